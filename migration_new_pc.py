@@ -228,6 +228,25 @@ class DatabaseMigration:
         self.add_column_if_not_exists('suppliers', 'created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
         self.add_column_if_not_exists('suppliers', 'updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
     
+    def run_versioned_migrations(self):
+        """Apply pending pos_app/database/migrations modules through the migration engine"""
+        self.log("\n--- Applying Versioned Migrations ---")
+        from sqlalchemy import create_engine
+        from pos_app.database.migration_engine import MigrationRunner
+
+        cfg = self.config
+        engine = create_engine(
+            f"postgresql://{cfg['username']}:{cfg['password']}@{cfg['host']}:{cfg['port']}/{cfg['database']}"
+        )
+        try:
+            applied = MigrationRunner(engine).run()
+            if applied:
+                self.log(f"✅ Applied migrations: {', '.join(f'v{v}' for v in applied)}")
+            else:
+                self.log("⚠️  No pending versioned migrations")
+        finally:
+            engine.dispose()
+    
     def run_all_migrations(self):
         """Run all database migrations"""
         self.log("=" * 80)
@@ -247,6 +266,7 @@ class DatabaseMigration:
             self.migrate_inventory_table()
             self.migrate_expenses_table()
             self.migrate_suppliers_table()
+            self.run_versioned_migrations()
             
             self.log("\n" + "=" * 80)
             self.log("✅ DATABASE MIGRATION COMPLETED SUCCESSFULLY")
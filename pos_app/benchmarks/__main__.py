@@ -0,0 +1,104 @@
+r"""
+Command line entry point: python -m pos_app.benchmarks [options]
+
+    --db URL            database URL (default: fresh SQLite file, removed after the run)
+    --profile NAME      smoke | small | realistic
+    --terminals N       concurrent simulated terminals
+    --transactions N    total operations (default from the profile)
+    --save-baseline     store this run as the baseline for profile + dialect
+    --check             exit 1 on any failed operation, a missing baseline or a
+                        regression against the stored baseline
+    --json PATH         also write the result as JSON
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+_here = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.abspath(os.path.join(_here, os.pardir, os.pardir))
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from sqlalchemy.orm import sessionmaker
+
+from pos_app.benchmarks.baseline import compare_to_baseline, load_baseline, save_baseline
+from pos_app.benchmarks.dataset import PROFILES, DatasetSpec, create_bench_engine, seed_dataset
+from pos_app.benchmarks.load import run_load
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pos_app.benchmarks", description="Sales pipeline benchmark")
+    parser.add_argument('--db', default=None, help="SQLAlchemy URL (sqlite:///... or postgresql://...)")
+    parser.add_argument('--profile', default='smoke', choices=sorted(PROFILES))
+    parser.add_argument('--terminals', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--baseline-dir', default=None)
+    parser.add_argument('--json', default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    # A scratch database per run, so earlier runs' sales do not skew this one
+    scratch = None if args.db else tempfile.mkdtemp(prefix='pos_bench_')
+    try:
+        url = args.db or f"sqlite:///{os.path.join(scratch, f'pos_bench_{args.profile}.db')}"
+        return _run(args, url)
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _run(args, url) -> int:
+    engine = create_bench_engine(url, pool_size=args.terminals + 2)
+    try:
+        with sessionmaker(bind=engine)() as session:
+            counts = seed_dataset(session, DatasetSpec.from_profile(args.profile, seed=args.seed))
+        print(f"Dataset ({args.profile}): {counts}")
+
+        transactions = args.transactions or PROFILES[args.profile]['transactions']
+        result = run_load(engine, terminals=args.terminals, transactions=transactions, seed=args.seed)
+    finally:
+        engine.dispose()
+    print(result.summary())
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result.to_dict(), f, indent=2)
+
+    status = 0
+    errors = sum(result.errors.values())
+    if args.check:
+        if errors:
+            print(f"FAILED: {errors} operation(s) failed; rerun with --verbose for the errors")
+            status = 1
+        baseline = load_baseline(args.profile, result.dialect, args.baseline_dir)
+        if baseline is None:
+            print(f"FAILED: no baseline for {args.profile}/{result.dialect}; run with --save-baseline first")
+            status = 1
+        else:
+            regressions = compare_to_baseline(result, baseline)
+            for line in regressions:
+                print(f"REGRESSION: {line}")
+            if regressions:
+                status = 1
+            elif not errors:
+                print("Within baseline tolerances")
+    if args.save_baseline:
+        if errors:
+            print("Baseline not saved: the run had failed operations")
+            status = 1
+        else:
+            print(f"Baseline saved to {save_baseline(result, args.profile, args.baseline_dir)}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Stored benchmark baselines and regression checks.
+
+A baseline is the JSON from BenchmarkResult.to_dict() saved per profile and
+database dialect (baselines/<profile>_<dialect>.json). A later run regresses
+when checkout latency grows, throughput drops or the error rate rises beyond
+the tolerances.
+"""
+
+import json
+import os
+from datetime import datetime
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+LATENCY_TOLERANCE = 0.25     # p50/p99 may grow by 25%
+THROUGHPUT_TOLERANCE = 0.20  # tps may drop by 20%
+ERROR_RATE_TOLERANCE = 0.01  # error rate may rise by one percentage point
+
+
+def baseline_path(profile: str, dialect: str, directory: str | None = None) -> str:
+    return os.path.join(directory or BASELINE_DIR, f"{profile}_{dialect}.json")
+
+
+def save_baseline(result, profile: str, directory: str | None = None) -> str:
+    data = result.to_dict() if hasattr(result, 'to_dict') else dict(result)
+    data['profile'] = profile
+    data['recorded_at'] = datetime.now().isoformat(timespec='seconds')
+    path = baseline_path(profile, data['dialect'], directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(profile: str, dialect: str, directory: str | None = None):
+    path = baseline_path(profile, dialect, directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _error_rate(data: dict) -> float:
+    total = (data.get('completed') or 0) + (data.get('errors') or 0)
+    return (data.get('errors') or 0) / total if total else 0.0
+
+
+def compare_to_baseline(result, baseline: dict, latency_tolerance: float = LATENCY_TOLERANCE,
+                        throughput_tolerance: float = THROUGHPUT_TOLERANCE,
+                        error_tolerance: float = ERROR_RATE_TOLERANCE) -> list:
+    """Return human-readable regressions (empty list when within tolerance)."""
+    current = result.to_dict() if hasattr(result, 'to_dict') else dict(result)
+    regressions = []
+
+    base_checkout = (baseline.get('ops') or {}).get('checkout') or {}
+    cur_checkout = (current.get('ops') or {}).get('checkout') or {}
+    for key in ('p50_ms', 'p99_ms'):
+        base, cur = base_checkout.get(key), cur_checkout.get(key)
+        if base and cur is not None and cur > base * (1 + latency_tolerance):
+            regressions.append(f"checkout {key} {cur:.2f} > baseline {base:.2f} (+{(cur / base - 1) * 100:.0f}%)")
+
+    base_tps, cur_tps = baseline.get('tps'), current.get('tps')
+    if base_tps and cur_tps is not None and cur_tps < base_tps * (1 - throughput_tolerance):
+        regressions.append(f"throughput {cur_tps:.2f} tps < baseline {base_tps:.2f} tps")
+
+    if _error_rate(current) > _error_rate(baseline) + error_tolerance:
+        regressions.append(f"error rate {_error_rate(current):.1%} > baseline {_error_rate(baseline):.1%}")
+    return regressions
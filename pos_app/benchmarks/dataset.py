@@ -0,0 +1,201 @@
+"""
+Deterministic benchmark dataset.
+
+Products, customers and years of sales history are generated from a seeded
+random.Random and written with batched Core inserts, so a 100k-sale history
+loads in seconds. The supplier and walk-in customer reuse the demo-data helpers
+(utils/demo_data.py); everything else is tagged BENCH-* so seeding is idempotent.
+"""
+
+import logging
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, insert, select, text
+
+from pos_app.models.database import Base, Customer, Payment, Product, Sale, SaleItem, mark_sync_changed
+from pos_app.utils.demo_data import _get_or_create_customer, _get_or_create_supplier
+from pos_app.utils.money import from_paisa
+
+logger = logging.getLogger(__name__)
+
+SKU_PREFIX = 'BENCH-'
+SUPPLIER_CODE = 'SUP-BENCH'
+INSERT_CHUNK = 2000
+
+# Dataset size and default number of load transactions per profile
+PROFILES = {
+    'smoke': {'products': 200, 'customers': 50, 'days': 30, 'sales_per_day': 20, 'transactions': 60},
+    'small': {'products': 2000, 'customers': 300, 'days': 365, 'sales_per_day': 60, 'transactions': 400},
+    'realistic': {'products': 10000, 'customers': 2000, 'days': 730, 'sales_per_day': 150, 'transactions': 2000},
+}
+
+
+class DatasetSpec:
+    """Size and seed of a benchmark dataset"""
+
+    def __init__(self, products=200, customers=50, days=30, sales_per_day=20, items_per_sale=3, seed=42):
+        self.products = int(products)
+        self.customers = int(customers)
+        self.days = int(days)
+        self.sales_per_day = int(sales_per_day)
+        self.items_per_sale = max(1, int(items_per_sale))
+        self.seed = int(seed)
+
+    @classmethod
+    def from_profile(cls, name: str, seed: int = 42):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown benchmark profile '{name}' (choose from {', '.join(PROFILES)})")
+        cfg = {k: v for k, v in PROFILES[name].items() if k != 'transactions'}
+        return cls(seed=seed, **cfg)
+
+
+def create_bench_engine(url: str, pool_size: int = 8):
+    """Engine suitable for concurrent terminals (SQLite gets WAL and a busy timeout)."""
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={'check_same_thread': False, 'timeout': 30})
+
+        @event.listens_for(engine, 'connect')
+        def _sqlite_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            cur.execute('PRAGMA journal_mode=WAL')
+            cur.execute('PRAGMA synchronous=NORMAL')
+            cur.close()
+        return engine
+    return create_engine(url, pool_size=pool_size, max_overflow=pool_size, pool_pre_ping=True)
+
+
+def _next_id(session, model) -> int:
+    return int(session.execute(select(func.coalesce(func.max(model.id), 0))).scalar() or 0) + 1
+
+
+def _insert_chunks(session, table, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        session.execute(insert(table), rows[start:start + INSERT_CHUNK])
+
+
+def _sync_sequences(session, tables):
+    """Explicit ids do not advance PostgreSQL sequences; move them past the seeded rows."""
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in tables:
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+def _max_numeric_invoice(session) -> int:
+    highest = 0
+    for (number,) in session.execute(select(Sale.invoice_number)):
+        if number and str(number).isdigit():
+            highest = max(highest, int(number))
+    return highest
+
+
+def seed_dataset(session, spec: DatasetSpec | None = None) -> dict:
+    """Create the benchmark dataset (once) and return its row counts."""
+    spec = spec or DatasetSpec()
+    Base.metadata.create_all(session.get_bind())
+
+    existing = session.execute(
+        select(func.count(Product.id)).where(Product.sku.like(f"{SKU_PREFIX}%"))
+    ).scalar()
+    if existing:
+        return dataset_counts(session)
+
+    rng = random.Random(spec.seed)
+    supplier = _get_or_create_supplier(session, SUPPLIER_CODE, "Benchmark Supplier")
+    _get_or_create_customer(session, "CUST-BENCH-WALKIN", "Benchmark Walk-in", "RETAIL")
+
+    # Products: prices held in paisa so totals are exact
+    product_id = _next_id(session, Product)
+    products, prices = [], []
+    for i in range(spec.products):
+        retail = rng.randint(50, 5000) * 100
+        prices.append((product_id + i, retail))
+        products.append({
+            'id': product_id + i,
+            'name': f"Bench Product {i:06d}",
+            'sku': f"{SKU_PREFIX}{i:06d}",
+            'barcode': f"29{i:011d}",
+            'retail_price': from_paisa(retail),
+            'wholesale_price': from_paisa(retail * 9 // 10),
+            'purchase_price': from_paisa(retail * 6 // 10),
+            'stock_level': 10_000_000,
+            'retail_stock': 10_000_000,
+            'warehouse_stock': 0,
+            'reorder_level': 5,
+            'supplier_id': supplier.id,
+            'unit': 'pcs',
+        })
+    _insert_chunks(session, Product.__table__, products)
+
+    customer_id = _next_id(session, Customer)
+    customers = []
+    for i in range(spec.customers):
+        credit = rng.randint(5_000, 50_000) * 100 if rng.random() < 0.3 else 0
+        customers.append({
+            'id': customer_id + i,
+            'code': f"BC-{i:06d}",
+            'name': f"Bench Customer {i:06d}",
+            'type': 'WHOLESALE' if i % 10 == 0 else 'RETAIL',
+            'credit_limit': 5_000_000.0,
+            'current_credit': from_paisa(credit),
+            'is_active': True,
+        })
+    _insert_chunks(session, Customer.__table__, customers)
+
+    # Sales history: spec.days of spec.sales_per_day, one payment per sale
+    sale_id = _next_id(session, Sale)
+    invoice = _max_numeric_invoice(session) + 1
+    start = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=spec.days)
+    customer_ids = [c['id'] for c in customers]
+    sales, items, payments = [], [], []
+    for day in range(spec.days):
+        for n in range(spec.sales_per_day):
+            when = start + timedelta(days=day, seconds=n * (36_000 // max(1, spec.sales_per_day)))
+            cust = rng.choice(customer_ids) if customer_ids and rng.random() < 0.4 else None
+            total = 0
+            for _ in range(rng.randint(1, spec.items_per_sale * 2 - 1)):
+                pid, price = rng.choice(prices)
+                qty = rng.randint(1, 4)
+                total += price * qty
+                items.append({'sale_id': sale_id, 'product_id': pid, 'quantity': float(qty),
+                              'unit_price': from_paisa(price), 'discount': 0.0, 'discount_type': 'NONE',
+                              'total': from_paisa(price * qty)})
+            method = 'CARD' if rng.random() < 0.2 else 'CASH'
+            sales.append({'id': sale_id, 'invoice_number': str(invoice), 'customer_id': cust,
+                          'subtotal': from_paisa(total), 'tax_amount': 0.0, 'discount_amount': 0.0,
+                          'total_amount': from_paisa(total), 'paid_amount': from_paisa(total),
+                          'sale_date': when, 'status': 'COMPLETED', 'is_wholesale': False,
+                          'payment_method': method, 'created_by': 'bench', 'is_refund': False})
+            payments.append({'sale_id': sale_id, 'customer_id': cust, 'amount': from_paisa(total),
+                             'payment_date': when, 'payment_method': method, 'status': 'COMPLETED',
+                             'reference': 'BENCH', 'created_by': 'bench'})
+            sale_id += 1
+            invoice += 1
+        if len(items) >= INSERT_CHUNK * 5:
+            _insert_chunks(session, Sale.__table__, sales)
+            _insert_chunks(session, SaleItem.__table__, items)
+            _insert_chunks(session, Payment.__table__, payments)
+            sales, items, payments = [], [], []
+    _insert_chunks(session, Sale.__table__, sales)
+    _insert_chunks(session, SaleItem.__table__, items)
+    _insert_chunks(session, Payment.__table__, payments)
+
+    _sync_sequences(session, ('products', 'customers', 'sales', 'sale_items', 'payments'))
+    for key in ('products', 'customers', 'sales'):
+        mark_sync_changed(session, key)
+    session.commit()
+    counts = dataset_counts(session)
+    logger.info(f"Seeded benchmark dataset: {counts}")
+    return counts
+
+
+def dataset_counts(session) -> dict:
+    return {
+        'products': session.execute(select(func.count(Product.id)).where(Product.sku.like(f"{SKU_PREFIX}%"))).scalar(),
+        'customers': session.execute(select(func.count(Customer.id)).where(Customer.code.like('BC-%'))).scalar(),
+        'sales': session.execute(select(func.count(Sale.id))).scalar(),
+        'sale_items': session.execute(select(func.count(SaleItem.id))).scalar(),
+    }
@@ -0,0 +1,212 @@
+"""
+Simulated terminals driving BusinessController concurrently.
+
+Each terminal is a thread with its own Session and controller, started together
+behind a barrier. Operations are drawn from a seeded mix:
+
+    checkout  - create_sale with 1-5 lines (cash, card or credit)
+    payment   - record_customer_payment against a customer with credit
+    receive   - create_purchase + receive_purchase
+    report    - dashboard_metrics / receivables / customer statement
+
+Latency is measured per operation with perf_counter; failed operations are
+rolled back and counted as errors.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from pos_app.benchmarks.dataset import SKU_PREFIX, SUPPLIER_CODE
+from pos_app.controllers.business_logic import BusinessController
+from pos_app.models.database import Customer, Product, Supplier
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIX = {'checkout': 0.85, 'payment': 0.05, 'receive': 0.03, 'report': 0.07}
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BenchmarkResult:
+    """Latencies per operation plus overall throughput"""
+
+    def __init__(self, dialect: str, terminals: int, elapsed: float, latencies: dict, errors: dict):
+        self.dialect = dialect
+        self.terminals = terminals
+        self.elapsed = elapsed
+        self.latencies = latencies
+        self.errors = errors
+
+    @property
+    def completed(self) -> int:
+        return sum(len(v) for v in self.latencies.values())
+
+    @property
+    def tps(self) -> float:
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def op_stats(self, op: str) -> dict:
+        values = self.latencies.get(op, [])
+        return {
+            'count': len(values),
+            'errors': self.errors.get(op, 0),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(max(values) * 1000, 2) if values else 0.0,
+            'tps': round(len(values) / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+        }
+
+    def to_dict(self) -> dict:
+        ops = sorted(set(self.latencies) | set(self.errors))
+        return {
+            'dialect': self.dialect,
+            'terminals': self.terminals,
+            'elapsed_s': round(self.elapsed, 3),
+            'completed': self.completed,
+            'errors': sum(self.errors.values()),
+            'tps': round(self.tps, 2),
+            'ops': {op: self.op_stats(op) for op in ops},
+        }
+
+    def summary(self) -> str:
+        lines = [f"{self.dialect}: {self.terminals} terminal(s), {self.completed} ops in {self.elapsed:.2f}s "
+                 f"= {self.tps:.1f} tps, {sum(self.errors.values())} error(s)",
+                 f"{'operation':<10} {'count':>6} {'err':>4} {'p50 ms':>9} {'p99 ms':>9} {'tps':>8}"]
+        for op, s in self.to_dict()['ops'].items():
+            lines.append(f"{op:<10} {s['count']:>6} {s['errors']:>4} {s['p50_ms']:>9.2f} {s['p99_ms']:>9.2f} {s['tps']:>8.2f}")
+        return '\n'.join(lines)
+
+
+class _Terminal:
+    """One simulated till"""
+
+    def __init__(self, index, session_factory, catalog, mix, seed):
+        self.index = index
+        self.session = session_factory()
+        self.controller = BusinessController(self.session)
+        self.catalog = catalog
+        self.rng = random.Random(seed * 1000 + index)
+        self.ops = list(mix)
+        self.weights = [mix[o] for o in self.ops]
+        self.latencies = {}
+        self.errors = {}
+
+    def _items(self, n_max=5):
+        lines = {}
+        for _ in range(self.rng.randint(1, n_max)):
+            pid, price = self.rng.choice(self.catalog['products'])
+            lines.setdefault(pid, {'product_id': pid, 'quantity': 0, 'unit_price': price, 'unit_cost': round(price * 0.6, 2)})
+            lines[pid]['quantity'] += self.rng.randint(1, 3)
+        return list(lines.values())
+
+    def checkout(self):
+        roll = self.rng.random()
+        customers = self.catalog['customers']
+        if roll < 0.1 and customers:
+            self.controller.create_sale(self.rng.choice(customers), self._items(), payment_method='CREDIT')
+        else:
+            self.controller.create_sale(None, self._items(), payment_method='CARD' if roll < 0.3 else 'CASH')
+
+    def payment(self):
+        credit = self.catalog['credit_customers'] or self.catalog['customers']
+        self.controller.record_customer_payment(self.rng.choice(credit), 1.0, reference='BENCH')
+
+    def receive(self):
+        purchase = self.controller.create_purchase(self.catalog['supplier_id'], self._items(3))
+        self.controller.receive_purchase(purchase.id)
+
+    def report(self):
+        choice = self.rng.randrange(3)
+        if choice == 0:
+            self.controller.dashboard_metrics()
+        elif choice == 1:
+            self.controller.get_receivables_report()
+        elif self.catalog['customers']:
+            self.controller.get_customer_statement_entries(self.rng.choice(self.catalog['customers']))
+
+    def run(self, count, barrier):
+        barrier.wait()
+        for _ in range(count):
+            op = self.rng.choices(self.ops, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                getattr(self, op)()
+            except Exception as e:
+                self.errors[op] = self.errors.get(op, 0) + 1
+                logger.debug(f"Terminal {self.index} {op} failed: {e}")
+                try:
+                    self.session.rollback()
+                except Exception:
+                    pass
+                continue
+            self.latencies.setdefault(op, []).append(time.perf_counter() - started)
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+def _load_catalog(session) -> dict:
+    products = session.execute(
+        select(Product.id, Product.retail_price).where(Product.sku.like(f"{SKU_PREFIX}%")).order_by(Product.id)
+    ).all()
+    if not products:
+        raise RuntimeError("No benchmark dataset found; run seed_dataset() first")
+    customers = session.execute(select(Customer.id, Customer.current_credit)
+                                .where(Customer.code.like('BC-%')).order_by(Customer.id)).all()
+    supplier_id = session.execute(select(Supplier.id).where(Supplier.code == SUPPLIER_CODE)).scalar()
+    return {
+        'products': [(pid, float(price)) for pid, price in products],
+        'customers': [cid for cid, _ in customers],
+        'credit_customers': [cid for cid, credit in customers if credit and float(credit) > 100],
+        'supplier_id': supplier_id,
+    }
+
+
+def run_load(engine, terminals: int = 4, transactions: int = 200, mix: dict | None = None,
+             seed: int = 7) -> BenchmarkResult:
+    """Run ``transactions`` operations spread over ``terminals`` concurrent terminals."""
+    terminals = max(1, int(terminals))
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        catalog = _load_catalog(session)
+
+    mix = mix or DEFAULT_MIX
+    tills = [_Terminal(i, factory, catalog, mix, seed) for i in range(terminals)]
+    share, extra = divmod(int(transactions), terminals)
+    barrier = threading.Barrier(terminals + 1)
+    threads = [threading.Thread(target=t.run, args=(share + (1 if i < extra else 0), barrier),
+                                name=f"bench-terminal-{i}", daemon=True)
+               for i, t in enumerate(tills)]
+    for th in threads:
+        th.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for th in threads:
+        th.join()
+    elapsed = time.perf_counter() - started
+
+    latencies, errors = {}, {}
+    for t in tills:
+        for op, values in t.latencies.items():
+            latencies.setdefault(op, []).extend(values)
+        for op, n in t.errors.items():
+            errors[op] = errors.get(op, 0) + n
+        t.close()
+    return BenchmarkResult(engine.dialect.name, terminals, elapsed, latencies, errors)
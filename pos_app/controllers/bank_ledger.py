@@ -0,0 +1,430 @@
+from pos_app.models.database import BankAccount, BankBalanceSnapshot, BankTransaction
+from pos_app.utils.logger import app_logger
+from pos_app.utils.money import money, money_sum, from_paisa, to_paisa
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import date, datetime, timedelta
+import threading
+import time
+
+
+# Transaction types that add to / take from the balance. The amount's sign is ignored for
+# these (refunds are stored as negative WITHDRAWALs); ADJUSTMENT uses the stored sign.
+CREDIT_TYPES = ('DEPOSIT', 'TRANSFER_IN', 'RECEIPT', 'INTEREST')
+DEBIT_TYPES = ('WITHDRAWAL', 'TRANSFER_OUT', 'PAYMENT', 'FEE')
+
+PAGE_SIZE = 200
+SNAPSHOT_INTERVAL = 3600  # seconds between background daily-balance snapshots
+
+
+def _type_name(transaction_type):
+    return str(getattr(transaction_type, 'value', transaction_type) or '').upper()
+
+
+def signed_amount(transaction_type, amount) -> float:
+    """Effect of a transaction on the account balance"""
+    kind = _type_name(transaction_type)
+    value = money(amount)
+    if kind in CREDIT_TYPES:
+        return abs(value)
+    if kind in DEBIT_TYPES:
+        return -abs(value)
+    return value
+
+
+def _signed_amount():
+    amount = func.coalesce(BankTransaction.amount, 0)
+    kind = BankTransaction.transaction_type
+    return case(
+        (kind.in_(CREDIT_TYPES), func.abs(amount)),
+        (kind.in_(DEBIT_TYPES), -func.abs(amount)),
+        else_=amount,
+    )
+
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)[:10]).date()
+
+
+def _before(key):
+    """Rows ordered strictly before the keyset position (transaction_date, id)"""
+    when, tid = key
+    return or_(BankTransaction.transaction_date < when,
+               and_(BankTransaction.transaction_date == when, BankTransaction.id < tid))
+
+
+def _at_or_after(key):
+    when, tid = key
+    return or_(BankTransaction.transaction_date > when,
+               and_(BankTransaction.transaction_date == when, BankTransaction.id >= tid))
+
+
+def _at_or_before(key):
+    when, tid = key
+    return or_(BankTransaction.transaction_date < when,
+               and_(BankTransaction.transaction_date == when, BankTransaction.id <= tid))
+
+
+class LedgerPage:
+    def __init__(self, rows, next_cursor):
+        self.rows = rows                # dicts, newest first, with the running 'balance'
+        self.next_cursor = next_cursor  # pass as `after` for the next page; None on the last page
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+class BankLedgerService:
+    """Bank transaction ledger: paging, running balances, daily snapshots and reconciliation.
+
+    Pages are read newest first with a keyset cursor on (transaction_date, id)
+    instead of loading every matching row. The running balance shown for each
+    row is computed with a window function over the page's span, starting from
+    the account's latest daily balance snapshot before the page (plus the
+    transactions since), so a page costs the same however long the history is.
+
+    record() is the write path: it locks the account row and reads its current
+    balance fresh before computing balance_after. reconcile() repairs
+    balance_after and current_balance in bulk after concurrent or back-dated writes.
+
+    When a fiscal year's transactions are archived (database/archive.py),
+    carry_forward() first writes each account's closing balance at the end of
+    that year. Snapshots up to the archived boundary are never rebuilt, and
+    reconcile() starts each account from the carried-forward balance instead
+    of opening_balance, so the archived year's net is not lost. Pages that
+    reach back into an archived year include its rows from the archive.
+
+        ledger = BankLedgerService(session)
+        page = ledger.page(account_id=1, date_from=start, date_to=end)
+        more = ledger.page(account_id=1, date_from=start, date_to=end, after=page.next_cursor)
+        ledger.reconcile()                 # recompute stored balances and snapshots
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    # ------------------------------------------------------------ writes
+    def record(self, amount, transaction_type, account_id=None, description=None, reference_number=None,
+               transaction_date=None, created_by=None):
+        """Add a transaction to the account (default: the first account) without committing.
+
+        Returns the BankTransaction, or None when there is no such account.
+        """
+        q = self.session.query(BankAccount)
+        q = q.filter(BankAccount.id == account_id) if account_id else q.order_by(BankAccount.id)
+        account = q.with_for_update().populate_existing().first()
+        if account is None:
+            return None
+        balance = money_sum((account.current_balance, signed_amount(transaction_type, amount)))
+        transaction = BankTransaction(
+            bank_account_id=account.id,
+            amount=amount,
+            balance_after=balance,
+            transaction_type=_type_name(transaction_type),
+            description=description,
+            reference_number=reference_number,
+            transaction_date=transaction_date or datetime.now(),
+            created_by=created_by
+        )
+        account.current_balance = balance
+        account.updated_at = datetime.now()
+        self.session.add(transaction)
+        return transaction
+
+    # ------------------------------------------------------------ balances
+    def _latest_snapshots(self, account_ids, before_day=None):
+        latest = self.session.query(BankBalanceSnapshot.bank_account_id.label('account_id'),
+                                    func.max(BankBalanceSnapshot.day).label('day'))
+        if before_day is not None:
+            latest = latest.filter(BankBalanceSnapshot.day < before_day)
+        if account_ids is not None:
+            latest = latest.filter(BankBalanceSnapshot.bank_account_id.in_(list(account_ids)))
+        latest = latest.group_by(BankBalanceSnapshot.bank_account_id).subquery()
+        rows = self.session.query(BankBalanceSnapshot).join(
+            latest, and_(latest.c.account_id == BankBalanceSnapshot.bank_account_id,
+                         latest.c.day == BankBalanceSnapshot.day))
+        return {s.bank_account_id: s for s in rows}
+
+    def balance_before(self, account_id, key) -> float:
+        """Balance after every transaction ordered before the keyset position (transaction_date, id)."""
+        snap = self._latest_snapshots([account_id], before_day=_day(key[0])).get(account_id)
+        q = self.session.query(func.coalesce(func.sum(_signed_amount()), 0)) \
+            .filter(BankTransaction.bank_account_id == account_id, _before(key))
+        if snap is not None:
+            base = money(snap.closing_balance)
+            q = q.filter(BankTransaction.transaction_date >= datetime.combine(snap.day + timedelta(days=1), datetime.min.time()))
+        else:
+            base = money(self.session.query(BankAccount.opening_balance).filter(BankAccount.id == account_id).scalar())
+        return money_sum((base, q.scalar()))
+
+    def balance_at(self, account_id, at=None) -> float:
+        """Balance including every transaction dated before `at` (default: now)."""
+        at = at or datetime.now()
+        return self.balance_before(account_id, (at, 0))
+
+    # ------------------------------------------------------------ paging
+    def page(self, account_id=None, transaction_type=None, date_from=None, date_to=None, reconciled_only=False,
+             after=None, limit=PAGE_SIZE) -> LedgerPage:
+        """One page of transactions, newest first. date_to is exclusive; `after` is a previous next_cursor."""
+        q = self.session.query(BankTransaction, BankAccount.name, BankAccount.account_number) \
+            .join(BankAccount, BankAccount.id == BankTransaction.bank_account_id)
+        if account_id:
+            q = q.filter(BankTransaction.bank_account_id == account_id)
+        if transaction_type:
+            q = q.filter(BankTransaction.transaction_type == _type_name(transaction_type))
+        if date_from is not None:
+            q = q.filter(BankTransaction.transaction_date >= date_from)
+        if date_to is not None:
+            q = q.filter(BankTransaction.transaction_date < date_to)
+        if reconciled_only:
+            q = q.filter(BankTransaction.is_reconciled == True)
+        if after is not None:
+            q = q.filter(_before(after))
+        found = q.order_by(BankTransaction.transaction_date.desc(), BankTransaction.id.desc()).limit(limit + 1).all()
+        archived = self._archived_page(account_id, transaction_type, date_from, date_to, reconciled_only, after,
+                                       limit, found)
+        if archived:
+            found = sorted(list(found) + archived, key=lambda r: (r[0].transaction_date, r[0].id), reverse=True)
+        more = len(found) > limit
+        found = found[:limit]
+
+        balances = self._running_balances([t for t, _, _ in found if isinstance(t, BankTransaction)])
+        rows = [{
+            'id': t.id,
+            'date': t.transaction_date,
+            'account_id': t.bank_account_id,
+            'account_name': name,
+            'account_number': number or '',
+            'transaction_type': _type_name(t.transaction_type),
+            'reference_number': t.reference_number,
+            'description': t.description,
+            'amount': money(t.amount),
+            'signed_amount': signed_amount(t.transaction_type, t.amount),
+            'balance': balances.get(t.id) if isinstance(t, BankTransaction) else money(t.balance_after),
+            'stored_balance': money(t.balance_after),
+            'is_reconciled': bool(t.is_reconciled),
+        } for t, name, number in found]
+        last = found[-1][0] if found else None
+        return LedgerPage(rows, (last.transaction_date, last.id) if more and last is not None else None)
+
+    def _archived_page(self, account_id, transaction_type, date_from, date_to, reconciled_only, after, limit,
+                       found) -> list:
+        """Archived transactions (database/archive.py) that can fall on the page, as (row, name, number).
+
+        Only read when the page reaches back past the archived boundary. Archived
+        rows show their stored balance_after, reconciled before they were moved.
+        """
+        archived_until = self._archived_until()
+        if archived_until is None or (len(found) > limit and found[-1][0].transaction_date >= archived_until):
+            return []
+        from pos_app.database.archive import archived_rows
+        end = min(d for d in (date_to, after[0] if after is not None else None, archived_until) if d is not None)
+        equals = {'bank_account_id': account_id} if account_id else {}
+        rows = [r for r in archived_rows(self.session, 'bank_transactions', date_from, end, **equals)
+                if (date_to is None or r.transaction_date < date_to)
+                and (after is None or (r.transaction_date, r.id) < tuple(after))
+                and (not transaction_type or _type_name(r.transaction_type) == _type_name(transaction_type))
+                and (not reconciled_only or r.get('is_reconciled'))]
+        if not rows:
+            return []
+        rows.sort(key=lambda r: (r.transaction_date, r.id), reverse=True)
+        accounts = {aid: (name, number) for aid, name, number in
+                    self.session.query(BankAccount.id, BankAccount.name, BankAccount.account_number)}
+        return [(r, *accounts.get(r.bank_account_id, (None, None))) for r in rows[:limit + 1]]
+
+    def _running_balances(self, transactions) -> dict:
+        """{transaction_id: balance after it} for the given rows, via a window over each account's span."""
+        spans = {}
+        for t in transactions:
+            key = (t.transaction_date, t.id)
+            lo, hi = spans.get(t.bank_account_id, (key, key))
+            spans[t.bank_account_id] = (min(lo, key), max(hi, key))
+        balances = {}
+        for account_id, (lo, hi) in spans.items():
+            base = self.balance_before(account_id, lo)
+            running = func.sum(_signed_amount()).over(
+                order_by=(BankTransaction.transaction_date, BankTransaction.id))
+            rows = self.session.query(BankTransaction.id, running) \
+                .filter(BankTransaction.bank_account_id == account_id, _at_or_after(lo), _at_or_before(hi))
+            for tid, total in rows:
+                balances[tid] = money_sum((base, total))
+        return balances
+
+    # ------------------------------------------------------------ snapshots
+    def _archived_until(self):
+        """End (exclusive) of the last archived fiscal year of bank transactions, or None"""
+        from pos_app.database.archive import archived_periods
+        return max((p.period_end for p in archived_periods(self.session, 'bank_transactions')), default=None)
+
+    def carry_forward(self, end, commit=False) -> int:
+        """Snapshot every account's balance at `end` (a day boundary) before the transactions
+        dated earlier are archived. Returns the number of accounts carried forward."""
+        end = datetime.combine(_day(end), datetime.min.time())
+        self.snapshot(upto=end, commit=False)
+        day = end.date() - timedelta(days=1)
+        existing = {s.bank_account_id: s for s in
+                    self.session.query(BankBalanceSnapshot).filter(BankBalanceSnapshot.day == day)}
+        account_ids = [aid for aid, in self.session.query(BankAccount.id)]
+        for aid in account_ids:
+            balance = self.balance_at(aid, end)
+            snap = existing.get(aid)
+            if snap is None:
+                self.session.add(BankBalanceSnapshot(bank_account_id=aid, day=day, closing_balance=balance,
+                                                     transaction_count=0))
+            else:
+                snap.closing_balance = balance
+        if commit:
+            self.session.commit()
+        else:
+            self.session.flush()
+        return len(account_ids)
+
+    def snapshot(self, upto=None, account_ids=None, commit=True) -> int:
+        """Write closing balances for each closed day (before `upto`, default today) with transactions."""
+        cutoff = datetime.combine(_day(upto or datetime.now()), datetime.min.time())
+        latest = self._latest_snapshots(account_ids)
+        accounts = self.session.query(BankAccount.id, BankAccount.opening_balance)
+        if account_ids is not None:
+            accounts = accounts.filter(BankAccount.id.in_(list(account_ids)))
+        state = {}
+        for aid, opening in accounts:
+            snap = latest.get(aid)
+            state[aid] = (to_paisa(snap.closing_balance), snap.day) if snap is not None else (to_paisa(opening), None)
+        if not state:
+            return 0
+
+        day = func.date(BankTransaction.transaction_date)
+        q = self.session.query(BankTransaction.bank_account_id, day, func.sum(_signed_amount()),
+                               func.count(BankTransaction.id), func.max(BankTransaction.id)) \
+            .filter(BankTransaction.bank_account_id.in_(list(state)), BankTransaction.transaction_date < cutoff)
+        starts = [snap_day for _, snap_day in state.values() if snap_day is not None]
+        if starts and len(starts) == len(state):
+            q = q.filter(BankTransaction.transaction_date >= datetime.combine(min(starts), datetime.min.time()))
+        q = q.group_by(BankTransaction.bank_account_id, day) \
+            .order_by(BankTransaction.bank_account_id, day)
+
+        written = []
+        for aid, when, total, count, last_id in q:
+            balance, done = state[aid]
+            when = _day(when)
+            if done is not None and when <= done:
+                continue
+            balance += to_paisa(total)
+            state[aid] = (balance, when)
+            written.append(BankBalanceSnapshot(bank_account_id=aid, day=when, closing_balance=from_paisa(balance),
+                                               transaction_count=int(count or 0), last_transaction_id=last_id))
+        self.session.add_all(written)
+        if commit:
+            self.session.commit()
+        else:
+            self.session.flush()
+        return len(written)
+
+    def rebuild_snapshots(self, account_ids=None, upto=None, commit=True) -> int:
+        """Rewrite the snapshots after the archived boundary (earlier ones cover archived rows)."""
+        q = self.session.query(BankBalanceSnapshot)
+        archived_until = self._archived_until()
+        if archived_until is not None:
+            q = q.filter(BankBalanceSnapshot.day >= _day(archived_until))
+        if account_ids is not None:
+            q = q.filter(BankBalanceSnapshot.bank_account_id.in_(list(account_ids)))
+        q.delete(synchronize_session=False)
+        self.session.flush()
+        return self.snapshot(upto, account_ids, commit)
+
+    # ------------------------------------------------------------ reconciliation
+    def reconcile(self, account_ids=None, commit=True) -> dict:
+        """Recompute every balance_after and current_balance from the transactions, then the snapshots.
+
+        Accounts with archived transactions start from the balance carried forward
+        at the archived boundary, less the live transactions dated up to it.
+
+        Accounts are locked for the duration so writers going through record() wait.
+        Returns {'accounts', 'transactions_fixed', 'balances_fixed', 'snapshots'}.
+        """
+        try:
+            q = self.session.query(BankAccount).order_by(BankAccount.id)
+            if account_ids is not None:
+                q = q.filter(BankAccount.id.in_(list(account_ids)))
+            accounts = q.with_for_update().populate_existing().all()
+            if not accounts:
+                return {'accounts': 0, 'transactions_fixed': 0, 'balances_fixed': 0, 'snapshots': 0}
+            opening = {a.id: to_paisa(a.opening_balance) for a in accounts}
+            archived_until = self._archived_until()
+            if archived_until is not None:
+                floors = self._latest_snapshots(list(opening), before_day=_day(archived_until))
+                for aid, floor in floors.items():
+                    live = self.session.query(func.coalesce(func.sum(_signed_amount()), 0)).filter(
+                        BankTransaction.bank_account_id == aid,
+                        BankTransaction.transaction_date < datetime.combine(floor.day + timedelta(days=1),
+                                                                            datetime.min.time())).scalar()
+                    opening[aid] = to_paisa(floor.closing_balance) - to_paisa(live)
+
+            running = func.sum(_signed_amount()).over(
+                partition_by=BankTransaction.bank_account_id,
+                order_by=(BankTransaction.transaction_date, BankTransaction.id))
+            rows = self.session.query(BankTransaction.id, BankTransaction.bank_account_id,
+                                      BankTransaction.balance_after, running) \
+                .filter(BankTransaction.bank_account_id.in_(list(opening)))
+
+            fixes, closing = [], dict(opening)
+            for tid, aid, stored, total in rows.yield_per(5000):
+                balance = opening[aid] + to_paisa(total)
+                closing[aid] = balance
+                if stored is None or to_paisa(stored) != balance:
+                    fixes.append({'id': tid, 'balance_after': from_paisa(balance)})
+            for i in range(0, len(fixes), 1000):
+                self.session.execute(update(BankTransaction), fixes[i:i + 1000])
+
+            balances_fixed = 0
+            for account in accounts:
+                if to_paisa(account.current_balance) != closing[account.id]:
+                    account.current_balance = from_paisa(closing[account.id])
+                    balances_fixed += 1
+            snapshots = self.rebuild_snapshots([a.id for a in accounts], commit=False)
+            if commit:
+                self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to reconcile bank balances: {str(e)}")
+        result = {'accounts': len(accounts), 'transactions_fixed': len(fixes),
+                  'balances_fixed': balances_fixed, 'snapshots': snapshots}
+        app_logger.info(f"Bank reconciliation: {result}")
+        return result
+
+
+_snapshot_thread = None
+_snapshot_lock = threading.Lock()
+
+
+def start_balance_snapshots(interval=SNAPSHOT_INTERVAL):
+    """Snapshot closed days now and every `interval` seconds on a daemon thread.
+
+    Keeps balance_before() (and so every ledger page) reading from the latest
+    snapshot instead of summing the account's whole history.
+    """
+    global _snapshot_thread
+
+    def run():
+        from pos_app.database.db_utils import get_db_session
+        while True:
+            try:
+                with get_db_session() as session:
+                    written = BankLedgerService(session).snapshot()
+                if written:
+                    app_logger.info(f"Bank balance snapshots written: {written}")
+            except Exception as e:
+                # Another terminal writing the same day hits the unique index; the next run catches up
+                app_logger.warning(f"Bank balance snapshot failed: {e}")
+            time.sleep(interval)
+
+    with _snapshot_lock:
+        if _snapshot_thread is None or not _snapshot_thread.is_alive():
+            _snapshot_thread = threading.Thread(target=run, name="BankBalanceSnapshots", daemon=True)
+            _snapshot_thread.start()
+        return _snapshot_thread
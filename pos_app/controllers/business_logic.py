@@ -1,9 +1,16 @@
 from pos_app.models.database import Product, Customer, Supplier, Sale, SaleItem, Purchase, PurchaseItem, StockMovement, Payment, PaymentMethod, PaymentStatus, PurchasePayment, Expense
 from pos_app.utils.logger import inventory_logger
+from pos_app.utils.money import money, money_sum, money_mul, cost_mul, money_is_zero, money_gt, money_eq, to_paisa, from_paisa
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from datetime import datetime
 import random
 import string
+import time
+
+# Terminals number sales as max(invoice_number) + 1 on their own; a clash is retried
+INVOICE_NUMBER_ATTEMPTS = 5
+INVOICE_NUMBER_LOCK_KEY = 0x504F5349  # "POSI", pg_advisory_xact_lock key for numbering
 
 class BusinessController:
     def __init__(self, db_session):
@@ -127,7 +134,8 @@ class BusinessController:
                     product=product,
                     movement_type='IN',
                     quantity=stock_level,
-                    reference='Initial Stock'
+                    reference='Initial Stock',
+                    unit_cost=product_kwargs.get('purchase_price')
                 )
                 self.session.add(movement)
             try:
@@ -253,7 +261,8 @@ class BusinessController:
                 movement_type=movement_type,
                 quantity=qty,
                 location=location_str,
-                reference=reference
+                reference=reference,
+                unit_cost=product.purchase_price
             )
             self.session.add(movement)
 
@@ -329,7 +338,35 @@ class BusinessController:
             
         return stock_errors
 
-    def create_sale(self, customer_id, items, is_wholesale=False, payment_method='CASH', amount_paid=None, is_refund=False, refund_of_sale_id=None, discount_amount=0.0):
+    def create_sale(self, customer_id, items, is_wholesale=False, payment_method='CASH', amount_paid=None, is_refund=False, refund_of_sale_id=None, discount_amount=0.0, promotion_id=None):
+        # Another terminal may commit the same invoice number between our read and insert;
+        # the whole sale was rolled back, so it is simply tried again with a fresh number
+        for attempt in range(INVOICE_NUMBER_ATTEMPTS):
+            try:
+                return self._create_sale(customer_id, items, is_wholesale, payment_method, amount_paid,
+                                         is_refund, refund_of_sale_id, discount_amount, promotion_id)
+            except IntegrityError as e:
+                if 'invoice_number' not in str(e) or attempt == INVOICE_NUMBER_ATTEMPTS - 1:
+                    raise Exception(f"Failed to create sale: {str(e)}")
+                # Jitter so terminals that clashed do not pick the next number in lockstep
+                time.sleep(random.uniform(0, 0.02 * (attempt + 1)))
+
+    def _next_invoice_number(self):
+        """Highest numeric invoice number + 1 (PostgreSQL: serialised until commit)"""
+        if self.session.get_bind().dialect.name == 'postgresql':
+            self.session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {'k': INVOICE_NUMBER_LOCK_KEY})
+        # Column only, no Sale objects
+        max_num = 0
+        for (number,) in self.session.query(Sale.invoice_number):
+            if number:
+                try:
+                    num = int(number) if isinstance(number, str) else number
+                    max_num = max(max_num, num)
+                except (ValueError, TypeError):
+                    pass
+        return str(max_num + 1)
+
+    def _create_sale(self, customer_id, items, is_wholesale, payment_method, amount_paid, is_refund, refund_of_sale_id, discount_amount, promotion_id=None):
         try:
             # CRITICAL: Validate stock before processing sale
             # Refunds increase stock, so they must NOT be blocked by insufficient stock checks.
@@ -339,51 +376,25 @@ class BusinessController:
                     error_msg = "Insufficient stock for:\n" + "\n".join(stock_errors)
                     raise Exception(error_msg)
             
-            # Generate sequential invoice number
-            # Get all sales and find the highest numeric invoice number
-            all_sales = self.session.query(Sale).all()
-            max_num = 0
-            for sale in all_sales:
-                if sale.invoice_number:
-                    try:
-                        num = int(sale.invoice_number) if isinstance(sale.invoice_number, str) else sale.invoice_number
-                        max_num = max(max_num, num)
-                    except (ValueError, TypeError):
-                        pass
-            invoice_number = str(max_num + 1)
-
             # Normalize payment method to string for logic and storage
             if payment_method:
                 pm_raw = str(payment_method).upper().replace(' ', '_')
             else:
                 pm_raw = 'CASH'
 
-            # Calculate totals
-            subtotal = sum(item['quantity'] * item['unit_price'] for item in items)
-            
-            # Apply discount (ensure it doesn't exceed subtotal)
-            discount_amount = min(float(discount_amount or 0.0), subtotal)
-            
-            # Get configurable tax rate from settings
-            try:
-                from PySide6.QtCore import QSettings
-                settings = QSettings("POSApp", "Settings")
-                try:
-                    user_set = str(settings.value('tax_rate_user_set', 'false') or 'false').strip().lower() == 'true'
-                except Exception:
-                    user_set = False
-
-                if not user_set:
-                    tax_rate = 0.0
-                else:
-                    tax_rate = float(settings.value("tax_rate", 0.0)) / 100.0
-            except Exception:
-                tax_rate = 0.0
-            
-            # Calculate tax on discounted amount
-            taxable_amount = subtotal - discount_amount
-            tax_amount = taxable_amount * tax_rate
-            total_amount = taxable_amount + tax_amount
+            # Price the whole cart with the compiled rules, exactly as the sales screen totals it:
+            # product/customer discounts and the promotion picked at the till (not on refunds),
+            # the manual discount capped at the subtotal, and tax on the discounted lines
+            from pos_app.utils.pricing import get_pricing_engine
+            priced = get_pricing_engine().price_cart(
+                [{'id': item['product_id'], 'quantity': item['quantity'], 'price': item['unit_price']}
+                 for item in items],
+                customer_id=customer_id, manual_discount=discount_amount, apply_rules=not is_refund,
+                promotion_id=promotion_id, session=self.session)
+            subtotal = priced.subtotal
+            discount_amount = priced.discount
+            tax_amount = priced.tax
+            total_amount = priced.total
             
             # For refunds, make all amounts negative to properly reflect in reports
             if is_refund:
@@ -396,9 +407,9 @@ class BusinessController:
             # - Normal sale: credit means nothing paid now
             # - Refund: money goes OUT, treat paid_now as the refund amount (usually equals total)
             if is_refund:
-                paid_now = float(amount_paid) if amount_paid is not None else abs(total_amount)
+                paid_now = money(amount_paid) if amount_paid is not None else abs(total_amount)
             else:
-                paid_now = float(amount_paid) if amount_paid is not None else (
+                paid_now = money(amount_paid) if amount_paid is not None else (
                     0.0 if pm_raw == 'CREDIT' else total_amount
                 )
             if not is_refund:
@@ -406,7 +417,7 @@ class BusinessController:
                     paid_now = 0.0
                 if paid_now > total_amount:
                     paid_now = total_amount
-            remaining = 0.0 if is_refund else (total_amount - paid_now)
+            remaining = 0.0 if is_refund else from_paisa(to_paisa(total_amount) - to_paisa(paid_now))
             
             # Check credit limit for credit sales
             if customer_id and pm_raw == 'CREDIT':
@@ -415,10 +426,10 @@ class BusinessController:
                     customer = self.session.get(Customer, customer_id)
                     if customer:
                         # Calculate what the credit would be after this sale
-                        new_credit = (customer.current_credit or 0.0) + remaining
+                        new_credit = money_sum((customer.current_credit, remaining))
                         credit_limit = customer.credit_limit or 0.0
                         
-                        if new_credit > credit_limit:
+                        if money_gt(new_credit, credit_limit):
                             customer_name = getattr(customer, 'name', 'Unknown')
                             raise Exception(
                                 f"Credit limit exceeded for {customer_name}! "
@@ -435,9 +446,9 @@ class BusinessController:
             
             # Create sale
             sale = Sale(
-                invoice_number=invoice_number,
                 customer_id=customer_id,
                 subtotal=subtotal,
+                discount_amount=discount_amount,
                 tax_amount=tax_amount,
                 total_amount=total_amount,
                 paid_amount=paid_now,
@@ -448,15 +459,24 @@ class BusinessController:
                 refund_of_sale_id=refund_of_sale_id
             )
             self.session.add(sale)
+            # Insert first, number second: on SQLite the insert takes the write lock, so no
+            # other terminal can commit the number read next before this sale commits
+            self.session.flush()
+            invoice_number = self._next_invoice_number()
+            sale.invoice_number = invoice_number
+            self.session.flush()
             
-            # Add items and update stock
-            for item in items:
+            # Add items and update stock; each line carries its priced discount and total
+            # (tax included), so the lines add up to the sale total
+            for item, line in zip(items, priced.lines):
                 sale_item = SaleItem(
                     sale=sale,
                     product_id=item['product_id'],
                     quantity=item['quantity'],
                     unit_price=item['unit_price'],
-                    total=item['quantity'] * item['unit_price']
+                    discount=line.discount,
+                    discount_type='FIXED_AMOUNT',
+                    total=line.total
                 )
                 self.session.add(sale_item)
                 
@@ -477,7 +497,7 @@ class BusinessController:
             
             # Record payment
             if paid_now > 0:
-                status_code = 'COMPLETED' if abs(remaining) < 1e-6 else 'PARTIAL'
+                status_code = 'COMPLETED' if money_is_zero(remaining) else 'PARTIAL'
                 payment_amount = (-paid_now) if is_refund else paid_now
                 payment = Payment(
                     sale=sale,
@@ -489,11 +509,11 @@ class BusinessController:
                 self.session.add(payment)
             
             # Update customer credit if there is remaining amount
-            if customer_id and (not is_refund) and remaining > 1e-6:
+            if customer_id and (not is_refund) and money_gt(remaining, 0):
                 try:
                     customer = self.session.get(Customer, customer_id)
                     if customer:
-                        customer.current_credit = (customer.current_credit or 0.0) + remaining
+                        customer.current_credit = money_sum((customer.current_credit, remaining))
                         # Also record credit payment
                         credit_payment = Payment(
                             sale=sale,
@@ -508,40 +528,51 @@ class BusinessController:
                     pass
 
             # Refund reduces customer credit if they had any outstanding (best-effort)
-            if customer_id and is_refund and total_amount > 1e-6:
+            if customer_id and is_refund and money_gt(total_amount, 0):
                 try:
                     customer = self.session.get(Customer, customer_id)
                     if customer:
-                        current = float(customer.current_credit or 0.0)
-                        customer.current_credit = max(0.0, current - float(total_amount))
+                        current = money(customer.current_credit)
+                        customer.current_credit = max(0.0, from_paisa(to_paisa(current) - to_paisa(total_amount)))
                 except Exception:
                     pass
             
             # Record bank transaction for cash movement (non-credit)
             try:
-                from pos_app.models.database import BankTransaction, BankAccount
-                if pm_raw != 'CREDIT' and paid_now > 1e-6:
-                    acct = self.session.query(BankAccount).first()
-                    if acct is not None:
-                        # IMPORTANT: Bank balance must reflect actual cash movement, not invoice total.
-                        amt = float(paid_now or 0.0)
-                        if is_refund:
-                            amt = -amt
-                        new_balance = float(acct.current_balance or 0.0) + amt
-                        self.session.add(BankTransaction(
-                            bank_account_id=acct.id,
-                            amount=amt,
-                            balance_after=new_balance,
-                            transaction_type=('WITHDRAWAL' if is_refund else 'DEPOSIT'),
-                            description=f"{'Refund' if is_refund else 'Sale'} {invoice_number}",
-                            reference_number=invoice_number,
-                            transaction_date=datetime.now()
-                        ))
-                        acct.current_balance = new_balance
+                from pos_app.controllers.bank_ledger import BankLedgerService
+                if pm_raw != 'CREDIT' and money_gt(paid_now, 0):
+                    # IMPORTANT: Bank balance must reflect actual cash movement, not invoice total.
+                    amt = money(paid_now)
+                    if is_refund:
+                        amt = -amt
+                    BankLedgerService(self.session).record(
+                        amt, 'WITHDRAWAL' if is_refund else 'DEPOSIT',
+                        description=f"{'Refund' if is_refund else 'Sale'} {invoice_number}",
+                        reference_number=invoice_number
+                    )
             except Exception:
                 pass
+
+            # Cash sales and refunds move money in/out of the open cash drawer session
+            if pm_raw == 'CASH' and money_gt(paid_now, 0):
+                from pos_app.controllers.cash_drawer import CashDrawerService
+                CashDrawerService(self.session).record(
+                    'REFUND' if is_refund else 'SALE', paid_now,
+                    reference=invoice_number,
+                    description=f"{'Refund' if is_refund else 'Sale'} {invoice_number}"
+                )
             
             self.session.commit()
+
+            # Mark sales/stock as changed so cached reports and other terminals refresh
+            try:
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.session, 'sales')
+                mark_sync_changed(self.session, 'stock')
+                self.session.commit()
+            except Exception:
+                pass
+
             # remember for printing hooks
             try:
                 self._last_sale_id = sale.id
@@ -552,8 +583,10 @@ class BusinessController:
             print(f"Error creating sale: {e}")
             try:
                 self.session.rollback()
-            except Exception as e:
+            except Exception:
                 pass
+            if isinstance(e, IntegrityError):
+                raise
             raise Exception(f"Failed to create sale: {str(e)}")
 
     def create_purchase(self, supplier_id, items):
@@ -562,7 +595,7 @@ class BusinessController:
             purchase_number = self.generate_code('PO')
             
             # Calculate total
-            total_amount = sum(item['quantity'] * item['unit_cost'] for item in items)
+            total_amount = money_sum(cost_mul(item['unit_cost'], item['quantity']) for item in items)
             
             # Create purchase with PENDING status (not RECEIVED)
             purchase = Purchase(
@@ -576,7 +609,7 @@ class BusinessController:
             # Add items (do NOT update stock yet - only when received)
             for item in items:
                 # Calculate total_cost for this item
-                total_cost = item['quantity'] * item['unit_cost']
+                total_cost = cost_mul(item['unit_cost'], item['quantity'])
                 
                 purchase_item = PurchaseItem(
                     purchase=purchase,
@@ -637,6 +670,50 @@ class BusinessController:
                 pass
             return []
 
+    def get_stock_position(self, product_id, at=None):
+        """Stock quantity of a product at a point in time (snapshot + movements since)"""
+        try:
+            from pos_app.utils.inventory_ledger import InventoryLedger
+            return InventoryLedger(self.session).stock_at(product_id, at)
+        except Exception as e:
+            print(f"Error getting stock position: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return None
+
+    def get_inventory_valuation(self, at=None, product_ids=None):
+        """Stock quantities and weighted-average cost value at a point in time"""
+        try:
+            from pos_app.utils.inventory_ledger import InventoryLedger
+            return InventoryLedger(self.session).valuation(at, product_ids)
+        except Exception as e:
+            print(f"Error getting inventory valuation: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return None
+
+    def get_reorder_suggestions(self, window_days=30, lead_time_days=7, cover_days=30, supplier_id=None):
+        """Products to reorder with sales velocity, days of cover and suggested quantity"""
+        try:
+            from pos_app.controllers.replenishment import ReplenishmentEngine
+            return ReplenishmentEngine(self.session).suggestions(window_days, lead_time_days, cover_days, supplier_id)
+        except Exception as e:
+            print(f"Error getting reorder suggestions: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return []
+
+    def create_reorder_purchases(self, suggestions=None, notes=None):
+        """Create one purchase order per supplier from reorder suggestions"""
+        from pos_app.controllers.replenishment import ReplenishmentEngine
+        return ReplenishmentEngine(self.session).create_purchase_orders(suggestions, notes)
+
     def get_inventory_report(self):
         """Return all products with stock info"""
         try:
@@ -685,11 +762,11 @@ class BusinessController:
             customer = self.session.get(Customer, customer_id)
             if not customer:
                 raise Exception("Customer not found")
-            amt = float(amount or 0.0)
+            amt = money(amount)
             if amt <= 0:
                 raise Exception("Payment amount must be positive")
-            current = float(customer.current_credit or 0.0)
-            if amt > current + 1e-6:
+            current = money(customer.current_credit)
+            if money_gt(amt, current):
                 raise Exception(f"Payment exceeds outstanding balance (Due: {current:.2f})")
             # Normalize method to string for logic and storage
             pm_raw = str(payment_method).upper().replace(' ', '_')
@@ -706,7 +783,7 @@ class BusinessController:
             )
             self.session.add(pay)
             # Reduce outstanding credit
-            customer.current_credit = max(0.0, current - amt)
+            customer.current_credit = max(0.0, from_paisa(to_paisa(current) - to_paisa(amt)))
             self.session.commit()
             
             # Mark payments as changed so all views refresh
@@ -737,8 +814,8 @@ class BusinessController:
     def get_payables_report(self):
         """Return suppliers with computed outstanding dues (>0)."""
         try:
-            # We'll compute outstanding in the view for flexibility; return all suppliers
-            return self.session.query(Supplier).all()
+            from pos_app.controllers.supplier_balances import SupplierBalanceService
+            return [s for s, _ in SupplierBalanceService(self.session).get_payables()]
         except Exception as e:
             print(f"Error getting payables report: {e}")
             try:
@@ -756,13 +833,16 @@ class BusinessController:
         """
         try:
             from pos_app.models.database import Payment
+            from pos_app.database.archive import archived_rows
             entries: list[dict] = []
+            # Payments of closed fiscal years moved out by the archiver
+            archived = archived_rows(self.session, 'payments', customer_id=customer_id)
             # Charges (credit entries)
             credit_entries = (
                 self.session.query(Payment)
                 .filter(Payment.customer_id == customer_id, Payment.payment_method == 'CREDIT')
                 .all()
-            )
+            ) + [p for p in archived if p.get('payment_method') == 'CREDIT']
             for p in credit_entries:
                 entries.append({
                     'date': getattr(p, 'payment_date', None),
@@ -776,7 +856,7 @@ class BusinessController:
                 self.session.query(Payment)
                 .filter(Payment.customer_id == customer_id, Payment.payment_method != 'CREDIT')
                 .all()
-            )
+            ) + [p for p in archived if p.get('payment_method') != 'CREDIT']
             for p in payment_entries:
                 entries.append({
                     'date': getattr(p, 'payment_date', None),
@@ -825,6 +905,59 @@ class BusinessController:
             None
         )
 
+    def export_month_end_statements(self, start_date, end_date, customer_ids=None, workers=None, output_dir="documents"):
+        """Write one text statement per customer with activity in the period.
+
+        Entries for every customer are loaded with a single query and the documents
+        are rendered across a process pool. Returns the list of written paths.
+        """
+        try:
+            query = (
+                self.session.query(Payment)
+                .filter(Payment.customer_id.isnot(None),
+                        Payment.payment_date >= start_date,
+                        Payment.payment_date <= end_date)
+                .order_by(Payment.customer_id, Payment.payment_date)
+            )
+            if customer_ids:
+                query = query.filter(Payment.customer_id.in_(list(customer_ids)))
+            by_customer = {}
+            for p in query.all():
+                is_charge = p.payment_method == 'CREDIT'
+                by_customer.setdefault(p.customer_id, []).append([
+                    p.payment_date.strftime('%Y-%m-%d %H:%M') if p.payment_date else '',
+                    'Charge' if is_charge else 'Payment',
+                    p.reference or ('Credit Sale' if is_charge else ''),
+                    f"{float(p.amount or 0.0):.2f}",
+                    str(p.status or ''),
+                ])
+            if not by_customer:
+                return []
+            names = dict(
+                self.session.query(Customer.id, Customer.name)
+                .filter(Customer.id.in_(list(by_customer.keys())))
+                .all()
+            )
+            statements = [{
+                'customer_id': cid,
+                'customer_name': names.get(cid, f"Customer {cid}"),
+                'start_date': start_date.strftime('%Y-%m-%d') if hasattr(start_date, 'strftime') else start_date,
+                'end_date': end_date.strftime('%Y-%m-%d') if hasattr(end_date, 'strftime') else end_date,
+                'rows': rows,
+                'headers': ['Date', 'Type', 'Reference', 'Amount', 'Status'],
+            } for cid, rows in by_customer.items()]
+            from pos_app.utils.document_generator import DocumentGenerator
+            dg = DocumentGenerator(output_dir=output_dir)
+            return dg.generate_statements_batch(statements, workers=workers,
+                                                subdir=f"statements_{datetime.now().strftime('%Y%m')}")
+        except Exception as e:
+            print(f"Error exporting month-end statements: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return []
+
     def record_purchase_payment(self, purchase_id, supplier_id, amount, payment_method='BANK_TRANSFER', reference=None, notes=None, payment_date=None):
         try:
             purchase = self.session.get(Purchase, purchase_id)
@@ -854,28 +987,26 @@ class BusinessController:
             )
             self.session.add(pp)
             # update purchase paid_amount
-            purchase.paid_amount = (purchase.paid_amount or 0.0) + amount
+            purchase.paid_amount = money_sum((purchase.paid_amount, amount))
             # if fully paid, mark status
-            if abs((purchase.total_amount or 0.0) - (purchase.paid_amount or 0.0)) < 0.01:
+            if money_eq(purchase.total_amount, purchase.paid_amount):
                 purchase.status = 'PAID'
             # Bank transaction for outgoing payment
             try:
-                from pos_app.models.database import BankTransaction, BankAccount
-                acct = self.session.query(BankAccount).first()
-                if acct is not None:
-                    new_balance = float(acct.current_balance or 0.0) - float(amount or 0.0)
-                    self.session.add(BankTransaction(
-                        bank_account_id=acct.id,
-                        amount=amount,
-                        balance_after=new_balance,
-                        transaction_type='WITHDRAWAL',
-                        description=f"Purchase Payment #{purchase_id}",
-                        reference_number=f"PP-{purchase_id}",
-                        transaction_date=datetime.now()
-                    ))
-                    acct.current_balance = new_balance
+                from pos_app.controllers.bank_ledger import BankLedgerService
+                BankLedgerService(self.session).record(
+                    amount, 'WITHDRAWAL',
+                    description=f"Purchase Payment #{purchase_id}",
+                    reference_number=f"PP-{purchase_id}"
+                )
             except Exception:
                 pass
+            if pm_raw == 'CASH':
+                from pos_app.controllers.cash_drawer import CashDrawerService
+                CashDrawerService(self.session).record(
+                    'PAYOUT', amount, reference=f"PP-{purchase_id}",
+                    description=f"Purchase Payment #{purchase_id}"
+                )
             self.session.commit()
             
             # Mark payments as changed so all views refresh
@@ -891,6 +1022,11 @@ class BusinessController:
             self.session.rollback()
             raise Exception(f"Failed to record purchase payment: {str(e)}")
 
+    def get_supplier_balances(self, supplier_ids=None, as_of=None):
+        """Outstanding payables and ageing buckets per supplier (see SupplierBalanceService)."""
+        from pos_app.controllers.supplier_balances import SupplierBalanceService
+        return SupplierBalanceService(self.session).get_balances(supplier_ids, as_of)
+
     def get_outstanding_purchases(self):
         try:
             return self.session.query(Purchase).filter((Purchase.total_amount - Purchase.paid_amount) > 0).all()
@@ -917,6 +1053,11 @@ class BusinessController:
                 supplier_id=supplier_id
             )
             self.session.add(exp)
+            if str(payment_method or '').upper() == 'CASH':
+                from pos_app.controllers.cash_drawer import CashDrawerService
+                CashDrawerService(self.session).record(
+                    'PAYOUT', amount, reference=reference, description=f"Expense: {title}", created_by=created_by
+                )
             self.session.commit()
             return exp
         except SQLAlchemyError as e:
@@ -932,14 +1073,16 @@ class BusinessController:
             start_of_day = datetime(today.year, today.month, today.day)
             monthly_start = datetime(today.year, today.month, 1)
 
-            sales_today = self.session.query(Sale).filter(Sale.sale_date >= start_of_day).all() or []
-            sales_month = self.session.query(Sale).filter(Sale.sale_date >= monthly_start).all() or []
-            total_sales_today = sum(((-s.total_amount) if getattr(s, 'is_refund', False) else (s.total_amount or 0.0)) for s in sales_today)
-            monthly_revenue = sum(((-s.total_amount) if getattr(s, 'is_refund', False) else (s.total_amount or 0.0)) for s in sales_month)
-            low_stock = len(self.session.query(Product).filter(Product.stock_level <= Product.reorder_level).all())  # TODO: Add .all() or .first()
+            from sqlalchemy import func, case
+            # Money columns are NUMERIC, so SQL SUM is exact
+            signed_total = case((Sale.is_refund == True, -Sale.total_amount), else_=func.coalesce(Sale.total_amount, 0))
+            total_sales_today = money(self.session.query(func.sum(signed_total)).filter(Sale.sale_date >= start_of_day).scalar())
+            monthly_revenue = money(self.session.query(func.sum(signed_total)).filter(Sale.sale_date >= monthly_start).scalar())
+            low_stock = self.session.query(func.count(Product.id)).filter(Product.stock_level <= Product.reorder_level).scalar() or 0
             active_customers = self.session.query(Customer).filter(Customer.is_active == True).count()
-            outstanding_purchases = sum((p.total_amount - (p.paid_amount or 0.0)) for p in self.get_outstanding_purchases())
-            total_expenses = sum(e.amount for e in self.session.query(Expense).all() or [])
+            due = Purchase.total_amount - func.coalesce(Purchase.paid_amount, 0)
+            outstanding_purchases = money(self.session.query(func.sum(due)).filter(due > 0).scalar())
+            total_expenses = money(self.session.query(func.sum(Expense.amount)).scalar())
 
             return {
                 'total_sales_today': total_sales_today,
@@ -1057,12 +1200,16 @@ class BusinessController:
 
     def create_recurring_expense(self, title, amount, category, frequency, start_date, end_date, auto_create):
         try:
-            from pos_app.models.database import Expense, ExpenseSchedule, ExpenseFrequency
-            exp = Expense(title=title, amount=amount, category=category, frequency=frequency, is_recurring=True)
+            from pos_app.models.database import Expense
+            from pos_app.utils.expense_scheduler import ExpenseScheduler
+            if hasattr(frequency, 'value'):
+                frequency = frequency.value
+            exp = Expense(title=title, amount=amount, category=category, frequency=str(frequency or '').upper(),
+                          is_recurring=True, next_due_date=start_date, auto_create=bool(auto_create))
             self.session.add(exp)
-            # Seed first schedule
-            sched = ExpenseSchedule(expense=exp, scheduled_date=start_date, amount=amount, status='PENDING')
-            self.session.add(sched)
+            self.session.flush()
+            # Upcoming occurrences inside the scheduler's horizon
+            ExpenseScheduler(self.session).materialise([exp.id])
             self.session.commit()
             return exp
         except Exception as e:
@@ -1074,18 +1221,11 @@ class BusinessController:
             return None
 
     def process_recurring_expenses(self):
+        """Settle due recurring expenses (bulk) and return the number of Expense rows created."""
         try:
-            from datetime import datetime, timedelta
-            from pos_app.models.database import ExpenseSchedule
-            now = datetime.now()
-            due = self.session.query(ExpenseSchedule).filter(ExpenseSchedule.scheduled_date <= now, ExpenseSchedule.status == 'PENDING').all()
-            count = 0
-            for s in due:
-                s.status = 'PAID'
-                s.paid_date = now
-                count += 1
-            self.session.commit()
-            return count
+            from pos_app.utils.expense_scheduler import ExpenseScheduler
+            result = ExpenseScheduler(self.session).run()
+            return result['created'] if result else 0
         except Exception as e:
             print(f"Error processing recurring expenses: {e}")
             try:
@@ -1131,11 +1271,12 @@ class BusinessController:
             return False
 
     # Supplier purchase helpers
-    def create_supplier_purchase(self, supplier_id: int, items: list[dict], notes: str | None = None, amount_paid: float | None = None):
+    def create_supplier_purchase(self, supplier_id: int, items: list[dict], notes: str | None = None, amount_paid: float | None = None, commit: bool = True):
         """Create a purchase order for a supplier with optional partial payment.
 
         items: [{product_id, quantity, unit_cost}]
         Status is set to 'ORDERED' - use receive_purchase() to mark as received and update stock.
+        With commit=False the purchase is only flushed so several can be committed together.
         """
         try:
             # Check if supplier exists
@@ -1155,7 +1296,7 @@ class BusinessController:
             # Ensure purchase.id is populated for downstream use
             self.session.flush()
 
-            total = 0.0
+            total_paisa = 0
             for it in items:
                 qty = int(it.get('quantity', 0))
                 unit_cost = float(it.get('unit_cost', 0.0))
@@ -1168,7 +1309,7 @@ class BusinessController:
 
                 # Use relationship to ensure proper foreign key linkage
                 # received_quantity starts at 0 until purchase is received
-                item_total = qty * unit_cost
+                item_total = cost_mul(unit_cost, qty)
                 self.session.add(PurchaseItem(
                     purchase=purchase, 
                     product_id=pid, 
@@ -1177,12 +1318,12 @@ class BusinessController:
                     received_quantity=0,
                     total_cost=item_total
                 ))
-                total += item_total
+                total_paisa += to_paisa(item_total)
 
                 # DO NOT update stock yet - only when purchase is received
                 # Stock will be updated when receive_purchase() is called
 
-            purchase.total_amount = total
+            purchase.total_amount = from_paisa(total_paisa)
 
             # Record initial payment if provided (within same transaction)
             if amount_paid and amount_paid > 0:
@@ -1196,32 +1337,27 @@ class BusinessController:
                     notes=notes
                 )
                 self.session.add(pp)
-                purchase.paid_amount = (purchase.paid_amount or 0.0) + amount_paid
+                purchase.paid_amount = money_sum((purchase.paid_amount, amount_paid))
                 
                 # If fully paid, mark status
-                if abs((purchase.total_amount or 0.0) - (purchase.paid_amount or 0.0)) < 0.01:
+                if money_eq(purchase.total_amount, purchase.paid_amount):
                     purchase.status = 'PAID'
                 
                 # Record bank transaction for outgoing payment
                 try:
-                    from pos_app.models.database import BankTransaction, BankAccount
-                    acct = self.session.query(BankAccount).first()
-                    if acct is not None:
-                        new_balance = float(acct.current_balance or 0.0) - float(amount_paid or 0.0)
-                        self.session.add(BankTransaction(
-                            bank_account_id=acct.id,
-                            amount=amount_paid,
-                            balance_after=new_balance,
-                            transaction_type='WITHDRAWAL',
-                            description=f"Purchase #{purchase.purchase_number} Initial Payment",
-                            reference_number=purchase.purchase_number,
-                            transaction_date=datetime.now()
-                        ))
-                        acct.current_balance = new_balance
+                    from pos_app.controllers.bank_ledger import BankLedgerService
+                    BankLedgerService(self.session).record(
+                        amount_paid, 'WITHDRAWAL',
+                        description=f"Purchase #{purchase.purchase_number} Initial Payment",
+                        reference_number=purchase.purchase_number
+                    )
                 except Exception:
                     pass
 
-            self.session.commit()
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
             return purchase
         except SQLAlchemyError as e:
             self.session.rollback()
@@ -1324,6 +1460,13 @@ class BusinessController:
                                         product.purchase_price = float(weighted_avg)
                                     except Exception:
                                         pass
+                                    # The receipt's ledger entry carries the new average cost
+                                    movement = self.session.query(StockMovement).filter(
+                                        StockMovement.product_id == item.product_id,
+                                        StockMovement.reference == f'Purchase #{purchase.purchase_number} Received'
+                                    ).order_by(StockMovement.id.desc()).first()
+                                    if movement is not None:
+                                        movement.unit_cost = product.purchase_price
                 except Exception:
                     pass
             
@@ -1353,6 +1496,34 @@ class BusinessController:
             self.session.rollback()
             raise Exception(f"Failed to receive purchase: {str(e)}")
 
+    def print_purchase_labels(self, purchase_id: int, target: str | None = None, language: str | None = None):
+        """Print barcode labels for the received items of a purchase in one batch.
+
+        Target and label language default to the barcode printer settings.
+        Returns the batch stats dict, or None when nothing could be printed.
+        """
+        try:
+            from pos_app.utils.label_compiler import LabelBatchCompiler, label_items_for_purchase, print_label_batch
+            from pos_app.utils.barcode_printer import BarcodePrinterSettings
+            purchase = self.session.get(Purchase, purchase_id)
+            if not purchase:
+                raise Exception("Purchase not found")
+            items = label_items_for_purchase(purchase)
+            if not items:
+                return None
+            settings = BarcodePrinterSettings()
+            target = target or settings.label_target()
+            if not target:
+                print("No label printer configured")
+                return None
+            compiler = LabelBatchCompiler.for_printer(
+                settings.create_printer(), language or settings.get_setting('label_language', 'EPL2')
+            )
+            return print_label_batch(items, target, compiler=compiler)
+        except Exception as e:
+            print(f"Error printing purchase labels: {e}")
+            return None
+
     def get_supplier_purchase_history(self, supplier_id: int):
         """Get detailed purchase history for a supplier.
         
@@ -1583,10 +1754,10 @@ class SalesController:
             invoice_number = BusinessController(self.session).generate_code('INV')
 
             # Calculate totals
-            subtotal = sum(item['quantity'] * item['unit_price'] for item in items)
+            subtotal = money_sum(money_mul(item['unit_price'], item['quantity']) for item in items)
             tax_rate = 0.10
-            tax_amount = subtotal * tax_rate
-            total_amount = subtotal + tax_amount
+            tax_amount = money_mul(subtotal, tax_rate)
+            total_amount = money_sum((subtotal, tax_amount))
             # check stock availability first
             for it in items:
                 product = self.session.get(Product, it['product_id'])
@@ -1614,12 +1785,12 @@ class SalesController:
             }
             pm = mapping.get(pm, pm)
 
-            paid_now = float(amount_paid) if amount_paid is not None else (total_amount if pm != 'CREDIT' else 0.0)
+            paid_now = money(amount_paid) if amount_paid is not None else (total_amount if pm != 'CREDIT' else 0.0)
             if paid_now < 0:
                 paid_now = 0.0
             if paid_now > total_amount:
                 paid_now = total_amount
-            remaining = total_amount - paid_now
+            remaining = from_paisa(to_paisa(total_amount) - to_paisa(paid_now))
 
             # Get customer if needed
             customer = None
@@ -1631,9 +1802,9 @@ class SalesController:
                 # Only wholesale customers are allowed credit by default
                 if is_wholesale is False and customer.type and getattr(customer.type, 'name', '').upper() != 'WHOLESALE':
                     raise ValueError("Credit/partial payment allowed only for wholesale customers")
-                projected_credit = (customer.current_credit or 0.0) + remaining
+                projected_credit = money_sum((customer.current_credit, remaining))
                 limit = customer.credit_limit or 0.0
-                if limit and projected_credit > limit + 1e-6:
+                if limit and money_gt(projected_credit, limit):
                     raise ValueError(f"Credit limit exceeded. Limit: {limit:.2f}, Current: {customer.current_credit or 0.0:.2f}, New credit needed: {remaining:.2f}")
 
             # Create sale record
@@ -1657,7 +1828,7 @@ class SalesController:
                     product_id=item['product_id'],
                     quantity=item['quantity'],
                     unit_price=item['unit_price'],
-                    total=item['quantity'] * item['unit_price']
+                    total=money_mul(item['unit_price'], item['quantity'])
                 )
                 self.session.add(sale_item)
 
@@ -1675,13 +1846,13 @@ class SalesController:
                     customer_id=customer_id,
                     amount=paid_now,
                     payment_method=pm,
-                    status='COMPLETED' if abs(remaining) < 1e-6 else 'PARTIAL'
+                    status='COMPLETED' if money_is_zero(remaining) else 'PARTIAL'
                 )
                 self.session.add(payment)
 
             # Update customer credit if there is remaining amount
-            if customer and remaining > 1e-6:
-                customer.current_credit = (customer.current_credit or 0.0) + remaining
+            if customer and money_gt(remaining, 0):
+                customer.current_credit = money_sum((customer.current_credit, remaining))
                 # Also store a payment record for the credit portion (optional)
                 credit_payment = Payment(
                     sale=sale,
@@ -1693,6 +1864,16 @@ class SalesController:
                 self.session.add(credit_payment)
 
             self.session.commit()
+
+            # Mark sales/stock as changed so cached reports and other terminals refresh
+            try:
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.session, 'sales')
+                mark_sync_changed(self.session, 'stock')
+                self.session.commit()
+            except Exception:
+                pass
+
             # remember for printing hooks
             try:
                 self._last_sale_id = sale.id
@@ -1768,6 +1949,33 @@ class SalesController:
             customer = self.session.get(Customer, sale.customer_id) if sale.customer_id else None
             items = list(sale.items or [])
 
+            # Raw ESC/POS printer configured: queue bytes on the background spooler
+            from pos_app.utils.receipt_spooler import (
+                get_receipt_spooler, configured_receipt_target, configured_business_info)
+            target = configured_receipt_target()
+            if target:
+                receipt_data = {
+                    'invoice_number': sale.invoice_number,
+                    'date': sale.sale_date,
+                    'cashier': sale.created_by or 'Admin',
+                    'payment_method': sale.payment_method or 'Cash',
+                    'items': [{
+                        'name': getattr(it.product, 'name', '') or '',
+                        'quantity': it.quantity,
+                        'price': it.unit_price or 0.0,
+                        'total': it.total or 0.0,
+                    } for it in items],
+                    'subtotal': sale.subtotal or 0.0,
+                    'discount_amount': sale.discount_amount or 0.0,
+                    'tax_amount': sale.tax_amount or 0.0,
+                    'final_total': sale.total_amount or 0.0,
+                    'amount_paid': sale.paid_amount or 0.0,
+                    'is_refund': bool(sale.is_refund),
+                    'business_info': configured_business_info(),
+                }
+                job = get_receipt_spooler().submit_receipt(receipt_data, target)
+                return f"Queued receipt {sale.invoice_number or sid} (job {job.id})"
+
             # Generate PDF invoice
             from utils.document_generator import DocumentGenerator
             dg = DocumentGenerator(output_dir="documents")
@@ -0,0 +1,241 @@
+from pos_app.models.database import CashDrawerSession, CashMovement
+from pos_app.utils.logger import app_logger
+from pos_app.utils.money import money, money_sum, from_paisa, to_paisa
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+
+
+# Movement types and the session counter each one adds to. Cash in: SALE, DEPOSIT;
+# cash out: REFUND, PAYOUT, WITHDRAWAL; ADJUSTMENT keeps its sign.
+TOTAL_COLUMNS = {
+    'SALE': 'sales_total',
+    'REFUND': 'refunds_total',
+    'PAYOUT': 'payouts_total',
+    'DEPOSIT': 'deposits_total',
+    'WITHDRAWAL': 'withdrawals_total',
+    'ADJUSTMENT': 'adjustments_total',
+}
+CASH_IN = ('SALE', 'DEPOSIT')
+CASH_OUT = ('REFUND', 'PAYOUT', 'WITHDRAWAL')
+
+
+class CashDrawerError(Exception):
+    """Raised for drawer operations that need an open session or a valid movement."""
+
+
+def drawer_effect(movement_type, amount) -> float:
+    """Effect of a movement on the cash expected in the drawer"""
+    value = money(amount)
+    if movement_type in CASH_IN:
+        return abs(value)
+    if movement_type in CASH_OUT:
+        return -abs(value)
+    return value
+
+
+class CashDrawerService:
+    """Cash drawer sessions with incrementally maintained expected balance and totals.
+
+    Every cash movement is written through record(), which locks the open
+    session row, adds the CashMovement and bumps the session's running totals
+    and expected_balance in the caller's transaction. X-reports (mid-shift) and
+    Z-reports (at close) then read one row instead of summing the day's
+    movements or sales.
+
+        drawer = CashDrawerService(session)
+        drawer.open_session(5000.0, opened_by='admin')
+        drawer.record('PAYOUT', 300.0, description="Tea")   # caller commits
+        drawer.x_report()
+        drawer.close_session(counted=12450.0, closed_by='admin')
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def current_session(self, lock=False):
+        """The most recently opened OPEN session, or None."""
+        q = self.session.query(CashDrawerSession).filter(CashDrawerSession.status == 'OPEN') \
+            .order_by(CashDrawerSession.opened_at.desc(), CashDrawerSession.id.desc())
+        if lock:
+            q = q.with_for_update().populate_existing()
+        return q.first()
+
+    def _session(self, session_id=None, lock=False):
+        if session_id is None:
+            return self.current_session(lock)
+        q = self.session.query(CashDrawerSession).filter(CashDrawerSession.id == session_id)
+        if lock:
+            q = q.with_for_update().populate_existing()
+        return q.first()
+
+    def open_session(self, opening_balance=0.0, opened_by=None, user_id=None, notes=None, commit=True):
+        """Open a new session; any session left open is closed first."""
+        try:
+            for stale in self.session.query(CashDrawerSession).filter(CashDrawerSession.status == 'OPEN'):
+                stale.status = 'CLOSED'
+                stale.closed_at = datetime.now()
+            drawer = CashDrawerSession(
+                user_id=user_id,
+                opening_balance=money(opening_balance),
+                expected_balance=money(opening_balance),
+                opened_at=datetime.now(),
+                status='OPEN',
+                notes=notes,
+                opened_by=opened_by
+            )
+            self._reset_totals(drawer)
+            self.session.add(drawer)
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+            return drawer
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to open cash drawer: {str(e)}")
+
+    @staticmethod
+    def _reset_totals(drawer):
+        for column in TOTAL_COLUMNS.values():
+            setattr(drawer, column, 0.0)
+        drawer.sale_count = 0
+        drawer.refund_count = 0
+        drawer.movement_count = 0
+
+    @staticmethod
+    def _apply(drawer, movement_type, amount, sign=1):
+        column = TOTAL_COLUMNS[movement_type]
+        value = abs(money(amount)) if movement_type != 'ADJUSTMENT' else money(amount)
+        setattr(drawer, column, from_paisa(to_paisa(getattr(drawer, column)) + sign * to_paisa(value)))
+        drawer.expected_balance = from_paisa(
+            to_paisa(drawer.expected_balance) + sign * to_paisa(drawer_effect(movement_type, amount)))
+        drawer.movement_count = (drawer.movement_count or 0) + sign
+        if movement_type == 'SALE':
+            drawer.sale_count = (drawer.sale_count or 0) + sign
+        elif movement_type == 'REFUND':
+            drawer.refund_count = (drawer.refund_count or 0) + sign
+
+    def record(self, movement_type, amount, reference=None, description=None, created_by=None, session_id=None):
+        """Add a movement to the open (or given) session without committing.
+
+        Returns the CashMovement, or None when no session is open (cash sales are
+        still allowed without a drawer session).
+        """
+        movement_type = str(movement_type or '').upper()
+        if movement_type not in TOTAL_COLUMNS:
+            raise CashDrawerError(f"Unknown cash movement type: {movement_type}")
+        if money(amount) == 0:
+            return None
+        drawer = self._session(session_id, lock=True)
+        if drawer is None or (session_id is not None and drawer.status != 'OPEN'):
+            return None
+        movement = CashMovement(
+            session_id=drawer.id,
+            movement_type=movement_type,
+            amount=abs(money(amount)) if movement_type != 'ADJUSTMENT' else money(amount),
+            reference=reference,
+            description=description,
+            created_at=datetime.now(),
+            created_by=created_by
+        )
+        self._apply(drawer, movement_type, amount)
+        self.session.add(movement)
+        return movement
+
+    def payout(self, amount, description=None, reference=None, created_by=None, commit=True):
+        """Cash paid out of the drawer (expenses, petty cash)."""
+        movement = self.record('PAYOUT', amount, reference, description, created_by)
+        if movement is None:
+            raise CashDrawerError("No open cash drawer session")
+        if commit:
+            self.session.commit()
+        return movement
+
+    def x_report(self, session_id=None) -> dict:
+        """Totals of the open (or given) session so far, read from the session row."""
+        drawer = self._session(session_id)
+        if drawer is None:
+            return None
+        report = {
+            'session_id': drawer.id,
+            'status': drawer.status,
+            'opened_at': drawer.opened_at,
+            'opened_by': drawer.opened_by,
+            'closed_at': drawer.closed_at,
+            'closed_by': drawer.closed_by,
+            'opening_balance': money(drawer.opening_balance),
+            'expected_balance': money(drawer.expected_balance),
+            'sale_count': int(drawer.sale_count or 0),
+            'refund_count': int(drawer.refund_count or 0),
+            'movement_count': int(drawer.movement_count or 0),
+            'closing_balance': money(drawer.closing_balance) if drawer.closing_balance is not None else None,
+            'variance': money(drawer.variance) if drawer.variance is not None else None,
+        }
+        for column in TOTAL_COLUMNS.values():
+            report[column] = money(getattr(drawer, column))
+        report['cash_in'] = money_sum((report['sales_total'], report['deposits_total']))
+        report['cash_out'] = money_sum((report['refunds_total'], report['payouts_total'], report['withdrawals_total']))
+        return report
+
+    def close_session(self, counted, closed_by=None, notes=None, cash_out=0.0, session_id=None, commit=True) -> dict:
+        """Close the session against the counted cash and return its Z-report.
+
+        ``cash_out`` is cash taken out at closing; it is recorded as a PAYOUT so the
+        closing balance is what stays in the drawer (counted - cash_out).
+        """
+        try:
+            drawer = self._session(session_id, lock=True)
+            if drawer is None or drawer.status != 'OPEN':
+                raise CashDrawerError("No open cash drawer session")
+            if money(cash_out) > 0:
+                self.record('PAYOUT', cash_out, description="Cash taken out at closing",
+                            created_by=closed_by, session_id=drawer.id)
+            closing = from_paisa(to_paisa(counted) - to_paisa(cash_out))
+            drawer.closing_balance = closing
+            drawer.variance = from_paisa(to_paisa(closing) - to_paisa(drawer.expected_balance))
+            drawer.closed_at = datetime.now()
+            drawer.closed_by = closed_by
+            drawer.status = 'CLOSED'
+            if notes:
+                drawer.notes = f"{drawer.notes}\n{notes}" if drawer.notes else notes
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to close cash drawer: {str(e)}")
+        report = self.x_report(drawer.id)
+        app_logger.info(f"Cash drawer session {drawer.id} closed: expected {report['expected_balance']:,.2f}, "
+                        f"closing {report['closing_balance']:,.2f}, variance {report['variance']:,.2f}")
+        return report
+
+    def z_report(self, session_id) -> dict:
+        """Final totals of a closed session."""
+        return self.x_report(session_id)
+
+    def rebuild(self, session_id, commit=True):
+        """Recompute a session's totals and expected balance from its movements (one grouped query)."""
+        drawer = self._session(session_id, lock=True)
+        if drawer is None:
+            return None
+        self._reset_totals(drawer)
+        drawer.expected_balance = money(drawer.opening_balance)
+        rows = self.session.query(CashMovement.movement_type, func.count(CashMovement.id),
+                                  func.coalesce(func.sum(CashMovement.amount), 0)) \
+            .filter(CashMovement.session_id == drawer.id) \
+            .group_by(CashMovement.movement_type)
+        for movement_type, count, total in rows:
+            if movement_type not in TOTAL_COLUMNS:
+                continue
+            self._apply(drawer, movement_type, total)
+            # _apply counted one movement for the whole group
+            drawer.movement_count += int(count) - 1
+            if movement_type == 'SALE':
+                drawer.sale_count += int(count) - 1
+            elif movement_type == 'REFUND':
+                drawer.refund_count += int(count) - 1
+        if commit:
+            self.session.commit()
+        return drawer
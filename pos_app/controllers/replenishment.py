@@ -0,0 +1,179 @@
+from pos_app.models.database import Product, Purchase, PurchaseItem, Sale, SaleItem
+from pos_app.utils.logger import inventory_logger
+from sqlalchemy import case, func, literal
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timedelta
+import math
+
+
+# Defaults: 30 days of sales history, 7 days supplier lead time, order for 30 days of cover
+VELOCITY_WINDOW_DAYS = 30
+LEAD_TIME_DAYS = 7
+COVER_DAYS = 30
+
+# Purchases whose unreceived quantities count as already on order
+OPEN_PURCHASE_STATUSES = ('ORDERED', 'PARTIAL')
+
+
+def _greatest(a, b):
+    return case((a >= b, a), else_=b)
+
+
+def _least(a, b):
+    return case((a <= b, a), else_=b)
+
+
+class ReplenishmentEngine:
+    """Reorder suggestions for every SKU from one set-based query.
+
+    Per product: units sold over the window (refunds netted out) give the daily
+    velocity, stock / velocity the days of cover. A product needs reordering
+    when stock plus open purchase quantities is at or below its reorder point,
+    max(reorder_level, velocity * lead time). The suggested quantity brings it
+    up to max(reorder_level, velocity * (lead time + cover days)) and is capped by
+    max_stock. Sales and open purchases are aggregated in grouped subqueries
+    joined to products, so the work is a few index scans regardless of the
+    number of SKUs; only products that need stock come back to Python.
+
+        engine = ReplenishmentEngine(session)
+        suggestions = engine.suggestions(window_days=30, lead_time_days=7)
+        engine.create_purchase_orders(suggestions)   # one PO per supplier, one commit
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def _velocity(self, since, until):
+        sold = case((Sale.is_refund == True, -SaleItem.quantity), else_=SaleItem.quantity)
+        return (self.session.query(SaleItem.product_id.label('product_id'),
+                                   func.sum(sold).label('sold'))
+                .join(Sale, Sale.id == SaleItem.sale_id)
+                .filter(Sale.sale_date >= since, Sale.sale_date < until)
+                .group_by(SaleItem.product_id)
+                .subquery())
+
+    def _on_order(self):
+        open_qty = PurchaseItem.quantity - func.coalesce(PurchaseItem.received_quantity, 0)
+        return (self.session.query(PurchaseItem.product_id.label('product_id'),
+                                   func.sum(_greatest(open_qty, literal(0.0))).label('on_order'))
+                .join(Purchase, Purchase.id == PurchaseItem.purchase_id)
+                .filter(Purchase.status.in_(OPEN_PURCHASE_STATUSES))
+                .group_by(PurchaseItem.product_id)
+                .subquery())
+
+    def suggestion_query(self, window_days=VELOCITY_WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS,
+                         cover_days=COVER_DAYS, supplier_id=None, product_ids=None, as_of=None,
+                         include_all=False):
+        """The suggestion query (rows: id, name, supplier_id, stock, ... suggested)."""
+        as_of = as_of or datetime.now()
+        window_days = max(int(window_days or 1), 1)
+        velocity = self._velocity(as_of - timedelta(days=window_days), as_of)
+        on_order = self._on_order()
+
+        stock = func.coalesce(Product.stock_level, 0)
+        pending = func.coalesce(on_order.c.on_order, 0.0)
+        sold = _greatest(func.coalesce(velocity.c.sold, 0.0), literal(0.0))
+        daily = sold / float(window_days)
+        reorder_level = func.coalesce(Product.reorder_level, 0)
+        reorder_point = _greatest(reorder_level * 1.0, daily * float(lead_time_days))
+        target = _greatest(reorder_level * 1.0, daily * float(lead_time_days + cover_days))
+        wanted = target - stock - pending
+        room = Product.max_stock - stock - pending
+        suggested = case((Product.max_stock.isnot(None), _least(wanted, room)), else_=wanted)
+        days_cover = case((daily > 0, stock / daily), else_=None)
+
+        q = (self.session.query(
+                Product.id.label('product_id'),
+                Product.name.label('name'),
+                Product.sku.label('sku'),
+                Product.supplier_id.label('supplier_id'),
+                Product.purchase_price.label('unit_cost'),
+                stock.label('stock'),
+                pending.label('on_order'),
+                sold.label('sold'),
+                daily.label('daily_velocity'),
+                days_cover.label('days_of_cover'),
+                reorder_point.label('reorder_point'),
+                suggested.label('suggested'))
+             .outerjoin(velocity, velocity.c.product_id == Product.id)
+             .outerjoin(on_order, on_order.c.product_id == Product.id)
+             .filter(Product.is_active == True))
+        if supplier_id is not None:
+            q = q.filter(Product.supplier_id == supplier_id)
+        if product_ids is not None:
+            q = q.filter(Product.id.in_(list(product_ids)))
+        if not include_all:
+            q = q.filter(stock + pending <= reorder_point, suggested > 0)
+        return q.order_by(Product.supplier_id, Product.id)
+
+    def suggestions(self, window_days=VELOCITY_WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS,
+                    cover_days=COVER_DAYS, supplier_id=None, product_ids=None, as_of=None,
+                    include_all=False):
+        """Reorder suggestions as dicts, ordered by supplier.
+
+        Keys: product_id, name, sku, supplier_id, unit_cost, stock, on_order, sold,
+        daily_velocity, days_of_cover (None without sales), reorder_point, quantity.
+        """
+        rows = self.suggestion_query(window_days, lead_time_days, cover_days, supplier_id,
+                                     product_ids, as_of, include_all)
+        result = []
+        for r in rows:
+            quantity = max(int(math.ceil(float(r.suggested or 0) - 1e-9)), 0)
+            result.append({
+                'product_id': r.product_id,
+                'name': r.name,
+                'sku': r.sku,
+                'supplier_id': r.supplier_id,
+                'unit_cost': float(r.unit_cost or 0.0),
+                'stock': float(r.stock or 0),
+                'on_order': float(r.on_order or 0),
+                'sold': float(r.sold or 0),
+                'daily_velocity': float(r.daily_velocity or 0),
+                'days_of_cover': float(r.days_of_cover) if r.days_of_cover is not None else None,
+                'reorder_point': float(r.reorder_point or 0),
+                'quantity': quantity,
+            })
+        return result
+
+    @staticmethod
+    def group_by_supplier(suggestions):
+        """{supplier_id: [suggestion, ...]}; products without a supplier are under None."""
+        groups = {}
+        for s in suggestions:
+            groups.setdefault(s['supplier_id'], []).append(s)
+        return groups
+
+    def create_purchase_orders(self, suggestions=None, notes=None, **suggestion_args):
+        """Create one ORDERED purchase per supplier from the suggestions, in a single transaction.
+
+        Returns {'purchases': [Purchase, ...], 'unassigned': [suggestion, ...]} where
+        unassigned are suggestions for products without a supplier.
+        """
+        from pos_app.controllers.business_logic import BusinessController
+
+        if suggestions is None:
+            suggestions = self.suggestions(**suggestion_args)
+        groups = self.group_by_supplier(s for s in suggestions if s['quantity'] > 0)
+        unassigned = groups.pop(None, [])
+        controller = BusinessController(self.session)
+        purchases = []
+        try:
+            # Load the products once so create_supplier_purchase's lookups hit the identity map
+            ids = [s['product_id'] for group in groups.values() for s in group]
+            if ids:
+                self.session.query(Product).filter(Product.id.in_(ids)).all()
+            for supplier_id, group in sorted(groups.items()):
+                items = [{'product_id': s['product_id'], 'quantity': s['quantity'], 'unit_cost': s['unit_cost']}
+                         for s in group]
+                purchases.append(controller.create_supplier_purchase(
+                    supplier_id, items, notes=notes or "Auto-generated from reorder suggestions", commit=False))
+            self.session.commit()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to create reorder purchases: {str(e)}")
+        except Exception:
+            self.session.rollback()
+            raise
+        inventory_logger.info(f"Reorder: {len(purchases)} purchase order(s) for "
+                              f"{sum(len(g) for g in groups.values())} product(s), {len(unassigned)} without supplier")
+        return {'purchases': purchases, 'unassigned': unassigned}
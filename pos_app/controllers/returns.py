@@ -0,0 +1,199 @@
+from pos_app.models.database import (Customer, Product, Return, ReturnItem, ReturnStatus, PaymentMethod, Sale,
+                                     StockMovement, invoice_key, mark_sync_changed)
+from pos_app.utils.logger import inventory_logger
+from pos_app.utils.money import money, money_mul, money_sum
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import secrets
+
+
+RETURN_PREFIX = 'RET-'
+
+
+class ReturnError(Exception):
+    """Raised when a return cannot be created or completed; nothing is written."""
+
+
+class ReturnsService:
+    """Customer returns: invoice lookup, listing, creation and completion with stock restoration.
+
+    Invoices are found by an exact invoice_number match or by the indexed
+    normalised key (sales.invoice_key, "INV-0042" -> "42") instead of a set of
+    ILIKE patterns. Completing a return puts every returned quantity back on
+    the retail shelf with one UPDATE over the products and one bulk insert of
+    IN stock movements, in the same transaction as the status change.
+
+        service = ReturnsService(session)
+        sale = service.find_sale("INV-0042")
+        ret = service.create_return(customer_id, [{'product_id': 1, 'quantity': 2, 'unit_price': 50.0}])
+        service.complete_return(ret.id, refund_method='CASH')
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    # ------------------------------------------------------------ lookups
+    def find_sale(self, invoice_input):
+        """Latest sale matching the invoice number exactly, else by normalised key; None when not found."""
+        raw = (invoice_input or "").strip()
+        if not raw:
+            return None
+        sale = self.session.query(Sale).filter(Sale.invoice_number == raw).first()
+        if sale is None:
+            key = invoice_key(raw)
+            sale = self.session.query(Sale).filter(Sale.invoice_key == key).order_by(Sale.id.desc()).first()
+        return sale
+
+    def list_returns(self, start=None, end=None, status=None, limit=None) -> list:
+        """Returns in [start, end] as dicts (newest first) from one query with item counts."""
+        counts = (self.session.query(ReturnItem.return_id.label('return_id'),
+                                     func.count(ReturnItem.id).label('item_count'))
+                  .group_by(ReturnItem.return_id).subquery())
+        q = (self.session.query(Return.id, Return.return_number, Return.return_date, Return.status,
+                                Return.refund_amount, Return.reason, Customer.name,
+                                func.coalesce(counts.c.item_count, 0))
+             .outerjoin(Customer, Customer.id == Return.customer_id)
+             .outerjoin(counts, counts.c.return_id == Return.id))
+        if start is not None:
+            q = q.filter(Return.return_date >= start)
+        if end is not None:
+            q = q.filter(Return.return_date <= end)
+        if status:
+            q = q.filter(Return.status == (status if isinstance(status, ReturnStatus) else ReturnStatus(status)))
+        q = q.order_by(Return.return_date.desc(), Return.id.desc())
+        if limit:
+            q = q.limit(limit)
+        return [{
+            'id': rid,
+            'return_number': number,
+            'return_date': when,
+            'status': state.value if state is not None else None,
+            'refund_amount': money(refund),
+            'reason': reason,
+            'customer_name': customer or "Unknown",
+            'items_count': int(items or 0),
+        } for rid, number, when, state, refund, reason, customer, items in q]
+
+    # ------------------------------------------------------------ writes
+    @staticmethod
+    def _return_number(return_id):
+        return f"{RETURN_PREFIX}{return_id:06d}"
+
+    def create_return(self, customer_id, items, reason=None, notes=None, sale_id=None, commit=True):
+        """Create a PENDING return. items: [{product_id, quantity, unit_price, condition?}]"""
+        lines = [it for it in (items or []) if it.get('product_id') and int(it.get('quantity') or 0) > 0]
+        if not customer_id:
+            raise ReturnError("A customer is required for a return")
+        if not lines:
+            raise ReturnError("A return needs at least one item")
+        try:
+            # Numbered from the inserted row's id so terminals never pick the same number;
+            # the placeholder only lives inside this transaction
+            ret = Return(
+                return_number=f"{RETURN_PREFIX}NEW-{secrets.token_hex(8)}",
+                customer_id=customer_id,
+                sale_id=sale_id,
+                reason=reason,
+                notes=notes,
+                status=ReturnStatus.PENDING
+            )
+            ret.items = [ReturnItem(
+                product_id=it['product_id'],
+                quantity=int(it['quantity']),
+                unit_price=money(it.get('unit_price')),
+                total=money_mul(it.get('unit_price'), int(it['quantity'])),
+                condition=it.get('condition')
+            ) for it in lines]
+            ret.refund_amount = money_sum(i.total for i in ret.items)
+            self.session.add(ret)
+            self.session.flush()
+            ret.return_number = self._return_number(ret.id)
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+            return ret
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to create return: {str(e)}")
+
+    def restore_stock(self, quantities, reference=None) -> int:
+        """Put {product_id: quantity} back on the retail shelf with one bulk UPDATE; no commit.
+
+        Writes one IN StockMovement per product (bulk insert) and returns the number of products.
+        """
+        quantities = {pid: int(qty) for pid, qty in quantities.items() if pid is not None and int(qty or 0) > 0}
+        if not quantities:
+            return 0
+        ids = sorted(quantities)
+        # Lock the rows (id order) and read the costs the movements record
+        costs = dict(self.session.query(Product.id, Product.purchase_price)
+                     .filter(Product.id.in_(ids)).order_by(Product.id).with_for_update())
+        missing = [pid for pid in ids if pid not in costs]
+        if missing:
+            raise ReturnError(f"Products not found: {', '.join(str(pid) for pid in missing)}")
+        delta = case({pid: qty for pid, qty in quantities.items()}, value=Product.id, else_=0)
+        self.session.execute(
+            update(Product).where(Product.id.in_(ids)).values(
+                retail_stock=func.coalesce(Product.retail_stock, 0) + delta,
+                stock_level=func.coalesce(Product.warehouse_stock, 0) + func.coalesce(Product.retail_stock, 0) + delta,
+                updated_at=datetime.now()
+            ).execution_options(synchronize_session=False))
+        now = datetime.now()
+        self.session.execute(insert(StockMovement), [{
+            'product_id': pid,
+            'movement_type': 'IN',
+            'quantity': quantities[pid],
+            'location': 'RETAIL',
+            'reference': reference,
+            'unit_cost': costs[pid],
+            'date': now,
+        } for pid in ids])
+        # Loaded Product objects now hold stale stock columns
+        for obj in list(self.session.identity_map.values()):
+            if isinstance(obj, Product) and obj.id in quantities:
+                self.session.expire(obj, ['retail_stock', 'stock_level', 'updated_at'])
+        return len(ids)
+
+    def complete_return(self, return_id, refund_method='CASH', notes=None, created_by=None, commit=True):
+        """Restore stock, record the refund and mark the return COMPLETED in one transaction."""
+        ret = self.session.query(Return).filter(Return.id == return_id).with_for_update().populate_existing().first()
+        if ret is None:
+            raise ReturnError("Return not found")
+        if ret.status == ReturnStatus.COMPLETED:
+            raise ReturnError(f"Return {ret.return_number} is already completed")
+        if ret.status in (ReturnStatus.REJECTED, ReturnStatus.CANCELLED):
+            raise ReturnError(f"Return {ret.return_number} is {ret.status.value.lower()}")
+        try:
+            quantities = {}
+            for item in ret.items:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + int(item.quantity or 0)
+            self.restore_stock(quantities, reference=f"Return {ret.return_number}")
+
+            method = str(getattr(refund_method, 'name', refund_method) or 'CASH').upper()
+            ret.refund_amount = money_sum(i.total for i in ret.items)
+            ret.refund_method = PaymentMethod[method]
+            ret.status = ReturnStatus.COMPLETED
+            if notes:
+                ret.notes = notes
+            if method == 'CASH':
+                from pos_app.controllers.cash_drawer import CashDrawerService
+                CashDrawerService(self.session).record(
+                    'REFUND', ret.refund_amount, reference=ret.return_number,
+                    description=f"Return {ret.return_number}", created_by=created_by)
+            mark_sync_changed(self.session, 'products')
+            mark_sync_changed(self.session, 'stock')
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise Exception(f"Failed to complete return: {str(e)}")
+        except Exception:
+            self.session.rollback()
+            raise
+        inventory_logger.info(f"Return {ret.return_number} completed: {sum(quantities.values())} unit(s) of "
+                              f"{len(quantities)} product(s) restocked, refund {ret.refund_amount:,.2f}")
+        return ret
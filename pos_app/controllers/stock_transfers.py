@@ -0,0 +1,221 @@
+from pos_app.models.database import Product, StockMovement, InventoryLocation, mark_sync_changed
+from pos_app.utils.logger import inventory_logger
+from sqlalchemy import case, func, insert, or_
+from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime
+import random
+import string
+
+
+TO_RETAIL = 'TO_RETAIL'
+TO_WAREHOUSE = 'TO_WAREHOUSE'
+DIRECTIONS = (TO_RETAIL, TO_WAREHOUSE)
+
+# Prefix of the reference shared by the OUT/IN movement pair of a transfer batch
+TRANSFER_PREFIX = 'TRF-'
+
+
+class TransferError(Exception):
+    """Raised when a transfer batch cannot be applied; nothing is written.
+
+    ``shortages`` lists {'product_id', 'name', 'requested', 'available', 'location'}.
+    """
+
+    def __init__(self, message, shortages=None):
+        super().__init__(message)
+        self.shortages = shortages or []
+
+
+class StockTransferService:
+    """Atomic warehouse <-> retail transfers for many products at once.
+
+    One call locks the product rows (``SELECT ... FOR UPDATE``, in id order so
+    concurrent batches cannot deadlock), validates every line before touching
+    anything, moves the stock, recomputes ``stock_level``, writes the paired
+    OUT/IN ``StockMovement`` rows with a single bulk insert and marks the
+    products/stock sync state once. Either the whole batch applies or none of it.
+
+        service = StockTransferService(session)
+        service.transfer([{'product_id': 1, 'quantity': 5}, {'product_id': 2, 'quantity': 3}])
+        service.replenish_retail()      # top retail up to reorder_level from the warehouse
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def _reference(self):
+        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
+        return f"{TRANSFER_PREFIX}{datetime.now():%Y%m%d%H%M%S}-{suffix}"
+
+    def _normalize(self, items, direction):
+        """Merge lines into {(product_id, direction): quantity}; quantities must be whole and positive."""
+        lines = {}
+        for item in items:
+            if isinstance(item, dict):
+                product_id = item.get('product_id')
+                quantity = item.get('quantity')
+                line_direction = item.get('direction') or direction
+            else:
+                product_id, quantity = item[0], item[1]
+                line_direction = item[2] if len(item) > 2 else direction
+            if line_direction not in DIRECTIONS:
+                raise TransferError(f"Unknown transfer direction: {line_direction}")
+            try:
+                qty = float(quantity or 0)
+            except (TypeError, ValueError):
+                raise TransferError(f"Invalid quantity for product {product_id}: {quantity}")
+            if qty <= 0 or abs(qty - round(qty)) > 1e-6:
+                raise TransferError(f"Transfer quantity must be a positive whole number (product {product_id})")
+            key = (int(product_id), line_direction)
+            lines[key] = lines.get(key, 0) + int(round(qty))
+        return lines
+
+    def _lock(self, product_ids):
+        products = (self.session.query(Product)
+                    .filter(Product.id.in_(sorted(product_ids)))
+                    .order_by(Product.id)
+                    .with_for_update()
+                    .all())
+        return {p.id: p for p in products}
+
+    def _apply(self, products, lines, notes, reference, now):
+        """Validate and apply locked lines; returns (summary, movement rows)."""
+        missing = sorted({pid for pid, _ in lines if pid not in products})
+        if missing:
+            raise TransferError(f"Products not found: {missing}")
+
+        # Net per product first so a product can appear in both directions
+        net = {}
+        for (pid, direction), qty in lines.items():
+            net[pid] = net.get(pid, 0) + (qty if direction == TO_RETAIL else -qty)
+
+        shortages = []
+        for pid, delta in net.items():
+            product = products[pid]
+            warehouse, retail = int(product.warehouse_stock or 0), int(product.retail_stock or 0)
+            if delta > warehouse:
+                shortages.append({'product_id': pid, 'name': product.name, 'requested': delta,
+                                  'available': warehouse, 'location': InventoryLocation.WAREHOUSE.value})
+            elif -delta > retail:
+                shortages.append({'product_id': pid, 'name': product.name, 'requested': -delta,
+                                  'available': retail, 'location': InventoryLocation.RETAIL.value})
+        if shortages:
+            detail = ', '.join(f"{s['name']} ({s['location'].lower()}: {s['available']} < {s['requested']})" for s in shortages)
+            raise TransferError(f"Insufficient stock: {detail}", shortages)
+
+        for pid, delta in net.items():
+            product = products[pid]
+            product.warehouse_stock = int(product.warehouse_stock or 0) - delta
+            product.retail_stock = int(product.retail_stock or 0) + delta
+            product.stock_level = int(product.warehouse_stock or 0) + int(product.retail_stock or 0)
+
+        rows, summary = [], []
+        for (pid, direction), qty in sorted(lines.items()):
+            source, target = ((InventoryLocation.WAREHOUSE, InventoryLocation.RETAIL) if direction == TO_RETAIL
+                              else (InventoryLocation.RETAIL, InventoryLocation.WAREHOUSE))
+            cost = products[pid].purchase_price
+            for kind, location in (('OUT', source), ('IN', target)):
+                rows.append({'product_id': pid, 'date': now, 'movement_type': kind, 'quantity': qty,
+                             'location': location.value, 'reference': reference, 'notes': notes,
+                             'unit_cost': cost})
+            summary.append({'product_id': pid, 'direction': direction, 'quantity': qty})
+        return summary, rows
+
+    def _write(self, rows):
+        if rows:
+            self.session.execute(insert(StockMovement), rows)
+        mark_sync_changed(self.session, 'products')
+        mark_sync_changed(self.session, 'stock')
+
+    def transfer(self, items, direction=TO_RETAIL, notes=None, reference=None, commit=True):
+        """Move stock for many products in one transaction.
+
+        ``items`` are dicts {'product_id', 'quantity'[, 'direction']} or
+        (product_id, quantity[, direction]) tuples; ``direction`` is the default
+        (TO_RETAIL or TO_WAREHOUSE). Returns {'reference', 'lines', 'movements'}.
+        """
+        lines = self._normalize(items, direction)
+        if not lines:
+            return {'reference': None, 'lines': [], 'movements': 0}
+        reference = reference or self._reference()
+        try:
+            products = self._lock({pid for pid, _ in lines})
+            summary, rows = self._apply(products, lines, notes, reference, datetime.now())
+            self._write(rows)
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+        except TransferError:
+            self.session.rollback()
+            raise
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            inventory_logger.error(f"Stock transfer {reference} failed: {e}")
+            raise Exception(f"Failed to transfer stock: {str(e)}")
+        inventory_logger.info(f"Stock transfer {reference}: {len(summary)} line(s), {len(rows)} movement(s)")
+        return {'reference': reference, 'lines': summary, 'movements': len(rows)}
+
+    def _replenish_quantity(self):
+        """SQL expression: units to move so retail reaches reorder_level, capped by warehouse stock"""
+        warehouse = func.coalesce(Product.warehouse_stock, 0)
+        need = func.coalesce(Product.reorder_level, 0) - func.coalesce(Product.retail_stock, 0)
+        return case((need > warehouse, warehouse), else_=need)
+
+    def _replenish_query(self, product_ids=None):
+        qty = self._replenish_quantity()
+        q = (self.session.query(Product, qty.label('quantity'))
+             .filter(Product.is_active == True)
+             .filter(func.coalesce(Product.retail_stock, 0) < func.coalesce(Product.reorder_level, 0))
+             .filter(func.coalesce(Product.warehouse_stock, 0) > 0))
+        if product_ids is not None:
+            q = q.filter(Product.id.in_(list(product_ids)))
+        return q.order_by(Product.id)
+
+    def plan_replenishment(self, product_ids=None):
+        """Transfers replenish_retail() would make: [{'product_id', 'name', 'quantity', ...}] (read only)."""
+        return [
+            {'product_id': p.id, 'name': p.name, 'quantity': int(qty),
+             'retail_stock': int(p.retail_stock or 0), 'warehouse_stock': int(p.warehouse_stock or 0),
+             'reorder_level': int(p.reorder_level or 0)}
+            for p, qty in self._replenish_query(product_ids) if qty and qty > 0
+        ]
+
+    def replenish_retail(self, product_ids=None, notes=None, commit=True):
+        """Top retail stock up to reorder_level from the warehouse for every product that needs it.
+
+        The products and their transfer quantities come from one locking query,
+        then the batch is applied like transfer(). Returns the same dict.
+        """
+        reference = self._reference()
+        try:
+            locked = self._replenish_query(product_ids).with_for_update(of=Product).all()
+            products = {p.id: p for p, _ in locked}
+            lines = {(p.id, TO_RETAIL): int(qty) for p, qty in locked if qty and qty > 0}
+            if not lines:
+                return {'reference': None, 'lines': [], 'movements': 0}
+            summary, rows = self._apply(products, lines, notes or "Replenish retail to reorder level",
+                                        reference, datetime.now())
+            self._write(rows)
+            if commit:
+                self.session.commit()
+            else:
+                self.session.flush()
+        except TransferError:
+            self.session.rollback()
+            raise
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            inventory_logger.error(f"Retail replenishment {reference} failed: {e}")
+            raise Exception(f"Failed to replenish retail stock: {str(e)}")
+        inventory_logger.info(f"Retail replenishment {reference}: {len(summary)} product(s)")
+        return {'reference': reference, 'lines': summary, 'movements': len(rows)}
+
+    def recent_transfers(self, limit=50):
+        """Latest transfer movements (the destination side of each pair, plus legacy TRANSFER rows)."""
+        return (self.session.query(StockMovement)
+                .filter(or_(StockMovement.movement_type == 'TRANSFER',
+                            (StockMovement.reference.like(f"{TRANSFER_PREFIX}%")) & (StockMovement.movement_type == 'IN')))
+                .order_by(StockMovement.date.desc(), StockMovement.id.desc())
+                .limit(limit)
+                .all())
@@ -0,0 +1,153 @@
+import re
+
+from pos_app.models.database import Supplier, Purchase, OutstandingPurchase
+from sqlalchemy import func, case, and_, or_, literal, DateTime
+from datetime import datetime, timedelta
+
+
+# Ageing buckets in days past the due date: the OutstandingPurchase due date when one is
+# set, otherwise order_date (falling back to created_at) plus the supplier's payment terms
+AGEING_BUCKETS = ('current', 'days_30', 'days_60', 'days_90_plus')
+
+
+def payment_terms_days(terms):
+    """Credit days in a free-text payment terms field ("Net 30", "45 days", "2/10 net 30").
+
+    Cash/COD/advance and unparseable terms are due on the order date (0 days).
+    """
+    numbers = re.findall(r'\d+', str(terms or ''))
+    return int(numbers[-1]) if numbers else 0
+
+
+class SupplierBalanceService:
+    """Outstanding payables per supplier computed with a single grouped query.
+
+    Replaces the per-supplier ``query(Purchase).filter(supplier_id == ...)`` loops
+    in the suppliers, reports and search screens.
+    """
+
+    def __init__(self, db_session):
+        self.session = db_session
+
+    def _terms_by_days(self):
+        """{credit days: [supplier ids]} for suppliers with payment terms"""
+        by_days = {}
+        rows = (self.session.query(Supplier.id, Supplier.payment_terms)
+                .filter(Supplier.payment_terms.isnot(None), Supplier.payment_terms != '').all())
+        for supplier_id, terms in rows:
+            days = payment_terms_days(terms)
+            if days:
+                by_days.setdefault(days, []).append(supplier_id)
+        return by_days
+
+    def _balance_query(self, as_of=None):
+        as_of = as_of or datetime.now()
+        terms = self._terms_by_days()
+
+        due = func.coalesce(Purchase.total_amount, 0.0) - func.coalesce(Purchase.paid_amount, 0.0)
+        # Overpaid purchases do not offset what is owed on other purchases
+        owed = case((due > 0, due), else_=0.0)
+        placed = func.coalesce(Purchase.order_date, Purchase.created_at, as_of)
+        due_dates = (
+            self.session.query(OutstandingPurchase.purchase_id.label('purchase_id'),
+                               func.max(OutstandingPurchase.due_date).label('due_date'))
+            .filter(OutstandingPurchase.due_date.isnot(None))
+            .group_by(OutstandingPurchase.purchase_id)
+            .subquery()
+        )
+
+        def overdue(days):
+            """At least `days` past due as of `as_of`"""
+            cutoff = as_of - timedelta(days=days)
+            # Without an explicit due date: placed + terms <= cutoff, i.e. placed <= cutoff - terms
+            placed_cutoff = literal(cutoff, DateTime)
+            if terms:
+                placed_cutoff = case(
+                    *[(Purchase.supplier_id.in_(ids), literal(cutoff - timedelta(days=d), DateTime))
+                      for d, ids in terms.items()],
+                    else_=literal(cutoff, DateTime))
+            return or_(and_(due_dates.c.due_date.isnot(None), due_dates.c.due_date <= cutoff),
+                       and_(due_dates.c.due_date.is_(None), placed <= placed_cutoff))
+
+        overdue_30, overdue_60, overdue_90 = overdue(30), overdue(60), overdue(90)
+
+        return (
+            self.session.query(
+                Purchase.supplier_id.label('supplier_id'),
+                func.coalesce(func.sum(owed), 0.0).label('outstanding'),
+                func.coalesce(func.sum(case((~overdue_30, owed), else_=0.0)), 0.0).label('current'),
+                func.coalesce(func.sum(case((and_(overdue_30, ~overdue_60), owed), else_=0.0)), 0.0).label('days_30'),
+                func.coalesce(func.sum(case((and_(overdue_60, ~overdue_90), owed), else_=0.0)), 0.0).label('days_60'),
+                func.coalesce(func.sum(case((overdue_90, owed), else_=0.0)), 0.0).label('days_90_plus'),
+                func.count(Purchase.id).label('purchase_count'),
+            )
+            .select_from(Purchase)
+            .outerjoin(due_dates, due_dates.c.purchase_id == Purchase.id)
+            .filter(Purchase.supplier_id.isnot(None))
+            .filter(func.coalesce(Purchase.status, '') != 'CANCELLED')
+            .group_by(Purchase.supplier_id)
+        )
+
+    def get_balances(self, supplier_ids=None, as_of=None):
+        """Return {supplier_id: {'outstanding', 'current', 'days_30', 'days_60', 'days_90_plus', 'purchase_count'}}.
+
+        Suppliers without purchases are absent; use ``empty_balance()`` as the default.
+        """
+        try:
+            q = self._balance_query(as_of)
+            if supplier_ids is not None:
+                ids = [int(s) for s in supplier_ids if s is not None]
+                if not ids:
+                    return {}
+                q = q.filter(Purchase.supplier_id.in_(ids))
+            balances = {}
+            for row in q.all():
+                balances[int(row.supplier_id)] = {
+                    'outstanding': float(row.outstanding or 0.0),
+                    'current': float(row.current or 0.0),
+                    'days_30': float(row.days_30 or 0.0),
+                    'days_60': float(row.days_60 or 0.0),
+                    'days_90_plus': float(row.days_90_plus or 0.0),
+                    'purchase_count': int(row.purchase_count or 0),
+                }
+            return balances
+        except Exception as e:
+            print(f"Error computing supplier balances: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return {}
+
+    def get_outstanding(self, supplier_id, as_of=None):
+        """Outstanding payable for a single supplier."""
+        return self.get_balances([supplier_id], as_of).get(int(supplier_id), self.empty_balance())['outstanding']
+
+    def get_payables(self, as_of=None, only_outstanding=True):
+        """Return [(supplier, balance_dict)] ordered by outstanding amount, largest first."""
+        try:
+            balances = self.get_balances(as_of=as_of)
+            suppliers = self.session.query(Supplier).all()
+            rows = [(s, balances.get(s.id, self.empty_balance())) for s in suppliers]
+            if only_outstanding:
+                rows = [r for r in rows if r[1]['outstanding'] > 0.005]
+            rows.sort(key=lambda r: r[1]['outstanding'], reverse=True)
+            return rows
+        except Exception as e:
+            print(f"Error getting supplier payables: {e}")
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return []
+
+    @staticmethod
+    def empty_balance():
+        return {
+            'outstanding': 0.0,
+            'current': 0.0,
+            'days_30': 0.0,
+            'days_60': 0.0,
+            'days_90_plus': 0.0,
+            'purchase_count': 0,
+        }
@@ -0,0 +1,475 @@
+r"""
+Archival of closed fiscal years.
+
+Sales, their items/payments/splits, stock movements and bank transactions of
+a fiscal year that has closed are moved out of the live tables into
+``archive_<table>`` tables (tagged with ``archived_fy``) and recorded in
+``archived_periods``. The archived rows can also be exported to gzip JSON-lines
+files, which frees the archive tables too. Live tables only hold open years, so
+day-to-day queries and indexes stay small.
+
+On PostgreSQL the monthly partitions of the year (database/partitioning.py) go
+too. stock_movements months are detached, copied into the archive table in one
+statement each and dropped, instead of being deleted row by row. sale_items and
+payments months are detached and dropped once the row moves have emptied them.
+
+Reports stay complete through archived_rows() / archived_children(). They
+return archived rows for a date range from archive tables or files, with the
+same attribute names as the ORM rows, and are only consulted when the range
+overlaps an archived period.
+
+Sales that are still referenced from outside the year are kept live, so no
+foreign key is left dangling. That covers later refunds, returns and later
+payments. Credit sales that still make up a customer's outstanding balance
+stay live as well, until payments settle them. Stock movements are archived only after the inventory ledger has
+checkpointed the year (utils/inventory_ledger.py).
+
+    python -m pos_app.database.archive --list
+    python -m pos_app.database.archive --fiscal-year 2024 [--dry-run] [--to-files DIR]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime, date
+from decimal import Decimal
+
+_here = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.abspath(os.path.join(_here, os.pardir, os.pardir))
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, inspect, select, text
+
+from pos_app.database.partitioning import is_partitioned, list_partitions, months_within
+from pos_app.models.database import (
+    ArchivedPeriod, BankTransaction, Payment, PaymentSplit, Sale, SaleItem, StockMovement
+)
+from pos_app.utils.money import to_paisa
+
+logger = logging.getLogger(__name__)
+
+# Fiscal year July-June, named after the calendar year it ends in (FY2025 = Jul 2024 - Jun 2025)
+FISCAL_YEAR_START_MONTH = 7
+ARCHIVE_PREFIX = 'archive_'
+ID_BATCH = 500
+
+MODELS = {
+    'sales': Sale,
+    'sale_items': SaleItem,
+    'payment_splits': PaymentSplit,
+    'payments': Payment,
+    'stock_movements': StockMovement,
+    'bank_transactions': BankTransaction,
+}
+
+DATE_COLUMNS = {
+    'sales': 'sale_date',
+    'sale_items': 'created_at',
+    'payment_splits': 'created_at',
+    'payments': 'payment_date',
+    'stock_movements': 'date',
+    'bank_transactions': 'transaction_date',
+}
+
+
+def fiscal_year_bounds(year: int, start_month: int = FISCAL_YEAR_START_MONTH):
+    """(start, end) of fiscal year `year`; end is exclusive"""
+    if start_month == 1:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    return datetime(year - 1, start_month, 1), datetime(year, start_month, 1)
+
+
+def fiscal_year_of(ts: datetime, start_month: int = FISCAL_YEAR_START_MONTH) -> int:
+    if start_month == 1:
+        return ts.year
+    return ts.year + 1 if ts.month >= start_month else ts.year
+
+
+class ArchivedRow(dict):
+    """An archived row; columns are readable as attributes like ORM objects"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _archive_table(session, table: str) -> Table:
+    """Typed Table for archive_<table> (ORM columns present in it, plus archived_fy)"""
+    present = {c['name'] for c in inspect(session.connection()).get_columns(ARCHIVE_PREFIX + table)}
+    columns = [Column(c.name, c.type) for c in MODELS[table].__table__.columns if c.name in present]
+    return Table(ARCHIVE_PREFIX + table, MetaData(), *columns, Column('archived_fy', Integer))
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'value') and not isinstance(value, (int, float, str)):
+        return value.value  # Enum
+    return value
+
+
+def _parse_dates(row: dict, table: str) -> ArchivedRow:
+    for name in (DATE_COLUMNS[table], 'created_at'):
+        value = row.get(name)
+        if isinstance(value, str):
+            try:
+                row[name] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return ArchivedRow(row)
+
+
+def _has_registry(session) -> bool:
+    try:
+        return inspect(session.connection()).has_table('archived_periods')
+    except Exception:
+        return False
+
+
+def archived_periods(session, table: str, start=None, end=None) -> list:
+    """ArchivedPeriod rows of `table` overlapping [start, end)"""
+    if not _has_registry(session):
+        return []
+    q = session.query(ArchivedPeriod).filter(ArchivedPeriod.table_name == table)
+    if start is not None:
+        q = q.filter(ArchivedPeriod.period_end > start)
+    if end is not None:
+        q = q.filter(ArchivedPeriod.period_start <= end)
+    return q.order_by(ArchivedPeriod.period_start).all()
+
+
+def _read_file(path: str, table: str):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield _parse_dates(json.loads(line), table)
+
+
+def _bound(value, end=False):
+    """Dates widen to the whole day so they compare with the datetime columns"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, datetime.max.time() if end else datetime.min.time())
+    return value
+
+
+def archived_rows(session, table: str, start=None, end=None, **equals) -> list:
+    """Archived rows of `table` whose date column is in [start, end] (inclusive end, like the reports).
+
+    Keyword arguments restrict the rows to column values, e.g. customer_id=7.
+    """
+    start, end = _bound(start), _bound(end, end=True)
+    periods = archived_periods(session, table, start, end)
+    if not periods:
+        return []
+    column = DATE_COLUMNS[table]
+    rows = []
+    in_tables = [p.fiscal_year for p in periods if p.location == 'table']
+    if in_tables:
+        t = _archive_table(session, table)
+        q = select(t).where(t.c.archived_fy.in_(in_tables))
+        if start is not None:
+            q = q.where(t.c[column] >= start)
+        if end is not None:
+            q = q.where(t.c[column] <= end)
+        for name, value in equals.items():
+            q = q.where(t.c[name] == value)
+        rows.extend(ArchivedRow(r._mapping) for r in session.execute(q))
+    for p in periods:
+        if p.location != 'file' or not p.path:
+            continue
+        for row in _read_file(p.path, table):
+            when = row.get(column)
+            if (start is None or (when is not None and when >= start)) and (end is None or (when is not None and when <= end)) \
+                    and all(row.get(name) == value for name, value in equals.items()):
+                rows.append(row)
+    return rows
+
+
+def archived_children(session, table: str, key: str, ids, fiscal_years) -> list:
+    """Archived `table` rows whose `key` is in ids (e.g. sale_items of archived sales)."""
+    ids = set(ids)
+    fiscal_years = set(fiscal_years)
+    if not ids or not _has_registry(session):
+        return []
+    periods = [p for p in archived_periods(session, table) if p.fiscal_year in fiscal_years]
+    rows = []
+    in_tables = [p.fiscal_year for p in periods if p.location == 'table']
+    if in_tables:
+        t = _archive_table(session, table)
+        for batch in _batches(sorted(ids)):
+            q = select(t).where(t.c.archived_fy.in_(in_tables), t.c[key].in_(batch))
+            rows.extend(ArchivedRow(r._mapping) for r in session.execute(q))
+    for p in periods:
+        if p.location == 'file' and p.path:
+            rows.extend(row for row in _read_file(p.path, table) if row.get(key) in ids)
+    return rows
+
+
+def _batches(values, size=ID_BATCH):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class Archiver:
+    """Moves closed fiscal years from the live tables into archive tables/files"""
+
+    def __init__(self, session, start_month: int = FISCAL_YEAR_START_MONTH):
+        self.session = session
+        self.start_month = start_month
+
+    def closed_years(self, now=None) -> list:
+        """Fiscal years since the first sale that have ended and are not archived yet"""
+        current = fiscal_year_of(now or datetime.now(), self.start_month)
+        first = self.session.execute(select(Sale.sale_date).order_by(Sale.sale_date).limit(1)).scalar()
+        if first is None:
+            return []
+        done = {p.fiscal_year for p in archived_periods(self.session, 'sales')}
+        return [y for y in range(fiscal_year_of(first, self.start_month), current) if y not in done]
+
+    def _conn(self):
+        return self.session.connection()
+
+    def _live_columns(self, table: str) -> list:
+        return [c['name'] for c in inspect(self._conn()).get_columns(table)]
+
+    def _ensure_archive_table(self, table: str) -> list:
+        """Create archive_<table> (or add columns the live table gained); returns the live columns."""
+        conn = self._conn()
+        archive = ARCHIVE_PREFIX + table
+        columns = self._live_columns(table)
+        if not inspect(conn).has_table(archive):
+            conn.execute(text(f"CREATE TABLE {archive} AS SELECT * FROM {table} WHERE 1 = 0"))
+            conn.execute(text(f"ALTER TABLE {archive} ADD COLUMN archived_fy INTEGER"))
+            conn.execute(text(f"CREATE INDEX ix_{archive}_fy_date ON {archive} (archived_fy, {DATE_COLUMNS[table]})"))
+            return columns
+        present = {c['name'] for c in inspect(conn).get_columns(archive)}
+        for c in inspect(conn).get_columns(table):
+            if c['name'] not in present:
+                conn.execute(text(f"ALTER TABLE {archive} ADD COLUMN {c['name']} {c['type'].compile(conn.dialect)}"))
+        return columns
+
+    def _move(self, table: str, where: str, params: dict, year: int, dry_run: bool, expanding=()) -> int:
+        if dry_run:
+            stmt = text(f"SELECT COUNT(*) FROM {table} WHERE {where}")
+            if expanding:
+                stmt = stmt.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+            return int(self._conn().execute(stmt, params).scalar() or 0)
+        columns = ', '.join(self._ensure_archive_table(table))
+        insert = text(f"INSERT INTO {ARCHIVE_PREFIX}{table} ({columns}, archived_fy) "
+                      f"SELECT {columns}, :_fy FROM {table} WHERE {where}")
+        delete = text(f"DELETE FROM {table} WHERE {where}")
+        if expanding:
+            binds = [bindparam(name, expanding=True) for name in expanding]
+            insert, delete = insert.bindparams(*binds), delete.bindparams(*binds)
+        self._conn().execute(insert, dict(params, _fy=year))
+        return max(self._conn().execute(delete, params).rowcount or 0, 0)
+
+    def _detach_partitions(self, table: str, start, end, year: int, copy: bool) -> int:
+        """Detach and drop the monthly partitions of `table` inside [start, end) (PostgreSQL).
+
+        With copy, every row of each partition goes to the archive table first
+        and the number copied is returned. Without it, only partitions the row
+        moves have already emptied are released.
+        """
+        conn = self._conn()
+        if not is_partitioned(conn, table):
+            return 0
+        names = months_within(list_partitions(conn, table), start, end)
+        columns = ', '.join(self._ensure_archive_table(table)) if copy and names else None
+        moved = 0
+        for name in names:
+            if not copy and conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).scalar():
+                continue  # still holds rows of sales that stay live
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if copy:
+                moved += conn.execute(text(
+                    f"INSERT INTO {ARCHIVE_PREFIX}{table} ({columns}, archived_fy) SELECT {columns}, :fy FROM {name}"),
+                    {'fy': year}).rowcount or 0
+            conn.execute(text(f"DROP TABLE {name}"))
+            logger.info(f"[ARCHIVE] Detached and dropped partition {name}")
+        return moved
+
+    def _deletion_order(self, ids) -> list:
+        """Sale ids ordered so each refund is deleted before the sale it refunds (refund_of_sale_id)"""
+        refund_of = {}
+        for batch in _batches(ids):
+            refund_of.update(self._conn().execute(
+                text("SELECT id, refund_of_sale_id FROM sales WHERE id IN :ids")
+                .bindparams(bindparam('ids', expanding=True)), {'ids': batch}).all())
+
+        def depth(sale_id):
+            # Number of refunds between this sale and its original (chains are short)
+            level = 0
+            while refund_of.get(sale_id) in refund_of and level < len(refund_of):
+                sale_id, level = refund_of[sale_id], level + 1
+            return level
+
+        return sorted(ids, key=lambda sale_id: (-depth(sale_id), sale_id))
+
+    def _outstanding_sale_ids(self, end) -> set:
+        """Unpaid credit sales still making up a customer's balance.
+
+        Customer payments are not tied to sales, so the balance is settled
+        oldest first: the newest unpaid sales up to current_credit stay open.
+        """
+        open_ids = set()
+        rows = self._conn().execute(text(
+            "SELECT s.id, s.customer_id, s.total_amount, COALESCE(s.paid_amount, 0), c.current_credit "
+            "FROM sales s JOIN customers c ON c.id = s.customer_id "
+            "WHERE c.current_credit > 0 AND s.sale_date < :end AND COALESCE(s.is_refund, :false) = :false "
+            "AND COALESCE(s.paid_amount, 0) < s.total_amount "
+            "ORDER BY s.customer_id, s.sale_date DESC, s.id DESC"
+        ), {'end': end, 'false': False})
+        left = {}
+        for sale_id, customer_id, total, paid, credit in rows:
+            remaining = left.setdefault(customer_id, to_paisa(credit))
+            if remaining <= 0:
+                continue
+            open_ids.add(sale_id)
+            left[customer_id] = remaining - (to_paisa(total) - to_paisa(paid))
+        return open_ids
+
+    def _sale_ids(self, start, end) -> list:
+        """Sales of the year that nothing outside the year still references and nobody still owes"""
+        outstanding = self._outstanding_sale_ids(end)
+        return [sale_id for sale_id in self._conn().execute(text(
+            "SELECT s.id FROM sales s WHERE s.sale_date >= :start AND s.sale_date < :end "
+            "AND NOT EXISTS (SELECT 1 FROM sales r WHERE r.refund_of_sale_id = s.id "
+            "               AND (r.sale_date IS NULL OR r.sale_date < :start OR r.sale_date >= :end)) "
+            "AND NOT EXISTS (SELECT 1 FROM returns t WHERE t.sale_id = s.id) "
+            "AND NOT EXISTS (SELECT 1 FROM payments p WHERE p.sale_id = s.id "
+            "               AND (p.payment_date < :start OR p.payment_date >= :end))"
+        ), {'start': start, 'end': end}).scalars() if sale_id not in outstanding]
+
+    def archive_year(self, year: int, dry_run: bool = False, now=None) -> dict:
+        """Archive fiscal year `year`; returns {table: rows moved (or to move, with dry_run)}."""
+        start, end = fiscal_year_bounds(year, self.start_month)
+        if end > fiscal_year_bounds(fiscal_year_of(now or datetime.now(), self.start_month), self.start_month)[0]:
+            raise ValueError(f"Fiscal year {year} has not closed yet")
+        if archived_periods(self.session, 'sales', start, start):
+            raise ValueError(f"Fiscal year {year} is already archived")
+
+        try:
+            if not dry_run:
+                # Ledger snapshots must cover the year before its movements leave the live table
+                from pos_app.utils.inventory_ledger import InventoryLedger
+                InventoryLedger(self.session).checkpoint(upto=end, commit=False)
+
+            ids = self._sale_ids(start, end)
+            rng = {'start': start, 'end': end}
+            counts = dict.fromkeys(MODELS, 0)
+            for batch in _batches(ids):
+                for table in ('sale_items', 'payment_splits', 'payments'):
+                    counts[table] += self._move(table, "sale_id IN :ids", {'ids': batch}, year, dry_run, ('ids',))
+            counts['payments'] += self._move(
+                'payments', "sale_id IS NULL AND payment_date >= :start AND payment_date < :end", rng, year, dry_run)
+            # Refunds first: deleting an original before its refund would break refund_of_sale_id
+            for batch in _batches(self._deletion_order(ids)):
+                counts['sales'] += self._move('sales', "id IN :ids", {'ids': batch}, year, dry_run, ('ids',))
+            if not dry_run:
+                counts['stock_movements'] = self._detach_partitions('stock_movements', start, end, year, copy=True)
+            counts['stock_movements'] += self._move(
+                'stock_movements', "date >= :start AND date < :end", rng, year, dry_run)
+            if not dry_run:
+                # Balances carried past the year before its transactions leave the live table
+                from pos_app.controllers.bank_ledger import BankLedgerService
+                BankLedgerService(self.session).carry_forward(end)
+            counts['bank_transactions'] = self._move(
+                'bank_transactions',
+                "transaction_date >= :start AND transaction_date < :end "
+                "AND NOT EXISTS (SELECT 1 FROM payments p WHERE p.transaction_id = bank_transactions.id)",
+                rng, year, dry_run)
+
+            if dry_run:
+                return counts
+            for table in ('sale_items', 'payments'):
+                self._detach_partitions(table, start, end, year, copy=False)
+            for table, moved in counts.items():
+                self.session.add(ArchivedPeriod(table_name=table, fiscal_year=year, period_start=start,
+                                                period_end=end, row_count=moved, location='table'))
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        logger.info(f"[ARCHIVE] Fiscal year {year} archived: {counts}")
+        return counts
+
+    def export_year(self, year: int, directory: str) -> dict:
+        """Move fiscal year `year` from the archive tables to gzip JSON-lines files; returns {table: path}."""
+        os.makedirs(directory, exist_ok=True)
+        periods = self.session.query(ArchivedPeriod).filter(
+            ArchivedPeriod.fiscal_year == year, ArchivedPeriod.location == 'table').all()
+        paths = {}
+        try:
+            for period in periods:
+                table = period.table_name
+                path = os.path.join(directory, f"{table}_FY{year}.jsonl.gz")
+                digest = hashlib.sha256()
+                if inspect(self._conn()).has_table(ARCHIVE_PREFIX + table):
+                    t = _archive_table(self.session, table)
+                    with gzip.open(path, 'wt', encoding='utf-8') as f:
+                        for row in self.session.execute(select(t).where(t.c.archived_fy == year)):
+                            line = json.dumps({k: _jsonable(v) for k, v in row._mapping.items()}, sort_keys=True)
+                            digest.update(line.encode('utf-8'))
+                            f.write(line + "\n")
+                    self._conn().execute(text(f"DELETE FROM {ARCHIVE_PREFIX}{table} WHERE archived_fy = :fy"), {'fy': year})
+                else:
+                    with gzip.open(path, 'wt', encoding='utf-8'):
+                        pass
+                period.location = 'file'
+                period.path = os.path.abspath(path)
+                period.checksum = digest.hexdigest()
+                paths[table] = period.path
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        logger.info(f"[ARCHIVE] Fiscal year {year} exported to {directory}")
+        return paths
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m pos_app.database.archive",
+                                     description="Archive closed fiscal years")
+    parser.add_argument('--list', action='store_true', help="show closed and archived fiscal years")
+    parser.add_argument('--fiscal-year', type=int, default=None)
+    parser.add_argument('--start-month', type=int, default=FISCAL_YEAR_START_MONTH)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--to-files', default=None, metavar='DIR', help="also export the year to gzip files")
+    args = parser.parse_args(argv)
+
+    from sqlalchemy.orm import sessionmaker
+    from pos_app.models.database import get_engine
+    session = sessionmaker(bind=get_engine())()
+    try:
+        archiver = Archiver(session, args.start_month)
+        if args.list or args.fiscal_year is None:
+            print(f"Closed, not archived: {', '.join(f'FY{y}' for y in archiver.closed_years()) or '-'}")
+            for p in session.query(ArchivedPeriod).order_by(ArchivedPeriod.fiscal_year, ArchivedPeriod.table_name):
+                print(f"FY{p.fiscal_year}  {p.table_name:<18} {p.row_count:>8} rows  {p.location}  {p.path or ''}")
+            return 0
+        counts = archiver.archive_year(args.fiscal_year, dry_run=args.dry_run)
+        for table, n in counts.items():
+            print(f"{table:<18} {n:>8} {'rows to move' if args.dry_run else 'rows archived'}")
+        if args.to_files and not args.dry_run:
+            for table, path in archiver.export_year(args.fiscal_year, args.to_files).items():
+                print(f"{table:<18} -> {path}")
+        return 0
+    except ValueError as e:
+        print(f"Archive error: {e}")
+        return 1
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,6 +10,7 @@ class Database:
         self.engine = None
         self.session = None
         self._is_offline = False
+        self.schema_current = False
         self._setup_postgresql()
 
     def _setup_postgresql(self):
@@ -24,13 +25,16 @@ class Database:
             with self.engine.connect() as conn:
                 pass  # If we get here, connection is good
             
-            # Create tables if they don't exist
-            Base.metadata.create_all(self.engine)
-            
             # Create session
             Session = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
             self.session = Session()
 
+            # Create tables if they don't exist (skipped when the stored schema fingerprint matches)
+            from pos_app.utils.schema_fingerprint import schema_is_current
+            self.schema_current = schema_is_current(self.session)
+            if not self.schema_current:
+                Base.metadata.create_all(self.engine)
+
             # Confirm PostgreSQL connection
             from pos_app.models.database import _load_db_config
             cfg = _load_db_config()
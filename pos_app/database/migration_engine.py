@@ -0,0 +1,482 @@
+"""
+Migration engine - ordered, transactional, idempotent schema migrations.
+
+Every ``migrations/vN_<name>.py`` module is a node in a dependency graph. A module
+depends on the previous version unless it sets ``DEPENDS_ON = [..]``. The runner:
+
+- takes an advisory lock (PostgreSQL ``pg_advisory_lock``) so two terminals
+  never migrate the same database at once;
+- applies pending migrations in dependency order, each one in its own transaction
+  together with its ``schema_versions`` row, so a failure leaves nothing half-recorded;
+- stores a SHA-256 checksum of each module and reports modules edited after they ran;
+- runs modules with ``TRANSACTIONAL = False`` in autocommit mode so they can use
+  ``CREATE INDEX CONCURRENTLY`` and commit large backfills batch by batch;
+- at application startup (``run(startup=True)``) skips modules with
+  ``RUN_AT_STARTUP = False`` (or a tuple of dialects not including the current
+  one) - table rewrites left to the command line - and modules that list a
+  skipped one in ``DEPENDS_ON``. The implicit dependency
+  on the previous version does not hold later migrations back.
+
+A module edited after release lists the checksums of its earlier, equivalent
+versions in ``PREVIOUS_CHECKSUMS``; databases that ran those adopt the new
+checksum instead of reporting the module as changed.
+
+Modules expose either the legacy ``upgrade(session)`` or ``migrate(ctx)`` which
+receives a :class:`MigrationContext`:
+
+    def migrate(ctx):
+        ctx.add_column('sales', 'is_refund', 'BOOLEAN DEFAULT FALSE')
+        ctx.create_index('idx_sales_refund_of', 'sales', ['refund_of_sale_id'])
+        ctx.backfill('sales', 'is_refund = FALSE', 'is_refund IS NULL')
+
+    runner = MigrationRunner(engine)
+    runner.run()
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATIONS_PACKAGE = 'pos_app.database.migrations'
+
+# Key for pg_advisory_lock; any constant shared by every terminal works
+ADVISORY_LOCK_KEY = 0x504F534D  # "POSM"
+
+# Process-wide lock for databases without advisory locks (SQLite tests)
+_local_lock = threading.Lock()
+
+
+class MigrationError(Exception):
+    """Raised when the migration graph is invalid or a migration fails"""
+
+
+class MigrationLockError(MigrationError):
+    """Raised when another process holds the migration lock"""
+
+
+class Migration:
+    """One migration module discovered on disk"""
+
+    def __init__(self, version: int, name: str, path: str, package: str | None = None):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.package = package
+        with open(path, 'rb') as f:
+            self.checksum = hashlib.sha256(f.read()).hexdigest()
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            if self.package:
+                self._module = importlib.import_module(f"{self.package}.{self.name}")
+            else:
+                spec = importlib.util.spec_from_file_location(f"_pos_migration_{self.name}", self.path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self._module = module
+        return self._module
+
+    @property
+    def transactional(self) -> bool:
+        return bool(getattr(self.module, 'TRANSACTIONAL', True))
+
+    def runs_at_startup(self, dialect: str) -> bool:
+        """RUN_AT_STARTUP is a bool or the dialects on which the module is cheap enough"""
+        flag = getattr(self.module, 'RUN_AT_STARTUP', True)
+        if isinstance(flag, (tuple, list, set, frozenset)):
+            return dialect in flag
+        return bool(flag)
+
+    def accepts(self, checksum) -> bool:
+        """True if `checksum` is this module's or one of its equivalent earlier versions'"""
+        return checksum == self.checksum or checksum in getattr(self.module, 'PREVIOUS_CHECKSUMS', ())
+
+    @property
+    def description(self) -> str:
+        doc = (self.module.__doc__ or '').strip()
+        return doc.splitlines()[0].strip() if doc else f"Applied {self.name}"
+
+    def dependencies(self, previous: int | None) -> list:
+        declared = getattr(self.module, 'DEPENDS_ON', None)
+        if declared is None:
+            return [previous] if previous is not None else []
+        return [int(v) for v in declared]
+
+    def __repr__(self):
+        return f"Migration(v{self.version} {self.name})"
+
+
+class MigrationContext:
+    """Helpers handed to ``migrate(ctx)``; all statements run on ``ctx.connection``"""
+
+    def __init__(self, connection, transactional: bool = True):
+        self.connection = connection
+        self.transactional = transactional
+        self.dialect = connection.dialect.name
+
+    @property
+    def is_postgresql(self) -> bool:
+        return self.dialect == 'postgresql'
+
+    def execute(self, sql: str, params: dict | None = None):
+        return self.connection.execute(text(sql), params or {})
+
+    def table_exists(self, table: str) -> bool:
+        return inspect(self.connection).has_table(table)
+
+    def column_exists(self, table: str, column: str) -> bool:
+        if not self.table_exists(table):
+            return False
+        return any(c['name'] == column for c in inspect(self.connection).get_columns(table))
+
+    def add_column(self, table: str, column: str, ddl: str) -> bool:
+        """Add ``column`` if the table exists and the column does not. Returns True if added."""
+        if not self.table_exists(table) or self.column_exists(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        logger.info(f"[MIGRATION] Added {table}.{column}")
+        return True
+
+    def rename_column(self, table: str, old: str, new: str) -> bool:
+        if not self.column_exists(table, old) or self.column_exists(table, new):
+            return False
+        self.execute(f"ALTER TABLE {table} RENAME COLUMN {old} TO {new}")
+        return True
+
+    def _index_valid(self, name: str):
+        """True/False for an existing PostgreSQL index, None when it does not exist."""
+        return self.execute(
+            "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name",
+            {'name': name}
+        ).scalar()
+
+    def create_index(self, name: str, table: str, columns, unique: bool = False,
+                     where: str | None = None, concurrently: bool = True) -> bool:
+        """Create an index without blocking writes where possible.
+
+        On PostgreSQL outside a transaction this uses ``CREATE INDEX CONCURRENTLY``;
+        an invalid index left by an interrupted concurrent build is dropped and rebuilt.
+        """
+        if not self.table_exists(table):
+            return False
+        cols = ', '.join([columns] if isinstance(columns, str) else columns)
+        concurrent = concurrently and self.is_postgresql and not self.transactional
+        if self.is_postgresql:
+            valid = self._index_valid(name)
+            if valid:
+                return False
+            if valid is False:
+                self.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrent else ''}IF EXISTS {name}")
+        sql = (f"CREATE {'UNIQUE ' if unique else ''}INDEX {'CONCURRENTLY ' if concurrent else ''}"
+               f"IF NOT EXISTS {name} ON {table} ({cols})")
+        if where:
+            sql += f" WHERE {where}"
+        self.execute(sql)
+        return True
+
+    def backfill(self, table: str, set_sql: str, where: str = '1 = 1', params: dict | None = None,
+                 batch_size: int = 5000, key: str = 'id', pause: float = 0.0) -> int:
+        """Run ``UPDATE table SET set_sql WHERE where`` in primary-key windows.
+
+        Each window is its own short statement (committed immediately when the
+        migration is non-transactional), so row locks are held only briefly.
+        Returns the number of rows updated.
+        """
+        if not self.table_exists(table):
+            return 0
+        bounds = self.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}").first()
+        if not bounds or bounds[0] is None:
+            return 0
+        low, high = int(bounds[0]), int(bounds[1])
+        batch_size = max(1, int(batch_size))
+        total = 0
+        start = low
+        while start <= high:
+            args = dict(params or {})
+            args.update({'_lo': start, '_hi': start + batch_size})
+            result = self.execute(
+                f"UPDATE {table} SET {set_sql} WHERE {key} >= :_lo AND {key} < :_hi AND ({where})", args
+            )
+            total += max(result.rowcount or 0, 0)
+            start += batch_size
+            if pause:
+                time.sleep(pause)
+        logger.info(f"[MIGRATION] Backfilled {total} row(s) in {table}")
+        return total
+
+
+class _AdvisoryLock:
+    """Session-level PostgreSQL advisory lock; a process lock elsewhere"""
+
+    def __init__(self, engine, key: int = ADVISORY_LOCK_KEY, timeout: float = 60.0, poll: float = 0.5):
+        self.engine = engine
+        self.key = key
+        self.timeout = timeout
+        self.poll = poll
+        self._conn = None
+        self._local = False
+
+    def __enter__(self):
+        deadline = time.monotonic() + max(0.0, self.timeout)
+        if self.engine.dialect.name != 'postgresql':
+            if not _local_lock.acquire(timeout=max(0.0, self.timeout)):
+                raise MigrationLockError("Another migration is already running")
+            self._local = True
+            return self
+        conn = self.engine.connect()
+        try:
+            while True:
+                acquired = conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {'k': self.key}).scalar()
+                conn.commit()
+                if acquired:
+                    break
+                if time.monotonic() >= deadline:
+                    raise MigrationLockError("Another terminal is migrating this database; try again later")
+                time.sleep(self.poll)
+        except Exception:
+            conn.close()
+            raise
+        self._conn = conn
+        return self
+
+    def __exit__(self, *exc):
+        if self._local:
+            _local_lock.release()
+            self._local = False
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {'k': self.key})
+                self._conn.commit()
+            finally:
+                self._conn.close()
+                self._conn = None
+        return False
+
+
+class MigrationRunner:
+    """Discovers, orders and applies migrations against one engine"""
+
+    def __init__(self, engine, migrations_dir: str | None = None, package: str | None = None,
+                 lock_timeout: float = 60.0):
+        self.engine = engine
+        self.migrations_dir = migrations_dir or MIGRATIONS_DIR
+        if package is None and migrations_dir is None:
+            package = MIGRATIONS_PACKAGE
+        self.package = package
+        self.lock_timeout = lock_timeout
+
+    # ------------------------------------------------------------------ graph
+    def discover(self) -> list:
+        """All vN_*.py modules, sorted by version."""
+        if not os.path.isdir(self.migrations_dir):
+            return []
+        found = {}
+        for fname in os.listdir(self.migrations_dir):
+            if not (fname.startswith('v') and fname.endswith('.py')):
+                continue
+            try:
+                version = int(fname[1:].split('_')[0])
+            except ValueError:
+                continue
+            if version <= 0:
+                continue
+            if version in found:
+                raise MigrationError(f"Duplicate migration version {version}: {found[version].name}, {fname[:-3]}")
+            found[version] = Migration(version, fname[:-3], os.path.join(self.migrations_dir, fname), self.package)
+        return [found[v] for v in sorted(found)]
+
+    def plan(self, migrations: list | None = None) -> list:
+        """Topologically sort migrations; ties resolve to the lower version first."""
+        migrations = self.discover() if migrations is None else migrations
+        by_version = {m.version: m for m in migrations}
+        deps = {}
+        previous = None
+        for m in migrations:
+            deps[m.version] = m.dependencies(previous)
+            previous = m.version
+            for d in deps[m.version]:
+                if d not in by_version:
+                    raise MigrationError(f"{m.name} depends on missing migration v{d}")
+
+        ordered, state = [], {}
+
+        def visit(version, chain):
+            if state.get(version) == 'done':
+                return
+            if state.get(version) == 'visiting':
+                cycle = ' -> '.join(f"v{v}" for v in chain + [version])
+                raise MigrationError(f"Migration dependency cycle: {cycle}")
+            state[version] = 'visiting'
+            for d in sorted(deps[version]):
+                visit(d, chain + [version])
+            state[version] = 'done'
+            ordered.append(by_version[version])
+
+        for m in migrations:
+            visit(m.version, [])
+        return ordered
+
+    # ------------------------------------------------------------------ state
+    def ensure_version_table(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                """
+                CREATE TABLE IF NOT EXISTS schema_versions (
+                    version INTEGER PRIMARY KEY,
+                    applied_at TIMESTAMP NOT NULL,
+                    description TEXT
+                )
+                """
+            ))
+            existing = {c['name'] for c in inspect(conn).get_columns('schema_versions')}
+            for column, ddl in (('fingerprint', 'VARCHAR(64)'), ('checksum', 'VARCHAR(64)')):
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE schema_versions ADD COLUMN {column} {ddl}"))
+
+    def applied(self) -> dict:
+        """{version: checksum or None} for recorded migrations."""
+        self.ensure_version_table()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT version, checksum FROM schema_versions WHERE version > 0")).fetchall()
+        return {int(r[0]): r[1] for r in rows}
+
+    def current_version(self) -> int:
+        applied = self.applied()
+        return max(applied) if applied else 0
+
+    def pending(self, startup: bool = False) -> list:
+        """Migrations not applied yet; with startup, only those run(startup=True) would apply."""
+        applied = self.applied()
+        ordered = self.plan()
+        deferred = self.deferred(ordered, applied) if startup else set()
+        return [m for m in ordered if m.version not in applied and m.version not in deferred]
+
+    def deferred(self, ordered: list, applied: dict) -> set:
+        """Versions left to the command line at startup: modules not run at startup on
+        this dialect and modules declaring a dependency on one of them."""
+        deferred = set()
+        for m in ordered:
+            if m.version in applied:
+                continue
+            declared = getattr(m.module, 'DEPENDS_ON', None) or ()
+            if not m.runs_at_startup(self.engine.dialect.name) or any(int(d) in deferred for d in declared):
+                deferred.add(m.version)
+        return deferred
+
+    def verify(self, migrations: list | None = None, applied: dict | None = None) -> list:
+        """Applied migrations whose file changed since they ran: [(migration, stored_checksum)]."""
+        migrations = self.plan() if migrations is None else migrations
+        applied = self.applied() if applied is None else applied
+        return [(m, applied[m.version]) for m in migrations
+                if applied.get(m.version) and not m.accepts(applied[m.version])]
+
+    def _adopt_checksums(self, migrations: list, applied: dict) -> None:
+        """Rows written before checksums existed, or by an equivalent earlier version of the
+        module, take the current file's checksum."""
+        missing = [m for m in migrations if m.version in applied and applied[m.version] != m.checksum
+                   and (not applied[m.version] or m.accepts(applied[m.version]))]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            for m in missing:
+                conn.execute(text("UPDATE schema_versions SET checksum = :c WHERE version = :v"),
+                             {'c': m.checksum, 'v': m.version})
+                applied[m.version] = m.checksum
+
+    def _record(self, conn, migration: Migration) -> None:
+        conn.execute(text(
+            "INSERT INTO schema_versions (version, applied_at, description, checksum) "
+            "VALUES (:v, :at, :d, :c)"
+        ), {'v': migration.version, 'at': datetime.now(timezone.utc),
+            'd': migration.description, 'c': migration.checksum})
+
+    # ------------------------------------------------------------------ apply
+    def _apply(self, migration: Migration) -> None:
+        module = migration.module
+        if not hasattr(module, 'migrate') and not hasattr(module, 'upgrade'):
+            raise MigrationError(f"Migration {migration.name} has neither migrate(ctx) nor upgrade(session)")
+
+        if migration.transactional:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    if hasattr(module, 'migrate'):
+                        module.migrate(MigrationContext(conn, transactional=True))
+                    else:
+                        session = Session(bind=conn, join_transaction_mode='create_savepoint')
+                        try:
+                            module.upgrade(session)
+                            session.flush()
+                        finally:
+                            session.close()
+                    self._record(conn, migration)
+            return
+
+        with self.engine.connect() as conn:
+            autocommit = conn.execution_options(isolation_level='AUTOCOMMIT')
+            if hasattr(module, 'migrate'):
+                module.migrate(MigrationContext(autocommit, transactional=False))
+            else:
+                session = Session(bind=autocommit)
+                try:
+                    module.upgrade(session)
+                    session.commit()
+                finally:
+                    session.close()
+        # Non-transactional steps must be idempotent; the row is written only on success
+        with self.engine.begin() as conn:
+            self._record(conn, migration)
+
+    def run(self, target: int | None = None, strict: bool = False, startup: bool = False) -> list:
+        """Apply pending migrations up to ``target``; returns the applied versions.
+
+        ``strict`` turns a checksum mismatch on an applied migration into an error
+        instead of a warning. ``startup`` skips the migrations deferred() to the
+        command line.
+        """
+        with _AdvisoryLock(self.engine, timeout=self.lock_timeout):
+            self.ensure_version_table()
+            ordered = self.plan()
+            applied = self.applied()
+            self._adopt_checksums(ordered, applied)
+
+            for migration, stored in self.verify(ordered, applied):
+                message = f"Migration {migration.name} changed after it was applied (checksum {stored[:12]} -> {migration.checksum[:12]})"
+                if strict:
+                    raise MigrationError(message)
+                logger.warning(f"[MIGRATION] {message}")
+
+            deferred = self.deferred(ordered, applied) if startup else set()
+            done = []
+            for migration in ordered:
+                if migration.version in applied:
+                    continue
+                if target is not None and migration.version > target:
+                    continue
+                if migration.version in deferred:
+                    logger.info(f"[MIGRATION] {migration.name} left for python -m pos_app.database.migrate")
+                    continue
+                started = time.perf_counter()
+                logger.info(f"[MIGRATION] Applying {migration.name}")
+                try:
+                    self._apply(migration)
+                except MigrationError:
+                    raise
+                except Exception as e:
+                    raise MigrationError(f"Migration {migration.name} failed: {e}") from e
+                applied[migration.version] = migration.checksum
+                done.append(migration.version)
+                logger.info(f"[MIGRATION] Applied {migration.name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+            return done
@@ -0,0 +1,50 @@
+"""
+Migration v10: Cash drawer running totals
+- per-session sale/refund/payout/deposit/withdrawal/adjustment totals and counts on
+  cash_drawer_sessions (controllers/cash_drawer.py keeps them current)
+- session_id index on cash_movements
+- backfilled from the existing movements; expected_balance is recomputed for open sessions
+"""
+
+TOTALS = {
+    'sales_total': 'SALE',
+    'refunds_total': 'REFUND',
+    'payouts_total': 'PAYOUT',
+    'deposits_total': 'DEPOSIT',
+    'withdrawals_total': 'WITHDRAWAL',
+    'adjustments_total': 'ADJUSTMENT',
+}
+
+
+def _sum(movement_type):
+    return (f"(SELECT COALESCE(SUM(m.amount), 0) FROM cash_movements m "
+            f"WHERE m.session_id = cash_drawer_sessions.id AND m.movement_type = '{movement_type}')")
+
+
+def _count(movement_type=None):
+    kind = f" AND m.movement_type = '{movement_type}'" if movement_type else ""
+    return f"(SELECT COUNT(*) FROM cash_movements m WHERE m.session_id = cash_drawer_sessions.id{kind})"
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    for column in TOTALS:
+        ctx.add_column('cash_drawer_sessions', column, 'NUMERIC(14,2) DEFAULT 0')
+    for column in ('sale_count', 'refund_count', 'movement_count'):
+        ctx.add_column('cash_drawer_sessions', column, 'INTEGER DEFAULT 0')
+
+    if ctx.table_exists('cash_movements'):
+        ctx.create_index('ix_cash_movements_session_id', 'cash_movements', ['session_id'])
+        totals = ", ".join(f"{column} = {_sum(kind)}" for column, kind in TOTALS.items())
+        ctx.execute(f"""
+            UPDATE cash_drawer_sessions SET {totals},
+                sale_count = {_count('SALE')},
+                refund_count = {_count('REFUND')},
+                movement_count = {_count()}
+        """)
+        ctx.execute("""
+            UPDATE cash_drawer_sessions
+            SET expected_balance = COALESCE(opening_balance, 0) + sales_total + deposits_total
+                - refunds_total - payouts_total - withdrawals_total + adjustments_total
+            WHERE status = 'OPEN'
+        """)
@@ -0,0 +1,16 @@
+"""
+Migration v11: Expense scheduler
+- (status, scheduled_date) and (expense_id, scheduled_date) indexes on expense_schedules
+  for the due-occurrence UPDATE and per-template horizon reads
+"""
+
+# Autocommit so the indexes can be built CONCURRENTLY on a live database
+TRANSACTIONAL = False
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    if not ctx.table_exists('expense_schedules'):
+        return
+    ctx.create_index('ix_expense_schedules_status_date', 'expense_schedules', ['status', 'scheduled_date'])
+    ctx.create_index('ix_expense_schedules_expense_date', 'expense_schedules', ['expense_id', 'scheduled_date'])
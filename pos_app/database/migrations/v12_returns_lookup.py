@@ -0,0 +1,34 @@
+"""
+Migration v12: Returns and invoice lookups
+- sales.invoice_key: normalised invoice number ("INV-0042" -> "42"), backfilled in batches
+- indexes on sales.invoice_key, returns.return_date and return_items.return_id
+"""
+
+from sqlalchemy import text
+
+from pos_app.models.database import invoice_key
+
+# Autocommit: per-batch backfill commits and CREATE INDEX CONCURRENTLY
+TRANSACTIONAL = False
+
+BATCH_SIZE = 5000
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    ctx.add_column('sales', 'invoice_key', 'VARCHAR(50)')
+
+    last_id = 0
+    while True:
+        rows = ctx.connection.execute(text(
+            "SELECT id, invoice_number FROM sales WHERE id > :last AND invoice_key IS NULL "
+            "AND invoice_number IS NOT NULL ORDER BY id LIMIT :n"), {'last': last_id, 'n': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        ctx.connection.execute(text("UPDATE sales SET invoice_key = :key WHERE id = :id"),
+                               [{'id': r[0], 'key': invoice_key(r[1])} for r in rows])
+        last_id = rows[-1][0]
+
+    ctx.create_index('ix_sales_invoice_key', 'sales', ['invoice_key'])
+    ctx.create_index('ix_returns_return_date', 'returns', ['return_date'])
+    ctx.create_index('ix_return_items_return_id', 'return_items', ['return_id'])
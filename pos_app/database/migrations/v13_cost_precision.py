@@ -0,0 +1,34 @@
+"""
+Migration v13: Unit cost precision
+- products.purchase_price, purchase_items.unit_cost, stock_movements.unit_cost and
+  stock_snapshots.unit_cost become NUMERIC(14,4), so the weighted-average cost is no
+  longer rounded to paisa on every receipt (see the Cost type in utils/money.py)
+"""
+
+# Rewrites stock_movements (and its partitions) on PostgreSQL; run it from python -m pos_app.database.migrate
+RUN_AT_STARTUP = ('sqlite',)
+
+# table -> unit cost columns (mirrors the Cost columns in models/database.py)
+COST_COLUMNS = {
+    'products': ['purchase_price'],
+    'purchase_items': ['unit_cost'],
+    'stock_movements': ['unit_cost'],
+    'stock_snapshots': ['unit_cost'],
+}
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    if not ctx.is_postgresql:
+        # SQLite stores NUMERIC with REAL affinity either way; the Cost type rounds on write
+        return
+    for table, columns in COST_COLUMNS.items():
+        scales = dict(ctx.execute(
+            "SELECT column_name, numeric_scale FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = :table", {'table': table}).fetchall())
+        to_convert = [c for c in columns if c in scales and (scales[c] is None or scales[c] < 4)]
+        if not to_convert:
+            continue
+        # One ALTER per table so the table is rewritten only once
+        ctx.execute(f"ALTER TABLE {table} " + ", ".join(
+            f"ALTER COLUMN {c} TYPE NUMERIC(14,4) USING {c}::numeric" for c in to_convert))
@@ -0,0 +1,83 @@
+"""
+Migration v4: Exact money columns
+- Converts every money column from FLOAT (double precision) to NUMERIC(14,2)
+- Existing values are rounded half-up to whole paisa during the conversion
+"""
+from sqlalchemy import text
+
+# Rewrites every money table on PostgreSQL; run it from python -m pos_app.database.migrate
+RUN_AT_STARTUP = ('sqlite',)
+
+# table -> money columns (mirrors the Money columns in models/database.py)
+MONEY_COLUMNS = {
+    'customers': ['credit_limit', 'current_credit'],
+    'suppliers': ['credit_limit'],
+    'products': ['retail_price', 'wholesale_price', 'purchase_price'],
+    'sales': ['subtotal', 'tax_amount', 'discount_amount', 'total_amount', 'paid_amount'],
+    'sale_items': ['unit_price', 'discount', 'total'],
+    'payments': ['amount'],
+    'purchases': ['total_amount', 'paid_amount', 'tax_amount', 'discount_amount'],
+    'purchase_payments': ['amount'],
+    'purchase_items': ['unit_cost', 'total_cost'],
+    'bank_accounts': ['opening_balance', 'current_balance'],
+    'bank_transactions': ['amount', 'balance_after'],
+    'expenses': ['amount'],
+    'expense_schedules': ['amount'],
+    'discounts': ['min_amount', 'max_amount'],
+    'outstanding_purchases': ['amount_due'],
+    'customer_reports': ['total_sales', 'total_payments', 'outstanding_amount', 'average_order_value'],
+    'payment_splits': ['amount'],
+    'cash_drawer_sessions': ['opening_balance', 'closing_balance', 'expected_balance', 'variance'],
+    'cash_movements': ['amount'],
+    'bank_deposits': ['amount'],
+    'returns': ['refund_amount'],
+    'return_items': ['unit_price', 'total'],
+}
+
+
+def upgrade(session):
+    """Apply the migration."""
+    print("Applying migration: NUMERIC(14,2) money columns")
+    if session.bind.dialect.name != 'postgresql':
+        # SQLite stores NUMERIC with REAL affinity either way; the Money type rounds on write
+        print("Skipped: money columns are converted on PostgreSQL only")
+        return
+
+    for table, columns in MONEY_COLUMNS.items():
+        try:
+            existing = {
+                row[0]: row[1]
+                for row in session.execute(text("""
+                    SELECT column_name, data_type FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = :table
+                """), {'table': table}).fetchall()
+            }
+            to_convert = [c for c in columns if existing.get(c) in ('double precision', 'real')]
+            if not to_convert:
+                continue
+            # One ALTER per table so the table is rewritten only once
+            clauses = ", ".join(
+                f"ALTER COLUMN {c} TYPE NUMERIC(14,2) USING ROUND({c}::numeric, 2)" for c in to_convert
+            )
+            session.execute(text(f"ALTER TABLE {table} {clauses}"))
+            session.commit()
+            print(f"✓ {table}: {', '.join(to_convert)} -> NUMERIC(14,2)")
+        except Exception as e:
+            print(f"Error converting money columns on {table}: {e}")
+            session.rollback()
+            raise
+
+    print("Migration completed successfully")
+
+
+def downgrade(session):
+    """Revert the migration."""
+    print("Reverting migration: money columns back to double precision")
+    for table, columns in MONEY_COLUMNS.items():
+        try:
+            clauses = ", ".join(f"ALTER COLUMN {c} TYPE DOUBLE PRECISION" for c in columns)
+            session.execute(text(f"ALTER TABLE IF EXISTS {table} {clauses}"))
+            session.commit()
+        except Exception as e:
+            print(f"Error reverting {table}: {e}")
+            session.rollback()
@@ -0,0 +1,65 @@
+"""
+Migration v5: Consolidated safety fixes
+- Columns previously patched at every run by migrate.safety_fix_* (products, bank_accounts,
+  payments, bank_transactions)
+- sales.is_refund / sales.refund_of_sale_id (was migrate_add_refund_columns.py)
+- Indexes built with CREATE INDEX CONCURRENTLY and a batched is_refund backfill,
+  so the migration can run while terminals keep selling
+"""
+
+# Autocommit: required for CREATE INDEX CONCURRENTLY and per-batch backfill commits.
+# Every step below is idempotent, so an interrupted run can simply be repeated.
+TRANSACTIONAL = False
+
+COLUMNS = {
+    'products': [
+        ('rack_location', 'VARCHAR(50)'),
+    ],
+    'bank_accounts': [
+        ('branch_name', 'VARCHAR(100)'),
+        ('account_type', 'VARCHAR(50)'),
+        ('opening_balance', 'NUMERIC(14,2) DEFAULT 0'),
+        ('current_balance', 'NUMERIC(14,2) DEFAULT 0'),
+        ('is_active', 'BOOLEAN DEFAULT TRUE'),
+        ('notes', 'TEXT'),
+        ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+        ('updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+    ],
+    'payments': [
+        ('bank_account_id', 'INTEGER'),
+        ('transaction_id', 'INTEGER'),
+        ('created_by', 'VARCHAR(50)'),
+        ('updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+    ],
+    'bank_transactions': [
+        ('related_transaction_id', 'INTEGER'),
+        ('is_reconciled', 'BOOLEAN DEFAULT FALSE'),
+        ('reconciled_date', 'TIMESTAMP'),
+        ('created_by', 'VARCHAR(50)'),
+        ('updated_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP'),
+    ],
+    'sales': [
+        ('is_refund', 'BOOLEAN DEFAULT FALSE'),
+        ('refund_of_sale_id', 'INTEGER REFERENCES sales(id)'),
+    ],
+}
+
+INDEXES = [
+    ('idx_bank_accounts_account_number', 'bank_accounts', ['account_number'], None),
+    ('idx_sales_refund_of_sale_id', 'sales', ['refund_of_sale_id'], 'refund_of_sale_id IS NOT NULL'),
+]
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    for table, columns in COLUMNS.items():
+        for column, ddl in columns:
+            ctx.add_column(table, column, ddl)
+
+    ctx.rename_column('bank_transactions', 'reference', 'reference_number')
+
+    # Rows created before the column existed read as NULL; the model expects FALSE
+    ctx.backfill('sales', 'is_refund = FALSE', 'is_refund IS NULL', batch_size=5000)
+
+    for name, table, columns, where in INDEXES:
+        ctx.create_index(name, table, columns, where=where)
@@ -0,0 +1,44 @@
+"""
+Migration v6: Stock ledger
+- stock_movements.unit_cost (weighted-average cost after the movement)
+- stock_snapshots table for per-product stock/cost checkpoints
+- (product_id, date) index on stock_movements for bounded delta scans
+"""
+
+# Autocommit so the movement index can be built CONCURRENTLY on a live database
+TRANSACTIONAL = False
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    ctx.add_column('stock_movements', 'unit_cost', 'NUMERIC(14,2)')
+
+    if not ctx.table_exists('stock_snapshots'):
+        ctx.execute("""
+            CREATE TABLE IF NOT EXISTS stock_snapshots (
+                id SERIAL PRIMARY KEY,
+                product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+                period_end TIMESTAMP NOT NULL,
+                granularity VARCHAR(10) DEFAULT 'daily',
+                quantity DOUBLE PRECISION NOT NULL DEFAULT 0,
+                unit_cost NUMERIC(14,2),
+                value NUMERIC(14,2),
+                last_movement_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """ if ctx.is_postgresql else """
+            CREATE TABLE IF NOT EXISTS stock_snapshots (
+                id INTEGER PRIMARY KEY,
+                product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+                period_end DATETIME NOT NULL,
+                granularity VARCHAR(10) DEFAULT 'daily',
+                quantity FLOAT NOT NULL DEFAULT 0,
+                unit_cost NUMERIC(14,2),
+                value NUMERIC(14,2),
+                last_movement_id INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    ctx.create_index('ix_stock_movements_product_date', 'stock_movements', ['product_id', 'date'])
+    ctx.create_index('ix_stock_snapshots_product_period', 'stock_snapshots', ['product_id', 'period_end'], unique=True)
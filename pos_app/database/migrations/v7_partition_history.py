@@ -0,0 +1,38 @@
+"""
+Migration v7: Partitioned history tables
+- stock_movements, sale_items, payments rebuilt as monthly range-partitioned
+  tables on PostgreSQL (database/partitioning.py); bank_transactions stays a
+  plain table because payments.transaction_id references it
+- archived_periods registry for closed fiscal years moved out by database/archive.py
+"""
+
+from pos_app.database.partitioning import PARTITIONED_TABLES, convert_to_partitioned
+
+# Copies the history tables on PostgreSQL; run it from python -m pos_app.database.migrate
+RUN_AT_STARTUP = ('sqlite',)
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    if not ctx.table_exists('archived_periods'):
+        ctx.execute("""
+            CREATE TABLE IF NOT EXISTS archived_periods (
+                id {pk},
+                table_name VARCHAR(50) NOT NULL,
+                fiscal_year INTEGER NOT NULL,
+                period_start TIMESTAMP NOT NULL,
+                period_end TIMESTAMP NOT NULL,
+                row_count INTEGER DEFAULT 0,
+                location VARCHAR(10) DEFAULT 'table',
+                path VARCHAR(500),
+                checksum VARCHAR(64),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """.format(pk='SERIAL PRIMARY KEY' if ctx.is_postgresql else 'INTEGER PRIMARY KEY'))
+    ctx.create_index('ix_archived_periods_table_year', 'archived_periods', ['table_name', 'fiscal_year'], unique=True)
+
+    if not ctx.is_postgresql:
+        return
+    # Each table is copied into its partitioned replacement inside this migration's transaction
+    for table, column in PARTITIONED_TABLES.items():
+        convert_to_partitioned(ctx.connection, table, column)
@@ -0,0 +1,47 @@
+"""
+Migration v8: Sales statistics counters
+- product_daily_stats: per-day, per-product quantity/revenue/refund counters
+- customer_daily_stats: per-day, per-customer, per-payment-method counters
+- backfilled from the existing sales (utils/sales_stats.py keeps them current)
+"""
+
+from pos_app.utils.sales_stats import rebuild_stats
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    pk = 'SERIAL PRIMARY KEY' if ctx.is_postgresql else 'INTEGER PRIMARY KEY'
+    real = 'DOUBLE PRECISION' if ctx.is_postgresql else 'FLOAT'
+    ts = 'TIMESTAMP' if ctx.is_postgresql else 'DATETIME'
+    if not ctx.table_exists('product_daily_stats'):
+        ctx.execute(f"""
+            CREATE TABLE IF NOT EXISTS product_daily_stats (
+                id {pk},
+                day DATE NOT NULL,
+                product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+                quantity {real} NOT NULL DEFAULT 0,
+                revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+                refund_quantity {real} NOT NULL DEFAULT 0,
+                refund_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+                sale_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+    if not ctx.table_exists('customer_daily_stats'):
+        ctx.execute(f"""
+            CREATE TABLE IF NOT EXISTS customer_daily_stats (
+                id {pk},
+                day DATE NOT NULL,
+                customer_id INTEGER NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+                payment_method VARCHAR(20) NOT NULL DEFAULT 'CASH',
+                revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+                refund_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+                sale_count INTEGER NOT NULL DEFAULT 0,
+                refund_count INTEGER NOT NULL DEFAULT 0,
+                last_sale_at {ts}
+            )
+        """)
+    ctx.create_index('ix_product_daily_stats_day_product', 'product_daily_stats', ['day', 'product_id'], unique=True)
+    ctx.create_index('ix_customer_daily_stats_day_customer', 'customer_daily_stats',
+                     ['day', 'customer_id', 'payment_method'], unique=True)
+
+    rebuild_stats(ctx.connection)
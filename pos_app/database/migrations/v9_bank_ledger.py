@@ -0,0 +1,40 @@
+"""
+Migration v9: Bank ledger
+- bank_balance_snapshots table for per-account daily closing balances
+- (bank_account_id, transaction_date, id) index on bank_transactions for keyset paging
+  and running-balance windows
+"""
+
+# Autocommit so the transaction index can be built CONCURRENTLY on a live database
+TRANSACTIONAL = False
+
+
+def migrate(ctx):
+    """Apply the migration."""
+    if not ctx.table_exists('bank_balance_snapshots'):
+        ctx.execute("""
+            CREATE TABLE IF NOT EXISTS bank_balance_snapshots (
+                id SERIAL PRIMARY KEY,
+                bank_account_id INTEGER NOT NULL REFERENCES bank_accounts(id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                closing_balance NUMERIC(14,2) NOT NULL DEFAULT 0,
+                transaction_count INTEGER DEFAULT 0,
+                last_transaction_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """ if ctx.is_postgresql else """
+            CREATE TABLE IF NOT EXISTS bank_balance_snapshots (
+                id INTEGER PRIMARY KEY,
+                bank_account_id INTEGER NOT NULL REFERENCES bank_accounts(id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                closing_balance NUMERIC(14,2) NOT NULL DEFAULT 0,
+                transaction_count INTEGER DEFAULT 0,
+                last_transaction_id INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    ctx.create_index('ix_bank_transactions_account_date_id', 'bank_transactions',
+                     ['bank_account_id', 'transaction_date', 'id'])
+    ctx.create_index('ix_bank_balance_snapshots_account_day', 'bank_balance_snapshots',
+                     ['bank_account_id', 'day'], unique=True)
@@ -0,0 +1,193 @@
+"""
+Monthly range partitioning for the history tables (PostgreSQL only).
+
+stock_movements, sale_items and payments are append-mostly and every report
+filters them by date, so on PostgreSQL they are converted to tables
+partitioned by month on their date column (``<table>_pYYYYMM`` plus a
+``<table>_pdefault`` catch-all). Date-filtered queries then only touch the
+months they need. When a fiscal year is archived (database/archive.py) its
+stock_movements months are detached, copied to the archive and dropped. The
+sale_items and payments months are detached and dropped once archival has
+emptied them. Their rows stay live while a later refund or payment still
+references the sale.
+
+A partitioned table's primary key must include the partition column, so
+nothing can hold a foreign key to its id alone. Tables that are referenced are
+therefore not converted: ``sales`` (sale_items, payments, returns and refunds
+point at it) and ``bank_transactions`` (payments.transaction_id). Their closed
+years are handled by row archival only.
+
+    convert_to_partitioned(conn, 'stock_movements', 'date')   # migration v7
+    maintain_partitions(engine)                               # startup: next months
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    'stock_movements': 'date',
+    'sale_items': 'created_at',
+    'payments': 'payment_date',
+}
+
+# Rows with a NULL partition key get this value before conversion (the key becomes NOT NULL)
+KEY_BACKFILL = {
+    'sale_items': "COALESCE((SELECT s.sale_date FROM sales s WHERE s.id = {legacy}.sale_id), CURRENT_TIMESTAMP)",
+}
+
+MONTHS_AHEAD = 3
+
+
+def month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def add_months(ts: datetime, months: int) -> datetime:
+    index = ts.year * 12 + ts.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(name: str, table: str):
+    """Month start encoded in a partition name, or None for the default partition"""
+    suffix = name[len(table) + 2:] if name.startswith(f"{table}_p") else ''
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def months_within(partitions, start: datetime, end: datetime) -> list:
+    """Names of the monthly partitions (from list_partitions) that lie entirely inside [start, end)"""
+    return [name for name, month in partitions
+            if month is not None and month >= start and add_months(month, 1) <= end]
+
+
+def is_partitioned(conn, table: str) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :t AND pg_table_is_visible(c.oid)"), {'t': table}).scalar())
+
+
+def list_partitions(conn, table: str) -> list:
+    """[(partition_name, month_start or None)] ordered by month"""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :t"), {'t': table}).scalars().all()
+    parts = [(name, partition_month(name, table)) for name in rows]
+    return sorted(parts, key=lambda p: (p[1] is None, p[1] or datetime.min))
+
+
+def create_month_partition(conn, table: str, column: str, month: datetime) -> bool:
+    """Create the partition for `month` unless it exists or the default partition already holds its rows."""
+    name = partition_name(table, month)
+    if conn.execute(text("SELECT to_regclass(:n)"), {'n': name}).scalar():
+        return False
+    lo, hi = month, add_months(month, 1)
+    default = f"{table}_pdefault"
+    if conn.execute(text("SELECT to_regclass(:n)"), {'n': default}).scalar():
+        stranded = conn.execute(text(
+            f"SELECT 1 FROM {default} WHERE {column} >= :lo AND {column} < :hi LIMIT 1"), {'lo': lo, 'hi': hi}).scalar()
+        if stranded:
+            logger.warning(f"[PARTITION] {default} holds rows for {month:%Y-%m}; not creating {name}")
+            return False
+    conn.execute(text(
+        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{lo:%Y-%m-%d}') TO ('{hi:%Y-%m-%d}')"))
+    return True
+
+
+def convert_to_partitioned(conn, table: str, column: str, months_ahead: int = MONTHS_AHEAD) -> bool:
+    """Rebuild `table` as a monthly range-partitioned table with the same rows.
+
+    Indexes and outgoing foreign keys are recreated. A table that other tables
+    reference is left alone: their foreign keys could not point at the
+    partitioned table's (id, column) key, and dropping them would lose the
+    integrity check. Returns False when there is nothing to do (not PostgreSQL,
+    missing, already partitioned or referenced).
+    """
+    if conn.dialect.name != 'postgresql' or is_partitioned(conn, table):
+        return False
+    if not conn.execute(text("SELECT to_regclass(:t)"), {'t': table}).scalar():
+        return False
+    incoming = conn.execute(text(
+        "SELECT conrelid::regclass::text || '.' || conname FROM pg_constraint "
+        "WHERE confrelid = to_regclass(:t) AND contype = 'f'"), {'t': table}).scalars().all()
+    if incoming:
+        logger.warning(f"[PARTITION] Not partitioning {table}: referenced by {', '.join(incoming)}")
+        return False
+
+    legacy = f"{table}_legacy"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    conn.execute(text(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {legacy}_pkey"))
+
+    backfill = KEY_BACKFILL.get(table, "CURRENT_TIMESTAMP").format(legacy=legacy)
+    conn.execute(text(f"UPDATE {legacy} SET {column} = {backfill} WHERE {column} IS NULL"))
+
+    indexes = conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :t AND indexname NOT IN ("
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype IN ('p', 'u'))"),
+        {'t': legacy}).all()
+    outgoing = conn.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(:t) AND contype = 'f'"),
+        {'t': legacy}).all()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': legacy}).scalar()
+
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING GENERATED, "
+        f"PRIMARY KEY (id, {column})) PARTITION BY RANGE ({column})"))
+    conn.execute(text(f"CREATE TABLE {table}_pdefault PARTITION OF {table} DEFAULT"))
+
+    lo, hi = conn.execute(text(f"SELECT MIN({column}), MAX({column}) FROM {legacy}")).first()
+    first = month_start(lo or datetime.now())
+    last = add_months(month_start(max(hi or datetime.now(), datetime.now())), months_ahead)
+    month = first
+    while month <= last:
+        create_month_partition(conn, table, column, month)
+        month = add_months(month, 1)
+
+    copied = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}")).rowcount
+
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    for name, definition in indexes:
+        if definition.upper().startswith('CREATE UNIQUE'):
+            logger.warning(f"[PARTITION] Skipping unique index {name} on {table} (must include {column})")
+            continue
+        conn.execute(text(definition.replace(f" ON public.{legacy} ", f" ON {table} ").replace(f" ON {legacy} ", f" ON {table} ")))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})"))
+    for name, definition in outgoing:
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+
+    logger.info(f"[PARTITION] {table} partitioned by month on {column} ({copied} rows)")
+    return True
+
+
+def maintain_partitions(engine, months_ahead: int = MONTHS_AHEAD, now=None) -> int:
+    """Create partitions for the current and next months on every partitioned table."""
+    if engine.dialect.name != 'postgresql':
+        return 0
+    created = 0
+    start = month_start(now or datetime.now())
+    with engine.begin() as conn:
+        for table, column in PARTITIONED_TABLES.items():
+            if not is_partitioned(conn, table):
+                continue
+            for i in range(months_ahead + 1):
+                if create_month_partition(conn, table, column, add_months(start, i)):
+                    created += 1
+    if created:
+        logger.info(f"[PARTITION] Created {created} monthly partition(s)")
+    return created
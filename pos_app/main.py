@@ -338,18 +338,24 @@ def main():
                     print("[WARN] Startup validation had issues but continuing...")
             except Exception as e:
                 print(f"[WARN] Startup validation error: {e}")
-        
+            try:
+                from pos_app.database.partitioning import maintain_partitions
+                maintain_partitions(db.engine)
+            except Exception as e:
+                print(f"[WARN] Partition maintenance error: {e}")
+
         # Ensure an admin user exists (skip if offline)
         if not db._is_offline:
             try:
                 from pos_app.models.database import User, Base
                 from pos_app.utils.auth import hash_password
                 
-                # Create tables if they don't exist
-                try:
-                    Base.metadata.create_all(db.engine)
-                except Exception as e:
-                    print(f"[WARN] Could not create tables: {e}")
+                # Create tables if they don't exist (already done when the schema fingerprint matched)
+                if not getattr(db, 'schema_current', False):
+                    try:
+                        Base.metadata.create_all(db.engine)
+                    except Exception as e:
+                        print(f"[WARN] Could not create tables: {e}")
                 
                 admin_user = db.session.query(User).filter(User.username == 'admin').first()
                 if not admin_user:
@@ -401,10 +407,10 @@ def main():
     
     qInstallMessageHandler(qt_message_handler)
     
-    # Apply clean stylesheet to avoid Qt CSS warnings
+    # Apply the compiled application stylesheet (clean global sheet + variant rules)
     try:
-        from pos_app.utils.clean_styles import CLEAN_GLOBAL_STYLESHEET
-        app.setStyleSheet(CLEAN_GLOBAL_STYLESHEET)
+        from pos_app.utils.ui_styles import install_stylesheet
+        install_stylesheet(app)
         print("✅ Clean stylesheet loaded with CSS warning suppression")
     except Exception as e:
         print(f"WARNING: Could not load clean stylesheet: {e}")
@@ -489,7 +495,7 @@ def main():
             print(f"WARNING: Could not switch to client mode: {e}")
         
         # Create window with the logged-in user
-        window = MainWindow(controllers, login_dialog.user)
+        window = MainWindow(controllers, login_dialog.user, login_dialog.session_token)
         
         try:
             from pos_app.utils.ui_auditor import UIAuditor
@@ -498,6 +504,37 @@ def main():
             print(f"WARNING: Could not apply UI auditor: {e}")
 
         window.show()
+        try:
+            # First-show styling cost of the visible page, comparable between builds
+            from pos_app.utils.ui_styles import style_report
+            logger.info("UI styling timings:\n%s", style_report())
+        except Exception as e:
+            print(f"WARNING: Could not report UI styling timings: {e}")
+        try:
+            # Write any batched last_login/last_activity timestamps before exiting
+            from pos_app.utils.auth_service import get_auth_service
+            app.aboutToQuit.connect(get_auth_service().shutdown)
+        except Exception as e:
+            print(f"WARNING: Could not register auth shutdown: {e}")
+        if not db._is_offline:
+            try:
+                # Stock ledger snapshots for closed days (point-in-time valuation)
+                from pos_app.utils.inventory_ledger import start_ledger_checkpoints
+                start_ledger_checkpoints()
+            except Exception as e:
+                print(f"WARNING: Could not start stock ledger checkpoints: {e}")
+            try:
+                # Daily bank balance snapshots keep ledger pages independent of history length
+                from pos_app.controllers.bank_ledger import start_balance_snapshots
+                start_balance_snapshots()
+            except Exception as e:
+                print(f"WARNING: Could not start bank balance snapshots: {e}")
+            try:
+                # Recurring expenses: materialise upcoming occurrences and settle due ones
+                from pos_app.utils.expense_scheduler import start_expense_scheduler
+                start_expense_scheduler()
+            except Exception as e:
+                print(f"WARNING: Could not start expense scheduler: {e}")
         sys.exit(app.exec())
     else:
         # User cancelled login
@@ -543,6 +580,10 @@ def check_license(app):
     return True
 
 if __name__ == "__main__":
+    # Frozen (PyInstaller) builds: let document render workers run instead of a second app
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     # Create application instance
     app = QApplication(sys.argv)
     try:
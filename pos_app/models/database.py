@@ -1,13 +1,14 @@
 from sqlalchemy.schema import Index
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum, Text, Table, Date
+from sqlalchemy import event, create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum, Text, Table, Date
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, scoped_session
+from sqlalchemy.orm import relationship, sessionmaker, scoped_session, Session, validates
 import enum
 from datetime import datetime
 import os
 from urllib.parse import urlparse
 
 from pos_app.utils.network_manager import read_db_config, write_db_config, read_network_config
+from pos_app.utils.money import Cost, Money
 
 def _load_db_config():
     """Load database configuration from environment or config file"""
@@ -416,8 +417,8 @@ class Customer(Base):
     postal_code = Column(String(20))
     country = Column(String(50))
     tax_number = Column(String(50))  # For business customers
-    credit_limit = Column(Float, default=0.0)
-    current_credit = Column(Float, default=0.0)
+    credit_limit = Column(Money, default=0.0)
+    current_credit = Column(Money, default=0.0)
     # Enhanced customer details
     business_name = Column(String(200))
     contact_person = Column(String(100))
@@ -507,7 +508,7 @@ class Supplier(Base):
     bank_name = Column(String(100))
     bank_account = Column(String(50))
     bank_routing = Column(String(50))
-    credit_limit = Column(Float, default=0.0)
+    credit_limit = Column(Money, default=0.0)
     discount_percentage = Column(Float, default=0.0)
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -531,9 +532,9 @@ class Product(Base):
     sku = Column(String(50), unique=True)  # Keeping SKU for internal use
     rack_location = Column(String(50))     # New field for rack location
     barcode = Column(String(50), unique=True)
-    retail_price = Column(Float, nullable=False)
-    wholesale_price = Column(Float, nullable=False)
-    purchase_price = Column(Float, nullable=True)
+    retail_price = Column(Money, nullable=False)
+    wholesale_price = Column(Money, nullable=False)
+    purchase_price = Column(Cost, nullable=True)  # weighted-average cost, 4 decimal places
     # Separate warehouse and retail stock
     warehouse_stock = Column(Integer, default=0)
     retail_stock = Column(Integer, default=0)
@@ -590,21 +591,70 @@ class StockMovement(Base):
     location = Column(String(20))  # Changed from Enum to String - WAREHOUSE, RETAIL
     reference = Column(String(50))  # Purchase/Sale/Adjustment reference
     notes = Column(Text)
+    unit_cost = Column(Cost)  # Weighted-average purchase cost after this movement
     
     product = relationship("Product", back_populates="stock_movements")
 
+Index('ix_stock_movements_product_date', StockMovement.product_id, StockMovement.date)
+
+
+class StockSnapshot(Base):
+    """Per-product stock/cost checkpoint: the ledger state from all movements dated before period_end"""
+    __tablename__ = 'stock_snapshots'
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    period_end = Column(DateTime, nullable=False)  # exclusive boundary (midnight / first of month)
+    granularity = Column(String(10), default='daily')  # daily, monthly
+    quantity = Column(Float, nullable=False, default=0.0)
+    unit_cost = Column(Cost)
+    value = Column(Money)
+    last_movement_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+
+Index('ix_stock_snapshots_product_period', StockSnapshot.product_id, StockSnapshot.period_end, unique=True)
+
+
+class ArchivedPeriod(Base):
+    """A closed fiscal year moved out of a live history table (see database/archive.py)"""
+    __tablename__ = 'archived_periods'
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(50), nullable=False)
+    fiscal_year = Column(Integer, nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)  # exclusive
+    row_count = Column(Integer, default=0)
+    location = Column(String(10), default='table')  # table (archive_<name>) or file (gzip JSON lines)
+    path = Column(String(500))
+    checksum = Column(String(64))
+    created_at = Column(DateTime, default=datetime.now)
+
+Index('ix_archived_periods_table_year', ArchivedPeriod.table_name, ArchivedPeriod.fiscal_year, unique=True)
+
+def invoice_key(invoice_number):
+    """Normalised invoice number for lookups: the trailing number without leading zeros
+    ("INV-0042", "0042" and "42" -> "42"), otherwise the upper-cased text."""
+    raw = str(invoice_number or '').strip().upper()
+    if not raw:
+        return None
+    digits = len(raw) - len(raw.rstrip('0123456789'))
+    return str(int(raw[-digits:])) if digits else raw
+
+
 class Sale(Base):
     __tablename__ = 'sales'
     
     id = Column(Integer, primary_key=True)
     invoice_number = Column(String(50), unique=True)
+    invoice_key = Column(String(50))  # invoice_key(invoice_number), kept by the validator below
     customer_id = Column(Integer, ForeignKey('customers.id'))
-    subtotal = Column(Float, nullable=False)
-    tax_amount = Column(Float, default=0.0)
-    discount_amount = Column(Float, default=0.0)
+    subtotal = Column(Money, nullable=False)
+    tax_amount = Column(Money, default=0.0)
+    discount_amount = Column(Money, default=0.0)
     discount_type = Column(String(20))  # Changed from Enum to String
-    total_amount = Column(Float, nullable=False)
-    paid_amount = Column(Float, default=0.0)
+    total_amount = Column(Money, nullable=False)
+    paid_amount = Column(Money, default=0.0)
     sale_date = Column(DateTime, default=datetime.now)
     due_date = Column(DateTime)
     status = Column(String(20))  # Changed from Enum to String
@@ -621,6 +671,13 @@ class Sale(Base):
     payment_splits = relationship("PaymentSplit", back_populates="sale", cascade="all, delete-orphan")
     refunded_sale = relationship("Sale", remote_side=[id], foreign_keys=[refund_of_sale_id])
 
+    @validates('invoice_number')
+    def _set_invoice_key(self, key, value):
+        self.invoice_key = invoice_key(value)
+        return value
+
+Index('ix_sales_invoice_key', Sale.invoice_key)
+
 class SaleItem(Base):
     __tablename__ = 'sale_items'
     
@@ -628,22 +685,84 @@ class SaleItem(Base):
     sale_id = Column(Integer, ForeignKey('sales.id'))
     product_id = Column(Integer, ForeignKey('products.id'))
     quantity = Column(Float, nullable=False)  # Changed to Float to match database
-    unit_price = Column(Float, nullable=False)
-    discount = Column(Float, default=0.0)
+    unit_price = Column(Money, nullable=False)
+    discount = Column(Money, default=0.0)
     discount_type = Column(String(20))  # Changed from Enum to String
-    total = Column(Float, nullable=False)
+    total = Column(Money, nullable=False)
     created_at = Column(DateTime, default=datetime.now)  # Added to match database
     
     sale = relationship("Sale", back_populates="items")
     product = relationship("Product", back_populates="sale_items")
 
+
+class ProductDailyStat(Base):
+    """Per-day sales counters for a product, kept up to date on flush (see utils/sales_stats.py)"""
+    __tablename__ = 'product_daily_stats'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    quantity = Column(Float, nullable=False, default=0.0)         # units sold
+    revenue = Column(Money, nullable=False, default=0.0)          # line totals sold
+    refund_quantity = Column(Float, nullable=False, default=0.0)
+    refund_amount = Column(Money, nullable=False, default=0.0)
+    sale_count = Column(Integer, nullable=False, default=0)       # sale lines
+
+Index('ix_product_daily_stats_day_product', ProductDailyStat.day, ProductDailyStat.product_id, unique=True)
+
+
+class CustomerDailyStat(Base):
+    """Per-day, per-payment-method sales counters for a customer"""
+    __tablename__ = 'customer_daily_stats'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    customer_id = Column(Integer, ForeignKey('customers.id', ondelete='CASCADE'), nullable=False)
+    payment_method = Column(String(20), nullable=False, default='CASH')
+    revenue = Column(Money, nullable=False, default=0.0)
+    refund_amount = Column(Money, nullable=False, default=0.0)
+    sale_count = Column(Integer, nullable=False, default=0)
+    refund_count = Column(Integer, nullable=False, default=0)
+    last_sale_at = Column(DateTime)
+
+Index('ix_customer_daily_stats_day_customer', CustomerDailyStat.day, CustomerDailyStat.customer_id,
+      CustomerDailyStat.payment_method, unique=True)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    """No-op; registered with active_history so the flush sees the value a counter column had"""
+
+
+for _attr in (Sale.customer_id, Sale.sale_date, Sale.payment_method, Sale.total_amount, Sale.is_refund,
+              SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, SaleItem.total):
+    event.listen(_attr, 'set', _keep_previous_value, active_history=True)
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_sales_stats_fields(session, flush_context, instances):
+    """Load counter fields of sales/sale items about to be deleted or updated"""
+    if not any(isinstance(obj, (Sale, SaleItem)) for obj in list(session.dirty) + list(session.deleted)):
+        return
+    from pos_app.utils.sales_stats import prepare_flush
+    prepare_flush(session)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_sales_stats(session, flush_context):
+    """Fold inserted, updated and deleted sales and sale items into the daily statistics counters"""
+    if not any(isinstance(obj, (Sale, SaleItem))
+               for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        return
+    from pos_app.utils.sales_stats import apply_flush
+    apply_flush(session)
+
 class Payment(Base):
     __tablename__ = 'payments'
     
     id = Column(Integer, primary_key=True)
     sale_id = Column(Integer, ForeignKey('sales.id'))
     customer_id = Column(Integer, ForeignKey('customers.id'))
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     payment_date = Column(DateTime, default=datetime.now, nullable=False)
     payment_method = Column(String(20), nullable=False)
     status = Column(String(20), default='COMPLETED')
@@ -670,10 +789,10 @@ class Purchase(Base):
     order_date = Column(DateTime, default=datetime.now)
     delivery_date = Column(DateTime)
     expected_delivery = Column(DateTime)
-    total_amount = Column(Float, nullable=False)
-    paid_amount = Column(Float, default=0.0)
-    tax_amount = Column(Float, default=0.0)
-    discount_amount = Column(Float, default=0.0)
+    total_amount = Column(Money, nullable=False)
+    paid_amount = Column(Money, default=0.0)
+    tax_amount = Column(Money, default=0.0)
+    discount_amount = Column(Money, default=0.0)
     status = Column(String(20))  # ORDERED, RECEIVED, CANCELLED, PARTIAL
     priority = Column(String(20), default="NORMAL")  # LOW, NORMAL, HIGH, URGENT
     notes = Column(Text)
@@ -690,7 +809,7 @@ class PurchasePayment(Base):
     id = Column(Integer, primary_key=True)
     purchase_id = Column(Integer, ForeignKey('purchases.id'))
     supplier_id = Column(Integer, ForeignKey('suppliers.id'))
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     payment_date = Column(DateTime, default=datetime.now)
     payment_method = Column(String(20))
     status = Column(String(20), default='COMPLETED')
@@ -709,9 +828,9 @@ class PurchaseItem(Base):
     purchase_id = Column(Integer, ForeignKey('purchases.id'))
     product_id = Column(Integer, ForeignKey('products.id'))
     quantity = Column(Float, nullable=False)  # Changed to Float to match database
-    unit_cost = Column(Float, nullable=False)
+    unit_cost = Column(Cost, nullable=False)
     received_quantity = Column(Float)  # Changed to Float to match database
-    total_cost = Column(Float, nullable=False)
+    total_cost = Column(Money, nullable=False)
     created_at = Column(DateTime, default=datetime.now)  # Added to match database
     
     purchase = relationship("Purchase", back_populates="items")
@@ -728,8 +847,8 @@ class BankAccount(Base):
     bank_name = Column(String(100), nullable=False)
     branch_name = Column(String(100))
     account_type = Column(String(50))  # e.g., 'savings', 'checking', 'business'
-    opening_balance = Column(Float, default=0.0)
-    current_balance = Column(Float, default=0.0)
+    opening_balance = Column(Money, default=0.0)
+    current_balance = Column(Money, default=0.0)
     is_active = Column(Boolean, default=True)
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -764,11 +883,11 @@ class BankTransaction(Base):
     id = Column(Integer, primary_key=True)
     bank_account_id = Column(Integer, ForeignKey('bank_accounts.id'), nullable=False)
     transaction_date = Column(DateTime, default=datetime.now, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     # balance_after should be computed from account balance, not stored
-    balance_after = Column(Float, nullable=False)  # Kept for compatibility but should be computed
+    balance_after = Column(Money, nullable=False)  # Kept for compatibility but should be computed
     transaction_type = Column(Enum(TransactionType), nullable=False)
-    # reference = Column(String(100))  # Column doesn't exist in database
+    reference_number = Column(String(100))  # renamed from "reference" by migration v5
     description = Column(String(255))
     # related_transaction_id = Column(Integer, ForeignKey('bank_transactions.id'))  # Column doesn't exist in DB
     is_reconciled = Column(Boolean, default=False)
@@ -786,12 +905,30 @@ class BankTransaction(Base):
         if not self.transaction_date:
             self.transaction_date = datetime.now()
 
+Index('ix_bank_transactions_account_date_id', BankTransaction.bank_account_id, BankTransaction.transaction_date,
+      BankTransaction.id)
+
+
+class BankBalanceSnapshot(Base):
+    """Closing balance of a bank account at the end of a day with transactions (see controllers/bank_ledger.py)"""
+    __tablename__ = 'bank_balance_snapshots'
+
+    id = Column(Integer, primary_key=True)
+    bank_account_id = Column(Integer, ForeignKey('bank_accounts.id', ondelete='CASCADE'), nullable=False)
+    day = Column(Date, nullable=False)
+    closing_balance = Column(Money, nullable=False)
+    transaction_count = Column(Integer, default=0)
+    last_transaction_id = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+
+Index('ix_bank_balance_snapshots_account_day', BankBalanceSnapshot.bank_account_id, BankBalanceSnapshot.day, unique=True)
+
 class Expense(Base):
     __tablename__ = 'expenses'
 
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     expense_date = Column(DateTime, default=datetime.now)
     category = Column(String(100))
     subcategory = Column(String(100))
@@ -816,13 +953,17 @@ class ExpenseSchedule(Base):
     id = Column(Integer, primary_key=True)
     expense_id = Column(Integer, ForeignKey('expenses.id'))
     scheduled_date = Column(DateTime, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     status = Column(String(20), default="PENDING")  # PENDING, PAID, SKIPPED
     paid_date = Column(DateTime)
     notes = Column(Text)
     
     expense = relationship("Expense")
 
+# Scheduler scans (see utils/expense_scheduler.py)
+Index('ix_expense_schedules_status_date', ExpenseSchedule.status, ExpenseSchedule.scheduled_date)
+Index('ix_expense_schedules_expense_date', ExpenseSchedule.expense_id, ExpenseSchedule.scheduled_date)
+
 class Discount(Base):
     __tablename__ = 'discounts'
     
@@ -831,8 +972,8 @@ class Discount(Base):
     description = Column(Text)  # Changed from String(200) to Text to match schema
     discount_type = Column(String(20), nullable=False)  # Changed from Enum - uses PostgreSQL ENUM in DB
     discount_value = Column(Float, nullable=False)  # Changed from 'value' to match schema
-    min_amount = Column(Float)  # Removed default to match schema
-    max_amount = Column(Float)  # Changed from max_discount to match schema
+    min_amount = Column(Money)  # Removed default to match schema
+    max_amount = Column(Money)  # Changed from max_discount to match schema
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     is_active = Column(Boolean)  # Removed default to match schema
@@ -856,7 +997,7 @@ class OutstandingPurchase(Base):
     id = Column(Integer, primary_key=True)
     purchase_id = Column(Integer, ForeignKey('purchases.id'))
     supplier_id = Column(Integer, ForeignKey('suppliers.id'))
-    amount_due = Column(Float, nullable=False)
+    amount_due = Column(Money, nullable=False)
     due_date = Column(DateTime)
     days_overdue = Column(Integer, default=0)
     priority = Column(String(20), default="NORMAL")
@@ -874,13 +1015,13 @@ class CustomerReport(Base):
     id = Column(Integer, primary_key=True)
     customer_id = Column(Integer, ForeignKey('customers.id'))
     report_date = Column(DateTime, default=datetime.now)
-    total_sales = Column(Float, default=0.0)
-    total_payments = Column(Float, default=0.0)
-    outstanding_amount = Column(Float, default=0.0)
+    total_sales = Column(Money, default=0.0)
+    total_payments = Column(Money, default=0.0)
+    outstanding_amount = Column(Money, default=0.0)
     last_sale_date = Column(DateTime)
     last_payment_date = Column(DateTime)
     total_transactions = Column(Integer, default=0)
-    average_order_value = Column(Float, default=0.0)
+    average_order_value = Column(Money, default=0.0)
     notes = Column(Text)
     
     customer = relationship("Customer")
@@ -906,7 +1047,7 @@ class PaymentSplit(Base):
     id = Column(Integer, primary_key=True)
     sale_id = Column(Integer, ForeignKey('sales.id', ondelete='CASCADE'))
     payment_method = Column(String(50), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     bank_account_id = Column(Integer, ForeignKey('bank_accounts.id'))
     bank_deposit_id = Column(Integer, ForeignKey('bank_deposits.id'))
     reference = Column(String(100))
@@ -923,16 +1064,26 @@ class CashDrawerSession(Base):
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
-    opening_balance = Column(Float, nullable=False, default=0.0)
-    closing_balance = Column(Float)
-    expected_balance = Column(Float)
-    variance = Column(Float)
+    opening_balance = Column(Money, nullable=False, default=0.0)
+    closing_balance = Column(Money)
+    expected_balance = Column(Money)
+    variance = Column(Money)
     opened_at = Column(DateTime, default=datetime.now)
     closed_at = Column(DateTime)
     notes = Column(Text)
     status = Column(String(20), default='OPEN')  # OPEN, CLOSED, RECONCILED
     opened_by = Column(String(100))
     closed_by = Column(String(100))
+    # Running totals kept by CashDrawerService with every movement (X/Z reports read these)
+    sales_total = Column(Money, default=0.0)
+    sale_count = Column(Integer, default=0)
+    refunds_total = Column(Money, default=0.0)
+    refund_count = Column(Integer, default=0)
+    payouts_total = Column(Money, default=0.0)
+    deposits_total = Column(Money, default=0.0)
+    withdrawals_total = Column(Money, default=0.0)
+    adjustments_total = Column(Money, default=0.0)
+    movement_count = Column(Integer, default=0)
     
     user = relationship("User")
     cash_movements = relationship("CashMovement", back_populates="session", cascade="all, delete-orphan")
@@ -944,7 +1095,7 @@ class CashMovement(Base):
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey('cash_drawer_sessions.id', ondelete='CASCADE'))
     movement_type = Column(String(20), nullable=False)  # SALE, REFUND, PAYOUT, DEPOSIT, WITHDRAWAL, ADJUSTMENT
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     reference = Column(String(100))
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -952,6 +1103,8 @@ class CashMovement(Base):
     
     session = relationship("CashDrawerSession", back_populates="cash_movements")
 
+Index('ix_cash_movements_session_id', CashMovement.session_id)
+
 class BankDeposit(Base):
     """Track physical bank deposits"""
     __tablename__ = 'bank_deposits'
@@ -959,7 +1112,7 @@ class BankDeposit(Base):
     id = Column(Integer, primary_key=True)
     bank_account_id = Column(Integer, ForeignKey('bank_accounts.id', ondelete='CASCADE'))
     deposit_date = Column(Date, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     reference = Column(String(100))
     slip_number = Column(String(50))
     deposited_by = Column(String(100))
@@ -1004,7 +1157,7 @@ class Return(Base):
     return_date = Column(DateTime, default=datetime.now)
     reason = Column(Text)  # Reason for return (damaged, defective, wrong item, etc.)
     status = Column(Enum(ReturnStatus), default=ReturnStatus.PENDING)
-    refund_amount = Column(Float, default=0.0)
+    refund_amount = Column(Money, default=0.0)
     refund_method = Column(Enum(PaymentMethod), default=PaymentMethod.CASH)  # How refund was given
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -1023,8 +1176,8 @@ class ReturnItem(Base):
     return_id = Column(Integer, ForeignKey('returns.id'), nullable=False)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
     quantity = Column(Integer, default=1)
-    unit_price = Column(Float)  # Price at time of return
-    total = Column(Float)  # quantity * unit_price
+    unit_price = Column(Money)  # Price at time of return
+    total = Column(Money)  # quantity * unit_price
     condition = Column(String(50))  # "unopened", "used", "damaged", etc.
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.now)
@@ -1033,6 +1186,9 @@ class ReturnItem(Base):
     return_obj = relationship("Return", back_populates="items")
     product = relationship("Product")
 
+Index('ix_returns_return_date', Return.return_date)
+Index('ix_return_items_return_id', ReturnItem.return_id)
+
 # Session management
 from sqlalchemy.orm import sessionmaker
 
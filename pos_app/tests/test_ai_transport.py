@@ -0,0 +1,142 @@
+"""
+Unit tests for utils/ai_transport.py against a local HTTP stand-in server
+
+Tests cover:
+- Streamed token delivery and request payload
+- Cancellation mid-stream
+- Response cache and request coalescing
+- Context budget trimming and auth errors
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from pos_app.utils.ai_transport import (
+    AssistantTransport, AssistantAuthError, AssistantCancelled, CancelToken, ContextBudget, normalise_question
+)
+
+
+class StandIn:
+    """Chat-completions stand-in: streams `tokens` as server-sent events"""
+
+    def __init__(self):
+        self.tokens = ["Hello", ", ", "world"]
+        self.delay = 0.0
+        self.status = 200
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stand_in.requests.append(body)
+                if stand_in.status != 200:
+                    self.send_response(stand_in.status)
+                    self.end_headers()
+                    self.wfile.write(b'{"error": "invalid key"}')
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                try:
+                    for token in stand_in.tokens:
+                        time.sleep(stand_in.delay)
+                        chunk = {'choices': [{'delta': {'content': token}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def _ask(text):
+    return [{'role': 'user', 'content': text}]
+
+
+@pytest.mark.unit
+class TestAssistantStreaming:
+    """Test streaming and cancellation"""
+
+    def test_streams_tokens(self, stand_in):
+        transport = AssistantTransport('key', url=stand_in.url)
+        tokens = []
+        assert transport.ask(_ask("Hi there"), "ctx", on_token=tokens.append) == "Hello, world"
+        assert tokens == ["Hello", ", ", "world"]
+        body = stand_in.requests[0]
+        assert body['stream'] is True and body['max_tokens'] == 1024
+        assert body['messages'][0]['role'] == 'system' and 'ctx' in body['messages'][0]['content']
+
+    def test_cancel_mid_stream(self, stand_in):
+        stand_in.tokens = ["a"] * 50
+        stand_in.delay = 0.02
+        transport = AssistantTransport('key', url=stand_in.url)
+        cancel = CancelToken()
+        received = []
+
+        def on_token(token):
+            received.append(token)
+            if len(received) == 3:
+                cancel.cancel()
+
+        with pytest.raises(AssistantCancelled):
+            transport.ask(_ask("long answer"), "", on_token=on_token, cancel=cancel)
+        assert len(received) < 10
+        # Cancelled answers are not cached
+        assert transport.cache.get(transport.cache.key("long answer", "", [])) is None
+
+    def test_auth_error(self, stand_in):
+        stand_in.status = 401
+        with pytest.raises(AssistantAuthError):
+            AssistantTransport('bad', url=stand_in.url).ask(_ask("hi"))
+
+
+@pytest.mark.unit
+class TestAssistantCaching:
+    """Test the response cache, coalescing and context budget"""
+
+    def test_cache_keyed_on_question_and_context(self, stand_in):
+        transport = AssistantTransport('key', url=stand_in.url)
+        transport.ask(_ask("What is FIFO?"), "ctx")
+        assert transport.ask(_ask("  what is   fifo "), "ctx") == "Hello, world"
+        assert len(stand_in.requests) == 1
+        transport.ask(_ask("What is FIFO?"), "other ctx")
+        assert len(stand_in.requests) == 2
+        assert normalise_question(" What  IS fifo?? ") == "what is fifo"
+
+    def test_identical_requests_coalesce(self, stand_in):
+        stand_in.delay = 0.05
+        transport = AssistantTransport('key', url=stand_in.url)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(transport.ask(_ask("same"), "c")))
+                   for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        assert results == ["Hello, world"] * 3
+        assert len(stand_in.requests) == 1
+
+    def test_context_budget(self):
+        budget = ContextBudget(max_context_chars=50, max_history_chars=30, max_history_messages=3)
+        assert budget.trim_context("line\n" * 40).endswith("[context truncated]")
+        history = [{'role': 'user', 'content': 'x' * 20}, {'role': 'assistant', 'content': 'y' * 20},
+                   {'role': 'user', 'content': 'latest question'}]
+        assert budget.trim_history(history) == history[-1:]
+        assert len(budget.trim_history(history[1:2] + [{'role': 'user', 'content': 'q'}])) == 2
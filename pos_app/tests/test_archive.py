@@ -0,0 +1,175 @@
+"""
+Unit tests for partitioning helpers and fiscal-year archival
+(pos_app.database.partitioning, pos_app.database.archive)
+
+Tests cover:
+- Fiscal year bounds and monthly partition naming
+- Partition conversion is a no-op outside PostgreSQL
+- Dry-run counts vs. moving a closed year into archive tables
+- Sales referenced by a later refund stay live
+- Credit sales making up a customer's balance stay live; statements read archived payments
+- Refunds inside the year deleted before their originals (foreign keys on)
+- Reading archived rows back from archive tables and exported files
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from pos_app.database.archive import (
+    ID_BATCH, Archiver, archived_children, archived_rows, fiscal_year_bounds, fiscal_year_of
+)
+from pos_app.database.partitioning import (
+    add_months, convert_to_partitioned, months_within, partition_month, partition_name
+)
+from pos_app.models.database import ArchivedPeriod, Base, Payment, Product, Sale, SaleItem, StockMovement
+from pos_app.utils.assistant_metrics import revenue
+
+NOW = datetime(2026, 10, 19)
+
+
+def _sale(session, product, when, total, invoice, refund_of=None):
+    sale = Sale(invoice_number=invoice, subtotal=total, total_amount=total, sale_date=when,
+                status='COMPLETED', payment_method='CASH', is_refund=refund_of is not None,
+                refund_of_sale_id=refund_of)
+    session.add(sale)
+    session.flush()
+    session.add(SaleItem(sale_id=sale.id, product_id=product.id, quantity=1, unit_price=abs(total),
+                         total=abs(total), created_at=when))
+    session.add(Payment(sale_id=sale.id, amount=abs(total), payment_date=when, payment_method='CASH'))
+    session.add(StockMovement(product_id=product.id, date=when, movement_type='IN' if refund_of else 'OUT',
+                              quantity=1, reference=invoice))
+    return sale
+
+
+@pytest.fixture
+def old_sales(db_session, sample_product):
+    """Two FY2024 sales, one refunded in FY2026, and one live FY2027 sale"""
+    kept = _sale(db_session, sample_product, datetime(2023, 9, 5, 10), 100.0, 'INV-A')
+    _sale(db_session, sample_product, datetime(2024, 2, 1, 11), 250.0, 'INV-B')
+    refunded = _sale(db_session, sample_product, datetime(2024, 3, 3, 12), 80.0, 'INV-C')
+    _sale(db_session, sample_product, datetime(2025, 8, 1, 9), -80.0, 'REF-C', refund_of=refunded.id)
+    _sale(db_session, sample_product, datetime(2026, 8, 1, 9), 60.0, 'INV-D')
+    db_session.commit()
+    return kept
+
+
+@pytest.fixture
+def fk_session(tmp_path):
+    """Session on a SQLite file with foreign keys enforced, as PostgreSQL does"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'fk.db'}")
+    event.listen(engine, 'connect', lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestPartitionHelpers:
+    """Test fiscal years and partition names"""
+
+    def test_fiscal_year_bounds(self):
+        assert fiscal_year_bounds(2025) == (datetime(2024, 7, 1), datetime(2025, 7, 1))
+        assert fiscal_year_bounds(2025, start_month=1) == (datetime(2025, 1, 1), datetime(2026, 1, 1))
+        assert fiscal_year_of(datetime(2024, 7, 1)) == 2025
+        assert fiscal_year_of(datetime(2025, 6, 30)) == 2025
+
+    def test_partition_names(self, db_session):
+        assert add_months(datetime(2025, 11, 15), 3) == datetime(2026, 2, 1)
+        name = partition_name('stock_movements', datetime(2026, 2, 1))
+        assert name == 'stock_movements_p202602'
+        assert partition_month(name, 'stock_movements') == datetime(2026, 2, 1)
+        assert partition_month('stock_movements_pdefault', 'stock_movements') is None
+        assert convert_to_partitioned(db_session.connection(), 'stock_movements', 'date') is False
+        parts = [('sm_p202406', datetime(2024, 6, 1)), ('sm_p202407', datetime(2024, 7, 1)),
+                 ('sm_p202506', datetime(2025, 6, 1)), ('sm_p202507', datetime(2025, 7, 1)), ('sm_pdefault', None)]
+        assert months_within(parts, *fiscal_year_bounds(2025)) == ['sm_p202407', 'sm_p202506']
+
+
+@pytest.mark.unit
+class TestArchiver:
+    """Test moving closed fiscal years out of the live tables"""
+
+    def test_closed_years_and_dry_run(self, db_session, old_sales):
+        archiver = Archiver(db_session)
+        assert archiver.closed_years(NOW) == [2024, 2025, 2026]
+        counts = archiver.archive_year(2024, dry_run=True, now=NOW)
+        assert counts['sales'] == 2 and counts['sale_items'] == 2 and counts['payments'] == 2
+        assert counts['stock_movements'] == 3
+        assert db_session.query(Sale).count() == 5
+        assert db_session.query(ArchivedPeriod).count() == 0
+
+    def test_archive_year_keeps_referenced_sales(self, db_session, old_sales):
+        archiver = Archiver(db_session)
+        counts = archiver.archive_year(2024, now=NOW)
+        assert counts['sales'] == 2
+        live = {s.invoice_number for s in db_session.query(Sale)}
+        assert live == {'INV-C', 'REF-C', 'INV-D'}
+        assert db_session.query(StockMovement).filter(StockMovement.date < datetime(2024, 7, 1)).count() == 0
+        assert archiver.closed_years(NOW) == [2025, 2026]
+
+        with pytest.raises(ValueError):
+            archiver.archive_year(2024, now=NOW)
+        with pytest.raises(ValueError):
+            archiver.archive_year(2027, now=NOW)
+
+    def test_reports_read_archived_rows(self, db_session, old_sales, tmp_path):
+        before = revenue(db_session, datetime(2023, 7, 1), datetime(2024, 7, 1))
+        Archiver(db_session).archive_year(2024, now=NOW)
+        assert revenue(db_session, datetime(2023, 7, 1), datetime(2024, 7, 1)) == before
+
+        sales = archived_rows(db_session, 'sales', datetime(2024, 1, 1), datetime(2024, 12, 31))
+        assert [s.invoice_number for s in sales] == ['INV-B'] and sales[0].total_amount == 250.0
+        items = archived_children(db_session, 'sale_items', 'sale_id', [s.id for s in sales], {2024})
+        assert len(items) == 1 and items[0].total == 250.0
+
+        paths = Archiver(db_session).export_year(2024, str(tmp_path))
+        assert set(paths) >= {'sales', 'sale_items'}
+        assert db_session.query(ArchivedPeriod).filter(ArchivedPeriod.location == 'file').count() == len(paths)
+        from_files = archived_rows(db_session, 'sales', datetime(2024, 1, 1), datetime(2024, 12, 31))
+        assert [(s.invoice_number, s.sale_date) for s in from_files] == [('INV-B', datetime(2024, 2, 1, 11))]
+        assert revenue(db_session, datetime(2023, 7, 1), datetime(2024, 7, 1)) == before
+
+    def test_outstanding_credit_sales_stay_live(self, db_session, sample_product, sample_customer):
+        from pos_app.controllers.business_logic import BusinessController
+        settled = _sale(db_session, sample_product, datetime(2023, 9, 5, 10), 100.0, 'CR-1')
+        owing = _sale(db_session, sample_product, datetime(2024, 1, 5, 10), 300.0, 'CR-2')
+        for sale in (settled, owing):
+            sale.customer_id, sale.payment_method, sale.paid_amount = sample_customer.id, 'CREDIT', 0.0
+        # 400 charged, 100 paid back: the newest 300 is still owed
+        sample_customer.current_credit = 300.0
+        db_session.add(Payment(customer_id=sample_customer.id, amount=100.0, payment_method='CASH',
+                               payment_date=datetime(2024, 2, 1, 9), status='COMPLETED'))
+        db_session.commit()
+
+        Archiver(db_session).archive_year(2024, now=NOW)
+        assert {s.invoice_number for s in db_session.query(Sale)} == {'CR-2'}
+
+        # Statements still see the archived customer payment
+        entries = BusinessController(db_session).get_customer_statement_entries(sample_customer.id)
+        assert [(e['type'], e['amount']) for e in entries if e['type'] == 'Payment'] == [('Payment', 100.0)]
+        assert archived_rows(db_session, 'sales', customer_id=sample_customer.id)[0].invoice_number == 'CR-1'
+
+    def test_refunds_deleted_before_originals(self, fk_session):
+        product = Product(name="FK Product", sku="FK-1", retail_price=10.0, wholesale_price=8.0,
+                          purchase_price=5.0, stock_level=0)
+        fk_session.add(product)
+        fk_session.flush()
+        first = datetime(2023, 8, 1, 10)
+        sales = [_sale(fk_session, product, first + timedelta(minutes=i), 10.0, f"INV-{i}")
+                 for i in range(ID_BATCH + 100)]
+        # A refund (later batch) of a sale in the first batch, and a refund of that refund
+        refund = _sale(fk_session, product, datetime(2024, 5, 1, 9), -10.0, 'REF-1', refund_of=sales[0].id)
+        _sale(fk_session, product, datetime(2024, 5, 2, 9), 10.0, 'REF-2', refund_of=refund.id)
+        fk_session.commit()
+        original_id, refund_id = sales[0].id, refund.id
+
+        counts = Archiver(fk_session).archive_year(2024, now=NOW)
+        assert counts['sales'] == ID_BATCH + 102
+        assert fk_session.query(Sale).count() == 0 and fk_session.query(SaleItem).count() == 0
+        archived = archived_rows(fk_session, 'sales', datetime(2024, 5, 1), datetime(2024, 5, 3))
+        assert {r.invoice_number: r.refund_of_sale_id for r in archived} == {
+            'REF-1': original_id, 'REF-2': refund_id}
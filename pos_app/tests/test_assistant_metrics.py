@@ -0,0 +1,127 @@
+"""
+Unit tests for utils/assistant_metrics.py
+
+Tests cover:
+- Named time ranges
+- SQL-aggregated metrics (revenue, units, top products/customers, receivables)
+- Result caching with TTL and sync_state invalidation
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from pos_app.models.database import Sale, SaleItem, SyncState, mark_sync_changed
+from pos_app.utils.assistant_metrics import MetricEngine, resolve_time_range, parse_time_range, revenue
+
+
+def _sale(session, total, when, customer=None, product=None, qty=1, refund=False):
+    sale = Sale(invoice_number=f"T{session.query(Sale).count() + 1}", customer_id=getattr(customer, 'id', None),
+                total_amount=total, subtotal=total, paid_amount=total, sale_date=when,
+                status='COMPLETED', is_refund=refund)
+    session.add(sale)
+    session.flush()
+    if product is not None:
+        session.add(SaleItem(sale_id=sale.id, product_id=product.id, quantity=qty,
+                             unit_price=abs(total) / qty, total=abs(total)))
+    session.commit()
+    return sale
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestTimeRanges:
+    """Test named range resolution"""
+
+    def test_resolve_and_parse(self):
+        now = datetime(2026, 1, 15, 14, 30)
+        assert resolve_time_range('today', now) == (datetime(2026, 1, 15), None)
+        assert resolve_time_range('yesterday', now) == (datetime(2026, 1, 14), datetime(2026, 1, 15))
+        assert resolve_time_range('week', now) == (datetime(2026, 1, 12), None)
+        assert resolve_time_range('last_month', now) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
+        assert resolve_time_range(None, now) == (None, None)
+        assert parse_time_range("sales last month") == 'last_month'
+        assert parse_time_range("what sold yesterday?") == 'yesterday'
+        assert parse_time_range("inventory") is None
+
+
+@pytest.mark.unit
+class TestMetrics:
+    """Test SQL-aggregated metrics"""
+
+    def test_revenue_with_refunds_and_range(self, db_session, sample_customer):
+        now = datetime.now()
+        _sale(db_session, 100.0, now)
+        _sale(db_session, 50.0, now)
+        _sale(db_session, -30.0, now, refund=True)
+        _sale(db_session, 999.0, now - timedelta(days=3))
+        start, end = resolve_time_range('today')
+        r = revenue(db_session, start, end)
+        assert r['total_in'] == pytest.approx(150.0)
+        assert r['total_out'] == pytest.approx(30.0)
+        assert r['net'] == pytest.approx(120.0)
+        assert (r['count_sales'], r['count_refunds']) == (2, 1)
+
+    def test_products_customers_and_receivables(self, db_session, sample_customer, sample_product):
+        now = datetime.now()
+        _sale(db_session, 200.0, now, customer=sample_customer, product=sample_product, qty=2)
+        _sale(db_session, 100.0, now, product=sample_product, qty=1)
+        sample_customer.current_credit = 250.0
+        db_session.commit()
+
+        engine = MetricEngine()
+        units = engine.query('units_sold', 'today', session=db_session).value
+        assert units == {'units': 3.0, 'products': 1}
+        top = engine.query('top_products', 'today', session=db_session).value
+        assert top == [{'name': sample_product.name, 'qty': 3.0, 'amount': 300.0}]
+        customers = engine.query('top_customers', 'month', session=db_session)
+        assert customers.value[0]['name'] == sample_customer.name
+        assert "Top customers this month" in customers.text
+        owed = engine.query('receivables', session=db_session).value
+        assert owed['total'] == pytest.approx(250.0) and owed['customers'] == 1
+        summary = engine.query('database_summary', session=db_session).value
+        assert summary['sales'] == 2 and summary['products'] == 1
+
+
+@pytest.mark.unit
+class TestMetricCache:
+    """Test caching and invalidation"""
+
+    def test_cached_until_sync_marker_changes(self, db_session):
+        engine = MetricEngine()
+        _sale(db_session, 10.0, datetime.now())
+        first = engine.query('revenue', 'today', session=db_session)
+        assert first.cached is False
+
+        _sale(db_session, 5.0, datetime.now())  # written without a sync marker
+        again = engine.query('revenue', 'today', session=db_session)
+        assert again.cached is True and again.value['total_in'] == pytest.approx(10.0)
+
+        mark_sync_changed(db_session, 'sales')
+        db_session.commit()
+        fresh = engine.query('revenue', 'today', session=db_session)
+        assert fresh.cached is False and fresh.value['total_in'] == pytest.approx(15.0)
+
+    def test_ttl_expiry(self, db_session):
+        clock = FakeClock()
+        engine = MetricEngine(clock=clock)
+        engine.query('inventory', session=db_session)
+        assert engine.query('inventory', session=db_session).cached is True
+        clock.now += 10_000
+        assert engine.query('inventory', session=db_session).cached is False
+        engine.invalidate(['inventory'])
+        assert engine.query('inventory', session=db_session).cached is False
+
+    def test_create_sale_marks_sales(self, business_controller, db_session, sample_customer, sample_product):
+        sample_product.retail_stock = 10
+        db_session.commit()
+        business_controller.create_sale(
+            customer_id=sample_customer.id,
+            items=[{'product_id': sample_product.id, 'quantity': 1, 'unit_price': sample_product.retail_price}],
+        )
+        assert db_session.get(SyncState, 'sales') is not None
@@ -0,0 +1,136 @@
+"""
+Unit tests for utils/auth_service.py and the SQLite-backed LocalAuthCache
+
+Tests cover:
+- PBKDF2 hashing with legacy hash compatibility and rehash on login
+- Server login, offline fallback (connection errors only) and off-thread authentication
+- Signed session tokens (expiry, tampering, revocation) and password-checked unlock
+- Batched last_login/last_activity writes
+"""
+
+import hashlib
+import json
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from pos_app.models.database import Base, User
+from pos_app.utils.auth import hash_password, check_password, needs_rehash
+from pos_app.utils.auth_service import AuthService
+from pos_app.utils.local_auth import LocalAuthCache
+
+
+@pytest.fixture
+def auth_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalAuthCache, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(LocalAuthCache, 'CACHE_FILE', tmp_path / 'users_cache.json')
+    yield LocalAuthCache
+    LocalAuthCache.close()
+
+
+@pytest.fixture
+def factory(auth_cache):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all([
+        User(username='cashier', password_hash=hash_password('pw1'), full_name='Cash Ier', is_active=True),
+        User(username='legacy', password_hash='salt:' + hashlib.sha256(b'pw2salt').hexdigest(), is_active=True),
+        User(username='off', password_hash=hash_password('pw3'), is_active=False),
+    ])
+    session.commit()
+    session.close()
+    yield Session
+    engine.dispose()
+
+
+def _user(Session, name):
+    session = Session()
+    try:
+        return session.query(User).filter_by(username=name).one()
+    finally:
+        session.close()
+
+
+@pytest.mark.unit
+class TestPasswordHashes:
+    """Test hash formats"""
+
+    def test_pbkdf2_and_legacy(self):
+        hashed = hash_password('secret', iterations=1000)
+        assert hashed.startswith('pbkdf2_sha256$1000$')
+        assert check_password('secret', hashed) and not check_password('nope', hashed)
+        assert needs_rehash(hashed)
+        legacy = 'abc:' + hashlib.sha256(b'secretabc').hexdigest()
+        assert check_password('secret', legacy) and needs_rehash(legacy)
+        assert not needs_rehash(hash_password('secret'))
+
+
+@pytest.mark.unit
+class TestAuthService:
+    """Test authentication, tokens and activity batching"""
+
+    def test_server_login_caches_and_upgrades(self, factory, auth_cache):
+        service = AuthService(factory, flush_interval=0)
+        result = service.authenticate_async('legacy', 'pw2').result(timeout=10)
+        assert result.ok and result.source == 'server'
+        assert not needs_rehash(_user(factory, 'legacy').password_hash)
+        assert auth_cache.get_cached_user('LEGACY')['username'] == 'legacy'
+        assert service.authenticate('off', 'pw3').error == 'Account is disabled'
+        assert service.authenticate('cashier', 'bad').error == 'Invalid password'
+        service.shutdown()
+
+    def test_offline_fallback(self, auth_cache):
+        auth_cache.cache_user_credentials('away', hash_password('pw', iterations=1000), True, 'Away User')
+
+        def unreachable():
+            raise OperationalError('connect', {}, ConnectionRefusedError('server down'))
+        service = AuthService(unreachable, flush_interval=0)
+        result = service.authenticate('away', 'pw')
+        assert result.ok and result.source == 'local' and result.user.is_admin
+        assert not service.authenticate('away', 'bad').ok
+
+    def test_no_fallback_when_server_answers(self, factory, auth_cache):
+        # A user the server does not know (deleted since the cache was filled) stays locked out
+        auth_cache.cache_user_credentials('gone', hash_password('pw', iterations=1000), True, 'Gone')
+        service = AuthService(factory, flush_interval=0)
+        result = service.authenticate('gone', 'pw')
+        assert not result.ok and result.error == 'Invalid username or password'
+
+        def broken():
+            raise RuntimeError('bad query')
+        result = AuthService(broken, flush_interval=0).authenticate('gone', 'pw')
+        assert not result.ok and result.source is None
+
+    def test_tokens(self, factory):
+        service = AuthService(factory, flush_interval=0)
+        result = service.authenticate('cashier', 'pw1')
+        unlocked = service.unlock(result.token, 'Cashier', 'pw1')
+        assert unlocked.ok and unlocked.user.full_name == 'Cash Ier' and unlocked.user.id == result.user.id
+        assert service.unlock(result.token, 'cashier', 'bad').error == 'Invalid password'
+        assert not service.unlock(result.token, 'someone', 'pw1').ok
+        assert not service.unlock(service.issue_token(result.user), 'cashier', 'pw1').ok
+        payload, sig = result.token.split('.')
+        assert service.verify_token(payload[:-2] + 'xx.' + sig) is None
+        assert service.verify_token(service.issue_token(result.user, ttl=-1)) is None
+        service.revoke_token(result.token)
+        assert not service.unlock(result.token, 'cashier', 'pw1').ok
+
+    def test_activity_batched(self, factory):
+        service = AuthService(factory, flush_interval=0)
+        user = service.authenticate('cashier', 'pw1').user
+        for _ in range(50):
+            service.record_activity(user)
+        assert service.activity.pending == 1
+        assert service.activity.flush() == 1
+        stored = _user(factory, 'cashier')
+        assert stored.last_login is not None and stored.last_activity >= stored.last_login
+
+    def test_imports_legacy_json(self, auth_cache, tmp_path):
+        (tmp_path / 'users_cache.json').write_text(json.dumps({
+            'old': {'password_hash': hash_password('pw', iterations=1000), 'is_admin': False, 'full_name': 'Old'}
+        }))
+        assert auth_cache.authenticate_locally('old', 'pw')['full_name'] == 'Old'
+        assert not (tmp_path / 'users_cache.json').exists()
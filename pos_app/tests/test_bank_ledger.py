@@ -0,0 +1,159 @@
+"""
+Unit tests for the bank ledger service (pos_app.controllers.bank_ledger)
+
+Tests cover:
+- Recording transactions against the current (not a stale) account balance
+- Keyset pages with running balances across page boundaries
+- Daily closing balance snapshots, read by balance lookups without reconciliation
+- Bulk reconciliation of balance_after and current_balance
+- Reconciliation after a fiscal year of transactions was archived
+- Pages reaching into an archived year
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from pos_app.controllers.bank_ledger import BankLedgerService, signed_amount
+from pos_app.models.database import BankAccount, BankBalanceSnapshot, BankTransaction
+
+DAY = datetime(2026, 10, 1, 9)
+
+
+@pytest.fixture
+def bank_account(db_session):
+    account = BankAccount(name="Main", account_number="000123456", bank_name="Test Bank",
+                          opening_balance=1000.0, current_balance=1000.0)
+    db_session.add(account)
+    db_session.commit()
+    return account
+
+
+@pytest.fixture
+def ledger(db_session, bank_account):
+    """Ten transactions over five days: +100 deposits and -30 withdrawals alternating"""
+    service = BankLedgerService(db_session)
+    for i in range(10):
+        kind, amount = ('DEPOSIT', 100.0) if i % 2 == 0 else ('WITHDRAWAL', 30.0)
+        service.record(amount, kind, account_id=bank_account.id, reference_number=f"T{i}",
+                       transaction_date=DAY + timedelta(hours=12 * i))
+    db_session.commit()
+    return service
+
+
+@pytest.mark.unit
+class TestBankLedger:
+    """Test the paged bank ledger"""
+
+    def test_record_uses_fresh_balance(self, db_session, bank_account):
+        service = BankLedgerService(db_session)
+        # Another terminal moved the balance behind this session's back
+        db_session.execute(BankAccount.__table__.update().values(current_balance=1500.0))
+        tx = service.record(200.0, 'WITHDRAWAL', description="Rent")
+        db_session.commit()
+        assert tx.balance_after == 1300.0
+        assert db_session.get(BankAccount, bank_account.id).current_balance == 1300.0
+        # Refunds are stored as negative withdrawals and still reduce the balance
+        assert signed_amount('WITHDRAWAL', -50.0) == -50.0
+        assert signed_amount(BankTransaction.TransactionType.RECEIPT, 50.0) == 50.0
+
+    def test_keyset_pages_with_running_balance(self, db_session, bank_account, ledger):
+        first = ledger.page(account_id=bank_account.id, limit=4)
+        assert first.has_more
+        assert [r['reference_number'] for r in first.rows] == ['T9', 'T8', 'T7', 'T6']
+        assert [r['balance'] for r in first.rows] == [1350.0, 1380.0, 1280.0, 1310.0]
+
+        second = ledger.page(account_id=bank_account.id, limit=4, after=first.next_cursor)
+        assert [r['reference_number'] for r in second.rows] == ['T5', 'T4', 'T3', 'T2']
+        assert second.rows[0]['balance'] == 1210.0
+        last = ledger.page(account_id=bank_account.id, limit=4, after=second.next_cursor)
+        assert not last.has_more and [r['balance'] for r in last.rows] == [1070.0, 1100.0]
+
+        deposits = ledger.page(transaction_type='DEPOSIT', date_from=DAY + timedelta(days=2))
+        assert [r['reference_number'] for r in deposits.rows] == ['T8', 'T6', 'T4']
+        assert deposits.rows[0]['balance'] == 1380.0
+        assert ledger.balance_at(bank_account.id, DAY + timedelta(days=1)) == 1070.0
+
+    def test_snapshots(self, db_session, bank_account, ledger):
+        assert ledger.snapshot(upto=date(2026, 10, 4)) == 3
+        snaps = db_session.query(BankBalanceSnapshot).order_by(BankBalanceSnapshot.day).all()
+        assert [(s.day, s.closing_balance, s.transaction_count) for s in snaps] == [
+            (date(2026, 10, 1), 1070.0, 2), (date(2026, 10, 2), 1140.0, 2), (date(2026, 10, 3), 1210.0, 2)]
+        # Incremental: only the days after the last snapshot are added
+        assert ledger.snapshot(upto=date(2026, 10, 10)) == 2
+        assert ledger.snapshot(upto=date(2026, 10, 10)) == 0
+        # Pages read the same balances when starting from a snapshot
+        assert [r['balance'] for r in ledger.page(account_id=bank_account.id, limit=2).rows] == [1350.0, 1380.0]
+
+    def test_balance_reads_scheduled_snapshot(self, db_session, bank_account, ledger):
+        # What the background snapshot thread does, without reconcile()
+        assert BankLedgerService(db_session).snapshot(upto=date(2026, 10, 4)) == 3
+        assert ledger.balance_at(bank_account.id, DAY + timedelta(days=3)) == 1210.0
+        # Only the snapshot and the transactions after it are read, not the whole history
+        db_session.query(BankBalanceSnapshot).filter(BankBalanceSnapshot.day == date(2026, 10, 3)) \
+            .update({'closing_balance': 5000.0})
+        db_session.query(BankTransaction).filter(BankTransaction.transaction_date < DAY + timedelta(days=2)) \
+            .delete()
+        db_session.commit()
+        assert ledger.balance_at(bank_account.id, DAY + timedelta(days=3)) == 5000.0
+        assert ledger.balance_at(bank_account.id, DAY + timedelta(days=2)) == 1140.0
+
+    def test_reconcile_repairs_balances(self, db_session, bank_account, ledger):
+        # Concurrent writers left stale balances, and a back-dated transaction was inserted directly
+        db_session.execute(BankTransaction.__table__.update().values(balance_after=0))
+        db_session.add(BankTransaction(bank_account_id=bank_account.id, amount=20.0, balance_after=0,
+                                       transaction_type='FEE', transaction_date=DAY - timedelta(days=1)))
+        db_session.get(BankAccount, bank_account.id).current_balance = 999.0
+        db_session.commit()
+
+        result = ledger.reconcile()
+        assert result == {'accounts': 1, 'transactions_fixed': 11, 'balances_fixed': 1, 'snapshots': 6}
+        db_session.expire_all()
+        assert db_session.get(BankAccount, bank_account.id).current_balance == 1330.0
+        balances = [t.balance_after for t in db_session.query(BankTransaction)
+                    .order_by(BankTransaction.transaction_date, BankTransaction.id)]
+        assert balances[:3] == [980.0, 1080.0, 1050.0] and balances[-1] == 1330.0
+        assert ledger.reconcile()['transactions_fixed'] == 0
+
+    def test_reconcile_after_archiving(self, db_session):
+        from pos_app.database.archive import Archiver
+        account = BankAccount(name="Old", account_number="9", bank_name="Test Bank",
+                              opening_balance=0.0, current_balance=0.0)
+        db_session.add(account)
+        db_session.commit()
+        service = BankLedgerService(db_session)
+        service.record(100.0, 'DEPOSIT', account_id=account.id, transaction_date=datetime(2023, 9, 1, 10))
+        service.record(50.0, 'DEPOSIT', account_id=account.id, transaction_date=datetime(2025, 9, 1, 10))
+        db_session.commit()
+        service.snapshot(upto=date(2023, 10, 1))
+
+        Archiver(db_session).archive_year(2024, now=datetime(2026, 10, 19))
+        assert db_session.query(BankTransaction).count() == 1
+        assert service.reconcile()['balances_fixed'] == 0
+        db_session.expire_all()
+        assert db_session.get(BankAccount, account.id).current_balance == 150.0
+        assert db_session.query(BankTransaction.balance_after).scalar() == 150.0
+        assert service.balance_at(account.id, datetime(2026, 1, 1)) == 150.0
+        # Snapshots inside the archived year survive the rebuild
+        assert service.balance_at(account.id, datetime(2024, 1, 1)) == 100.0
+
+    def test_pages_include_archived_transactions(self, db_session):
+        from pos_app.database.archive import Archiver
+        account = BankAccount(name="Old", account_number="9", bank_name="Test Bank",
+                              opening_balance=0.0, current_balance=0.0)
+        db_session.add(account)
+        db_session.commit()
+        service = BankLedgerService(db_session)
+        for i, when in enumerate((datetime(2023, 9, 1, 10), datetime(2024, 2, 1, 10), datetime(2025, 9, 1, 10))):
+            service.record(100.0, 'DEPOSIT', account_id=account.id, reference_number=f"A{i}", transaction_date=when)
+        db_session.commit()
+        Archiver(db_session).archive_year(2024, now=datetime(2026, 10, 19))
+        assert db_session.query(BankTransaction).count() == 1
+
+        first = service.page(account_id=account.id, limit=2)
+        assert [r['reference_number'] for r in first.rows] == ['A2', 'A1']
+        assert [r['balance'] for r in first.rows] == [300.0, 200.0]
+        rest = service.page(account_id=account.id, limit=2, after=first.next_cursor)
+        assert [(r['reference_number'], r['balance']) for r in rest.rows] == [('A0', 100.0)]
+        assert not rest.has_more
+        ranged = service.page(account_id=account.id, date_from=datetime(2024, 1, 1), date_to=datetime(2024, 3, 1))
+        assert [r['account_name'] for r in ranged.rows] == ['Old']
@@ -0,0 +1,92 @@
+"""
+Unit tests for the pos_app.benchmarks package
+
+Tests cover:
+- Deterministic, idempotent dataset seeding
+- Running simulated terminals against a SQLite file, concurrently without invoice clashes
+- Percentiles and baseline regression checks
+- The command line --check failing on errors or a missing baseline
+"""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from pos_app.benchmarks import (
+    DatasetSpec, seed_dataset, create_bench_engine, run_load, percentile,
+    save_baseline, load_baseline, compare_to_baseline
+)
+from pos_app.benchmarks.__main__ import main
+from pos_app.models.database import Sale
+
+TINY = dict(products=30, customers=10, days=5, sales_per_day=4)
+
+
+def _seeded(tmp_path, name='bench.db', seed=42):
+    engine = create_bench_engine(f"sqlite:///{tmp_path / name}")
+    with sessionmaker(bind=engine)() as session:
+        counts = seed_dataset(session, DatasetSpec(seed=seed, **TINY))
+        totals = [float(t) for t in session.execute(select(Sale.total_amount).order_by(Sale.id)).scalars()]
+    return engine, counts, totals
+
+
+@pytest.mark.unit
+class TestBenchmarkDataset:
+    """Test dataset generation"""
+
+    def test_deterministic_and_idempotent(self, tmp_path):
+        engine_a, counts_a, totals_a = _seeded(tmp_path, 'a.db')
+        engine_b, counts_b, totals_b = _seeded(tmp_path, 'b.db')
+        assert counts_a == counts_b and totals_a == totals_b
+        assert counts_a['products'] == 30 and counts_a['sales'] == 20
+        with sessionmaker(bind=engine_a)() as session:
+            assert seed_dataset(session, DatasetSpec(**TINY)) == counts_a
+        engine_a.dispose()
+        engine_b.dispose()
+
+
+@pytest.mark.unit
+class TestBenchmarkLoad:
+    """Test the load generator and baselines"""
+
+    def test_run_load_single_terminal(self, tmp_path):
+        engine, _, _ = _seeded(tmp_path)
+        result = run_load(engine, terminals=1, transactions=12, mix={'checkout': 1.0})
+        data = result.to_dict()
+        assert data['ops']['checkout']['count'] == 12 and data['errors'] == 0
+        assert data['tps'] > 0 and data['ops']['checkout']['p99_ms'] >= data['ops']['checkout']['p50_ms']
+        engine.dispose()
+
+    def test_concurrent_terminals_number_sales_uniquely(self, tmp_path):
+        engine, _, _ = _seeded(tmp_path)
+        result = run_load(engine, terminals=4, transactions=40, mix={'checkout': 1.0})
+        assert result.to_dict()['errors'] == 0 and result.completed == 40
+        with sessionmaker(bind=engine)() as session:
+            numbers = session.execute(select(Sale.invoice_number)).scalars().all()
+        assert None not in numbers and len(set(numbers)) == len(numbers)
+        engine.dispose()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 99) == 0.0
+
+    def test_baseline_regressions(self, tmp_path):
+        base = {'dialect': 'sqlite', 'tps': 100.0, 'completed': 100, 'errors': 0,
+                'ops': {'checkout': {'p50_ms': 10.0, 'p99_ms': 40.0}}}
+        path = save_baseline(base, 'smoke', str(tmp_path))
+        assert path.endswith('smoke_sqlite.json')
+        stored = load_baseline('smoke', 'sqlite', str(tmp_path))
+        assert compare_to_baseline(base, stored) == []
+        slower = dict(base, tps=70.0, errors=5, ops={'checkout': {'p50_ms': 10.5, 'p99_ms': 80.0}})
+        regressions = compare_to_baseline(slower, stored)
+        assert len(regressions) == 3
+        assert any('p99_ms' in r for r in regressions)
+        assert load_baseline('smoke', 'postgresql', str(tmp_path)) is None
+
+    def test_check_needs_a_baseline(self, tmp_path, capsys):
+        argv = ['--terminals', '1', '--transactions', '4', '--baseline-dir', str(tmp_path)]
+        assert main(argv + ['--check']) == 1
+        assert 'no baseline' in capsys.readouterr().out
+        assert main(argv + ['--save-baseline']) == 0
+        assert load_baseline('smoke', 'sqlite', str(tmp_path))['completed'] == 4
@@ -0,0 +1,94 @@
+"""
+Unit tests for utils/cart.py
+
+Tests cover:
+- Keyed line lookup for repeat scans
+- Incremental totals (discount, tax, profit, refund pricing)
+- Change events and row renumbering
+"""
+
+import copy
+import random
+import pytest
+from pos_app.utils.cart import Cart
+from pos_app.utils.money import money_sum
+
+
+def _line(pid, price=100.0, qty=1, cost=60.0):
+    return {'id': pid, 'name': f"P{pid}", 'price': price, 'purchase_price': cost, 'quantity': qty}
+
+
+@pytest.mark.unit
+class TestCartLines:
+    """Test line management"""
+
+    def test_repeat_scan_increments_existing_line(self):
+        cart = Cart()
+        assert cart.add_or_increment(_line(1)) == (0, True)
+        assert cart.add_or_increment(_line(2)) == (1, True)
+        assert cart.add_or_increment(_line(1)) == (0, False)
+        assert len(cart) == 2 and cart[0]['quantity'] == 2
+        assert cart.find(2) == 1 and cart.find(99) == -1
+
+    def test_events_and_renumbering(self):
+        cart = Cart([_line(1), _line(2), _line(3)])
+        events = []
+        cart.subscribe(lambda event, row: events.append((event, row)))
+        cart[2]['quantity'] += 1
+        cart.pop(0)
+        assert cart.find(3) == 1
+        cart[1]['price'] = 50.0
+        cart.append(_line(4))
+        cart.reset([])
+        assert events == [('updated', 2), ('removed', 0), ('updated', 1), ('added', 2), ('reset', None)]
+        assert len(cart) == 0 and cart.subtotal == 0.0
+
+    def test_copies_are_detached_dicts(self):
+        cart = Cart([_line(1)])
+        snapshot = copy.deepcopy(cart[0])
+        assert type(snapshot) is dict
+        snapshot['quantity'] = 99
+        assert cart.items_count == 1
+
+
+@pytest.mark.unit
+class TestCartTotals:
+    """Test running totals"""
+
+    def test_totals_discount_tax_profit(self):
+        cart = Cart([_line(1, price=100.0, qty=2, cost=60.0), _line(2, price=10.5, qty=3, cost=7.25)])
+        totals = cart.totals(discount=31.5, tax_rate=10)
+        assert totals.items_count == 5
+        assert totals.subtotal == pytest.approx(231.5)
+        assert totals.total_cost == pytest.approx(141.75)
+        assert totals.profit == pytest.approx(89.75)
+        assert totals.tax == pytest.approx(20.0) and totals.total == pytest.approx(220.0)
+        assert cart.totals(discount=1000).total == 0.0
+
+    def test_refund_mode_uses_refund_unit_subtotal(self):
+        line = dict(_line(1, price=100.0, qty=2), refund_unit_subtotal=90.0)
+        cart = Cart([line])
+        assert cart.subtotal == 200.0
+        cart.set_refund_mode(True)
+        assert cart.subtotal == 180.0
+        cart[0]['quantity'] = 1
+        assert cart.subtotal == 90.0
+
+    def test_incremental_totals_match_full_recompute_on_large_cart(self):
+        rng = random.Random(7)
+        cart = Cart()
+        for pid in range(500):
+            cart.append(_line(pid, price=rng.randint(1, 99999) / 100, qty=rng.randint(1, 5)))
+        for _ in range(2000):
+            row = rng.randrange(len(cart))
+            action = rng.random()
+            if action < 0.5:
+                cart[row]['quantity'] = rng.randint(1, 20)
+            elif action < 0.9:
+                cart[row]['price'] = rng.randint(1, 99999) / 100
+            else:
+                cart.pop(row)
+                cart.append(_line(1000 + row, price=12.34))
+        expected = money_sum(round(line['quantity'] * line['price'], 2) for line in cart)
+        assert cart.subtotal == pytest.approx(expected, abs=0.001)
+        assert cart.items_count == sum(line['quantity'] for line in cart)
@@ -0,0 +1,80 @@
+"""
+Unit tests for the cash drawer service (pos_app.controllers.cash_drawer)
+
+Tests cover:
+- Cash sales, refunds and cash expenses recorded as drawer movements
+- Expected balance and totals maintained per movement (X-report)
+- Closing with counted cash and cash taken out (Z-report)
+- Rebuilding the totals from the movements
+"""
+
+import pytest
+from pos_app.controllers.cash_drawer import CashDrawerService
+from pos_app.models.database import CashDrawerSession, CashMovement
+
+
+@pytest.mark.unit
+class TestCashDrawer:
+    """Test incrementally tracked cash drawer sessions"""
+
+    def test_sales_refunds_and_payouts_recorded(self, db_session, business_controller, sample_product):
+        sample_product.retail_stock = 10
+        db_session.commit()
+        drawer = CashDrawerService(db_session)
+        opened = drawer.open_session(1000.0, opened_by='admin')
+        item = [{'product_id': sample_product.id, 'quantity': 2, 'unit_price': 100.0}]
+
+        business_controller.create_sale(None, item, payment_method='CASH')
+        business_controller.create_sale(None, item, payment_method='CARD')
+        business_controller.create_sale(None, [dict(item[0], quantity=1)], payment_method='CASH', is_refund=True)
+        business_controller.record_expense("Tea", 50.0, payment_method='CASH')
+
+        kinds = [m.movement_type for m in db_session.query(CashMovement).order_by(CashMovement.id)]
+        assert kinds == ['SALE', 'REFUND', 'PAYOUT']
+        report = drawer.x_report()
+        assert report['session_id'] == opened.id
+        assert (report['sale_count'], report['refund_count'], report['movement_count']) == (1, 1, 3)
+        assert report['sales_total'] == pytest.approx(db_session.query(CashMovement.amount)
+                                                      .filter(CashMovement.movement_type == 'SALE').scalar())
+        sale_amount = report['sales_total']
+        refund_amount = report['refunds_total']
+        assert report['expected_balance'] == pytest.approx(1000.0 + sale_amount - refund_amount - 50.0)
+
+    def test_no_open_session_records_nothing(self, db_session, business_controller, sample_product):
+        sample_product.retail_stock = 10
+        db_session.commit()
+        business_controller.create_sale(None, [{'product_id': sample_product.id, 'quantity': 1, 'unit_price': 100.0}],
+                                        payment_method='CASH')
+        assert db_session.query(CashMovement).count() == 0
+        assert CashDrawerService(db_session).x_report() is None
+
+    def test_close_session_z_report(self, db_session):
+        drawer = CashDrawerService(db_session)
+        first = drawer.open_session(500.0)
+        drawer.record('SALE', 1200.0, reference='1')
+        drawer.record('DEPOSIT', 300.0)
+        drawer.record('WITHDRAWAL', 100.0)
+        drawer.record('ADJUSTMENT', -20.0)
+        db_session.commit()
+        assert drawer.x_report()['expected_balance'] == 1880.0
+
+        report = drawer.close_session(counted=1870.0, cash_out=800.0, closed_by='admin')
+        assert report['status'] == 'CLOSED' and report['payouts_total'] == 800.0
+        assert (report['expected_balance'], report['closing_balance'], report['variance']) == (1080.0, 1070.0, -10.0)
+        assert drawer.current_session() is None
+        assert drawer.record('SALE', 10.0) is None
+        assert drawer.z_report(first.id) == report
+
+    def test_rebuild_matches_incremental(self, db_session):
+        drawer = CashDrawerService(db_session)
+        opened = drawer.open_session(100.0)
+        for kind, amount in [('SALE', 40.0), ('SALE', 60.0), ('REFUND', 15.0), ('PAYOUT', 5.0)]:
+            drawer.record(kind, amount)
+        db_session.commit()
+        incremental = drawer.x_report()
+
+        db_session.query(CashDrawerSession).update({'expected_balance': 0, 'sales_total': 0, 'sale_count': 0})
+        db_session.commit()
+        drawer.rebuild(opened.id)
+        assert drawer.x_report() == incremental
+        assert incremental['expected_balance'] == 180.0 and incremental['sale_count'] == 2
@@ -0,0 +1,104 @@
+"""
+Unit tests for utils/document_engine.py
+
+Tests cover:
+- Compiled template rendering and HTML escaping
+- Template caching and shared styles
+- Streaming invoice output through DocumentGenerator
+- Batch rendering (in-process, across a process pool, on threads in frozen builds)
+- Month-end statement export
+"""
+
+import sys
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from pos_app.utils import document_engine
+from pos_app.utils.document_engine import CompiledTemplate, Safe, render_batch
+from pos_app.utils.document_generator import DocumentGenerator
+from pos_app.models.database import Payment
+
+
+@pytest.mark.unit
+class TestCompiledTemplate:
+    """Test template compilation and rendering"""
+
+    def test_format_specs_and_escape(self):
+        tpl = CompiledTemplate("<b>{name}</b> {amount:>8.2f} {style}", escape=document_engine.html.escape)
+        out = tpl.render({'name': 'A & <B>', 'amount': 3.5, 'style': Safe('<i>')})
+        assert out == "<b>A &amp; &lt;B&gt;</b>     3.50 <i>"
+        assert tpl.fields == ('name', 'amount', 'style')
+
+    def test_templates_are_cached(self):
+        assert document_engine.get_template('invoice') is document_engine.get_template('invoice')
+        with pytest.raises(KeyError):
+            document_engine.get_template('no-such-template')
+
+    def test_statement_html_uses_shared_style(self):
+        html_out = document_engine.render('customer_statement_html', {
+            'shop_name': 'Shop', 'shop_address': '', 'shop_phone': '', 'period_text': '',
+            'customer_name': 'Ali & Sons', 'customer_address': 'Shop #3 <Mall>', 'customer_phone': '',
+            'rows': [], 'total_sales': 'Rs 0.00', 'total_payments': 'Rs 0.00', 'balance': 'Rs 0.00',
+            'generated_text': 'now',
+        })
+        assert document_engine.get_style('statement') in html_out
+        assert 'Ali &amp; Sons' in html_out
+        assert 'Shop #3 &lt;Mall&gt;' in html_out
+        assert 'No transactions found' in html_out
+
+
+@pytest.mark.unit
+class TestDocumentOutput:
+    """Test generated documents"""
+
+    def test_invoice_file(self, tmp_path):
+        sale = SimpleNamespace(invoice_number='INV-7', sale_date=datetime(2026, 1, 2, 3, 4, 5),
+                               tax_amount=0.0, discount_amount=0.0, total_amount=25.0)
+        items = [SimpleNamespace(product=SimpleNamespace(name='Widget'), quantity=2, unit_price=12.5, total=25.0)]
+        path = DocumentGenerator(str(tmp_path)).generate_invoice(sale, None, items)
+        text = open(path, encoding='utf-8').read()
+        assert path.endswith('invoice_INV-7.txt')
+        assert 'Customer: Walk-in Customer' in text
+        assert '2   Widget                          12.50      25.00' in text
+        assert 'TOTAL   :      25.00' in text
+
+    @pytest.mark.parametrize('workers, frozen', [(1, False), (2, False), (2, True)])
+    def test_render_batch(self, tmp_path, workers, frozen, monkeypatch):
+        monkeypatch.setattr(document_engine, 'MIN_PARALLEL_BATCH', 2)
+        pools = []
+        if frozen:
+            monkeypatch.setattr(sys, 'frozen', True, raising=False)
+
+            class Threads(document_engine.ThreadPoolExecutor):
+                def __init__(self, *args, **kwargs):
+                    pools.append(self)
+                    super().__init__(*args, **kwargs)
+            monkeypatch.setattr(document_engine, 'ThreadPoolExecutor', Threads)
+        jobs = [
+            ('customer_statement',
+             document_engine.statement_context(f"C{i}", '2026-01-01', '2026-01-31', [[i, 'Payment', '10.00']], ['#', 'Type', 'Amount']),
+             f"stmt_{i}.txt")
+            for i in range(6)
+        ]
+        jobs.append(('missing-template', {}, 'bad.txt'))
+        results = render_batch(jobs, str(tmp_path), workers=workers, chunk_size=2)
+        assert [r[0] for r in results] == [j[2] for j in jobs]
+        assert results[-1][1] is None and results[-1][2]
+        for filename, path, error in results[:-1]:
+            assert error is None
+            assert 'Customer Statement - C' in open(path, encoding='utf-8').read()
+        assert len(pools) == int(frozen)
+
+    def test_month_end_statements(self, business_controller, sample_customer, db_session, tmp_path):
+        db_session.add(Payment(customer_id=sample_customer.id, amount=50.0, payment_method='CASH',
+                               payment_date=datetime(2026, 1, 10), reference='R1'))
+        db_session.add(Payment(customer_id=sample_customer.id, amount=80.0, payment_method='CREDIT',
+                               payment_date=datetime(2026, 1, 5)))
+        db_session.commit()
+        paths = business_controller.export_month_end_statements(
+            datetime(2026, 1, 1), datetime(2026, 1, 31), workers=1, output_dir=str(tmp_path))
+        assert len(paths) == 1
+        text = open(paths[0], encoding='utf-8').read()
+        assert sample_customer.name in text
+        assert 'Charge | Credit Sale | 80.00' in text
+        assert 'Payment | R1 | 50.00' in text
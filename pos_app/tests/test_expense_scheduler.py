@@ -0,0 +1,123 @@
+"""
+Unit tests for the recurring expense scheduler (pos_app.utils.expense_scheduler)
+
+Tests cover:
+- Occurrence dates for every frequency, with month-end clamping
+- Materialising occurrences inside the horizon without duplicates
+- Bulk settlement of due occurrences into Expense rows
+- Cash occurrences recorded as drawer payouts
+- Manual (non auto-create) occurrences flagged OVERDUE
+- First run of an old template: no backlog booked, one OVERDUE occurrence
+"""
+
+from datetime import datetime
+
+import pytest
+from pos_app.models.database import Expense, ExpenseSchedule
+from pos_app.utils.expense_scheduler import ExpenseScheduler, next_occurrence, occurrences
+
+NOW = datetime(2026, 10, 19, 12)
+
+
+def _template(session, title, frequency, due, amount=100.0, auto_create=True):
+    expense = Expense(title=title, amount=amount, category="Utilities", frequency=frequency, is_recurring=True,
+                      next_due_date=due, auto_create=auto_create, payment_method='CASH')
+    session.add(expense)
+    session.commit()
+    return expense
+
+
+@pytest.mark.unit
+class TestExpenseScheduler:
+    """Test materialised recurring expense occurrences"""
+
+    def test_occurrence_dates(self):
+        jan31 = datetime(2026, 1, 31, 9)
+        assert next_occurrence(jan31, 'DAILY') == datetime(2026, 2, 1, 9)
+        assert next_occurrence(jan31, 'WEEKLY') == datetime(2026, 2, 7, 9)
+        assert next_occurrence(jan31, 'QUARTERLY') == datetime(2026, 4, 30, 9)
+        assert next_occurrence(jan31, 'YEARLY') == datetime(2027, 1, 31, 9)
+        assert next_occurrence(jan31, 'ONE_TIME') is None
+        # The anchor day survives short months
+        assert occurrences(jan31, 'MONTHLY', None, datetime(2026, 4, 1)) == [
+            jan31, datetime(2026, 2, 28, 9), datetime(2026, 3, 31, 9)]
+        # At least the next occurrence even when it is beyond the horizon
+        assert occurrences(jan31, 'YEARLY', jan31, datetime(2026, 4, 1)) == [datetime(2027, 1, 31, 9)]
+
+    def test_materialise_horizon(self, db_session):
+        rent = _template(db_session, "Rent", 'MONTHLY', datetime(2026, 11, 1))
+        _template(db_session, "Licence", 'YEARLY', datetime(2027, 6, 1))
+        _template(db_session, "Audit", 'ONE_TIME', datetime(2026, 12, 1))
+        scheduler = ExpenseScheduler(db_session, horizon_days=90)
+
+        assert scheduler.materialise(now=NOW) == 5
+        assert scheduler.materialise(now=NOW) == 0
+        dates = [s.scheduled_date for s in db_session.query(ExpenseSchedule)
+                 .filter(ExpenseSchedule.expense_id == rent.id).order_by(ExpenseSchedule.scheduled_date)]
+        assert dates == [datetime(2026, 11, 1), datetime(2026, 12, 1), datetime(2027, 1, 1)]
+        # The window moves forward with time
+        assert scheduler.materialise(now=datetime(2026, 11, 19)) == 1
+
+    def test_run_settles_due_in_bulk(self, db_session):
+        rent = _template(db_session, "Rent", 'MONTHLY', datetime(2026, 8, 5), amount=5000.0)
+        scheduler = ExpenseScheduler(db_session, horizon_days=30)
+        # Scheduled before the first occurrence; nothing ran while the next ones fell due
+        assert scheduler.materialise(now=datetime(2026, 8, 1)) == 1
+
+        result = scheduler.run(now=NOW)
+        assert result['created'] == 3
+        created = db_session.query(Expense).filter(Expense.is_recurring == False).order_by(Expense.expense_date).all()
+        assert [(e.title, e.amount, e.expense_date) for e in created] == [
+            ("Rent", 5000.0, datetime(2026, 8, 5)), ("Rent", 5000.0, datetime(2026, 9, 5)),
+            ("Rent", 5000.0, datetime(2026, 10, 5))]
+        assert all(e.reference.startswith("SCH-") and e.category == "Utilities" for e in created)
+        assert db_session.get(Expense, rent.id).next_due_date == datetime(2026, 11, 5)
+
+        # Nothing new is due on a second run
+        assert scheduler.run(now=NOW)['created'] == 0
+        pending = db_session.query(ExpenseSchedule).filter(ExpenseSchedule.status == 'PENDING').count()
+        assert pending == 1
+
+    def test_cash_occurrences_paid_out_of_drawer(self, db_session):
+        from pos_app.controllers.cash_drawer import CashDrawerService
+        drawer = CashDrawerService(db_session)
+        drawer.open_session(10000.0, opened_by='admin')
+        _template(db_session, "Rent", 'MONTHLY', datetime(2026, 10, 5), amount=5000.0)
+        bank = _template(db_session, "Internet", 'MONTHLY', datetime(2026, 10, 6), amount=800.0)
+        bank.payment_method = 'BANK_TRANSFER'
+        db_session.commit()
+        scheduler = ExpenseScheduler(db_session, horizon_days=30)
+        scheduler.materialise(now=datetime(2026, 10, 1))
+
+        result = scheduler.run(now=NOW)
+        assert (result['created'], result['payouts']) == (2, 1)
+        report = drawer.x_report()
+        assert (report['payouts_total'], report['expected_balance']) == (5000.0, 5000.0)
+
+    def test_manual_occurrences_marked_overdue(self, db_session, business_controller):
+        _template(db_session, "Cleaner", 'WEEKLY', datetime(2026, 10, 5), auto_create=False)
+        ExpenseScheduler(db_session).materialise(now=datetime(2026, 10, 1))
+        assert business_controller.process_recurring_expenses() == 0
+        statuses = [s.status for s in db_session.query(ExpenseSchedule).order_by(ExpenseSchedule.scheduled_date)]
+        assert statuses[:2] == ['OVERDUE', 'OVERDUE'] and 'PAID' not in statuses
+        assert db_session.query(Expense).count() == 1
+
+    def test_first_run_does_not_book_backlog(self, db_session):
+        daily = _template(db_session, "Milk", 'DAILY', datetime(2024, 10, 1, 9), amount=20.0)
+        yearly = _template(db_session, "Licence", 'YEARLY', datetime(2025, 3, 1))
+        scheduler = ExpenseScheduler(db_session, horizon_days=7)
+
+        result = scheduler.run(now=NOW)
+        assert result['created'] == 0
+        assert db_session.query(Expense).filter(Expense.is_recurring == False).count() == 0
+        rows = {(s.expense_id, s.status): s.scheduled_date for s in db_session.query(ExpenseSchedule)
+                .filter(ExpenseSchedule.status == 'OVERDUE')}
+        assert rows == {(daily.id, 'OVERDUE'): datetime(2026, 10, 19, 9), (yearly.id, 'OVERDUE'): datetime(2026, 3, 1)}
+        assert db_session.query(ExpenseSchedule).filter(ExpenseSchedule.expense_id == yearly.id,
+                                                        ExpenseSchedule.status == 'PENDING').one().scheduled_date \
+            == datetime(2027, 3, 1)
+        assert db_session.get(Expense, daily.id).next_due_date == datetime(2026, 10, 19, 9)
+
+        # Later runs settle what falls due from then on, not the OVERDUE one
+        assert scheduler.run(now=datetime(2026, 10, 21, 12))['created'] == 2
+        assert db_session.query(ExpenseSchedule).filter(ExpenseSchedule.status == 'OVERDUE').count() == 2
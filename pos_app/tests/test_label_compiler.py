@@ -0,0 +1,126 @@
+"""
+Unit tests for utils/label_compiler.py
+
+Tests cover:
+- EPL2 and ZPL stored form compilation
+- Merging, skipping and sanitising label data
+- Batch delivery to a file and to a local TCP 9100 stand-in
+- Throughput of a large batch over a single connection
+"""
+
+import socket
+import threading
+import time
+import pytest
+from pos_app.utils.label_compiler import LabelBatchCompiler, label_items_for_purchase, print_label_batch
+
+
+class LabelServer:
+    """Local stand-in for a raw TCP 9100 label printer"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.connections = 0
+        self.data = bytearray()
+        self._stop = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                self.connections += 1
+                while True:
+                    chunk = conn.recv(65536)
+                    if not chunk:
+                        break
+                    self.data.extend(chunk)
+
+    @property
+    def target(self):
+        return f"tcp://127.0.0.1:{self.port}"
+
+    def close(self):
+        self._stop = True
+        self.sock.close()
+
+
+@pytest.fixture
+def label_server():
+    server = LabelServer()
+    yield server
+    server.close()
+
+
+def _products(n):
+    return [({'barcode': f"89000{i:07d}", 'name': f"Product {i}"}, 3) for i in range(n)]
+
+
+@pytest.mark.unit
+class TestLabelCompiler:
+    """Test EPL2/ZPL command stream generation"""
+
+    def test_epl2_stored_form(self):
+        compiler = LabelBatchCompiler('EPL2')
+        data = compiler.compile([({'barcode': '123', 'name': 'Tea "Gold"'}, 5)])
+        text = data.decode('ascii')
+        assert text.count('FS"POSLBL"') == 1 and 'FE\n' in text
+        assert 'FR"POSLBL"\n?\nTea \\"Gold\\"\n123\nP5\n' in text
+        assert compiler.last_stats == {'labels': 5, 'products': 1, 'skipped': 0, 'bytes': len(data)}
+
+    def test_zpl_stored_format(self):
+        data = LabelBatchCompiler('ZPL').compile([(('456', 'Soap^X'), 2)]).decode('ascii')
+        assert data.startswith('^XA^DFR:POSLBL.ZPL')
+        assert '^XFR:POSLBL.ZPL^FN1^FDSoap X^FS^FN2^FD456^FS^PQ2^XZ' in data
+
+    def test_merges_and_skips(self):
+        compiler = LabelBatchCompiler('EPL2')
+        items = [(('1', 'A'), 2), (('1', 'A'), 3), (('', 'No code'), 4), (('2', 'B'), 0), (('2', 'B'), 1)]
+        text = compiler.compile(items).decode('ascii')
+        assert text.count('FR"POSLBL"') == 2
+        assert 'P5\n' in text
+        assert compiler.last_stats['labels'] == 6
+        assert compiler.last_stats['skipped'] == 2
+
+    def test_unknown_language(self):
+        with pytest.raises(ValueError):
+            LabelBatchCompiler('PCL')
+
+
+@pytest.mark.unit
+class TestLabelDelivery:
+    """Test sending compiled batches"""
+
+    def test_print_to_file(self, tmp_path):
+        out = tmp_path / 'labels.prn'
+        stats = print_label_batch(_products(10), f"file://{out}", language='ZPL')
+        assert stats['labels'] == 30
+        assert out.read_bytes().count(b'^PQ3^XZ') == 10
+
+    def test_purchase_items(self, sample_product):
+        item = type('Item', (), {'product': sample_product, 'received_quantity': 4.0, 'quantity': 10})()
+        purchase = type('P', (), {'items': [item]})()
+        assert label_items_for_purchase(purchase) == [(sample_product, 4.0)]
+
+    def test_socket_throughput(self, label_server):
+        items = _products(2000)
+        started = time.perf_counter()
+        stats = print_label_batch(items, label_server.target)
+        elapsed = time.perf_counter() - started
+        deadline = time.time() + 5
+        while len(label_server.data) < stats['bytes'] and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert stats['labels'] == 6000
+        assert len(label_server.data) == stats['bytes']
+        assert label_server.connections == 1
+        # One stream of variable data is far smaller than 6000 full label commands
+        assert stats['bytes'] < 6000 * 60
+        assert elapsed < 5.0
@@ -0,0 +1,94 @@
+"""
+Unit tests for utils/lan_discovery.py
+
+Tests cover:
+- Beacon request/announce round trip over UDP
+- Ignoring foreign datagrams
+- Async TCP probe of open and closed ports
+"""
+
+import asyncio
+import socket
+import time
+import pytest
+from pos_app.utils.lan_discovery import (
+    DiscoveryResponder, discover_servers, probe_tcp, probe_tcp_async, broadcast_addresses, _decode
+)
+
+
+@pytest.fixture
+def responder():
+    r = DiscoveryResponder({'host': '10.1.2.3', 'port': '5432', 'database': 'pos_network',
+                            'username': 'admin', 'password': 'secret'}, port=0, bind_host='127.0.0.1')
+    assert r.start()
+    yield r
+    r.stop()
+
+
+@pytest.mark.unit
+class TestDiscoveryBeacon:
+    """Test the UDP discovery beacon"""
+
+    def test_discovers_responder_quickly(self, responder):
+        started = time.perf_counter()
+        servers = discover_servers(timeout=0.3, port=responder.port, addresses=['127.0.0.1'])
+        assert time.perf_counter() - started < 1.0
+        assert len(servers) == 1
+        reply = servers[0]
+        assert reply['host'] == '10.1.2.3'
+        assert reply['ip'] == '127.0.0.1'
+        assert reply['database'] == 'pos_network'
+        assert 'password' not in reply
+
+    def test_no_responder_returns_empty(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        assert discover_servers(timeout=0.1, port=port, addresses=['127.0.0.1']) == []
+
+    def test_ignores_foreign_datagrams(self, responder):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.settimeout(0.3)
+        try:
+            sock.sendto(b'not json', ('127.0.0.1', responder.port))
+            with pytest.raises(socket.timeout):
+                sock.recvfrom(2048)
+        finally:
+            sock.close()
+        assert _decode(b'{"magic": "other"}') is None
+
+    def test_broadcast_addresses(self):
+        assert broadcast_addresses('192.168.5.20') == ['255.255.255.255', '192.168.5.255']
+        assert broadcast_addresses('127.0.0.1') == ['255.255.255.255']
+
+
+@pytest.mark.unit
+class TestTcpProbe:
+    """Test the asyncio TCP probe"""
+
+    def test_probe_open_and_closed(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        open_port = listener.getsockname()[1]
+        try:
+            assert probe_tcp(['127.0.0.1'], open_port, timeout=0.5) == ['127.0.0.1']
+            listener.close()
+            assert probe_tcp(['127.0.0.1'], open_port, timeout=0.5) == []
+        finally:
+            listener.close()
+
+    def test_sync_wrapper_inside_event_loop(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        port = listener.getsockname()[1]
+
+        async def main():
+            # Blocking wrapper called from a thread that already runs a loop
+            return probe_tcp(['127.0.0.1'], port, timeout=0.5), await probe_tcp_async([], port)
+        try:
+            assert asyncio.run(main()) == (['127.0.0.1'], [])
+        finally:
+            listener.close()
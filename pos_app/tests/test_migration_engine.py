@@ -0,0 +1,160 @@
+"""
+Unit tests for database/migration_engine.py
+
+Tests cover:
+- Dependency ordering, missing dependencies and cycles
+- Recording versions with checksums and detecting edited migrations
+- Rolling back a failed transactional migration
+- Deferring heavy migrations at startup, adopting equivalent earlier checksums
+- Batched backfills and index creation helpers
+- The consolidated v5 migration on a fresh schema
+"""
+
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from pos_app.database.migration_engine import (
+    MigrationRunner, MigrationContext, MigrationError, MigrationLockError, _AdvisoryLock
+)
+
+
+@pytest.fixture
+def engine():
+    eng = create_engine("sqlite://", poolclass=StaticPool, connect_args={'check_same_thread': False})
+    with eng.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, flag INTEGER)"))
+    yield eng
+    eng.dispose()
+
+
+def _write(directory, name, body):
+    (directory / f"{name}.py").write_text(body)
+
+
+def _versions(engine):
+    with engine.connect() as conn:
+        return [r[0] for r in conn.execute(text("SELECT version FROM schema_versions WHERE version > 0 ORDER BY version"))]
+
+
+@pytest.mark.unit
+class TestMigrationGraph:
+    """Test discovery and ordering"""
+
+    def test_orders_by_declared_dependencies(self, engine, tmp_path):
+        _write(tmp_path, 'v1_base', '"""Base"""\ndef migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v2_late', 'DEPENDS_ON = [3]\ndef migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v3_early', 'DEPENDS_ON = [1]\ndef migrate(ctx):\n    pass\n')
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        assert [m.version for m in runner.plan()] == [1, 3, 2]
+        assert runner.run() == [1, 3, 2]
+        assert runner.run() == []
+        assert _versions(engine) == [1, 2, 3]
+
+    def test_missing_dependency_and_cycle(self, engine, tmp_path):
+        _write(tmp_path, 'v1_a', 'DEPENDS_ON = [9]\ndef migrate(ctx):\n    pass\n')
+        with pytest.raises(MigrationError, match='missing'):
+            MigrationRunner(engine, migrations_dir=str(tmp_path)).plan()
+        _write(tmp_path, 'v1_a', 'DEPENDS_ON = [2]\ndef migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v2_b', 'DEPENDS_ON = [1]\ndef migrate(ctx):\n    pass\n')
+        with pytest.raises(MigrationError, match='cycle'):
+            MigrationRunner(engine, migrations_dir=str(tmp_path)).plan()
+
+
+@pytest.mark.unit
+class TestMigrationRun:
+    """Test applying migrations"""
+
+    def test_failed_migration_rolls_back(self, engine, tmp_path):
+        _write(tmp_path, 'v1_ok', 'def migrate(ctx):\n    ctx.add_column("items", "code", "TEXT")\n')
+        _write(tmp_path, 'v2_bad', (
+            'def migrate(ctx):\n'
+            '    ctx.execute("INSERT INTO items (name) VALUES (\'half\')")\n'
+            '    ctx.execute("SELECT * FROM no_such_table")\n'
+        ))
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        with pytest.raises(MigrationError, match='v2_bad'):
+            runner.run()
+        assert _versions(engine) == [1]
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM items")).scalar() == 0
+
+    def test_checksum_mismatch(self, engine, tmp_path):
+        _write(tmp_path, 'v1_a', 'def upgrade(session):\n    pass\n')
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        runner.run()
+        assert runner.verify() == []
+        _write(tmp_path, 'v1_a', 'def upgrade(session):\n    session.execute(None)\n')
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        assert len(runner.verify()) == 1
+        assert runner.run() == []
+        with pytest.raises(MigrationError, match='changed'):
+            runner.run(strict=True)
+
+    def test_startup_defers_heavy_migrations(self, engine, tmp_path):
+        _write(tmp_path, 'v1_a', 'def migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v2_rewrite', 'RUN_AT_STARTUP = False\ndef migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v3_b', 'def migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v4_needs_rewrite', 'DEPENDS_ON = [2]\ndef migrate(ctx):\n    pass\n')
+        _write(tmp_path, 'v5_cheap_here', "RUN_AT_STARTUP = ('sqlite',)\ndef migrate(ctx):\n    pass\n")
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        assert [m.version for m in runner.pending(startup=True)] == [1, 3, 5]
+        assert runner.run(startup=True) == [1, 3, 5]
+        assert runner.pending(startup=True) == []
+        assert [m.version for m in runner.pending()] == [2, 4]
+        assert runner.run() == [2, 4]
+
+    def test_previous_checksums_adopted(self, engine, tmp_path):
+        _write(tmp_path, 'v1_a', 'def upgrade(session):\n    pass\n')
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        runner.run()
+        old = runner.discover()[0].checksum
+        _write(tmp_path, 'v1_a', f'PREVIOUS_CHECKSUMS = [{old!r}]\ndef migrate(ctx):\n    pass\n')
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        assert runner.verify() == []
+        assert runner.run(strict=True) == []
+        assert runner.applied() == {1: runner.discover()[0].checksum}
+
+    def test_lock_is_exclusive(self, engine):
+        with _AdvisoryLock(engine, timeout=0):
+            result = []
+
+            def other():
+                try:
+                    with _AdvisoryLock(engine, timeout=0):
+                        result.append('acquired')
+                except MigrationLockError:
+                    result.append('blocked')
+            t = threading.Thread(target=other)
+            t.start()
+            t.join()
+        assert result == ['blocked']
+
+
+@pytest.mark.unit
+class TestMigrationContext:
+    """Test context helpers"""
+
+    def test_backfill_in_batches(self, engine):
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO items (id, name) VALUES " + ", ".join(f"({i}, 'n{i}')" for i in range(1, 251))))
+        with engine.connect() as conn:
+            ctx = MigrationContext(conn.execution_options(isolation_level='AUTOCOMMIT'), transactional=False)
+            assert ctx.backfill('items', 'flag = 1', 'flag IS NULL', batch_size=40) == 250
+            assert ctx.backfill('items', 'flag = 1', 'flag IS NULL', batch_size=40) == 0
+            assert ctx.create_index('idx_items_name', 'items', ['name'])
+            assert not ctx.add_column('items', 'name', 'TEXT')
+            assert not ctx.add_column('missing_table', 'x', 'TEXT')
+
+    def test_v5_on_fresh_schema(self):
+        from pos_app.models.database import Base
+        eng = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(eng)
+        runner = MigrationRunner(eng)
+        v5 = [m for m in runner.discover() if m.version == 5][0]
+        assert not v5.transactional
+        with eng.connect() as conn:
+            v5.module.migrate(MigrationContext(conn.execution_options(isolation_level='AUTOCOMMIT'), transactional=False))
+            names = {r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert 'idx_sales_refund_of_sale_id' in names
+        eng.dispose()
@@ -0,0 +1,98 @@
+"""
+Unit tests for utils/money.py
+
+Tests cover:
+- Paisa conversion and half-up rounding
+- Exact summation without float drift
+- Money column round-trip through the ORM
+- Sale totals computed with money helpers
+- Unit costs kept at 4 decimal places through weighted-average receipts
+"""
+
+import pytest
+from decimal import Decimal
+from pos_app.utils.money import (
+    to_decimal, to_paisa, from_paisa, money, money_sum, money_mul, money_eq, money_is_zero, money_gt,
+    cost, cost_mul
+)
+from pos_app.models.database import Sale, BankAccount, Product, StockMovement
+
+
+@pytest.mark.unit
+class TestMoneyHelpers:
+    """Test integer-paisa arithmetic helpers"""
+
+    def test_rounding_is_half_up(self):
+        assert to_paisa(1.005) == 101
+        assert to_paisa(2.675) == 268
+        assert to_paisa(-1.005) == -101
+        assert to_decimal('10.125') == Decimal('10.13')
+
+    def test_invalid_values_are_zero(self):
+        assert to_paisa(None) == 0
+        assert to_paisa('') == 0
+        assert to_paisa('abc') == 0
+        assert to_paisa(float('nan')) == 0
+
+    def test_sum_has_no_drift(self):
+        values = [0.1] * 1000
+        assert sum(values) != 100.0
+        assert money_sum(values) == 100.0
+        assert money_sum([0.1, 0.2]) == 0.3
+
+    def test_multiply_and_compare(self):
+        assert money_mul(33.33, 3) == 99.99
+        assert money_mul(100, 0.175) == 17.5
+        assert from_paisa(12345) == 123.45
+        assert money(19.999) == 20.0
+        assert money_eq(0.1 + 0.2, 0.3)
+        assert money_is_zero(1e-9)
+        assert money_gt(0.01, 0)
+        assert not money_gt(0.004, 0)
+
+
+@pytest.mark.unit
+class TestMoneyColumns:
+    """Test Money columns through the ORM"""
+
+    def test_money_column_rounds_on_store(self, db_session):
+        acct = BankAccount(name="Till", account_number="1", bank_name="Cash", current_balance=10.004)
+        db_session.add(acct)
+        db_session.commit()
+        db_session.expire(acct)
+        assert acct.current_balance == 10.0
+        assert isinstance(acct.current_balance, float)
+
+    def test_sale_totals_are_exact(self, business_controller, sample_product, db_session):
+        sample_product.retail_stock = 10
+        db_session.commit()
+        items = [{'product_id': sample_product.id, 'quantity': 3, 'unit_price': 33.33}]
+        sale = business_controller.create_sale(None, items)
+        db_session.expire(sale)
+        assert sale.subtotal == 99.99
+        assert sale.total_amount == 99.99
+        assert sale.paid_amount == 99.99
+        assert sale.items[0].total == 99.99
+
+    def test_cost_column_keeps_four_places(self, db_session, sample_product):
+        assert cost(10.123456) == 10.1235 and cost_mul(10.1235, 3) == 30.37
+        sample_product.purchase_price = 10.123456
+        db_session.commit()
+        db_session.expire(sample_product)
+        assert sample_product.purchase_price == 10.1235
+
+    def test_weighted_average_cost_does_not_drift(self, business_controller, sample_product, sample_supplier,
+                                                  db_session):
+        sample_product.warehouse_stock, sample_product.retail_stock, sample_product.stock_level = 3, 0, 3
+        sample_product.purchase_price = 10.0
+        db_session.commit()
+        # 3 at 10 + 4 at 11 = 74 / 7 = 10.571428...
+        purchase = business_controller.create_purchase(sample_supplier.id, [
+            {'product_id': sample_product.id, 'quantity': 4, 'unit_cost': 11.0}])
+        business_controller.receive_purchase(purchase.id)
+        db_session.expire_all()
+        product = db_session.get(Product, sample_product.id)
+        assert product.purchase_price == 10.5714
+        movement = db_session.query(StockMovement).filter(StockMovement.product_id == product.id) \
+            .order_by(StockMovement.id.desc()).first()
+        assert movement.unit_cost == 10.5714
@@ -0,0 +1,131 @@
+"""
+Unit tests for the pricing engine (pos_app.utils.pricing)
+
+Tests cover:
+- Settings tax rate read once until invalidated
+- Retail/wholesale repricing from the compiled table
+- Whole-cart pricing with product/customer discounts, chosen promotions and tax
+- Rebuilding the rules when sync markers move
+- Checkout recording the same totals (and line totals) the sales screen prices
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from pos_app.models.database import Discount, mark_sync_changed
+from pos_app.utils.cart import Cart
+from pos_app.utils.pricing import PricingEngine
+
+
+def _engine(rate=0.0, calls=None, clock=None):
+    def settings_rate():
+        if calls is not None:
+            calls.append(1)
+        return rate
+    return PricingEngine(settings_tax_rate=settings_rate, clock=clock or (lambda: 0.0))
+
+
+@pytest.mark.unit
+class TestPricingEngine:
+    """Test compiled pricing rules"""
+
+    def test_tax_rate_cached_until_invalidated(self):
+        calls = []
+        engine = _engine(16.0, calls)
+        assert engine.tax_rate() == 16.0 and engine.tax_rate() == 16.0
+        assert len(calls) == 1
+        engine.invalidate()
+        engine.tax_rate()
+        assert len(calls) == 2
+
+    def test_reprice_retail_wholesale(self, db_session, sample_product):
+        engine = _engine()
+        cart = Cart([{'id': sample_product.id, 'price': 100.0, 'purchase_price': 50.0, 'quantity': 2},
+                     {'id': None, 'price': 9.0, 'quantity': 1}])
+        assert engine.reprice(cart, wholesale=True, session=db_session) == 1
+        assert cart[0]['price'] == 75.0 and cart[1]['price'] == 9.0
+        assert cart.subtotal == 159.0
+        assert engine.reprice(cart, wholesale=False, session=db_session) == 1
+        assert cart[0]['price'] == 100.0
+
+    def test_price_cart_plain_matches_sale_math(self, db_session, sample_product):
+        engine = _engine(10.0)
+        lines = [{'id': sample_product.id, 'price': 100.0, 'quantity': 3}]
+        priced = engine.price_cart(lines, manual_discount=50, session=db_session)
+        assert (priced.subtotal, priced.cart_discount, priced.tax, priced.total) == (300.0, 50.0, 25.0, 275.0)
+        assert priced.lines[0].total == 275.0
+
+        wholesale = engine.price_cart(lines, wholesale=True, session=db_session)
+        assert wholesale.subtotal == 225.0 and wholesale.lines[0].unit_price == 75.0
+
+    def test_price_cart_applies_discount_rules(self, db_session, sample_product, sample_customer):
+        sample_product.discount_percentage = 10.0
+        sample_product.tax_rate = 5.0
+        sample_customer.discount_percentage = 20.0
+        promo = Discount(name="Big basket", discount_type="FIXED_AMOUNT", discount_value=30.0,
+                         min_amount=100.0, is_active=True, start_date=datetime.now() - timedelta(days=1))
+        db_session.add(promo)
+        db_session.commit()
+        engine = _engine(10.0)
+        lines = [{'id': sample_product.id, 'price': 100.0, 'quantity': 2}]
+
+        # Promotions are never applied unless picked
+        unasked = engine.price_cart(lines, session=db_session)
+        assert (unasked.line_discount, unasked.cart_discount, unasked.total) == (20.0, 0.0, 189.0)
+
+        walk_in = engine.price_cart(lines, promotion_id=promo.id, session=db_session)
+        # 200 - 10% = 180, promotion 30 -> 150, product tax 5% -> 7.50
+        assert (walk_in.line_discount, walk_in.cart_discount, walk_in.tax, walk_in.total) == (20.0, 30.0, 7.5, 157.5)
+
+        member = engine.price_cart(lines, customer_id=sample_customer.id, manual_discount=50,
+                                   promotion_id=promo.id, session=db_session)
+        # Customer 20% beats product 10%; manual 50 beats the promotion
+        assert (member.line_discount, member.cart_discount, member.total) == (40.0, 50.0, 115.5)
+
+        plain = engine.price_cart(lines, customer_id=sample_customer.id, apply_rules=False, promotion_id=promo.id,
+                                  session=db_session)
+        assert plain.discount == 0.0 and plain.total == 210.0
+
+    def test_rules_rebuilt_on_sync_marker(self, db_session, sample_product):
+        clock = [0.0]
+        engine = _engine(clock=lambda: clock[0])
+        first = engine.rules(db_session)
+        assert engine.rules(db_session) is first
+
+        sample_product.retail_price = 120.0
+        mark_sync_changed(db_session, 'products')
+        db_session.commit()
+        clock[0] = 1.0
+        assert engine.rules(db_session) is first  # within the check interval
+        clock[0] = 10.0
+        rules = engine.rules(db_session)
+        assert rules is not first and rules.products[sample_product.id].retail == 12000
+
+    def test_checkout_matches_screen_pricing(self, db_session, monkeypatch, business_controller,
+                                             sample_product, sample_customer):
+        sample_product.retail_stock = 10
+        sample_product.discount_percentage = 10.0
+        sample_customer.discount_percentage = 20.0
+        db_session.commit()
+        engine = _engine(10.0)
+        monkeypatch.setattr('pos_app.utils.pricing._engine', engine)
+
+        cart = Cart([{'id': sample_product.id, 'price': 100.0, 'purchase_price': 50.0, 'quantity': 2}])
+        screen = engine.price_cart(cart.pricing_lines(), customer_id=sample_customer.id, manual_discount=5,
+                                   session=db_session)
+        sale = business_controller.create_sale(sample_customer.id, [
+            {'product_id': sample_product.id, 'quantity': 2, 'unit_price': 100.0}], discount_amount=5)
+        # 200 - 20% customer discount = 160, manual 5 -> 155, tax 10% -> 15.50
+        assert (sale.subtotal, sale.discount_amount, sale.tax_amount, sale.total_amount) == \
+            (screen.subtotal, screen.discount, screen.tax, screen.total) == (200.0, 45.0, 15.5, 170.5)
+        # Lines carry their discount and add up to the sale total
+        assert [(i.discount, i.total) for i in sale.items] == [(45.0, 170.5)]
+
+        # Refunds are priced at the refunded line value, without discount rules
+        refund_cart = Cart([{'id': sample_product.id, 'price': 100.0, 'refund_unit_subtotal': 77.5, 'quantity': 1}],
+                           refund_mode=True)
+        assert refund_cart.pricing_lines() == [{'id': sample_product.id, 'quantity': 1.0, 'price': 77.5}]
+        refund = business_controller.create_sale(sample_customer.id, [
+            {'product_id': sample_product.id, 'quantity': 1, 'unit_price': 77.5}],
+            is_refund=True, refund_of_sale_id=sale.id)
+        assert (refund.subtotal, refund.tax_amount, refund.total_amount) == (-77.5, -7.75, -85.25)
@@ -0,0 +1,155 @@
+"""
+Unit tests for utils/receipt_spooler.py and utils/printer_transport.py
+
+Tests cover:
+- ESC/POS rendering from receipt data, including the business header
+- Transport selection from target URIs
+- Background delivery to a file and to a local TCP socket
+- Retry and failure reporting
+"""
+
+import socket
+import threading
+import pytest
+from pos_app.utils.printer_transport import (
+    create_transport, FileTransport, SocketTransport, SerialTransport, PrinterTransportError
+)
+from pos_app.utils.receipt_spooler import (
+    EscPosReceiptTemplate, ReceiptSpooler, configured_business_info, ESC_INIT, ESC_FEED_CUT, ESC_OPEN_DRAWER
+)
+
+
+RECEIPT = {
+    'business_info': {'name': 'Test Shop', 'address': 'Main Road'},
+    'invoice_number': 'INV-0001',
+    'items': [
+        {'name': 'Widget', 'quantity': 2, 'price': 50.0},
+        {'name': 'Gadget', 'quantity': 1, 'price': 25.5, 'total': 25.5},
+    ],
+    'subtotal': 125.5,
+    'final_total': 125.5,
+    'amount_paid': 200.0,
+}
+
+
+@pytest.mark.unit
+class TestEscPosTemplate:
+    """Test ESC/POS receipt rendering"""
+
+    def test_render_contains_lines_and_totals(self):
+        data = EscPosReceiptTemplate('Test Shop', 'Main Road').render(RECEIPT)
+        assert data.startswith(ESC_INIT)
+        assert data.endswith(ESC_FEED_CUT)
+        assert b'Test Shop' in data
+        assert b'INV-0001' in data
+        assert b'Widget' in data and b'100.00' in data
+        assert b'125.50' in data
+        assert b'74.50' in data  # change
+
+    def test_lines_fit_width_and_drawer_kick(self):
+        tpl = EscPosReceiptTemplate('Shop', width=32, open_drawer=True)
+        data = tpl.render({'items': [{'name': 'X' * 80, 'quantity': 1, 'price': 1.0}]})
+        assert ESC_OPEN_DRAWER in data
+        body = data[len(tpl._header):]
+        for line in body.split(b'\n'):
+            printable = bytes(b for b in line if b >= 0x20)
+            assert len(printable) <= 32 + 4  # allow for inline command bytes
+
+    def test_business_header(self, tmp_path):
+        out = tmp_path / 'receipt.bin'
+        spooler = ReceiptSpooler()
+        data = dict(RECEIPT, business_info=configured_business_info(
+            {'name': 'Test Shop', 'address': 'Main Road', 'phone': '0300-1234567'}))
+        assert spooler.submit_receipt(data, f"file://{out}").wait(5)
+        header = out.read_bytes().split(b'INV-0001')[0]
+        assert b'Test Shop' in header and b'Main Road' in header and b'Tel: 0300-1234567' in header
+        spooler.shutdown()
+
+    def test_templates_are_cached(self):
+        spooler = ReceiptSpooler()
+        assert spooler.template_for('A', width=42) is spooler.template_for('A', width=42)
+        assert spooler.template_for('A', width=42) is not spooler.template_for('A', width=32)
+
+
+@pytest.mark.unit
+class TestPrinterTransport:
+    """Test target URI parsing"""
+
+    def test_create_transport(self, tmp_path):
+        assert isinstance(create_transport('tcp://10.0.0.5:9100'), SocketTransport)
+        assert create_transport('tcp://10.0.0.5').port == 9100
+        serial_t = create_transport('serial://COM3?baud=19200')
+        assert isinstance(serial_t, SerialTransport)
+        assert serial_t.port == 'COM3' and serial_t.baudrate == 19200
+        assert isinstance(create_transport(str(tmp_path / 'out.bin')), FileTransport)
+        with pytest.raises(PrinterTransportError):
+            create_transport('')
+        with pytest.raises(PrinterTransportError):
+            create_transport('ftp://printer')
+
+
+@pytest.mark.unit
+class TestReceiptSpooler:
+    """Test background printing"""
+
+    def test_prints_to_file(self, tmp_path):
+        out = tmp_path / 'receipt.bin'
+        spooler = ReceiptSpooler()
+        try:
+            job = spooler.submit_receipt(RECEIPT, f"file://{out}")
+            assert job.wait(5)
+            assert out.read_bytes().startswith(ESC_INIT)
+        finally:
+            spooler.shutdown()
+
+    def test_prints_to_socket(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        received = []
+
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                chunks = []
+                while True:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                received.append(b''.join(chunks))
+
+        t = threading.Thread(target=serve, daemon=True)
+        t.start()
+        spooler = ReceiptSpooler()
+        try:
+            job = spooler.submit(b'hello printer', f"tcp://127.0.0.1:{port}")
+            assert job.wait(5)
+            t.join(5)
+            assert received == [b'hello printer']
+        finally:
+            spooler.shutdown()
+            server.close()
+
+    def test_retries_then_fails(self):
+        calls = []
+        statuses = []
+
+        class Broken:
+            def send(self, data):
+                calls.append(len(data))
+                raise PrinterTransportError("offline")
+
+        spooler = ReceiptSpooler(transport_factory=lambda target: Broken(), retry_delay=0.01,
+                                 max_attempts=3, on_status=lambda job: statuses.append(job.status))
+        try:
+            job = spooler.submit(b'x', 'tcp://nowhere')
+            assert job.wait(5) is False
+            assert job.status == 'FAILED'
+            assert job.attempts == 3
+            assert len(calls) == 3
+            assert 'RETRYING' in statuses and statuses[-1] == 'FAILED'
+            assert spooler.wait_idle(1)
+        finally:
+            spooler.shutdown()
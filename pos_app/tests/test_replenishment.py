@@ -0,0 +1,96 @@
+"""
+Unit tests for the replenishment engine (pos_app.controllers.replenishment)
+
+Tests cover:
+- Sales velocity (refunds netted) and days of cover
+- Suggested quantity from reorder level / velocity, capped by max_stock
+- Open purchase quantities counted as on order
+- One purchase order per supplier created in a single batch
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from pos_app.controllers.replenishment import ReplenishmentEngine
+from pos_app.models.database import Product, Purchase, PurchaseItem, Sale, SaleItem
+
+NOW = datetime(2026, 10, 19, 12)
+
+
+def _product(session, sku, stock, reorder=10, supplier=None, max_stock=None):
+    product = Product(name=f"Item {sku}", sku=sku, barcode=f"BC-{sku}", retail_price=20.0,
+                      wholesale_price=15.0, purchase_price=8.0, stock_level=stock, retail_stock=stock,
+                      warehouse_stock=0, reorder_level=reorder, max_stock=max_stock,
+                      supplier_id=supplier.id if supplier else None, is_active=True)
+    session.add(product)
+    session.flush()
+    return product
+
+
+def _sell(session, product, qty, days_ago, refund=False):
+    sale = Sale(subtotal=qty * 20.0, total_amount=qty * 20.0, sale_date=NOW - timedelta(days=days_ago),
+                status='COMPLETED', is_refund=refund)
+    session.add(sale)
+    session.flush()
+    session.add(SaleItem(sale_id=sale.id, product_id=product.id, quantity=qty, unit_price=20.0, total=qty * 20.0))
+
+
+@pytest.fixture
+def catalogue(db_session, sample_supplier):
+    fast = _product(db_session, 'FAST', 10, supplier=sample_supplier, max_stock=50)
+    slow = _product(db_session, 'SLOW', 5, supplier=sample_supplier)
+    orphan = _product(db_session, 'ORPHAN', 0, reorder=3)
+    full = _product(db_session, 'FULL', 100, supplier=sample_supplier)
+    ordered = _product(db_session, 'ORDERED', 2, supplier=sample_supplier)
+    _sell(db_session, fast, 40, 3)
+    _sell(db_session, fast, 30, 20)
+    _sell(db_session, fast, 10, 2, refund=True)
+    _sell(db_session, fast, 500, 45)  # outside the window
+    po = Purchase(supplier_id=sample_supplier.id, purchase_number='PO-OPEN', total_amount=80.0, status='ORDERED')
+    db_session.add(po)
+    db_session.flush()
+    db_session.add(PurchaseItem(purchase_id=po.id, product_id=ordered.id, quantity=10, received_quantity=2,
+                                unit_cost=8.0, total_cost=80.0))
+    db_session.commit()
+    return {'fast': fast, 'slow': slow, 'orphan': orphan, 'full': full, 'ordered': ordered}
+
+
+@pytest.mark.unit
+class TestReplenishmentEngine:
+    """Test set-based reorder suggestions"""
+
+    def test_velocity_and_cover(self, db_session, catalogue):
+        rows = {s['sku']: s for s in ReplenishmentEngine(db_session).suggestions(as_of=NOW, include_all=True)}
+        fast = rows['FAST']
+        assert fast['sold'] == 60 and fast['daily_velocity'] == 2.0
+        assert fast['days_of_cover'] == 5.0 and fast['reorder_point'] == 14.0
+        assert rows['SLOW']['days_of_cover'] is None
+        assert rows['ORDERED']['on_order'] == 8
+
+    def test_suggested_quantities(self, db_session, catalogue):
+        suggestions = ReplenishmentEngine(db_session).suggestions(as_of=NOW)
+        got = {s['sku']: s['quantity'] for s in suggestions}
+        # FAST: target 2/day * 37 days = 74, minus 10 in stock = 64, capped by max_stock 50 -> 40
+        assert got == {'FAST': 40, 'SLOW': 5, 'ORPHAN': 3}
+
+        longer = {s['sku']: s['quantity'] for s in
+                  ReplenishmentEngine(db_session).suggestions(as_of=NOW, lead_time_days=0, cover_days=10)}
+        assert longer['FAST'] == 10
+
+    def test_group_and_create_purchase_orders(self, db_session, catalogue, sample_supplier):
+        engine = ReplenishmentEngine(db_session)
+        suggestions = engine.suggestions(as_of=NOW)
+        groups = engine.group_by_supplier(suggestions)
+        assert sorted(s['sku'] for s in groups[sample_supplier.id]) == ['FAST', 'SLOW']
+        assert [s['sku'] for s in groups[None]] == ['ORPHAN']
+
+        result = engine.create_purchase_orders(suggestions)
+        assert [s['sku'] for s in result['unassigned']] == ['ORPHAN']
+        assert len(result['purchases']) == 1
+        po = result['purchases'][0]
+        assert po.status == 'ORDERED' and po.total_amount == 360.0
+        items = {i.product_id: i.quantity for i in db_session.query(PurchaseItem).filter(PurchaseItem.purchase_id == po.id)}
+        assert items == {catalogue['fast'].id: 40, catalogue['slow'].id: 5}
+
+        # The new order now counts as on order
+        assert {s['sku'] for s in engine.suggestions(as_of=NOW)} == {'ORPHAN'}
@@ -0,0 +1,105 @@
+"""
+Unit tests for the returns service (pos_app.controllers.returns)
+
+Tests cover:
+- Invoice lookup by exact number and by normalised key
+- Return numbers taken from the inserted row's id
+- Return listing with customer names and item counts
+- Completing a return: batched stock restoration, movements and refund
+- Product picker search over the shared product index
+"""
+
+from datetime import datetime
+
+import pytest
+from pos_app.controllers.returns import ReturnError, ReturnsService
+from pos_app.models.database import Product, ReturnStatus, Sale, StockMovement, invoice_key
+from pos_app.utils.scanner import get_product_index
+
+
+@pytest.fixture
+def second_product(db_session):
+    product = Product(name="Blue Widget", sku="BW-01", barcode="555000", retail_price=40.0, wholesale_price=30.0,
+                      purchase_price=20.0, stock_level=5, retail_stock=3, warehouse_stock=2, is_active=True)
+    db_session.add(product)
+    db_session.commit()
+    return product
+
+
+@pytest.mark.unit
+class TestReturnsService:
+    """Test returns processing"""
+
+    def test_find_sale_by_invoice(self, db_session):
+        for number in ("7", "INV-0042", "A-X"):
+            db_session.add(Sale(invoice_number=number, subtotal=10.0, total_amount=10.0))
+        db_session.commit()
+        service = ReturnsService(db_session)
+
+        assert invoice_key("INV-0042") == "42" and invoice_key(" a-x ") == "A-X" and invoice_key("") is None
+        assert service.find_sale("INV-0042").invoice_number == "INV-0042"
+        assert service.find_sale("42").invoice_number == "INV-0042"
+        assert service.find_sale("0007").invoice_number == "7"
+        assert service.find_sale("INV-7").invoice_number == "7"
+        assert service.find_sale("a-x").invoice_number == "A-X"
+        # Trailing digits must match exactly, not as a suffix
+        assert service.find_sale("2") is None
+
+    def test_create_and_list_returns(self, db_session, sample_customer, sample_product, second_product):
+        service = ReturnsService(db_session)
+        first = service.create_return(sample_customer.id, [
+            {'product_id': sample_product.id, 'quantity': 2, 'unit_price': 100.0},
+            {'product_id': second_product.id, 'quantity': 1, 'unit_price': 40.0},
+            {'product_id': None, 'quantity': 1, 'unit_price': 5.0},
+        ], reason="Damaged")
+        assert first.return_number == "RET-000001" and first.refund_amount == 240.0
+        service.create_return(sample_customer.id, [{'product_id': sample_product.id, 'quantity': 1, 'unit_price': 100.0}])
+        with pytest.raises(ReturnError):
+            service.create_return(sample_customer.id, [])
+
+        rows = service.list_returns()
+        assert [(r['return_number'], r['items_count'], r['customer_name']) for r in rows] == [
+            ("RET-000002", 1, sample_customer.name), ("RET-000001", 2, sample_customer.name)]
+        assert service.list_returns(status='COMPLETED') == []
+        assert len(service.list_returns(start=datetime(2000, 1, 1), status='PENDING', limit=1)) == 1
+
+        # Uncommitted returns are numbered as soon as the row is flushed
+        pending = service.create_return(sample_customer.id, [
+            {'product_id': second_product.id, 'quantity': 1, 'unit_price': 40.0}], commit=False)
+        assert pending.id == 3 and pending.return_number == "RET-000003"
+        db_session.rollback()
+
+    def test_complete_return_restores_stock_in_bulk(self, db_session, sample_customer, sample_product, second_product):
+        sample_product.retail_stock, sample_product.warehouse_stock = 6, 4
+        db_session.commit()
+        service = ReturnsService(db_session)
+        ret = service.create_return(sample_customer.id, [
+            {'product_id': sample_product.id, 'quantity': 2, 'unit_price': 100.0},
+            {'product_id': sample_product.id, 'quantity': 1, 'unit_price': 100.0},
+            {'product_id': second_product.id, 'quantity': 4, 'unit_price': 40.0},
+        ])
+
+        done = service.complete_return(ret.id, 'CASH', notes="Refunded")
+        assert done.status == ReturnStatus.COMPLETED and done.refund_amount == 460.0
+        assert (sample_product.retail_stock, sample_product.stock_level) == (9, 13)
+        assert (second_product.retail_stock, second_product.stock_level) == (7, 9)
+        moves = {m.product_id: (m.movement_type, m.quantity, m.location, m.unit_cost)
+                 for m in db_session.query(StockMovement).filter(StockMovement.reference == f"Return {ret.return_number}")}
+        assert moves == {sample_product.id: ('IN', 3, 'RETAIL', 50.0), second_product.id: ('IN', 4, 'RETAIL', 20.0)}
+
+        with pytest.raises(ReturnError):
+            service.complete_return(ret.id)
+        db_session.expire_all()
+        assert db_session.get(Product, sample_product.id).retail_stock == 9
+
+    def test_product_picker_search(self, db_session, sample_product, second_product):
+        index = get_product_index(db_session)
+        assert get_product_index(db_session) is index
+        assert [p.name for p in index.search("widget")] == ["Blue Widget"]
+        assert [p.id for p in index.search("BW")] == [second_product.id]
+        assert index.search("555000")[0].id == second_product.id
+        second_product.is_active = False
+        db_session.commit()
+        index.load()
+        assert index.search("widget") == []
+        assert len(index.search("", limit=1)) == 1
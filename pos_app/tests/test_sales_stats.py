@@ -0,0 +1,159 @@
+"""
+Unit tests for the sales statistics store (pos_app.utils.sales_stats)
+
+Tests cover:
+- Counters updated on flush for sales, refunds and deletions
+- Updated sales and lines moving their counters, deletes of expired rows
+- Rolled-back sales leave no counters
+- Top-K products and customers answered from the daily aggregates
+- Payment method preferences per customer
+- Rebuilding the counters from sale rows
+"""
+
+from datetime import date, datetime
+
+import pytest
+from pos_app.models.database import CustomerDailyStat, ProductDailyStat, Sale, SaleItem
+from pos_app.utils.sales_stats import SalesStats, rebuild_stats
+
+DAY = datetime(2026, 10, 1, 10)
+
+
+def _sale(session, items, when=DAY, customer=None, method='CASH', refund=False):
+    total = sum(qty * price for _, qty, price in items)
+    sale = Sale(subtotal=total, total_amount=total, sale_date=when, customer_id=customer.id if customer else None,
+                payment_method=method, is_refund=refund, status='COMPLETED')
+    sale.items = [SaleItem(product_id=p.id, quantity=qty, unit_price=price, total=qty * price) for p, qty, price in items]
+    session.add(sale)
+    session.commit()
+    return sale
+
+
+@pytest.fixture
+def second_product(db_session, sample_product):
+    from pos_app.models.database import Product
+    product = Product(name="Second Product", sku="TEST-SKU-002", barcode="222", retail_price=10.0,
+                      wholesale_price=8.0, purchase_price=5.0, stock_level=10)
+    db_session.add(product)
+    db_session.commit()
+    return product
+
+
+@pytest.mark.unit
+class TestSalesStats:
+    """Test incrementally maintained product/customer counters"""
+
+    def test_counters_follow_sales_refunds_and_deletes(self, db_session, sample_product, sample_customer):
+        _sale(db_session, [(sample_product, 3, 100.0)], customer=sample_customer)
+        second = _sale(db_session, [(sample_product, 2, 100.0)], when=DAY.replace(hour=15), customer=sample_customer)
+        _sale(db_session, [(sample_product, 1, 100.0)], customer=sample_customer, refund=True)
+
+        stat = db_session.query(ProductDailyStat).one()
+        assert (stat.day, stat.quantity, stat.revenue, stat.refund_quantity, stat.sale_count) == (
+            date(2026, 10, 1), 5.0, 500.0, 1.0, 2)
+        cust = db_session.query(CustomerDailyStat).one()
+        assert (cust.revenue, cust.refund_amount, cust.sale_count, cust.refund_count) == (500.0, 100.0, 2, 1)
+        assert cust.last_sale_at == DAY.replace(hour=15)
+
+        db_session.delete(second)
+        db_session.commit()
+        db_session.expire_all()
+        assert db_session.query(ProductDailyStat.quantity, ProductDailyStat.sale_count).one() == (3.0, 1)
+        assert db_session.query(CustomerDailyStat.revenue).scalar() == 300.0
+
+    def test_rolled_back_sale_leaves_no_counters(self, db_session, sample_product):
+        db_session.begin_nested()
+        sale = Sale(subtotal=100.0, total_amount=100.0, sale_date=DAY)
+        sale.items = [SaleItem(product_id=sample_product.id, quantity=1, unit_price=100.0, total=100.0)]
+        db_session.add(sale)
+        db_session.flush()
+        assert db_session.query(ProductDailyStat).count() == 1
+        db_session.rollback()
+        assert db_session.query(ProductDailyStat).count() == 0
+
+    def test_top_products(self, db_session, sample_product, second_product):
+        _sale(db_session, [(sample_product, 2, 100.0), (second_product, 5, 10.0)])
+        _sale(db_session, [(second_product, 4, 10.0)], when=datetime(2026, 10, 3, 9))
+        _sale(db_session, [(sample_product, 9, 100.0)], when=datetime(2026, 9, 1, 9))
+        stats = SalesStats(db_session)
+
+        top = stats.top_products(datetime(2026, 10, 1), datetime(2026, 10, 31, 23, 59))
+        assert [(r['name'], r['quantity']) for r in top] == [("Second Product", 9.0), ("Test Product", 2.0)]
+        by_revenue = stats.top_products(datetime(2026, 10, 1), None, limit=1, by='revenue')
+        assert by_revenue[0]['name'] == "Test Product" and by_revenue[0]['revenue'] == 200.0
+        least = stats.top_products(datetime(2026, 10, 1), datetime(2026, 10, 31), limit=1, ascending=True)
+        assert least[0]['name'] == "Test Product"
+        # Exclusive end at midnight leaves out the 3rd
+        assert stats.top_products(DAY, datetime(2026, 10, 3), end_exclusive=True)[0]['quantity'] == 5.0
+        assert stats.product_totals(datetime(2026, 10, 1))['quantity'] == 11.0
+
+    def test_top_customers_and_payment_preferences(self, db_session, sample_product, sample_customer):
+        _sale(db_session, [(sample_product, 1, 100.0)], customer=sample_customer, method='CASH')
+        _sale(db_session, [(sample_product, 2, 100.0)], customer=sample_customer, method='CARD')
+        _sale(db_session, [(sample_product, 1, 100.0)], customer=sample_customer, method='CARD')
+        stats = SalesStats(db_session)
+
+        top = stats.top_customers(datetime(2026, 10, 1), datetime(2026, 10, 2))
+        assert len(top) == 1
+        assert (top[0]['name'], top[0]['revenue'], top[0]['transactions'], top[0]['avg_order']) == (
+            sample_customer.name, 400.0, 3, 400.0 / 3)
+        assert stats.active_customers(datetime(2026, 10, 1)) == 1
+
+        prefs = stats.payment_preferences(date(2026, 10, 1), date(2026, 10, 2), end_exclusive=True)
+        assert prefs[sample_customer.id]['methods'] == {'CASH': 1, 'CARD': 2}
+        assert prefs[sample_customer.id]['total_spent'] == 400.0
+
+    def test_rebuild_matches_incremental(self, db_session, sample_product, second_product, sample_customer):
+        _sale(db_session, [(sample_product, 2, 100.0), (second_product, 5, 10.0)], customer=sample_customer)
+        _sale(db_session, [(second_product, 1, 10.0)], customer=sample_customer, refund=True)
+        _sale(db_session, [(second_product, 4, 10.0)], when=datetime(2026, 10, 3, 9))
+
+        def snapshot():
+            db_session.expire_all()
+            products = sorted((str(s.day), s.product_id, s.quantity, s.revenue, s.refund_quantity, s.refund_amount,
+                               s.sale_count) for s in db_session.query(ProductDailyStat))
+            customers = sorted((str(s.day), s.customer_id, s.payment_method, s.revenue, s.refund_amount,
+                                s.sale_count, s.refund_count) for s in db_session.query(CustomerDailyStat))
+            return products, customers
+
+        incremental = snapshot()
+        assert rebuild_stats(db_session.connection()) == {'products': 3, 'customers': 1}
+        assert snapshot() == incremental
+        rebuild_stats(db_session.connection(), start=date(2026, 10, 3), end=date(2026, 10, 3))
+        assert snapshot() == incremental
+
+    def test_updates_move_counters(self, db_session, sample_product, second_product, sample_customer):
+        sale = _sale(db_session, [(sample_product, 2, 100.0), (second_product, 5, 10.0)], customer=sample_customer)
+        other = _sale(db_session, [(second_product, 3, 10.0)], customer=sample_customer)
+        first_id, second_id = sample_product.id, second_product.id
+
+        # Attributes expired by the commit: old values are loaded when they are replaced
+        sale.payment_method = 'CARD'
+        sale.total_amount = 230.0
+        sale.sale_date = datetime(2026, 10, 2, 11)
+        sale.items[0].quantity = 1
+        sale.items[0].total = 100.0
+        db_session.commit()
+        # A line deleted while neither it nor its sale is loaded
+        db_session.expire_all()
+        item_id = other.items[0].id
+        db_session.expunge_all()
+        db_session.delete(db_session.get(SaleItem, item_id))
+        db_session.commit()
+
+        def counters():
+            db_session.expire_all()
+            products = sorted((str(s.day), s.product_id, s.quantity, s.revenue, s.sale_count)
+                              for s in db_session.query(ProductDailyStat) if s.sale_count or s.refund_quantity)
+            customers = sorted((str(s.day), s.payment_method, s.revenue, s.sale_count)
+                               for s in db_session.query(CustomerDailyStat) if s.sale_count or s.refund_count)
+            return products, customers
+
+        incremental = counters()
+        assert incremental == (
+            [('2026-10-02', first_id, 1.0, 100.0, 1), ('2026-10-02', second_id, 5.0, 50.0, 1)],
+            [('2026-10-01', 'CASH', 30.0, 1), ('2026-10-02', 'CARD', 230.0, 1)])
+        assert db_session.query(ProductDailyStat.quantity).filter(
+            ProductDailyStat.day == date(2026, 10, 1), ProductDailyStat.product_id == second_id).scalar() == 0
+        rebuild_stats(db_session.connection())
+        assert counters() == incremental
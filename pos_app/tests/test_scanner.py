@@ -0,0 +1,152 @@
+"""
+Unit tests for the barcode scanner pipeline (pos_app.utils.scanner)
+
+Tests cover:
+- Telling scanner bursts from typing by inter-key timing
+- Dispatching codes through the product index into the cart
+- Deactivated products never resolving from a scan
+- Index refresh when sync markers move
+- Replaying recorded scan streams
+"""
+
+import pytest
+from pos_app.models.database import Product, mark_sync_changed
+from pos_app.utils.cart import Cart
+from pos_app.utils.scanner import (
+    ScanBurstDetector, ScanDispatcher, ScannerPipeline, ProductIndex,
+    load_scan_recording, save_scan_recording, replay_scan_stream
+)
+
+
+def _feed(detector, text, start, gap):
+    ts = start
+    for ch in text:
+        detector.key(ch, ts)
+        ts += gap
+    return ts - gap
+
+
+def _stream(text, start, gap, enter_gap=0.01):
+    events = [{'t': start + i * gap, 'k': ch} for i, ch in enumerate(text)]
+    events.append({'t': events[-1]['t'] + enter_gap, 'k': '\n'})
+    return events
+
+
+@pytest.mark.unit
+class TestScanBurstDetector:
+    """Test burst detection"""
+
+    def test_burst_vs_typing(self):
+        detector = ScanBurstDetector()
+        last = _feed(detector, "1234567890", 10.0, 0.005)
+        scanned = detector.enter(last + 0.01)
+        assert scanned.code == "1234567890" and scanned.burst
+
+        last = _feed(detector, "1234", 20.0, 0.15)
+        scanned = detector.enter(last + 0.2)
+        assert scanned.code == "1234" and not scanned.burst
+        assert detector.enter(30.0) is None
+
+    def test_typed_prefix_then_burst(self):
+        detector = ScanBurstDetector()
+        last = _feed(detector, "ab", 5.0, 0.2)
+        last = _feed(detector, "99887766", last + 0.2, 0.004)
+        scanned = detector.enter(last + 0.02)
+        assert scanned.burst and scanned.code == "99887766"
+
+        # Enter long after a fast run is not a scanner terminator
+        last = _feed(detector, "99887766", 40.0, 0.004)
+        assert not detector.enter(last + 0.3).burst
+
+
+@pytest.mark.unit
+class TestScanDispatcher:
+    """Test dispatching into the cart"""
+
+    def test_scan_adds_and_increments(self, db_session, sample_product):
+        cart = Cart()
+        pipeline = ScannerPipeline(ScanBurstDetector(), ScanDispatcher(ProductIndex(db_session), cart))
+        for start in (1.0, 2.0):
+            last = _feed(pipeline.detector, "1234567890", start, 0.003)
+            result = pipeline.enter(last + 0.01)
+            assert result.ok and result.row == 0
+        assert len(cart) == 1 and cart[0]['quantity'] == 2
+        assert cart[0]['price'] == 100.0 and cart.subtotal == 200.0
+        assert cart.find(sample_product.id) == 0
+
+        wholesale = ScanDispatcher(ProductIndex(db_session), Cart(), wholesale=lambda: True)
+        assert wholesale.dispatch(_scanned("TEST-SKU-001")).ok
+        assert wholesale.cart[0]['price'] == 75.0
+
+    def test_not_found_and_out_of_stock(self, db_session, sample_product):
+        sample_product.stock_level = 1
+        db_session.commit()
+        dispatcher = ScanDispatcher(ProductIndex(db_session), Cart())
+        assert dispatcher.dispatch(_scanned("0000")).status == 'not_found'
+        assert dispatcher.dispatch(_scanned("1234567890")).ok
+        result = dispatcher.dispatch(_scanned("1234567890"))
+        assert result.status == 'out_of_stock' and not result.ok
+        assert dispatcher.cart[0]['quantity'] == 1
+        assert dispatcher.latency_summary()['scans'] == 3
+
+    def test_inactive_products_not_scanned(self, db_session, sample_product, sample_supplier):
+        index = ProductIndex(db_session)
+        dispatcher = ScanDispatcher(index, Cart())
+        assert dispatcher.dispatch(_scanned("1234567890")).ok
+
+        # Added after the index loaded: the unindexed-code fallback skips it
+        db_session.add(Product(name="Retired", sku="OLD-1", barcode="777000111", retail_price=5.0,
+                               wholesale_price=4.0, purchase_price=2.0, stock_level=4, is_active=False,
+                               supplier_id=sample_supplier.id))
+        sample_product.is_active = False
+        db_session.commit()
+        assert dispatcher.dispatch(_scanned("777000111")).status == 'not_found'
+
+        # Deactivated products are indexed (for the picker) but never scanned
+        fresh = ProductIndex(db_session)
+        assert fresh.lookup("1234567890") is None and fresh.lookup("TEST-SKU-001") is None
+        assert [snap.name for snap in fresh.search("", active_only=False)] == ["Retired", "Test Product"]
+        assert len(dispatcher.cart) == 1
+
+    def test_index_refreshes_on_sync_markers(self, db_session, sample_product, sample_supplier):
+        clock = [0.0]
+        index = ProductIndex(db_session, check_interval=1.0, clock=lambda: clock[0])
+        assert index.lookup("1234567890").stock_level == 10
+
+        sample_product.stock_level = 3
+        mark_sync_changed(db_session, 'stock')
+        db_session.add(Product(name="New", sku="NEW-1", barcode="555000111", retail_price=5.0, wholesale_price=4.0,
+                               purchase_price=2.0, stock_level=4, supplier_id=sample_supplier.id))
+        db_session.commit()
+        # Within the check interval the cached snapshot is used; unknown codes hit the DB
+        assert index.lookup("1234567890").stock_level == 10
+        assert index.lookup("555000111").name == "New"
+
+        clock[0] = 5.0
+        assert index.lookup("1234567890").stock_level == 3
+
+
+def _scanned(code):
+    detector = ScanBurstDetector()
+    last = _feed(detector, code, 0.0, 0.002)
+    return detector.enter(last + 0.01)
+
+
+@pytest.mark.unit
+class TestScanReplay:
+    """Test the replay harness"""
+
+    def test_replay_recorded_stream(self, db_session, sample_product, tmp_path):
+        events = _stream("1234567890", 1.0, 0.004) + _stream("hello", 3.0, 0.2) + _stream("1234567890", 6.0, 0.004)
+        path = str(tmp_path / "scans.json")
+        save_scan_recording(events, path)
+        loaded = load_scan_recording(path)
+        assert len(loaded) == len(events)
+
+        cart = Cart()
+        pipeline = ScannerPipeline(ScanBurstDetector(), ScanDispatcher(ProductIndex(db_session), cart))
+        report = replay_scan_stream(loaded, pipeline)
+        assert [r.status for r in report['results']] == ['added', 'added']
+        assert report['typed'] == ['hello']
+        assert cart[0]['quantity'] == 2
+        assert report['latency']['scans'] == 2 and report['latency']['max_ms'] >= report['latency']['p50_ms']
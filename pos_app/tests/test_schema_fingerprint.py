@@ -0,0 +1,161 @@
+"""
+Unit tests for utils/schema_fingerprint.py
+
+Tests cover:
+- Fingerprint stability and sensitivity to model changes
+- Storing the fingerprint in schema_versions
+- StartupValidator skipping introspection when the fingerprint matches
+- Pending migrations applied at startup, invoice keys backfilled by the audit
+"""
+
+import pytest
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, text
+from sqlalchemy.orm import sessionmaker
+from pos_app.database.migration_engine import MigrationRunner
+from pos_app.models.database import Base
+from pos_app.utils import schema_fingerprint
+from pos_app.utils.schema_fingerprint import (
+    compute_schema_fingerprint, store_fingerprint, get_stored_fingerprint, schema_is_current, clear_fingerprint
+)
+from pos_app.utils.startup_validator import StartupValidator
+
+
+@pytest.fixture
+def fresh_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _metadata(extra_column=False):
+    md = MetaData()
+    cols = [Column('id', Integer, primary_key=True), Column('name', String(50))]
+    if extra_column:
+        cols.append(Column('code', String(10)))
+    Table('things', md, *cols)
+    return md
+
+
+@pytest.mark.unit
+class TestSchemaFingerprint:
+    """Test fingerprint computation and storage"""
+
+    def test_fingerprint_is_stable_and_sensitive(self):
+        assert compute_schema_fingerprint(_metadata()) == compute_schema_fingerprint(_metadata())
+        assert compute_schema_fingerprint(_metadata()) != compute_schema_fingerprint(_metadata(True))
+        assert len(compute_schema_fingerprint()) == 64
+
+    def test_store_and_compare(self, fresh_session):
+        assert get_stored_fingerprint(fresh_session) is None
+        assert not schema_is_current(fresh_session)
+        assert store_fingerprint(fresh_session)
+        assert schema_is_current(fresh_session)
+        # Storing again updates the same row
+        assert store_fingerprint(fresh_session)
+        count = fresh_session.execute(text("SELECT COUNT(*) FROM schema_versions")).scalar()
+        assert count == 1
+        clear_fingerprint(fresh_session)
+        assert not schema_is_current(fresh_session)
+
+    def test_adds_column_to_existing_table(self, fresh_session):
+        fresh_session.execute(text(
+            "CREATE TABLE schema_versions (version INTEGER PRIMARY KEY, applied_at TIMESTAMP NOT NULL, description TEXT)"
+        ))
+        fresh_session.execute(text("INSERT INTO schema_versions VALUES (1, CURRENT_TIMESTAMP, 'v1')"))
+        fresh_session.commit()
+        assert store_fingerprint(fresh_session)
+        assert schema_is_current(fresh_session)
+        assert fresh_session.execute(text("SELECT MAX(version) FROM schema_versions")).scalar() == 1
+
+
+@pytest.mark.unit
+class TestStartupValidatorCache:
+    """Test that startup validation is skipped when the schema is unchanged"""
+
+    def test_skips_audit_when_fingerprint_matches(self, fresh_session, monkeypatch):
+        calls = []
+        from pos_app.utils.schema_auditor import SchemaAuditor
+        original = SchemaAuditor.compare_schemas
+
+        def counting(session, models):
+            calls.append(1)
+            return original(session, models)
+
+        monkeypatch.setattr(SchemaAuditor, 'compare_schemas', staticmethod(counting))
+
+        assert StartupValidator.validate_and_fix_schema(fresh_session)
+        assert len(calls) == 1
+        assert schema_is_current(fresh_session)
+
+        assert StartupValidator.validate_and_fix_schema(fresh_session)
+        assert len(calls) == 1
+
+        assert StartupValidator.validate_and_fix_schema(fresh_session, force=True)
+        assert len(calls) == 2
+
+    def test_model_change_triggers_audit(self, fresh_session, monkeypatch):
+        assert StartupValidator.validate_and_fix_schema(fresh_session)
+        monkeypatch.setattr(schema_fingerprint, '_cached_fingerprint', 'f' * 64)
+        assert not schema_is_current(fresh_session)
+        assert StartupValidator.validate_and_fix_schema(fresh_session)
+        assert get_stored_fingerprint(fresh_session) == 'f' * 64
+
+
+MIGRATION = '''"""Add products.legacy_flag"""
+
+
+def migrate(ctx):
+    ctx.add_column('products', 'legacy_flag', 'INTEGER DEFAULT 0')
+'''
+
+
+@pytest.mark.unit
+class TestStartupMigrations:
+    """Test that startup brings old databases up to date without the migrate CLI"""
+
+    def test_applies_pending_migrations(self, tmp_path):
+        (tmp_path / 'v1_legacy_flag.py').write_text(MIGRATION)
+        engine = create_engine("sqlite:///:memory:")
+        session = sessionmaker(bind=engine)()
+        runner = MigrationRunner(engine, migrations_dir=str(tmp_path))
+        try:
+            # Fresh database: the ORM tables are created before the migration alters them
+            assert StartupValidator.apply_pending_migrations(session, runner)
+            columns = [row[1] for row in session.execute(text("PRAGMA table_info(products)"))]
+            assert 'legacy_flag' in columns and 'invoice_key' in [
+                row[1] for row in session.execute(text("PRAGMA table_info(sales)"))]
+            assert runner.pending() == [] and runner.current_version() == 1
+            assert StartupValidator.apply_pending_migrations(session, runner)
+        finally:
+            session.close()
+            engine.dispose()
+
+    def test_application_migrations_on_sqlite(self):
+        engine = create_engine("sqlite:///:memory:")
+        session = sessionmaker(bind=engine)()
+        runner = MigrationRunner(engine)
+        try:
+            assert StartupValidator.apply_pending_migrations(session, runner)
+            assert runner.pending() == []
+            assert session.execute(text("SELECT COUNT(*) FROM keyboard_shortcuts")).scalar() > 0
+            assert session.execute(text("SELECT COUNT(*) FROM bank_accounts")).scalar() == 1
+        finally:
+            session.close()
+            engine.dispose()
+
+    def test_audit_backfills_invoice_keys(self, fresh_session):
+        from pos_app.controllers.returns import ReturnsService
+        fresh_session.execute(text("DROP INDEX ix_sales_invoice_key"))
+        fresh_session.execute(text("ALTER TABLE sales DROP COLUMN invoice_key"))
+        fresh_session.execute(text(
+            "INSERT INTO sales (invoice_number, subtotal, total_amount, sale_date) "
+            "VALUES ('INV-0042', 10, 10, CURRENT_TIMESTAMP)"))
+        fresh_session.commit()
+
+        assert StartupValidator.validate_and_fix_schema(fresh_session, force=True)
+        assert fresh_session.execute(text("SELECT invoice_key FROM sales")).scalar() == '42'
+        assert ReturnsService(fresh_session).find_sale("0042").invoice_number == 'INV-0042'
+        assert StartupValidator.backfill_invoice_keys(fresh_session) == 0
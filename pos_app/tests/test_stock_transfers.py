@@ -0,0 +1,87 @@
+"""
+Unit tests for the stock transfer service (pos_app.controllers.stock_transfers)
+
+Tests cover:
+- Multi-product warehouse -> retail transfers with paired movements
+- stock_level recomputed and sync state marked once
+- All-or-nothing validation of a batch with a shortage
+- Replenishing retail to reorder level, capped by warehouse stock
+"""
+
+import pytest
+from pos_app.controllers.stock_transfers import (
+    StockTransferService, TransferError, TO_RETAIL, TO_WAREHOUSE
+)
+from pos_app.models.database import Product, StockMovement, SyncState
+from pos_app.utils.inventory_ledger import InventoryLedger
+
+
+def _product(session, sku, warehouse, retail, reorder=10):
+    product = Product(name=f"Item {sku}", sku=sku, barcode=f"BC-{sku}", retail_price=20.0,
+                      wholesale_price=15.0, purchase_price=10.0, warehouse_stock=warehouse,
+                      retail_stock=retail, stock_level=warehouse + retail, reorder_level=reorder,
+                      is_active=True)
+    session.add(product)
+    return product
+
+
+@pytest.fixture
+def stocked(db_session):
+    products = [_product(db_session, 'A', 50, 2), _product(db_session, 'B', 4, 3), _product(db_session, 'C', 0, 20)]
+    db_session.commit()
+    return products
+
+
+@pytest.mark.unit
+class TestStockTransferService:
+    """Test batched warehouse <-> retail transfers"""
+
+    def test_transfer_many_products(self, db_session, stocked):
+        a, b, c = stocked
+        result = StockTransferService(db_session).transfer(
+            [{'product_id': a.id, 'quantity': 5}, (b.id, 4), (c.id, 6, TO_WAREHOUSE)], notes="Morning shelf fill")
+        assert result['movements'] == 6 and result['reference'].startswith('TRF-')
+        assert (a.warehouse_stock, a.retail_stock, a.stock_level) == (45, 7, 52)
+        assert (b.warehouse_stock, b.retail_stock) == (0, 7)
+        assert (c.warehouse_stock, c.retail_stock, c.stock_level) == (6, 14, 20)
+
+        moves = db_session.query(StockMovement).filter(StockMovement.reference == result['reference']).all()
+        assert sorted((m.product_id, m.movement_type, m.location) for m in moves if m.product_id == c.id) == [
+            (c.id, 'IN', 'WAREHOUSE'), (c.id, 'OUT', 'RETAIL')]
+        assert {m.unit_cost for m in moves} == {10.0}
+        assert db_session.query(SyncState).filter(SyncState.key.in_(['products', 'stock'])).count() == 2
+
+    def test_transfers_net_to_zero_in_ledger(self, db_session, stocked):
+        a = stocked[0]
+        service = StockTransferService(db_session)
+        service.transfer([(a.id, 5)])
+        service.transfer([(a.id, 2)], direction=TO_WAREHOUSE)
+        assert InventoryLedger(db_session).stock_at(a.id) == 0
+        assert [t.location for t in service.recent_transfers()] == ['WAREHOUSE', 'RETAIL']
+
+    def test_shortage_rejects_whole_batch(self, db_session, stocked):
+        a, b, _ = stocked
+        service = StockTransferService(db_session)
+        with pytest.raises(TransferError) as err:
+            service._apply({a.id: a, b.id: b}, {(a.id, TO_RETAIL): 5, (b.id, TO_RETAIL): 9}, None, 'TRF-X', None)
+        assert [(s['product_id'], s['available'], s['requested']) for s in err.value.shortages] == [(b.id, 4, 9)]
+        assert (a.warehouse_stock, a.retail_stock) == (50, 2)
+
+        with pytest.raises(TransferError):
+            service.transfer([(a.id, 1.5)])
+        with pytest.raises(TransferError):
+            service.transfer([(a.id, 1, 'SIDEWAYS')])
+
+    def test_replenish_retail_to_reorder_level(self, db_session, stocked):
+        a, b, c = stocked
+        service = StockTransferService(db_session)
+        plan = service.plan_replenishment()
+        assert [(line['product_id'], line['quantity']) for line in plan] == [(a.id, 8), (b.id, 4)]
+
+        result = service.replenish_retail()
+        assert [(line['product_id'], line['quantity']) for line in result['lines']] == [(a.id, 8), (b.id, 4)]
+        assert (a.retail_stock, a.warehouse_stock) == (10, 42)
+        assert (b.retail_stock, b.warehouse_stock) == (7, 0)
+        assert c.retail_stock == 20
+        assert service.plan_replenishment() == []
+        assert service.replenish_retail()['lines'] == []
@@ -0,0 +1,102 @@
+"""
+Unit tests for controllers/supplier_balances.py
+
+Tests cover:
+- Grouped outstanding computation per supplier
+- Ageing buckets (current, 30, 60, 90+) by days past the due date
+- Due dates from outstanding_purchases, else order date plus payment terms
+- Overpaid and cancelled purchases
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from pos_app.controllers.supplier_balances import SupplierBalanceService, payment_terms_days
+from pos_app.models.database import Supplier, Purchase, OutstandingPurchase
+
+
+def _purchase(session, supplier, number, total, paid, days_ago, status='ORDERED'):
+    p = Purchase(
+        supplier_id=supplier.id,
+        purchase_number=number,
+        total_amount=total,
+        paid_amount=paid,
+        status=status,
+        order_date=datetime.now() - timedelta(days=days_ago),
+    )
+    session.add(p)
+    session.commit()
+    return p
+
+
+@pytest.mark.unit
+class TestSupplierBalances:
+    """Test the grouped supplier balance query"""
+
+    def test_outstanding_and_ageing(self, db_session, sample_supplier):
+        """Outstanding amounts fall into the right ageing bucket"""
+        _purchase(db_session, sample_supplier, 'PO-A1', 1000.0, 400.0, 5)
+        _purchase(db_session, sample_supplier, 'PO-A2', 500.0, 0.0, 45)
+        _purchase(db_session, sample_supplier, 'PO-A3', 300.0, 100.0, 75)
+        _purchase(db_session, sample_supplier, 'PO-A4', 250.0, 0.0, 120)
+
+        bal = SupplierBalanceService(db_session).get_balances()[sample_supplier.id]
+
+        assert bal['outstanding'] == pytest.approx(600.0 + 500.0 + 200.0 + 250.0)
+        assert bal['current'] == pytest.approx(600.0)
+        assert bal['days_30'] == pytest.approx(500.0)
+        assert bal['days_60'] == pytest.approx(200.0)
+        assert bal['days_90_plus'] == pytest.approx(250.0)
+        assert bal['purchase_count'] == 4
+
+    def test_ageing_uses_due_date_and_payment_terms(self, db_session, sample_supplier):
+        """Purchases age from their due date, not from the day they were placed"""
+        sample_supplier.payment_terms = "Net 60"
+        db_session.commit()
+        _purchase(db_session, sample_supplier, 'PO-D1', 400.0, 0.0, 45)    # due in 15 days
+        _purchase(db_session, sample_supplier, 'PO-D2', 300.0, 0.0, 100)   # 40 days past due
+        explicit = _purchase(db_session, sample_supplier, 'PO-D3', 200.0, 0.0, 10)
+        db_session.add(OutstandingPurchase(purchase_id=explicit.id, supplier_id=sample_supplier.id,
+                                           amount_due=200.0, due_date=datetime.now() - timedelta(days=95)))
+        db_session.commit()
+
+        bal = SupplierBalanceService(db_session).get_balances()[sample_supplier.id]
+
+        assert bal['current'] == pytest.approx(400.0)
+        assert bal['days_30'] == pytest.approx(300.0)
+        assert bal['days_60'] == pytest.approx(0.0)
+        assert bal['days_90_plus'] == pytest.approx(200.0)
+        assert [payment_terms_days(t) for t in ("Net 30", "2/10 net 45", "COD", None)] == [30, 45, 0, 0]
+
+    def test_overpaid_and_cancelled_are_ignored(self, db_session, sample_supplier):
+        """Overpayments do not offset other dues and cancelled orders are excluded"""
+        _purchase(db_session, sample_supplier, 'PO-B1', 100.0, 150.0, 1)
+        _purchase(db_session, sample_supplier, 'PO-B2', 300.0, 0.0, 1)
+        _purchase(db_session, sample_supplier, 'PO-B3', 999.0, 0.0, 1, status='CANCELLED')
+
+        service = SupplierBalanceService(db_session)
+        assert service.get_outstanding(sample_supplier.id) == pytest.approx(300.0)
+
+    def test_multiple_suppliers_and_filter(self, db_session, sample_supplier):
+        """Balances are grouped per supplier and can be filtered by id"""
+        other = Supplier(name="Other Supplier", contact="555-0000")
+        db_session.add(other)
+        db_session.commit()
+        _purchase(db_session, sample_supplier, 'PO-C1', 100.0, 0.0, 1)
+        _purchase(db_session, other, 'PO-C2', 700.0, 200.0, 1)
+
+        service = SupplierBalanceService(db_session)
+        balances = service.get_balances()
+        assert balances[sample_supplier.id]['outstanding'] == pytest.approx(100.0)
+        assert balances[other.id]['outstanding'] == pytest.approx(500.0)
+
+        only_other = service.get_balances([other.id])
+        assert list(only_other.keys()) == [other.id]
+
+        payables = service.get_payables()
+        assert [s.id for s, _ in payables] == [other.id, sample_supplier.id]
+
+    def test_supplier_without_purchases(self, db_session, sample_supplier):
+        """Suppliers with no purchases report a zero balance"""
+        service = SupplierBalanceService(db_session)
+        assert service.get_outstanding(sample_supplier.id) == 0.0
+        assert service.get_payables() == []
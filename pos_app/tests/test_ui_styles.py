@@ -0,0 +1,99 @@
+"""
+Unit tests for the application stylesheet helpers (pos_app.utils.ui_styles)
+
+Tests cover:
+- Minifying stylesheets: comments, whitespace and repeated rules
+- Caching of compiled stylesheets
+- The application sheet: global rules followed by the variant rules
+- Variant changes re-polishing only visible widgets, step timings and their report
+"""
+
+import pytest
+from pos_app.utils.ui_styles import (STYLE_TIMINGS, VARIANT_STYLESHEET, application_stylesheet,
+                                     compile_stylesheet, set_variant, style_report, timed)
+
+
+class _Style:
+    def __init__(self):
+        self.calls = []
+
+    def unpolish(self, widget):
+        self.calls.append('unpolish')
+
+    def polish(self, widget):
+        self.calls.append('polish')
+
+
+class _Widget:
+    """Just enough of QWidget for set_variant()"""
+
+    def __init__(self, visible):
+        self.props, self.visible, self._style = {}, visible, _Style()
+
+    def property(self, name):
+        return self.props.get(name)
+
+    def setProperty(self, name, value):
+        self.props[name] = value
+
+    def isVisible(self):
+        return self.visible
+
+    def style(self):
+        return self._style
+
+    def update(self):
+        self._style.calls.append('update')
+
+
+@pytest.mark.unit
+class TestUIStyles:
+    """Test the compiled application stylesheet"""
+
+    def test_compile_minifies(self):
+        sheet = """
+        /* Buttons */
+        QPushButton ,  QToolButton {
+            color : #fff ;
+            padding: 4px  8px;
+        }
+        QLabel { color: #eee; }
+        QPushButton, QToolButton { color: #fff; padding: 4px  8px }
+        QLabel { color: #ddd; }
+        """
+        assert compile_stylesheet(sheet) == (
+            "QPushButton,QToolButton{color:#fff;padding:4px  8px}\n"
+            "QLabel{color:#eee}\n"
+            "QLabel{color:#ddd}")
+
+    def test_compiled_sheet_is_cached(self):
+        first = compile_stylesheet("QLabel { margin: 1px; }", "QFrame { margin: 2px; }")
+        assert compile_stylesheet("QLabel { margin: 1px; }", "QFrame { margin: 2px; }") is first
+        assert compile_stylesheet("QFrame { margin: 2px; }") == "QFrame{margin:2px}"
+
+    def test_application_sheet_orders_variants_last(self):
+        sheet = application_stylesheet()
+        assert application_stylesheet() is sheet
+        assert '/*' not in sheet and '\n\n' not in sheet
+        base = sheet.index('QPushButton{')
+        row = sheet.index('QPushButton[variant="row-action"],QPushButton[variant="row-secondary"]{')
+        assert base < row and 'min-height:0px' in sheet[row:]
+        assert sheet.endswith(compile_stylesheet(VARIANT_STYLESHEET).splitlines()[-1])
+
+    def test_set_variant_repolishes_visible_widgets(self):
+        hidden, shown = _Widget(False), _Widget(True)
+        assert set_variant(hidden, 'row-action') and hidden.props == {'variant': 'row-action'}
+        assert hidden.style().calls == []
+        assert set_variant(shown, 'row-action')
+        assert shown.style().calls == ['unpolish', 'polish', 'update']
+        assert not set_variant(shown, 'row-action')
+        assert shown.style().calls == ['unpolish', 'polish', 'update']
+
+        with timed('test.step'):
+            pass
+        assert STYLE_TIMINGS['test.step'] >= 0
+
+    def test_style_report_against_baseline(self, monkeypatch):
+        monkeypatch.setattr('pos_app.utils.ui_styles.STYLE_TIMINGS', {'apply_to': 10.0, 'page': 40.0})
+        assert style_report() == "page: 40.0 ms\napply_to: 10.0 ms"
+        assert style_report({'page': 80.0}) == "page: 40.0 ms (was 80.0 ms, -50%)\napply_to: 10.0 ms"
@@ -0,0 +1,274 @@
+"""
+Assistant transport - streamed, cancellable chat completions.
+
+Requests go to an OpenAI-compatible /chat/completions endpoint (Groq by default)
+with "stream": true; tokens are handed to a callback as the server-sent events
+arrive, and a CancelToken stops the read between chunks. Prompts are trimmed to
+a ContextBudget before sending, answers are cached per normalised question plus
+a hash of the context it was asked in, and identical questions asked while one
+is already in flight share that single request.
+
+    transport = AssistantTransport(api_key)
+    text = transport.ask(messages, system_context, on_token=print, cancel=CancelToken())
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = "https://api.groq.com/openai/v1/chat/completions"
+DEFAULT_MODEL = "groq/compound"
+MAX_RESPONSE_TOKENS = 1024
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 60.0  # between stream chunks, not for the whole answer
+
+
+class AssistantTransportError(Exception):
+    """The assistant request failed"""
+
+
+class AssistantAuthError(AssistantTransportError):
+    """Invalid API key or model (HTTP 400/401/403)"""
+
+
+class AssistantCancelled(AssistantTransportError):
+    """The request was cancelled by the user"""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ContextBudget:
+    """Character budget for one request (about 4 characters per token)"""
+
+    def __init__(self, max_context_chars=6000, max_history_chars=4000, max_history_messages=8):
+        self.max_context_chars = max_context_chars
+        self.max_history_chars = max_history_chars
+        self.max_history_messages = max_history_messages
+
+    def trim_context(self, text: str) -> str:
+        text = (text or "").strip()
+        if len(text) <= self.max_context_chars:
+            return text
+        return text[:self.max_context_chars].rsplit("\n", 1)[0] + "\n[context truncated]"
+
+    def trim_history(self, messages: list) -> list:
+        """Newest messages that fit the budget; the last (current) message is always kept."""
+        messages = [m for m in (messages or []) if (m.get("content") or "").strip()]
+        if not messages:
+            return []
+        kept = [messages[-1]]
+        used = len(messages[-1]["content"])
+        for msg in reversed(messages[:-1]):
+            if len(kept) >= self.max_history_messages or used + len(msg["content"]) > self.max_history_chars:
+                break
+            kept.append(msg)
+            used += len(msg["content"])
+        return list(reversed(kept))
+
+
+def normalise_question(text: str) -> str:
+    text = re.sub(r"\s+", " ", (text or "").lower()).strip()
+    return text.rstrip("?!. ")
+
+
+class ResponseCache:
+    """LRU of answers keyed on (normalised question, context hash)"""
+
+    def __init__(self, max_entries=128, ttl=600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question: str, context: str, previous: list) -> str:
+        digest = hashlib.sha256((context or "").encode("utf-8"))
+        for msg in previous or []:
+            digest.update(f"\x00{msg.get('role')}:{msg.get('content')}".encode("utf-8"))
+        return f"{normalise_question(question)}|{digest.hexdigest()[:32]}"
+
+    def get(self, key: str):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            if hit[0] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+SYSTEM_PROMPT = """You are a helpful AI assistant for a Point of Sale (POS) system.
+
+IMPORTANT RULES:
+- You do NOT have direct access to the application's database.
+- Only use facts that are explicitly provided in the Database Context or user message.
+- Never invent (hallucinate) sales totals, customer names, product names, dates, IDs, or counts.
+- If the user asks for database values that are not present in the Database Context, respond with:
+  "I can't access the database directly from here. Please use the app's built-in report/summary, or ask the app to fetch the data.".
+
+Database Context (may be incomplete):
+{context}
+
+When you are unsure, ask a short clarifying question instead of guessing."""
+
+
+class AssistantTransport:
+    """Streams chat completions with caching and request coalescing"""
+
+    def __init__(self, api_key, url=DEFAULT_URL, model=DEFAULT_MODEL, max_tokens=MAX_RESPONSE_TOKENS,
+                 budget=None, cache=None, http=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.api_key = api_key
+        self.url = url
+        self.model = model
+        self.max_tokens = max_tokens
+        self.budget = budget or ContextBudget()
+        self.cache = cache if cache is not None else ResponseCache()
+        self.http = http or requests.Session()
+        self.timeout = timeout
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def build_messages(self, messages: list, context: str) -> list:
+        system = SYSTEM_PROMPT.format(context=self.budget.trim_context(context))
+        return [{"role": "system", "content": system}] + self.budget.trim_history(messages)
+
+    def ask(self, messages: list, context: str = "", on_token=None, cancel: CancelToken | None = None) -> str:
+        """Answer the last user message; returns the full text (tokens also go to on_token)."""
+        history = self.budget.trim_history(messages)
+        if not history:
+            raise AssistantTransportError("Nothing to send")
+        key = self.cache.key(history[-1]["content"], self.budget.trim_context(context), history[-3:-1])
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            if on_token:
+                on_token(cached)
+            return cached
+
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                owner = self._inflight[key] = _InFlight()
+        if waiting is not None:
+            return self._join(waiting, on_token, cancel)
+
+        try:
+            owner.text = self.stream(self.build_messages(history, context), on_token, cancel)
+            self.cache.put(key, owner.text)
+            return owner.text
+        except Exception as e:
+            owner.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            owner.done.set()
+
+    def _join(self, waiting: _InFlight, on_token, cancel):
+        while not waiting.done.wait(0.05):
+            if cancel is not None and cancel.cancelled:
+                raise AssistantCancelled("Request cancelled")
+        if waiting.error is not None:
+            raise waiting.error
+        if on_token:
+            on_token(waiting.text)
+        return waiting.text
+
+    def stream(self, messages: list, on_token=None, cancel: CancelToken | None = None) -> str:
+        """POST one streamed completion and return the concatenated text."""
+        if cancel is not None and cancel.cancelled:
+            raise AssistantCancelled("Request cancelled")
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": self.max_tokens,
+            "stream": True,
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        started = time.perf_counter()
+        try:
+            response = self.http.post(self.url, headers=headers, json=payload, stream=True, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            raise AssistantTransportError("Request timed out. Please try again.")
+        except requests.exceptions.RequestException as e:
+            raise AssistantTransportError(f"Network error: {e}")
+
+        with response:
+            if response.status_code in (400, 401, 403):
+                logger.debug(f"Assistant request rejected: {response.text[:500]}")
+                raise AssistantAuthError(
+                    f"Bad Request ({response.status_code}): Invalid API key or model. Please check the API configuration.")
+            if response.status_code >= 400:
+                raise AssistantTransportError(f"Network error: HTTP {response.status_code}")
+
+            if 'text/event-stream' not in (response.headers.get('Content-Type') or ''):
+                # Server ignored "stream": plain JSON completion
+                text = response.json()['choices'][0]['message']['content'] or ""
+                if on_token and text:
+                    on_token(text)
+                return text
+
+            parts = []
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if cancel is not None and cancel.cancelled:
+                        raise AssistantCancelled("Request cancelled")
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        delta = json.loads(data)['choices'][0].get('delta') or {}
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    token = delta.get('content')
+                    if token:
+                        parts.append(token)
+                        if on_token:
+                            on_token(token)
+            except requests.exceptions.RequestException as e:
+                raise AssistantTransportError(f"Network error: {e}")
+
+        logger.debug(f"Assistant answer streamed in {time.perf_counter() - started:.2f}s ({len(parts)} chunks)")
+        return "".join(parts)
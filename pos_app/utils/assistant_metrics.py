@@ -0,0 +1,330 @@
+"""
+Metric layer for the AI assistant's local answers.
+
+Named metrics (revenue, units sold, top products, top customers, receivables,
+inventory, customer names, database summary) are computed with SQL aggregates and
+cached per (metric, time range, limit). A cached value is reused until its TTL
+expires or one of the sync_state domains it depends on changes, so repeated
+questions are answered instantly without touching the network.
+
+    engine = get_metric_engine()
+    result = engine.query('revenue', 'today')
+    result.value   # {'total_in': ..., 'net': ...}
+    result.text    # formatted answer for the chat
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func
+
+from pos_app.database.archive import archived_rows
+from pos_app.models.database import Customer, Product, Sale, SaleItem, Supplier, SyncState
+from pos_app.utils.sales_stats import SalesStats
+
+logger = logging.getLogger(__name__)
+
+# Seconds a result may be reused when no sync marker changed
+LIVE_TTL = 30          # ranges that include "now"
+HISTORICAL_TTL = 3600  # closed ranges (yesterday, last month)
+DEFAULT_TTL = 120
+
+RANGE_TITLES = {
+    'today': "Today's", 'yesterday': "Yesterday's", 'week': "This week's", 'month': "This month's",
+    'last_month': "Last month's", 'year': "This year's", None: "All-time",
+}
+
+
+def resolve_time_range(label, now: datetime | None = None):
+    """(start, end) for a named range; end is exclusive and None means "until now"."""
+    now = now or datetime.now()
+    start_of_day = datetime(now.year, now.month, now.day)
+    if label == 'today':
+        return start_of_day, None
+    if label == 'yesterday':
+        return start_of_day - timedelta(days=1), start_of_day
+    if label == 'week':
+        return start_of_day - timedelta(days=start_of_day.weekday()), None
+    if label == 'month':
+        return datetime(now.year, now.month, 1), None
+    if label == 'last_month':
+        end = datetime(now.year, now.month, 1)
+        return datetime(end.year - 1, 12, 1) if end.month == 1 else datetime(end.year, end.month - 1, 1), end
+    if label == 'year':
+        return datetime(now.year, 1, 1), None
+    return None, None
+
+
+def parse_time_range(text: str):
+    """Range label mentioned in a question, or None."""
+    s = (text or '').lower()
+    if 'yesterday' in s:
+        return 'yesterday'
+    if 'today' in s or 'todays' in s:
+        return 'today'
+    if 'last month' in s:
+        return 'last_month'
+    if 'this week' in s or 'weekly' in s:
+        return 'week'
+    if 'this month' in s or 'monthly' in s or 'month' in s:
+        return 'month'
+    if 'this year' in s or 'yearly' in s:
+        return 'year'
+    return None
+
+
+def _in_range(query, column, start, end):
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end)
+    return query
+
+
+# ---------------------------------------------------------------- metrics
+def revenue(session, start, end, limit=None) -> dict:
+    """Sales IN, refunds OUT and net for the range (one aggregate query)."""
+    amount = func.abs(func.coalesce(Sale.total_amount, 0))
+    refund = Sale.is_refund.is_(True)
+    row = _in_range(session.query(
+        func.coalesce(func.sum(case((refund, 0), else_=amount)), 0),
+        func.coalesce(func.sum(case((refund, amount), else_=0)), 0),
+        func.coalesce(func.sum(case((refund, 0), else_=1)), 0),
+        func.coalesce(func.sum(case((refund, 1), else_=0)), 0),
+    ), Sale.sale_date, start, end).one()
+    total_in, total_out = float(row[0] or 0), float(row[1] or 0)
+    count_sales, count_refunds = int(row[2] or 0), int(row[3] or 0)
+    # Closed fiscal years moved out by the archiver still count
+    for sale in archived_rows(session, 'sales', start, end):
+        if end is not None and sale.sale_date is not None and sale.sale_date >= end:
+            continue
+        amount = abs(float(sale.get('total_amount') or 0))
+        if sale.get('is_refund'):
+            total_out += amount
+            count_refunds += 1
+        else:
+            total_in += amount
+            count_sales += 1
+    return {
+        'total_in': total_in,
+        'total_out': total_out,
+        'net': total_in - total_out,
+        'count_sales': count_sales,
+        'count_refunds': count_refunds,
+        'rows': count_sales + count_refunds,
+    }
+
+
+def units_sold(session, start, end, limit=None) -> dict:
+    q = session.query(func.coalesce(func.sum(SaleItem.quantity), 0), func.count(func.distinct(SaleItem.product_id)))
+    q = _in_range(q.join(Sale, SaleItem.sale_id == Sale.id).filter(Sale.is_refund.isnot(True)), Sale.sale_date, start, end)
+    units, products = q.one()
+    return {'units': float(units or 0), 'products': int(products or 0)}
+
+
+def top_products(session, start, end, limit=20) -> list:
+    rows = SalesStats(session).top_products(start, end, limit=limit or 20, by='revenue', end_exclusive=True)
+    return [{'name': r['name'], 'qty': r['quantity'], 'amount': r['revenue']} for r in rows]
+
+
+def top_customers(session, start, end, limit=5) -> list:
+    rows = SalesStats(session).top_customers(start, end, limit=limit or 5, end_exclusive=True)
+    return [{'id': r['customer_id'], 'name': r['name'], 'total': r['revenue']} for r in rows]
+
+
+def receivables(session, start=None, end=None, limit=10) -> dict:
+    total, count = session.query(func.coalesce(func.sum(Customer.current_credit), 0), func.count(Customer.id)) \
+        .filter(Customer.current_credit > 0).one()
+    rows = session.query(Customer.name, Customer.current_credit).filter(Customer.current_credit > 0) \
+        .order_by(Customer.current_credit.desc()).limit(limit or 10).all()
+    return {'total': float(total or 0), 'customers': int(count or 0),
+            'top': [{'name': r[0], 'amount': float(r[1] or 0)} for r in rows]}
+
+
+def inventory(session, start=None, end=None, limit=None) -> dict:
+    total, low = session.query(
+        func.count(Product.id),
+        func.coalesce(func.sum(case((Product.stock_level <= Product.reorder_level, 1), else_=0)), 0),
+    ).one()
+    return {'products': int(total or 0), 'low_stock': int(low or 0)}
+
+
+def customer_names(session, start=None, end=None, limit=200) -> dict:
+    names = [n for (n,) in session.query(Customer.name).order_by(Customer.name.asc()).limit(limit or 200) if (n or '').strip()]
+    return {'names': names, 'total': session.query(func.count(Customer.id)).scalar() or 0}
+
+
+def database_summary(session, start=None, end=None, limit=None) -> dict:
+    """Row counts for the assistant's prompt context in one round trip."""
+    row = session.query(
+        session.query(func.count(Product.id)).scalar_subquery(),
+        session.query(func.count(Customer.id)).scalar_subquery(),
+        session.query(func.count(Sale.id)).scalar_subquery(),
+        session.query(func.count(Supplier.id)).scalar_subquery(),
+    ).one()
+    return {'products': int(row[0] or 0), 'customers': int(row[1] or 0),
+            'sales': int(row[2] or 0), 'suppliers': int(row[3] or 0)}
+
+
+# ---------------------------------------------------------------- formatting
+def _fmt_revenue(v, label):
+    return (f"{RANGE_TITLES.get(label, 'Selected')} totals:\n\n"
+            f"Sales (IN): {v['total_in']:.2f} ({v['count_sales']} invoices)\n"
+            f"Refunds (OUT): {v['total_out']:.2f} ({v['count_refunds']} invoices)\n"
+            f"Net: {v['net']:.2f}")
+
+
+def _fmt_units(v, label):
+    return f"{RANGE_TITLES.get(label, 'Selected')} units sold: {v['units']:.2f} across {v['products']} products"
+
+
+def _range_phrase(label):
+    return {'today': 'today', 'yesterday': 'yesterday', 'week': 'this week', 'month': 'this month',
+            'last_month': 'last month', 'year': 'this year'}.get(label, 'overall')
+
+
+def _fmt_top_products(v, label):
+    if not v:
+        return f"No sold items found for {_range_phrase(label)}."
+    lines = [f"- {r['name']}: qty {r['qty']:.2f}, amount {r['amount']:.2f}" for r in v]
+    return f"Sold items {_range_phrase(label)}:\n\n" + "\n".join(lines)
+
+
+def _fmt_top_customers(v, label):
+    if not v:
+        return f"No customer sales found for {_range_phrase(label)}."
+    lines = [f"{i}. {r['name']}: {r['total']:.2f}" for i, r in enumerate(v, start=1)]
+    return f"Top customers {_range_phrase(label)}:\n\n" + "\n".join(lines)
+
+
+def _fmt_receivables(v, label):
+    if not v['customers']:
+        return "No outstanding customer balances."
+    lines = [f"- {r['name']}: {r['amount']:.2f}" for r in v['top']]
+    return (f"Receivables: {v['total']:.2f} owed by {v['customers']} customers\n\n" + "\n".join(lines))
+
+
+def _fmt_inventory(v, label):
+    return f"Inventory status:\n\nProducts: {v['products']}\nLow stock items: {v['low_stock']}"
+
+
+def _fmt_customer_names(v, label):
+    if not v['names']:
+        return "No customers found in the database."
+    more = f"\n\nShowing first {len(v['names'])} of {v['total']}." if v['total'] > len(v['names']) else ""
+    return "Customer names:\n\n" + "\n".join(f"- {n}" for n in v['names']) + more
+
+
+def _fmt_summary(v, label):
+    return (f"Products: {v['products']}\nCustomers: {v['customers']}\n"
+            f"Sales: {v['sales']}\nSuppliers: {v['suppliers']}")
+
+
+class Metric:
+    """A named, cacheable aggregate"""
+
+    def __init__(self, name, compute, formatter, depends, default_range=None, default_limit=None, ttl=DEFAULT_TTL):
+        self.name = name
+        self.compute = compute
+        self.formatter = formatter
+        self.depends = tuple(depends)
+        self.default_range = default_range
+        self.default_limit = default_limit
+        self.ttl = ttl
+
+
+METRICS = {m.name: m for m in (
+    Metric('revenue', revenue, _fmt_revenue, ('sales',), 'today'),
+    Metric('units_sold', units_sold, _fmt_units, ('sales',), 'today'),
+    Metric('top_products', top_products, _fmt_top_products, ('sales', 'products'), 'month', 20),
+    Metric('top_customers', top_customers, _fmt_top_customers, ('sales', 'customers'), 'month', 5),
+    Metric('receivables', receivables, _fmt_receivables, ('customers', 'payments', 'sales'), None, 10),
+    Metric('inventory', inventory, _fmt_inventory, ('products', 'stock')),
+    Metric('customer_names', customer_names, _fmt_customer_names, ('customers',), None, 200),
+    Metric('database_summary', database_summary, _fmt_summary, ('products', 'customers', 'sales', 'suppliers'),
+           ttl=HISTORICAL_TTL),
+)}
+
+
+class MetricResult:
+    def __init__(self, name, range_label, value, text, cached):
+        self.name = name
+        self.range_label = range_label
+        self.value = value
+        self.text = text
+        self.cached = cached
+
+
+class MetricEngine:
+    """Runs metrics with a TTL + sync_state-validated cache"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _versions(self, session, keys) -> tuple:
+        try:
+            rows = session.query(SyncState.key, SyncState.last_changed).filter(SyncState.key.in_(keys)).all()
+        except Exception:
+            try:
+                session.rollback()
+            except Exception:
+                pass
+            return (None,) * len(keys)
+        stamps = dict(rows)
+        return tuple(stamps.get(k) for k in keys)
+
+    def _ttl(self, metric, start, end):
+        if metric.ttl != DEFAULT_TTL:
+            return metric.ttl
+        return HISTORICAL_TTL if end is not None and end <= datetime.now() else (LIVE_TTL if start else DEFAULT_TTL)
+
+    def query(self, name: str, range_label='default', limit=None, session=None, now=None) -> MetricResult:
+        metric = METRICS[name]
+        label = metric.default_range if range_label == 'default' else range_label
+        limit = limit or metric.default_limit
+        if session is None:
+            from pos_app.database.db_utils import get_db_session
+            with get_db_session() as own:
+                return self._query(metric, label, limit, own, now)
+        return self._query(metric, label, limit, session, now)
+
+    def _query(self, metric, label, limit, session, now):
+        start, end = resolve_time_range(label, now)
+        key = (metric.name, label, start, end, limit)
+        versions = self._versions(session, metric.depends)
+        with self._lock:
+            hit = self._cache.get(key)
+        if hit is not None and hit[0] > self._clock() and hit[1] == versions:
+            return MetricResult(metric.name, label, hit[2], metric.formatter(hit[2], label), True)
+
+        started = time.perf_counter()
+        value = metric.compute(session, start, end, limit)
+        logger.debug(f"Metric {metric.name}/{label} computed in {(time.perf_counter() - started) * 1000:.1f} ms")
+        with self._lock:
+            self._cache[key] = (self._clock() + self._ttl(metric, start, end), versions, value)
+        return MetricResult(metric.name, label, value, metric.formatter(value, label), False)
+
+    def invalidate(self, names=None):
+        with self._lock:
+            if names is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] in set(names)]:
+                    del self._cache[key]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_metric_engine() -> MetricEngine:
+    """Process-wide metric engine (its cache survives reopening the assistant page)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = MetricEngine()
+        return _engine
@@ -1,23 +1,55 @@
 import hashlib
+import hmac
 import secrets
 
+# Work factor for new hashes. Tuned so one verification costs roughly 50-100 ms on a
+# till PC: slow enough to resist offline guessing, and login runs it off the UI thread.
+PBKDF2_ITERATIONS = 120_000
+PBKDF2_PREFIX = "pbkdf2_sha256"
 
-def hash_password(password: str) -> str:
-    """Hash password using built-in hashlib (no external dependencies)"""
-    # Generate a random salt
+try:
+    import bcrypt  # optional: only needed to verify hashes imported from bcrypt-based tools
+except ImportError:  # pragma: no cover
+    bcrypt = None
+
+
+def hash_password(password: str, iterations: int | None = None) -> str:
+    """Hash password with salted PBKDF2-HMAC-SHA256 (built-in hashlib, no external dependencies)"""
+    iterations = int(iterations or PBKDF2_ITERATIONS)
     salt = secrets.token_hex(16)
-    # Hash password with salt
-    pwd_hash = hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
-    return f"{salt}:{pwd_hash}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('ascii'), iterations).hex()
+    return f"{PBKDF2_PREFIX}${iterations}${salt}${digest}"
 
 
 def check_password(password: str, hashed: str) -> bool:
-    """Check password against hash using built-in hashlib"""
+    """Check password against a PBKDF2, bcrypt or legacy salted SHA-256 hash"""
     try:
+        if not hashed:
+            return False
+        if hashed.startswith(PBKDF2_PREFIX + "$"):
+            _, iterations, salt, stored = hashed.split('$', 3)
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('ascii'), int(iterations)).hex()
+            return hmac.compare_digest(digest, stored)
+        if hashed.startswith('$2'):
+            if bcrypt is None:
+                return False
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
         if ':' not in hashed:
             return False
+        # Legacy format: "salt:sha256(password + salt)"
         salt, stored_hash = hashed.split(':', 1)
         pwd_hash = hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
-        return pwd_hash == stored_hash
+        return hmac.compare_digest(pwd_hash, stored_hash)
     except Exception:
         return False
+
+
+def needs_rehash(hashed: str, iterations: int | None = None) -> bool:
+    """True when a hash uses the legacy format or fewer iterations than configured"""
+    iterations = int(iterations or PBKDF2_ITERATIONS)
+    if not hashed or not hashed.startswith(PBKDF2_PREFIX + "$"):
+        return not (hashed or '').startswith('$2')
+    try:
+        return int(hashed.split('$', 2)[1]) < iterations
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,329 @@
+"""
+Authentication service - off-thread password verification, short-lived session
+tokens and batched user activity writes.
+
+    service = get_auth_service()
+    future = service.authenticate_async(username, password)   # UI thread stays responsive
+    result = future.result()                                   # AuthResult
+    service.unlock(result.token, username, password)           # lock screen, no KDF round
+    service.record_activity(result.user)                       # queued, flushed in one UPDATE
+
+Password hashes use the tuned PBKDF2 work factor from utils/auth; legacy hashes
+are upgraded on the next successful server login. Successful logins refresh the
+local offline cache (utils/local_auth.LocalAuthCache); the cache is only consulted
+when the server cannot be reached, never when it rejects the credentials.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+from sqlalchemy import exc as sa_exc
+
+from pos_app.utils.auth import check_password, hash_password, needs_rehash
+from pos_app.utils.local_auth import LocalAuthCache
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL_SECONDS = 15 * 60
+ACTIVITY_FLUSH_SECONDS = 30.0
+
+
+class AuthenticatedUser:
+    """Plain user snapshot handed to the UI (safe to use after the DB session is closed)"""
+
+    def __init__(self, username, is_admin=False, full_name=None, id=None, authenticated_locally=False):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.full_name = full_name or username
+        self.is_active = True
+        self.authenticated_locally = authenticated_locally
+
+    def to_claims(self) -> dict:
+        return {'uid': self.id, 'sub': self.username, 'adm': self.is_admin,
+                'name': self.full_name, 'loc': self.authenticated_locally}
+
+    @classmethod
+    def from_claims(cls, claims: dict):
+        return cls(claims.get('sub'), claims.get('adm'), claims.get('name'), claims.get('uid'), claims.get('loc', False))
+
+
+class AuthResult:
+    """Outcome of an authentication attempt"""
+
+    def __init__(self, user=None, token=None, error=None, source=None):
+        self.user = user
+        self.token = token
+        self.error = error
+        self.source = source  # 'server', 'local' or 'token'
+
+    @property
+    def ok(self) -> bool:
+        return self.user is not None
+
+
+def _default_session():
+    from pos_app.models import database as db
+    if db.SessionLocal is None:
+        db.init_session(db.get_engine())
+    return db.SessionLocal()
+
+
+def _is_connection_error(exc) -> bool:
+    """True when the server could not be reached (as opposed to answering with an error)"""
+    if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.DisconnectionError,
+                            sa_exc.TimeoutError, OSError))
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class ActivityRecorder:
+    """Collects last_login/last_activity timestamps and writes them in one batched UPDATE"""
+
+    def __init__(self, session_factory=None, interval: float = ACTIVITY_FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, login: bool = False, when: datetime | None = None):
+        if user_id is None:
+            return
+        when = when or datetime.now()
+        with self._lock:
+            entry = self._pending.setdefault(user_id, {'last_login': None, 'last_activity': None})
+            entry['last_activity'] = when
+            if login:
+                entry['last_login'] = when
+        self._ensure_thread()
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _ensure_thread(self):
+        if self.interval and self.interval > 0 and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="ActivityRecorder", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _session(self):
+        return (self.session_factory or _default_session)()
+
+    def flush(self) -> int:
+        """Write all pending timestamps; returns the number of users updated."""
+        from pos_app.models.database import User
+
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        logins = [{'b_id': uid, 'b_login': e['last_login'], 'b_activity': e['last_activity']}
+                  for uid, e in batch.items() if e['last_login'] is not None]
+        activity = [{'b_id': uid, 'b_activity': e['last_activity']}
+                    for uid, e in batch.items() if e['last_login'] is None]
+        session = None
+        try:
+            session = self._session()
+            conn = session.connection()
+            if logins:
+                conn.execute(update(User.__table__).where(User.__table__.c.id == bindparam('b_id')).values(
+                    last_login=bindparam('b_login'), last_activity=bindparam('b_activity')), logins)
+            if activity:
+                conn.execute(update(User.__table__).where(User.__table__.c.id == bindparam('b_id')).values(
+                    last_activity=bindparam('b_activity')), activity)
+            session.commit()
+            return len(batch)
+        except Exception as e:
+            logger.warning(f"Could not write user activity ({len(batch)} users): {e}")
+            if session is not None:
+                try:
+                    session.rollback()
+                except Exception:
+                    pass
+            # Keep the newest values for the next attempt
+            with self._lock:
+                for uid, entry in batch.items():
+                    current = self._pending.setdefault(uid, entry)
+                    if current is not entry and current['last_login'] is None:
+                        current['last_login'] = entry['last_login']
+            return 0
+        finally:
+            if session is not None:
+                session.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2)
+            self._thread = None
+        self.flush()
+
+
+class AuthService:
+    """Verifies credentials off the UI thread and issues signed session tokens"""
+
+    def __init__(self, session_factory=None, token_ttl: int = TOKEN_TTL_SECONDS,
+                 flush_interval: float = ACTIVITY_FLUSH_SECONDS, secret: bytes | None = None):
+        self.session_factory = session_factory
+        self.token_ttl = int(token_ttl)
+        # Per-process key: tokens only unlock this terminal and die with the app
+        self._secret = secret or secrets.token_bytes(32)
+        self._revoked = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth")
+        self.activity = ActivityRecorder(session_factory, flush_interval)
+
+    # ---------------------- tokens ----------------------
+    def _password_verifier(self, username: str, password: str) -> str:
+        message = f"{(username or '').lower()}\0{password or ''}".encode('utf-8')
+        return _b64(hmac.new(self._secret, b'unlock\0' + message, hashlib.sha256).digest())
+
+    def issue_token(self, user: AuthenticatedUser, ttl: int | None = None, password: str | None = None) -> str:
+        claims = user.to_claims()
+        if password is not None:
+            # Lets unlock() check the password with one HMAC instead of a KDF round
+            claims['pwv'] = self._password_verifier(user.username, password)
+        claims['exp'] = int(time.time()) + int(ttl or self.token_ttl)
+        claims['jti'] = secrets.token_hex(8)
+        payload = _b64(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+        signature = _b64(hmac.new(self._secret, payload.encode('ascii'), hashlib.sha256).digest())
+        return f"{payload}.{signature}"
+
+    def _claims(self, token: str):
+        try:
+            payload, signature = token.split('.', 1)
+            expected = _b64(hmac.new(self._secret, payload.encode('ascii'), hashlib.sha256).digest())
+            if not hmac.compare_digest(signature, expected):
+                return None
+            claims = json.loads(_unb64(payload))
+        except Exception:
+            return None
+        if claims.get('exp', 0) < time.time() or claims.get('jti') in self._revoked:
+            return None
+        return claims
+
+    def verify_token(self, token: str):
+        """Return the AuthenticatedUser for a valid, unexpired token, else None."""
+        claims = self._claims(token) if token else None
+        return AuthenticatedUser.from_claims(claims) if claims else None
+
+    def revoke_token(self, token: str):
+        try:
+            self._revoked.add(json.loads(_unb64(token.split('.', 1)[0])).get('jti'))
+        except Exception:
+            pass
+
+    def unlock(self, token: str, username: str, password: str) -> AuthResult:
+        """Resume a locked session without a KDF round.
+
+        The token must be live, belong to username and carry the verifier of this
+        password; otherwise the caller falls back to authenticate_async().
+        """
+        claims = self._claims(token) if token else None
+        if claims is None or not claims.get('pwv') or (claims.get('sub') or '').lower() != (username or '').lower():
+            return AuthResult(error="Session expired, please enter your password")
+        if not hmac.compare_digest(claims['pwv'], self._password_verifier(username, password)):
+            return AuthResult(error="Invalid password")
+        user = AuthenticatedUser.from_claims(claims)
+        self.activity.record(user.id)
+        return AuthResult(user, token, source='token')
+
+    # ---------------------- passwords ----------------------
+    def _session(self):
+        return (self.session_factory or _default_session)()
+
+    def _server_user(self, username: str, password: str):
+        """(AuthenticatedUser or None, error or None, reachable)"""
+        from pos_app.models.database import User
+        session = None
+        try:
+            session = self._session()
+            user = session.query(User).filter(User.username == username).first()
+            if user is None:
+                return None, "Invalid username or password", True
+            if not user.is_active:
+                return None, "Account is disabled", True
+            if not check_password(password, user.password_hash):
+                return None, "Invalid password", True
+            if needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hash_password(password)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    logger.warning(f"Could not upgrade password hash for {username}: {e}")
+            LocalAuthCache.cache_user_credentials(username, user.password_hash, user.is_admin, user.full_name)
+            return AuthenticatedUser(user.username, user.is_admin, user.full_name, user.id), None, True
+        except Exception as e:
+            if _is_connection_error(e):
+                logger.warning(f"Authentication server unreachable: {e}")
+                return None, None, False
+            logger.error(f"Server authentication failed: {e}")
+            return None, "Could not verify credentials, please try again", True
+        finally:
+            if session is not None:
+                session.close()
+
+    def authenticate(self, username: str, password: str) -> AuthResult:
+        """Blocking authentication: the server, or the offline cache when it cannot be reached."""
+        user, error, reachable = self._server_user(username, password)
+        if user is not None:
+            self.activity.record(user.id, login=True)
+            return AuthResult(user, self.issue_token(user, password=password), source='server')
+        if reachable:
+            return AuthResult(error=error)
+
+        local = LocalAuthCache.authenticate_locally(username, password)
+        if local:
+            user = AuthenticatedUser(local['username'], local['is_admin'], local['full_name'],
+                                     authenticated_locally=True)
+            return AuthResult(user, self.issue_token(user, password=password), source='local')
+        return AuthResult(error="Invalid username or password")
+
+    def authenticate_async(self, username: str, password: str):
+        """Run authenticate() on the auth worker thread; returns a Future[AuthResult]."""
+        return self._executor.submit(self.authenticate, username, password)
+
+    def record_activity(self, user):
+        self.activity.record(getattr(user, 'id', None))
+
+    def shutdown(self):
+        self.activity.stop()
+        self._executor.shutdown(wait=False)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_auth_service() -> AuthService:
+    """Process-wide auth service"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AuthService()
+        return _service
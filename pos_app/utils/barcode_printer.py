@@ -5,7 +5,10 @@ Bypasses Windows drivers for accurate label positioning using gap sensing
 
 import os
 import subprocess
-import serial
+try:
+    import serial
+except ImportError:  # pyserial is optional; network/file targets work without it
+    serial = None
 import time
 from typing import List, Dict, Optional, Tuple
 import logging
@@ -345,6 +348,31 @@ class BarcodePrinter:
             logger.error(f"Serial print error: {e}")
             return False
     
+    def print_batch(self, items, target: str = None, language: str = 'EPL2') -> bool:
+        """Print labels for many (product, copies) pairs as one command stream"""
+        from pos_app.utils.label_compiler import LabelBatchCompiler, print_label_batch
+        try:
+            compiler = LabelBatchCompiler.for_printer(self, language)
+
+            # Already-open serial connection: write the whole stream at once
+            if not target and self.serial_port and self.serial_port.is_open:
+                self.serial_port.write(compiler.compile(items))
+                self.serial_port.flush()
+                return True
+
+            if not target and self.printer_name and os.name == 'nt':
+                target = f"win://{self.printer_name}"
+            if not target:
+                logger.error("No label printer target configured")
+                return False
+
+            print_label_batch(items, target, compiler=compiler)
+            return True
+
+        except Exception as e:
+            logger.error(f"Batch print error: {e}")
+            return False
+
     def test_print(self) -> bool:
         """Print a test label"""
         return self.print_barcode("123456789012", "TEST LABEL", 1)
@@ -377,7 +405,10 @@ class BarcodePrinterSettings:
         'default_copies': 1,
         'gap_sensing': True,
         'serial_port': '',
-        'baudrate': 9600
+        'baudrate': 9600,
+        'label_language': 'EPL2',
+        'label_target': '',
+        'print_labels_on_receive': False
     }
     
     def __init__(self, settings_file: str = None):
@@ -416,6 +447,19 @@ class BarcodePrinterSettings:
         """Set a specific setting"""
         self.settings[key] = value
     
+    def label_target(self) -> str:
+        """Raw target URI for batch label printing ('' when none is configured)"""
+        target = (self.settings.get('label_target') or '').strip()
+        if target:
+            return target
+        serial_port = (self.settings.get('serial_port') or '').strip()
+        if serial_port:
+            return f"serial://{serial_port}?baud={int(self.settings.get('baudrate') or 9600)}"
+        printer_name = (self.settings.get('printer_name') or '').strip()
+        if printer_name and os.name == 'nt':
+            return f"win://{printer_name}"
+        return ''
+
     def create_printer(self) -> BarcodePrinter:
         """Create printer instance with current settings"""
         return BarcodePrinter(
@@ -0,0 +1,353 @@
+"""
+Cart engine for the sales screen, independent of Qt.
+
+Lines stay plain dicts (CartLine subclasses dict) so existing code that reads or
+writes item['quantity'] / item['price'] keeps working, but every write goes
+through the owning Cart, which keeps running totals in paisa and tells
+listeners which row changed. Totals are O(1) to read, repeat scans find their
+line through a product-id index, and the table only redraws the affected rows.
+
+    cart = Cart()
+    cart.subscribe(lambda event, row: ...)        # 'added' | 'updated' | 'removed' | 'reset'
+    row, created = cart.add_or_increment({'id': 7, 'name': 'Tea', 'price': 120.0, 'quantity': 1})
+    cart[row]['quantity'] = 3
+    cart.totals(discount=50, tax_rate=0).total
+"""
+
+import logging
+
+from pos_app.utils.money import from_paisa, money_mul, to_paisa
+
+logger = logging.getLogger(__name__)
+
+# Line fields that feed the totals
+TRACKED_FIELDS = ('quantity', 'price', 'purchase_price', 'refund_unit_subtotal')
+
+
+def _qty(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class CartLine(dict):
+    """One cart row; writes are reported to the owning Cart"""
+
+    __slots__ = ('_cart', '_row')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cart = None
+        self._row = -1
+
+    def __setitem__(self, key, value):
+        cart = self._cart
+        if cart is None:
+            return super().__setitem__(key, value)
+        cart._before_change(self, key)
+        super().__setitem__(key, value)
+        cart._after_change(self, key)
+
+    def __delitem__(self, key):
+        cart = self._cart
+        if cart is None:
+            return super().__delitem__(key)
+        cart._before_change(self, key)
+        super().__delitem__(key)
+        cart._after_change(self, key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def __reduce__(self):
+        # Copies/pickles are detached plain dicts
+        return (dict, (dict(self),))
+
+
+class CartTotals:
+    def __init__(self, items_count, subtotal, total_cost, discount, tax, total):
+        self.items_count = items_count
+        self.subtotal = subtotal
+        self.total_cost = total_cost
+        self.profit = subtotal - total_cost
+        self.discount = discount
+        self.tax = tax
+        self.total = total
+
+    def as_tuple(self):
+        """(items_count, subtotal, total_cost, profit, discount, tax, total)"""
+        return self.items_count, self.subtotal, self.total_cost, self.profit, self.discount, self.tax, self.total
+
+
+class Cart:
+    """Ordered cart lines with incremental totals and change events"""
+
+    def __init__(self, items=None, refund_mode=False):
+        self._lines = []
+        self._by_key = {}
+        self._listeners = []
+        self._refund_mode = bool(refund_mode)
+        self._qty_milli = 0
+        self._subtotal_paisa = 0
+        self._cost_paisa = 0
+        self._pending = None  # contribution of the line being edited
+        if items:
+            self.reset(items, notify=False)
+
+    # ------------------------------------------------------------ events
+    def subscribe(self, callback):
+        """callback(event, row) with event in 'added', 'updated', 'removed', 'reset'.
+
+        After 'added'/'removed' every row from `row` onward may have moved; 'reset'
+        passes row=None.
+        """
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def _emit(self, event, row):
+        for callback in list(self._listeners):
+            try:
+                callback(event, row)
+            except Exception as e:
+                logger.warning(f"Cart listener failed on {event}: {e}")
+
+    # ------------------------------------------------------------ totals
+    def _contribution(self, line):
+        qty = _qty(line.get('quantity'))
+        unit = line.get('price', 0.0)
+        if self._refund_mode and line.get('refund_unit_subtotal') is not None:
+            unit = line.get('refund_unit_subtotal')
+        try:
+            sub = to_paisa(money_mul(unit or 0, qty))
+            cost = to_paisa(money_mul(line.get('purchase_price', 0) or 0, qty))
+        except Exception:
+            sub = cost = 0
+        return round(qty * 1000), sub, cost
+
+    def _apply(self, contribution, sign):
+        self._qty_milli += sign * contribution[0]
+        self._subtotal_paisa += sign * contribution[1]
+        self._cost_paisa += sign * contribution[2]
+
+    def _before_change(self, line, key):
+        if key in TRACKED_FIELDS:
+            self._pending = self._contribution(line)
+        if key == 'id':
+            self._unindex(line)
+
+    def _after_change(self, line, key):
+        if key in TRACKED_FIELDS and self._pending is not None:
+            self._apply(self._pending, -1)
+            self._apply(self._contribution(line), +1)
+            self._pending = None
+        if key == 'id':
+            self._index(line)
+        self._emit('updated', line._row)
+
+    def _index(self, line):
+        key = line.get('id')
+        if key is not None and key not in self._by_key:
+            self._by_key[key] = line
+
+    def _unindex(self, line):
+        key = line.get('id')
+        if key is not None and self._by_key.get(key) is line:
+            del self._by_key[key]
+            # Another line with the same product takes over the slot
+            for other in self._lines:
+                if other is not line and other.get('id') == key:
+                    self._by_key[key] = other
+                    break
+
+    @property
+    def refund_mode(self) -> bool:
+        return self._refund_mode
+
+    def set_refund_mode(self, refund_mode: bool):
+        """Refund carts total on refund_unit_subtotal; switching recomputes once."""
+        refund_mode = bool(refund_mode)
+        if refund_mode != self._refund_mode:
+            self._refund_mode = refund_mode
+            self._recompute()
+
+    def _recompute(self):
+        self._qty_milli = self._subtotal_paisa = self._cost_paisa = 0
+        for line in self._lines:
+            self._apply(self._contribution(line), +1)
+
+    @property
+    def items_count(self) -> float:
+        count = self._qty_milli / 1000.0
+        return int(count) if count == int(count) else count
+
+    @property
+    def subtotal(self) -> float:
+        return from_paisa(self._subtotal_paisa)
+
+    @property
+    def total_cost(self) -> float:
+        return from_paisa(self._cost_paisa)
+
+    def pricing_lines(self) -> list:
+        """Lines for PricingEngine.price_cart ({'id', 'quantity', 'price'}); refund carts price at refund_unit_subtotal"""
+        lines = []
+        for line in self._lines:
+            unit = line.get('price', 0.0)
+            if self._refund_mode and line.get('refund_unit_subtotal') is not None:
+                unit = line.get('refund_unit_subtotal')
+            lines.append({'id': line.get('id'), 'quantity': _qty(line.get('quantity')), 'price': unit or 0.0})
+        return lines
+
+    def totals(self, discount=0.0, tax_rate=0.0) -> CartTotals:
+        """Totals after a fixed discount (capped at the subtotal) and tax on the remainder."""
+        try:
+            discount_paisa = max(0, min(to_paisa(discount or 0), self._subtotal_paisa))
+        except Exception:
+            discount_paisa = 0
+        taxable = self._subtotal_paisa - discount_paisa
+        try:
+            tax = round(taxable * float(tax_rate or 0.0) / 100.0)
+        except (TypeError, ValueError):
+            tax = 0
+        return CartTotals(self.items_count, self.subtotal, self.total_cost,
+                          from_paisa(discount_paisa), from_paisa(tax), from_paisa(taxable + tax))
+
+    # ------------------------------------------------------------ lines
+    def _attach(self, item, row):
+        line = item if isinstance(item, CartLine) and item._cart is None else CartLine(item)
+        line._cart = self
+        line._row = row
+        self._index(line)
+        self._apply(self._contribution(line), +1)
+        return line
+
+    def _detach(self, line):
+        self._apply(self._contribution(line), -1)
+        self._unindex(line)
+        line._cart = None
+        line._row = -1
+
+    def find(self, key) -> int:
+        """Row of the (first) line for a product id, or -1"""
+        line = self._by_key.get(key)
+        return line._row if line is not None else -1
+
+    def add_or_increment(self, item: dict, quantity=1):
+        """Bump the quantity of the line with the same product id, or append a new line.
+
+        Returns (row, created).
+        """
+        row = self.find(item.get('id'))
+        if row >= 0:
+            line = self._lines[row]
+            current = line.get('quantity') or 0
+            try:
+                line['quantity'] = current + quantity
+            except TypeError:
+                line['quantity'] = _qty(current) + _qty(quantity)
+            return row, False
+        self.append(item)
+        return len(self._lines) - 1, True
+
+    def append(self, item: dict):
+        line = self._attach(item, len(self._lines))
+        self._lines.append(line)
+        self._emit('added', line._row)
+        return line
+
+    def insert(self, index: int, item: dict):
+        index = max(0, min(len(self._lines), index if index >= 0 else len(self._lines) + index))
+        line = self._attach(item, index)
+        self._lines.insert(index, line)
+        self._renumber(index + 1)
+        self._emit('added', index)
+        return line
+
+    def pop(self, index: int = -1):
+        if index < 0:
+            index += len(self._lines)
+        if not 0 <= index < len(self._lines):
+            raise IndexError("cart index out of range")
+        line = self._lines.pop(index)
+        self._detach(line)
+        self._renumber(index)
+        self._emit('removed', index)
+        return line
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(len(self._lines))), reverse=True):
+                self.pop(i)
+        else:
+            self.pop(index)
+
+    def remove(self, item):
+        for row, line in enumerate(self._lines):
+            if line is item:
+                self.pop(row)
+                return
+        raise ValueError("item not in cart")
+
+    def index(self, item) -> int:
+        for row, line in enumerate(self._lines):
+            if line is item:
+                return row
+        raise ValueError("item not in cart")
+
+    def _renumber(self, start: int):
+        for row in range(start, len(self._lines)):
+            self._lines[row]._row = row
+
+    def clear(self):
+        self.reset([])
+
+    def reset(self, items, notify=True):
+        """Replace all lines (e.g. loading a refund invoice)"""
+        items = list(items or [])
+        for line in self._lines:
+            line._cart = None
+            line._row = -1
+        self._lines = []
+        self._by_key = {}
+        self._qty_milli = self._subtotal_paisa = self._cost_paisa = 0
+        for item in items:
+            self._lines.append(self._attach(item, len(self._lines)))
+        if notify:
+            self._emit('reset', None)
+
+    # ------------------------------------------------------------ list protocol
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __iter__(self):
+        return iter(list(self._lines))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._lines[index]
+        return self._lines[index]
+
+    def __repr__(self):
+        return f"Cart({len(self._lines)} lines, subtotal={self.subtotal:.2f})"
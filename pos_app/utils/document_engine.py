@@ -0,0 +1,556 @@
+"""
+Document rendering engine - compiled, cached templates for invoices, purchase
+orders and customer statements.
+
+Templates are parsed once into literal/field parts and cached per process, styles
+(CSS) are registered once and shared by every HTML document, and output is
+streamed chunk by chunk to the destination file instead of being built as one
+large string. ``render_batch`` spreads thousands of documents across a process
+pool for month-end runs.
+
+    render_to_file('invoice', invoice_context(sale, customer, items), 'documents/invoice_1.txt')
+    render_batch([('customer_statement', ctx, 'stmt_1.txt'), ...], 'documents/month_end')
+
+Contexts are plain dicts (picklable), so ORM objects are converted with the
+``*_context`` helpers before rendering.
+"""
+
+import html
+import logging
+import os
+import string
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Batches smaller than this are rendered in-process; pool start-up would cost more
+MIN_PARALLEL_BATCH = 64
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+class Safe(str):
+    """String that is inserted into HTML templates without escaping."""
+    pass
+
+
+class CompiledTemplate:
+    """A ``str.format`` style template parsed once into (literal, field, spec, conversion) parts."""
+
+    _formatter = string.Formatter()
+
+    def __init__(self, source: str, escape=None):
+        self.source = source
+        self.escape = escape
+        self._parts = []
+        for literal, field, spec, conversion in self._formatter.parse(source):
+            self._parts.append((literal, field, spec or '', conversion))
+        self.fields = tuple(p[1] for p in self._parts if p[1])
+
+    def render(self, context: dict) -> str:
+        out = []
+        append = out.append
+        escape = self.escape
+        for literal, field, spec, conversion in self._parts:
+            if literal:
+                append(literal)
+            if field is None:
+                continue
+            value = context[field]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            if escape is not None and isinstance(value, str) and not isinstance(value, Safe):
+                value = escape(value)
+            append(format(value, spec))
+        return ''.join(out)
+
+
+class DocumentTemplate:
+    """Header + repeated row + footer, rendered as a stream of chunks.
+
+    The context holds the header/footer fields plus a ``rows`` iterable of dicts
+    (each rendered with ``row``). ``empty`` is emitted when there are no rows.
+    """
+
+    def __init__(self, name: str, header: str, row: str = '', footer: str = '', empty: str = '',
+                 escape=None, styles: dict | None = None):
+        self.name = name
+        self.header = CompiledTemplate(header, escape)
+        self.row = CompiledTemplate(row, escape)
+        self.footer = CompiledTemplate(footer, escape)
+        self.empty = CompiledTemplate(empty, escape)
+        # Shared stylesheets looked up by name at render time, e.g. {'styles': 'statement'}
+        self.styles = dict(styles or {})
+
+    def _context(self, context: dict) -> dict:
+        ctx = dict(context)
+        for key, style_name in self.styles.items():
+            ctx.setdefault(key, get_style(style_name))
+        return ctx
+
+    def render_iter(self, context: dict):
+        """Yield the document in chunks (header, one chunk per row, footer)."""
+        ctx = self._context(context)
+        yield self.header.render(ctx)
+        has_rows = False
+        for row in ctx.get('rows') or ():
+            has_rows = True
+            yield self.row.render(row)
+        if not has_rows and self.empty.source:
+            yield self.empty.render(ctx)
+        yield self.footer.render(ctx)
+
+    def render(self, context: dict) -> str:
+        return ''.join(self.render_iter(context))
+
+    def write(self, context: dict, stream) -> int:
+        """Stream the document to an open text stream; returns characters written."""
+        written = 0
+        for chunk in self.render_iter(context):
+            stream.write(chunk)
+            written += len(chunk)
+        return written
+
+
+# ---------------------- SHARED STYLES ----------------------
+_styles = {}
+
+
+def register_style(name: str, css: str):
+    """Register a stylesheet shared by all HTML templates that reference ``name``."""
+    _styles[name] = Safe(css)
+
+
+def get_style(name: str) -> Safe:
+    return _styles.get(name, Safe(''))
+
+
+# ---------------------- TEMPLATE REGISTRY ----------------------
+_template_sources = {}
+_compiled = {}
+
+
+def register_template(name: str, header: str, row: str = '', footer: str = '', empty: str = '',
+                      html_escape: bool = False, styles: dict | None = None):
+    """Register (or replace) a template source; it is compiled on first use."""
+    _template_sources[name] = dict(header=header, row=row, footer=footer, empty=empty,
+                                   escape=html.escape if html_escape else None, styles=styles)
+    _compiled.pop(name, None)
+
+
+def get_template(name: str) -> DocumentTemplate:
+    """Compiled template for ``name`` (compiled once per process)."""
+    tpl = _compiled.get(name)
+    if tpl is None:
+        try:
+            source = _template_sources[name]
+        except KeyError:
+            raise KeyError(f"Unknown document template: {name}")
+        tpl = DocumentTemplate(name, **source)
+        _compiled[name] = tpl
+    return tpl
+
+
+def render(name: str, context: dict) -> str:
+    return get_template(name).render(context)
+
+
+def render_to_file(name: str, context: dict, path: str) -> str:
+    """Stream a document to ``path`` and return the path."""
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        get_template(name).write(context, f)
+    return path
+
+
+# ---------------------- BATCH RENDERING ----------------------
+def _warm_templates():
+    """Pool initializer: compile every registered template once per worker."""
+    for name in list(_template_sources):
+        try:
+            get_template(name)
+        except Exception as e:
+            logger.warning(f"Could not compile template {name}: {e}")
+
+
+def _render_chunk(jobs, output_dir):
+    results = []
+    for name, context, filename in jobs:
+        path = os.path.join(output_dir, filename)
+        try:
+            results.append((filename, render_to_file(name, context, path), None))
+        except Exception as e:
+            results.append((filename, None, str(e)))
+    return results
+
+
+def render_batch(jobs, output_dir: str, workers: int | None = None, chunk_size: int = 50) -> list:
+    """Render many documents, in parallel when the batch is large.
+
+    ``jobs`` is an iterable of ``(template_name, context, filename)``. Returns a list of
+    ``(filename, path_or_None, error_or_None)`` in the same order as ``jobs``.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 8)
+    chunk_size = max(1, int(chunk_size))
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    if workers <= 1 or len(jobs) < MIN_PARALLEL_BATCH:
+        return _render_chunk(jobs, output_dir)
+
+    # A frozen build re-runs its entry point in every spawned worker; threads are the safe choice there
+    executor = ThreadPoolExecutor if getattr(sys, 'frozen', False) else ProcessPoolExecutor
+    results = []
+    try:
+        with executor(max_workers=min(workers, len(chunks)), initializer=_warm_templates) as pool:
+            for chunk_results in pool.map(_render_chunk, chunks, [output_dir] * len(chunks)):
+                results.extend(chunk_results)
+    except Exception as e:
+        # Pool unavailable (restricted sandbox): render here
+        logger.warning(f"Process pool unavailable, rendering {len(jobs)} documents in-process: {e}")
+        results = _render_chunk(jobs, output_dir)
+    failed = [r for r in results if r[2]]
+    if failed:
+        logger.error(f"{len(failed)} of {len(jobs)} documents failed to render, first: {failed[0][2]}")
+    return results
+
+
+# ---------------------- CONTEXT BUILDERS ----------------------
+def invoice_context(sale, customer, items) -> dict:
+    """Plain-dict invoice context from ORM objects."""
+    rows = []
+    subtotal = 0.0
+    for it in items:
+        qty = getattr(it, "quantity", 0)
+        price = getattr(it, "unit_price", 0.0)
+        total = getattr(it, "total", qty * price)
+        subtotal += total
+        rows.append({
+            'qty': qty,
+            'name': getattr(getattr(it, "product", None), "name", "") or "",
+            'price': price,
+            'total': total,
+        })
+    tax_amount = getattr(sale, "tax_amount", 0.0)
+    discount_amount = getattr(sale, "discount_amount", 0.0)
+    return {
+        'invoice_no': getattr(sale, "invoice_number", getattr(sale, "id", "N/A")),
+        'sale_date': getattr(sale, "sale_date", datetime.now()),
+        'customer_name': getattr(customer, "name", "Walk-in Customer") if customer else "Walk-in Customer",
+        'rows': rows,
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'discount_amount': discount_amount,
+        'grand_total': getattr(sale, "total_amount", subtotal + tax_amount - discount_amount),
+    }
+
+
+def purchase_order_context(purchase, supplier, items) -> dict:
+    """Plain-dict purchase order context from ORM objects."""
+    rows = []
+    total = 0.0
+    for it in items:
+        qty = getattr(it, 'quantity', 0)
+        cost = getattr(it, 'unit_cost', 0.0)
+        line_total = qty * cost
+        total += line_total
+        rows.append({
+            'name': getattr(getattr(it, 'product', None), 'name', '') or '',
+            'qty': qty,
+            'cost': cost,
+            'line_total': line_total,
+        })
+    return {
+        'po_number': getattr(purchase, 'purchase_number', ''),
+        'order_date': getattr(purchase, 'order_date', datetime.now()),
+        'supplier_name': getattr(supplier, 'name', ''),
+        'supplier_contact': getattr(supplier, 'contact_person', ''),
+        'supplier_email': getattr(supplier, 'email', ''),
+        'rows': rows,
+        'total': total,
+    }
+
+
+def statement_context(customer_name: str, start_date, end_date, rows, headers=None) -> dict:
+    """Plain-dict text statement context; ``rows`` are sequences of cell values."""
+    return {
+        'customer_name': customer_name,
+        'start_date': start_date,
+        'end_date': end_date,
+        'generated': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'header_block': (" | ".join(str(h) for h in headers) + "\n" + "-" * 80 + "\n") if headers else "",
+        'rows': [{'line': " | ".join(str(v) for v in r)} for r in rows],
+    }
+
+
+# ---------------------- BUILT-IN TEMPLATES ----------------------
+register_template(
+    'invoice',
+    header=(
+        "=" * 60 + "\n"
+        "INVOICE\n"
+        + "=" * 60 + "\n\n"
+        "Invoice #: {invoice_no}\n"
+        "Date    : {sale_date:%Y-%m-%d %H:%M:%S}\n"
+        "Customer: {customer_name}\n\n"
+        "Qty  Item                           Price      Total\n"
+        + "-" * 60 + "\n"
+    ),
+    row="{qty:<3} {name:<28} {price:>8.2f} {total:>10.2f}\n",
+    footer=(
+        "-" * 60 + "\n"
+        "Subtotal: {subtotal:>10.2f}\n"
+        "Tax     : {tax_amount:>10.2f}\n"
+        "Discount: {discount_amount:>10.2f}\n"
+        "TOTAL   : {grand_total:>10.2f}\n"
+        + "=" * 60 + "\n"
+        "Thank you for your business!\n"
+    ),
+)
+
+register_template(
+    'purchase_order',
+    header=(
+        "PURCHASE ORDER\n"
+        + "=" * 60 + "\n"
+        "PO #: {po_number}\n"
+        "Date: {order_date:%Y-%m-%d}\n"
+        "\nSupplier:\n"
+        "  Name   : {supplier_name}\n"
+        "  Contact: {supplier_contact}\n"
+        "  Email  : {supplier_email}\n\n"
+        "Items:\n"
+        + "-" * 60 + "\n"
+    ),
+    row="{name:<30} x{qty:<3} @ {cost:>8.2f} = {line_total:>8.2f}\n",
+    footer="-" * 60 + "\nTOTAL: {total:>10.2f}\n",
+)
+
+register_template(
+    'customer_statement',
+    header=(
+        "Customer Statement - {customer_name}\n"
+        "Period: {start_date} to {end_date}\n"
+        "Generated on: {generated}\n"
+        + "=" * 80 + "\n"
+        "{header_block}"
+    ),
+    row="{line}\n",
+)
+
+register_style('statement', """        @page {
+            margin: 18mm;
+        }
+        body {
+            font-family: 'Segoe UI', 'Arial', sans-serif;
+            margin: 0;
+            padding: 1rem 1.5rem 1.5rem 1.5rem;
+            color: #0f172a;
+            background: #ffffff;
+            font-size: 10px;
+            line-height: 1.2;
+        }
+        .header {
+            text-align: center;
+            margin-bottom: 0.8rem;
+        }
+        .header h1 {
+            margin: 0;
+            font-size: 1.8em;
+            letter-spacing: 0.12em;
+        }
+        .header p {
+            margin: 0.2rem 0;
+            color: #475569;
+            font-size: 1.1em;
+        }
+        .bill-to {
+            margin-top: 1rem;
+            padding: 0.8rem;
+            border: 1px solid #e2e8f0;
+            border-radius: 6px;
+            background: #f8fafc;
+        }
+        .bill-to h2 {
+            margin: 0 0 0.5rem 0;
+            font-size: 1.1em;
+            color: #475569;
+            letter-spacing: 0.08em;
+        }
+        .summary-section {
+            margin-top: 1rem;
+        }
+        .summary-card {
+            display: inline-block;
+            min-width: 120px;
+            margin-right: 1rem;
+            margin-bottom: 0.5rem;
+            padding: 0.7rem 0.8rem;
+            border-radius: 4px;
+            background: linear-gradient(135deg, #eef2ff, #eff6ff);
+            border: 1px solid #dbeafe;
+        }
+        .summary-card .label {
+            text-transform: uppercase;
+            font-size: 0.9em;
+            letter-spacing: 0.12em;
+            color: #6366f1;
+            margin-bottom: 0.3rem;
+        }
+        .summary-card .value {
+            font-size: 1.2em;
+            font-weight: 700;
+        }
+        table {
+            width: 95%;
+            max-width: 1400px;
+            border-collapse: collapse;
+            margin: 2rem auto 1.5rem auto;
+            table-layout: fixed;
+            font-size: 1.4rem;
+            border: 3px solid #1e293b;
+            border-radius: 10px;
+            overflow: hidden;
+            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
+        }
+        th {
+            text-align: center;
+            padding: 2rem 2rem;
+            background: #000000 !important;
+            color: #ffffff !important;
+            font-size: 1.6rem !important;
+            font-weight: 900 !important;
+            border: 3px solid #ffffff !important;
+            text-transform: uppercase;
+            letter-spacing: 3px;
+            text-shadow: 2px 2px 4px rgba(0,0,0,0.8);
+            height: 60px !important;
+            line-height: 1.2;
+        }
+        td {
+            padding: 1.2rem 1.8rem;
+            border: 2px solid #e2e8f0;
+            font-size: 1.2rem;
+            color: #0f172a;
+            vertical-align: middle;
+            text-align: center;
+            background: #ffffff;
+            font-weight: 500;
+        }
+        td.numeric {
+            text-align: right;
+            font-variant-numeric: tabular-nums;
+        }
+        tr:nth-child(even) td {
+            background-color: #f8fafc;
+        }
+        tr {
+            min-height: 2rem;
+        }
+        .section-title {
+            margin-top: 1.2rem;
+            font-size: 0.9rem;
+            letter-spacing: 0.22em;
+            color: #94a3b8;
+        }
+        .footer {
+            margin-top: 1rem;
+            text-align: center;
+            font-size: 0.8rem;
+            color: #94a3b8;
+        }
+        .empty {
+            text-align: center;
+            padding: 1.5rem 0;
+            color: #94a3b8;
+            font-size: 1rem;
+        }
+""")
+
+register_template(
+    'customer_statement_html',
+    header="""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8" />
+    <style>
+{styles}    </style>
+</head>
+<body>
+    <div class="header">
+        <p class="section-title">CUSTOMER STATEMENT</p>
+        <h1>{shop_name}</h1>
+        <p>{shop_address}</p>
+        <p>Contact: {shop_phone}</p>
+        <p>Statement Period: {period_text}</p>
+    </div>
+
+    <div class="bill-to">
+        <h2>BILL TO</h2>
+        <p><strong>Name:</strong> {customer_name}</p>
+        <p><strong>Address:</strong> {customer_address}</p>
+        <p><strong>Phone:</strong> {customer_phone}</p>
+    </div>
+
+    <table style="border-collapse: collapse; width: 95%; margin: 2rem auto; table-layout: fixed;">
+        <thead style="display: table-header-group;">
+            <tr>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DATE</th>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DESCRIPTION</th>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">QTY</th>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DISCOUNT</th>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">PRICE</th>
+                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">SUBTOTAL</th>
+            </tr>
+        </thead>
+        <tbody>
+            """,
+    row=(
+        "<tr>"
+        "<td>{date}</td>"
+        "<td>{description}</td>"
+        "<td class='numeric'>{quantity}</td>"
+        "<td class='numeric'>{discount}</td>"
+        "<td class='numeric'>{price}</td>"
+        "<td class='numeric'>{subtotal}</td>"
+        "</tr>"
+    ),
+    empty="<tr><td colspan='6' class='empty'>No transactions found for the selected period.</td></tr>",
+    footer="""
+        </tbody>
+        <tfoot>
+            <tr style="background: linear-gradient(135deg, #f1f5f9, #e2e8f0); border-top: 3px solid #1e293b;">
+                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">TOTAL OF THAT SALE:</td>
+                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #1e293b; padding: 0.5rem 1rem;">{total_sales}</td>
+            </tr>
+            <tr style="background: linear-gradient(135deg, #e8f4f8, #d1ecf1); border-top: 2px solid #0c4a6e;">
+                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">TOTAL PAID:</td>
+                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #0c4a6e; padding: 0.5rem 1rem;">{total_payments}</td>
+            </tr>
+            <tr style="background: linear-gradient(135deg, #fef2f2, #fee2e2); border-top: 2px solid #dc2626;">
+                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">AMOUNT DUE:</td>
+                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #dc2626; padding: 0.5rem 1rem;">{balance}</td>
+            </tr>
+        </tfoot>
+    </table>
+
+    <div class="footer">
+        <p>Generated on {generated_text}</p>
+        <p>Thank you for your business!</p>
+    </div>
+</body>
+</html>
+""",
+    html_escape=True,
+    styles={'styles': 'statement'},
+)
@@ -2,6 +2,8 @@ from datetime import datetime
 import os
 import csv
 
+from pos_app.utils import document_engine
+
 
 class DocumentGenerator:
     """Pure-stdlib document generator for EXE builds (no reportlab/matplotlib/PIL)."""
@@ -13,44 +15,9 @@ class DocumentGenerator:
 
     # ---------------------- INVOICE (TEXT) ----------------------
     def generate_invoice(self, sale, customer, items):
-        invoice_no = getattr(sale, "invoice_number", getattr(sale, "id", "N/A"))
-        filename = os.path.join(self.output_dir, f"invoice_{invoice_no}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("=" * 60 + "\n")
-            f.write("INVOICE\n")
-            f.write("=" * 60 + "\n\n")
-
-            sale_date = getattr(sale, "sale_date", datetime.now())
-            f.write(f"Invoice #: {invoice_no}\n")
-            f.write(f"Date    : {sale_date.strftime('%Y-%m-%d %H:%M:%S')}\n")
-
-            cust_name = getattr(customer, "name", "Walk-in Customer") if customer else "Walk-in Customer"
-            f.write(f"Customer: {cust_name}\n\n")
-
-            f.write("Qty  Item                           Price      Total\n")
-            f.write("-" * 60 + "\n")
-
-            subtotal = 0.0
-            for it in items:
-                name = getattr(getattr(it, "product", None), "name", "") or ""
-                qty = getattr(it, "quantity", 0)
-                price = getattr(it, "unit_price", 0.0)
-                total = getattr(it, "total", qty * price)
-                subtotal += total
-                f.write(f"{qty:<3} {name:<28} {price:>8.2f} {total:>10.2f}\n")
-
-            tax_amount = getattr(sale, "tax_amount", 0.0)
-            discount_amount = getattr(sale, "discount_amount", 0.0)
-            grand_total = getattr(sale, "total_amount", subtotal + tax_amount - discount_amount)
-
-            f.write("-" * 60 + "\n")
-            f.write(f"Subtotal: {subtotal:>10.2f}\n")
-            f.write(f"Tax     : {tax_amount:>10.2f}\n")
-            f.write(f"Discount: {discount_amount:>10.2f}\n")
-            f.write(f"TOTAL   : {grand_total:>10.2f}\n")
-            f.write("=" * 60 + "\n")
-            f.write("Thank you for your business!\n")
-        return filename
+        context = document_engine.invoice_context(sale, customer, items)
+        filename = os.path.join(self.output_dir, f"invoice_{context['invoice_no']}.txt")
+        return document_engine.render_to_file('invoice', context, filename)
 
     # ---------------------- THERMAL RECEIPT (TEXT) ----------------------
     def generate_thermal_receipt(self, sale, items, business_info=None, filename=None, width_mm=80):
@@ -138,30 +105,8 @@ class DocumentGenerator:
     # ---------------------- PURCHASE ORDER (TEXT) ----------------------
     def generate_purchase_order(self, purchase, supplier, items):
         filename = os.path.join(self.output_dir, f"po_{getattr(purchase, 'purchase_number', getattr(purchase, 'id', 'N/A'))}.txt")
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("PURCHASE ORDER\n")
-            f.write("=" * 60 + "\n")
-            f.write(f"PO #: {getattr(purchase, 'purchase_number', '')}\n")
-            f.write(f"Date: {getattr(purchase, 'order_date', datetime.now()).strftime('%Y-%m-%d')}\n")
-            f.write("\nSupplier:\n")
-            f.write(f"  Name   : {getattr(supplier, 'name', '')}\n")
-            f.write(f"  Contact: {getattr(supplier, 'contact_person', '')}\n")
-            f.write(f"  Email  : {getattr(supplier, 'email', '')}\n\n")
-
-            f.write("Items:\n")
-            f.write("-" * 60 + "\n")
-            total = 0.0
-            for it in items:
-                pname = getattr(getattr(it, 'product', None), 'name', '') or ''
-                qty = getattr(it, 'quantity', 0)
-                cost = getattr(it, 'unit_cost', 0.0)
-                line_total = qty * cost
-                total += line_total
-                f.write(f"{pname:<30} x{qty:<3} @ {cost:>8.2f} = {line_total:>8.2f}\n")
-
-            f.write("-" * 60 + "\n")
-            f.write(f"TOTAL: {total:>10.2f}\n")
-        return filename
+        context = document_engine.purchase_order_context(purchase, supplier, items)
+        return document_engine.render_to_file('purchase_order', context, filename)
 
     # ---------------------- INVENTORY REPORT (TEXT) ----------------------
     def generate_inventory_report(self, products):
@@ -237,15 +182,39 @@ class DocumentGenerator:
     def generate_customer_statement_pdf(self, customer_name: str, start_date, end_date, rows, headers):
         filename = f"customer_statement_{customer_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         path = os.path.join(self.output_dir, filename)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(f"Customer Statement - {customer_name}\n")
-            f.write(f"Period: {start_date} to {end_date}\n")
-            f.write("Generated on: " + datetime.now().strftime('%Y-%m-%d %H:%M') + "\n")
-            f.write("=" * 80 + "\n")
-
-            if headers:
-                f.write(" | ".join(str(h) for h in headers) + "\n")
-                f.write("-" * 80 + "\n")
-            for r in rows:
-                f.write(" | ".join(str(v) for v in r) + "\n")
-        return path
+        context = document_engine.statement_context(customer_name, start_date, end_date, rows, headers)
+        return document_engine.render_to_file('customer_statement', context, path)
+
+    # ---------------------- BATCH (MONTH-END) ----------------------
+    def generate_statements_batch(self, statements, workers=None, subdir=None):
+        """Render many customer statements across a process pool.
+
+        ``statements`` is an iterable of dicts with customer_name, start_date, end_date,
+        rows, headers and optionally customer_id. Returns the list of written paths.
+        """
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        jobs = []
+        for st in statements:
+            key = st.get('customer_id', st.get('customer_name', ''))
+            context = document_engine.statement_context(
+                st.get('customer_name', ''), st.get('start_date', ''), st.get('end_date', ''),
+                st.get('rows', []), st.get('headers')
+            )
+            jobs.append(('customer_statement', context, f"customer_statement_{key}_{stamp}.txt"))
+        output_dir = os.path.join(self.output_dir, subdir) if subdir else self.output_dir
+        results = document_engine.render_batch(jobs, output_dir, workers=workers)
+        return [path for _, path, error in results if path]
+
+    def generate_invoices_batch(self, invoices, workers=None, subdir=None):
+        """Render many invoices across a process pool.
+
+        ``invoices`` is an iterable of ``(sale, customer, items)``. ORM objects are converted
+        to plain contexts here, so only picklable data crosses process boundaries.
+        """
+        jobs = []
+        for sale, customer, items in invoices:
+            context = document_engine.invoice_context(sale, customer, items)
+            jobs.append(('invoice', context, f"invoice_{context['invoice_no']}.txt"))
+        output_dir = os.path.join(self.output_dir, subdir) if subdir else self.output_dir
+        results = document_engine.render_batch(jobs, output_dir, workers=workers)
+        return [path for _, path, error in results if path]
@@ -0,0 +1,288 @@
+"""
+Recurring expense scheduler - upcoming occurrences and bulk processing of due ones.
+
+A recurring Expense (is_recurring=True) is a template: its frequency and
+next_due_date say when it falls due. materialise() keeps ExpenseSchedule rows
+for every occurrence inside a horizon window (and at least the next one), so
+the scheduled-payments screen and cash planning see what is coming.
+process_due() then settles everything due in one statement:
+
+    UPDATE expense_schedules SET status='PAID', paid_date=:now
+    WHERE status = 'PENDING' AND scheduled_date <= :now
+      AND expense_id IN (auto-create templates)
+    RETURNING id, expense_id, scheduled_date, amount
+
+and inserts the matching Expense rows with one bulk insert. Occurrences paid in
+cash are also written to the open cash drawer session as PAYOUT movements
+(controllers/cash_drawer.py), in the same transaction, as a manually recorded
+cash expense is. Due occurrences of
+templates without auto_create are only flagged OVERDUE for manual payment.
+OVERDUE always means "waiting for a person"; it is never settled automatically.
+
+The first time a template is materialised (no schedule rows yet, e.g. the
+first start after upgrading) its backlog since next_due_date is not booked:
+only the latest missed occurrence is created, as OVERDUE, and scheduling
+continues from now.
+
+    scheduler = ExpenseScheduler(session)
+    scheduler.run()                       # materialise + process, one commit
+    start_expense_scheduler()             # same, at startup and every hour
+
+On PostgreSQL a transaction-level advisory lock makes concurrent runs from
+several terminals skip instead of double-booking.
+"""
+
+import calendar
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, text, update
+
+from pos_app.models.database import Expense, ExpenseSchedule
+
+logger = logging.getLogger(__name__)
+
+HORIZON_DAYS = 90          # materialise occurrences this far ahead
+SCHEDULER_INTERVAL = 3600  # seconds between background runs
+ADVISORY_LOCK_KEY = 0x45585053  # 'EXPS'
+
+OPEN_STATUSES = ('PENDING', 'OVERDUE')
+MONTHS = {'MONTHLY': 1, 'QUARTERLY': 3, 'YEARLY': 12}
+DAYS = {'DAILY': 1, 'WEEKLY': 7}
+
+
+def _frequency(value) -> str:
+    value = getattr(value, 'value', value)
+    return str(value or '').upper().replace(' ', '_')
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+def add_months(when: datetime, months: int, anchor_day: int | None = None) -> datetime:
+    """Same day-of-month `months` later, clamped to the month's last day (31 Jan -> 28/29 Feb -> 31 Mar)."""
+    index = when.month - 1 + months
+    year, month = when.year + index // 12, index % 12 + 1
+    day = min(anchor_day or when.day, calendar.monthrange(year, month)[1])
+    return when.replace(year=year, month=month, day=day)
+
+
+def next_occurrence(when: datetime, frequency, anchor_day: int | None = None):
+    """The occurrence after `when` for an ExpenseFrequency value, or None for ONE_TIME/unknown."""
+    frequency = _frequency(frequency)
+    if frequency in DAYS:
+        return when + timedelta(days=DAYS[frequency])
+    if frequency in MONTHS:
+        return add_months(when, MONTHS[frequency], anchor_day)
+    return None
+
+
+def occurrences(start: datetime, frequency, after: datetime | None, until: datetime, at_least_one=True) -> list:
+    """Occurrences from `start` later than `after` up to `until`; with at_least_one, the next one
+    is returned even when it falls beyond `until`."""
+    start = _as_datetime(start)
+    if _frequency(frequency) not in DAYS and _frequency(frequency) not in MONTHS:
+        return [start] if after is None else []
+    found, current, anchor = [], start, start.day
+    while current is not None:
+        if after is None or current > after:
+            if current > until:
+                if at_least_one and not found:
+                    found.append(current)
+                break
+            found.append(current)
+        current = next_occurrence(current, frequency, anchor)
+    return found
+
+
+class ExpenseScheduler:
+    """Materialise and process recurring expense occurrences (see module docstring)."""
+
+    def __init__(self, db_session, horizon_days=HORIZON_DAYS):
+        self.session = db_session
+        self.horizon_days = horizon_days
+
+    def _templates(self, expense_ids=None):
+        q = self.session.query(Expense).filter(Expense.is_recurring == True, Expense.next_due_date.isnot(None))
+        if expense_ids is not None:
+            q = q.filter(Expense.id.in_(list(expense_ids)))
+        return q.all()
+
+    def materialise(self, expense_ids=None, now=None) -> int:
+        """Insert the missing occurrences inside the horizon (one grouped read, one bulk insert)."""
+        now = now or datetime.now()
+        until = now + timedelta(days=self.horizon_days)
+        templates = self._templates(expense_ids)
+        if not templates:
+            return 0
+        latest = dict(
+            self.session.query(ExpenseSchedule.expense_id, func.max(ExpenseSchedule.scheduled_date))
+            .filter(ExpenseSchedule.expense_id.in_([t.id for t in templates]))
+            .group_by(ExpenseSchedule.expense_id)
+        )
+        rows = []
+        for template in templates:
+            last = latest.get(template.id)
+            last = _as_datetime(last) if last is not None else None
+            # Keep at least one occurrence ahead of now, even beyond the horizon (yearly expenses)
+            ahead = last is None or last <= now
+            dates = occurrences(template.next_due_date, template.frequency, last, until, ahead)
+            if last is None:
+                # First materialisation: never book the backlog; the latest missed one waits for a person
+                missed = [when for when in dates if when < now]
+                dates = [when for when in dates if when >= now]
+                if missed:
+                    rows.append({'expense_id': template.id, 'scheduled_date': missed[-1],
+                                 'amount': template.amount, 'status': 'OVERDUE'})
+                if missed and not dates:
+                    # Still keep the next occurrence, even beyond the horizon
+                    dates = occurrences(template.next_due_date, template.frequency, missed[-1], until)[:1]
+            for when in dates:
+                rows.append({'expense_id': template.id, 'scheduled_date': when,
+                             'amount': template.amount, 'status': 'PENDING'})
+        if rows:
+            self.session.execute(insert(ExpenseSchedule), rows)
+        return len(rows)
+
+    def _settle(self, now):
+        """Mark due auto-create occurrences PAID; returns (id, expense_id, scheduled_date, amount) rows."""
+        auto = self.session.query(Expense.id).filter(Expense.is_recurring == True,
+                                                     func.coalesce(Expense.auto_create, True) == True)
+        due = and_(ExpenseSchedule.status == 'PENDING', ExpenseSchedule.scheduled_date <= now,
+                   ExpenseSchedule.expense_id.in_(auto.scalar_subquery()))
+        columns = (ExpenseSchedule.id, ExpenseSchedule.expense_id, ExpenseSchedule.scheduled_date, ExpenseSchedule.amount)
+        stmt = update(ExpenseSchedule).where(due).values(status='PAID', paid_date=now) \
+            .execution_options(synchronize_session=False)
+        if self.session.get_bind().dialect.update_returning:
+            return self.session.execute(stmt.returning(*columns)).all()
+        # No UPDATE ... RETURNING: read the due rows under the same conditions first
+        rows = self.session.query(*columns).filter(due).with_for_update().all()
+        if rows:
+            self.session.execute(update(ExpenseSchedule).where(ExpenseSchedule.id.in_([r[0] for r in rows]))
+                                 .values(status='PAID', paid_date=now).execution_options(synchronize_session=False))
+        return rows
+
+    def process_due(self, now=None) -> dict:
+        """Settle every due occurrence and create its Expense rows in bulk.
+
+        Returns {'created': n, 'overdue': n, 'payouts': n}; the caller commits.
+        """
+        now = now or datetime.now()
+        settled = self._settle(now)
+        if settled:
+            templates = {t.id: t for t in self.session.query(Expense).filter(
+                Expense.id.in_({r[1] for r in settled}))}
+            self.session.execute(insert(Expense), [{
+                'title': templates[expense_id].title,
+                'amount': amount,
+                'expense_date': scheduled_date,
+                'category': templates[expense_id].category,
+                'subcategory': templates[expense_id].subcategory,
+                'payment_method': templates[expense_id].payment_method,
+                'supplier_id': templates[expense_id].supplier_id,
+                'bank_account_id': templates[expense_id].bank_account_id,
+                'reference': f"SCH-{schedule_id}",
+                'notes': templates[expense_id].notes,
+                'is_recurring': False,
+                'created_by': 'Scheduler',
+                'created_at': now,
+            } for schedule_id, expense_id, scheduled_date, amount in settled])
+        payouts = self._record_cash_payouts(settled, templates) if settled else 0
+
+        manual = self.session.query(Expense.id).filter(Expense.is_recurring == True,
+                                                       func.coalesce(Expense.auto_create, True) == False)
+        overdue = self.session.execute(
+            update(ExpenseSchedule)
+            .where(ExpenseSchedule.status == 'PENDING',
+                   ExpenseSchedule.scheduled_date < datetime.combine(now.date(), datetime.min.time()),
+                   ExpenseSchedule.expense_id.in_(manual.scalar_subquery()))
+            .values(status='OVERDUE')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self._refresh_next_due()
+        return {'created': len(settled), 'overdue': overdue or 0, 'payouts': payouts}
+
+    def _record_cash_payouts(self, settled, templates) -> int:
+        """PAYOUT movements for settled occurrences paid in cash; skipped when no drawer is open."""
+        from pos_app.controllers.cash_drawer import CashDrawerService
+        drawer = CashDrawerService(self.session)
+        payouts = 0
+        for schedule_id, expense_id, _, amount in settled:
+            template = templates[expense_id]
+            if str(getattr(template.payment_method, 'value', template.payment_method) or '').upper() != 'CASH':
+                continue
+            if drawer.record('PAYOUT', amount, reference=f"SCH-{schedule_id}",
+                             description=f"Expense: {template.title}", created_by='Scheduler') is not None:
+                payouts += 1
+        return payouts
+
+    def _refresh_next_due(self):
+        """next_due_date of each template = its earliest open occurrence (one correlated UPDATE)."""
+        earliest = (self.session.query(func.min(ExpenseSchedule.scheduled_date))
+                    .filter(ExpenseSchedule.expense_id == Expense.id, ExpenseSchedule.status.in_(OPEN_STATUSES))
+                    .correlate(Expense).scalar_subquery())
+        has_open = (self.session.query(ExpenseSchedule.id)
+                    .filter(ExpenseSchedule.expense_id == Expense.id, ExpenseSchedule.status.in_(OPEN_STATUSES))
+                    .correlate(Expense).exists())
+        self.session.execute(update(Expense).where(Expense.is_recurring == True, has_open)
+                             .values(next_due_date=earliest).execution_options(synchronize_session=False))
+
+    def _try_lock(self) -> bool:
+        if self.session.get_bind().dialect.name != 'postgresql':
+            return True
+        return bool(self.session.execute(text("SELECT pg_try_advisory_xact_lock(:k)"),
+                                         {'k': ADVISORY_LOCK_KEY}).scalar())
+
+    def run(self, now=None) -> dict:
+        """Process due occurrences, then materialise the horizon; one commit.
+
+        Returns {'created', 'overdue', 'materialised'}, or None when another terminal holds the lock.
+        """
+        now = now or datetime.now()
+        try:
+            if not self._try_lock():
+                self.session.rollback()
+                return None
+            # Materialise first so occurrences that fell due while nothing ran are settled too
+            materialised = self.materialise(now=now)
+            result = self.process_due(now)
+            materialised += self.materialise(now=now)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        self.session.expire_all()
+        result['materialised'] = materialised
+        if result['created'] or result['overdue'] or materialised:
+            logger.info(f"Expense scheduler: {result}")
+        return result
+
+
+_scheduler_thread = None
+_scheduler_lock = threading.Lock()
+
+
+def start_expense_scheduler(interval=SCHEDULER_INTERVAL, horizon_days=HORIZON_DAYS):
+    """Run the scheduler now and every `interval` seconds on a daemon thread."""
+    global _scheduler_thread
+
+    def run():
+        from pos_app.database.db_utils import get_db_session
+        while True:
+            try:
+                with get_db_session() as session:
+                    ExpenseScheduler(session, horizon_days).run()
+            except Exception as e:
+                logger.warning(f"Expense scheduler run failed: {e}")
+            time.sleep(interval)
+
+    with _scheduler_lock:
+        if _scheduler_thread is None or not _scheduler_thread.is_alive():
+            _scheduler_thread = threading.Thread(target=run, name="ExpenseScheduler", daemon=True)
+            _scheduler_thread.start()
+        return _scheduler_thread
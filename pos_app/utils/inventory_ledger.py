@@ -0,0 +1,323 @@
+"""
+Inventory ledger - point-in-time stock and valuation from stock_movements.
+
+Product.stock_level only says what is on hand now. Every sale, refund, receipt
+and transfer also writes a StockMovement row (with the weighted-average cost
+after the movement in unit_cost), so the movements form a ledger. Replaying the
+whole ledger to answer "what was on hand on 31 March" gets slower every day;
+instead checkpoint() writes per-product StockSnapshot rows at the end of each
+closed period (daily or monthly) that had movements, and a point-in-time query
+reads the latest snapshot before the date plus the movements after it
+(a bounded delta scan over the (product_id, date) index).
+
+A snapshot's last_movement_id is the highest movement id folded into it. A
+movement written later but dated before a snapshot's end (a back-dated receipt
+or correction) would fall outside every delta window, so checkpoint() first
+looks for such movements and drops the affected products' snapshots from the
+movement's date on; they are rebuilt in the same run. Snapshots of archived
+years (database/archive.py) are kept, since their movements are gone.
+
+    ledger = InventoryLedger(session)
+    ledger.checkpoint()                               # snapshot closed days
+    ledger.stock_at(product_id, datetime(2026, 3, 31, 23, 59))
+    ledger.valuation(at=datetime(2026, 4, 1))         # {'quantity', 'value', 'lines', ...}
+
+Movement signs: IN adds, OUT removes, TRANSFER is neutral and ADJUSTMENT uses the
+stored (signed) quantity. Warehouse <-> retail transfers are written as an
+OUT/IN pair and net to zero.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, or_
+
+from pos_app.models.database import Product, StockMovement, StockSnapshot
+from pos_app.utils.money import cost_mul, money_sum
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('daily', 'monthly')
+CHECKPOINT_INTERVAL = 6 * 3600  # seconds between background checkpoints
+INSERT_BATCH = 1000
+
+
+def period_start(ts: datetime, granularity: str = 'daily') -> datetime:
+    if granularity == 'monthly':
+        return datetime(ts.year, ts.month, 1)
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def period_end(ts: datetime, granularity: str = 'daily') -> datetime:
+    """Exclusive end of the period containing ts (next midnight / first of next month)"""
+    start = period_start(ts, granularity)
+    if granularity == 'monthly':
+        return datetime(start.year + (start.month == 12), start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _signed_quantity():
+    kind = func.upper(StockMovement.movement_type)
+    return case(
+        (kind == 'OUT', -StockMovement.quantity),
+        (kind == 'TRANSFER', 0.0),
+        else_=StockMovement.quantity,
+    )
+
+
+def signed_quantity(movement_type, quantity) -> float:
+    kind = str(movement_type or '').upper()
+    qty = float(quantity or 0.0)
+    if kind == 'OUT':
+        return -qty
+    if kind == 'TRANSFER':
+        return 0.0
+    return qty
+
+
+class StockPosition:
+    def __init__(self, product_id, quantity, unit_cost, snapshot_at=None, scanned=0):
+        self.product_id = product_id
+        self.quantity = quantity
+        self.unit_cost = unit_cost
+        self.snapshot_at = snapshot_at  # period_end of the snapshot used, None if none
+        self.scanned = scanned          # movements read after the snapshot
+
+    @property
+    def value(self) -> float:
+        return cost_mul(self.unit_cost or 0.0, self.quantity)
+
+
+class InventoryLedger:
+    """Snapshot + delta queries over the stock movement ledger"""
+
+    def __init__(self, session, granularity='daily'):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {GRANULARITIES}")
+        self.session = session
+        self.granularity = granularity
+
+    # ------------------------------------------------------------ snapshots
+    def _latest(self, at=None):
+        """Subquery: (product_id, period_end) of each product's latest snapshot at or before `at`"""
+        q = self.session.query(StockSnapshot.product_id.label('product_id'),
+                               func.max(StockSnapshot.period_end).label('period_end'))
+        if at is not None:
+            q = q.filter(StockSnapshot.period_end <= at)
+        return q.group_by(StockSnapshot.product_id).subquery()
+
+    def _snapshots(self, at=None, product_ids=None) -> dict:
+        latest = self._latest(at)
+        q = self.session.query(StockSnapshot).join(
+            latest, (latest.c.product_id == StockSnapshot.product_id) & (latest.c.period_end == StockSnapshot.period_end))
+        if product_ids is not None:
+            q = q.filter(StockSnapshot.product_id.in_(product_ids))
+        return {s.product_id: s for s in q}
+
+    def _back_dated(self) -> dict:
+        """{product_id: earliest date} of movements newer than the product's latest snapshot but dated before its end"""
+        latest = self._latest()
+        snap = self.session.query(
+            StockSnapshot.product_id.label('product_id'), StockSnapshot.period_end.label('period_end'),
+            StockSnapshot.last_movement_id.label('last_id')
+        ).join(latest, (latest.c.product_id == StockSnapshot.product_id)
+               & (latest.c.period_end == StockSnapshot.period_end)).subquery()
+        q = self.session.query(StockMovement.product_id, func.min(StockMovement.date)) \
+            .join(snap, snap.c.product_id == StockMovement.product_id) \
+            .filter(StockMovement.id > func.coalesce(snap.c.last_id, 0), StockMovement.date < snap.c.period_end) \
+            .group_by(StockMovement.product_id)
+        return dict(q)
+
+    def _drop_stale(self, stale: dict) -> int:
+        """Delete the snapshots that a back-dated movement invalidates (never those of archived years)."""
+        from pos_app.database.archive import archived_periods
+        archived_until = max((p.period_end for p in archived_periods(self.session, 'stock_movements')), default=None)
+        dropped = 0
+        for pid, since in stale.items():
+            if archived_until is not None and since < archived_until:
+                logger.warning(f"Stock movement for product {pid} dated {since:%Y-%m-%d} falls in an archived "
+                               f"year; snapshots before {archived_until:%Y-%m-%d} are kept")
+                since = archived_until
+            dropped += self.session.query(StockSnapshot).filter(
+                StockSnapshot.product_id == pid, StockSnapshot.period_end > since
+            ).delete(synchronize_session=False)
+        self.session.flush()
+        return dropped
+
+    def _window(self, q, latest, before):
+        """Movements dated after the product's snapshot boundary and before `before`"""
+        q = q.outerjoin(latest, latest.c.product_id == StockMovement.product_id)
+        return q.filter(StockMovement.date < before,
+                        or_(latest.c.period_end.is_(None), StockMovement.date >= latest.c.period_end))
+
+    # ------------------------------------------------------------ queries
+    def positions(self, at=None, product_ids=None) -> dict:
+        """{product_id: StockPosition} as of `at` (default now)."""
+        at = at or datetime.now()
+        ids = list(product_ids) if product_ids is not None else None
+        snaps = self._snapshots(at, ids)
+        latest = self._latest(at)
+
+        delta = self._window(self.session.query(
+            StockMovement.product_id, func.coalesce(func.sum(_signed_quantity()), 0.0), func.count(StockMovement.id)
+        ), latest, at)
+        costed = self._window(self.session.query(
+            StockMovement.product_id.label('product_id'), func.max(StockMovement.id).label('id')
+        ), latest, at).filter(StockMovement.unit_cost.isnot(None))
+        if ids is not None:
+            delta = delta.filter(StockMovement.product_id.in_(ids))
+            costed = costed.filter(StockMovement.product_id.in_(ids))
+        deltas = {pid: (float(qty or 0.0), int(n)) for pid, qty, n in delta.group_by(StockMovement.product_id)}
+        last_cost = costed.group_by(StockMovement.product_id).subquery()
+        costs = dict(self.session.query(StockMovement.product_id, StockMovement.unit_cost)
+                     .join(last_cost, last_cost.c.id == StockMovement.id))
+
+        products = self.session.query(Product.id, Product.purchase_price)
+        if ids is not None:
+            products = products.filter(Product.id.in_(ids))
+
+        result = {}
+        for pid, current_cost in products:
+            snap = snaps.get(pid)
+            qty, scanned = deltas.get(pid, (0.0, 0))
+            base = float(snap.quantity or 0.0) if snap is not None else 0.0
+            cost = costs.get(pid)
+            if cost is None and snap is not None:
+                cost = snap.unit_cost
+            if cost is None:
+                cost = current_cost
+            result[pid] = StockPosition(pid, base + qty, float(cost or 0.0),
+                                        snap.period_end if snap is not None else None, scanned)
+        return result
+
+    def stock_at(self, product_id, at=None) -> float:
+        position = self.positions(at, [product_id]).get(product_id)
+        return position.quantity if position is not None else 0.0
+
+    def valuation(self, at=None, product_ids=None) -> dict:
+        """Stock quantity and cost value per product and in total as of `at`."""
+        at = at or datetime.now()
+        positions = self.positions(at, product_ids)
+        lines = [
+            {'product_id': p.product_id, 'quantity': p.quantity, 'unit_cost': p.unit_cost, 'value': p.value}
+            for p in positions.values() if p.quantity
+        ]
+        return {
+            'at': at,
+            'products': len(lines),
+            'quantity': sum(line['quantity'] for line in lines),
+            'value': money_sum(line['value'] for line in lines),
+            'movements_scanned': sum(p.scanned for p in positions.values()),
+            'lines': lines,
+        }
+
+    def drift(self, product_ids=None) -> dict:
+        """{product_id: (ledger_quantity, stock_level)} where the ledger disagrees with the counter."""
+        positions = self.positions(None, product_ids)
+        q = self.session.query(Product.id, Product.stock_level)
+        if product_ids is not None:
+            q = q.filter(Product.id.in_(list(product_ids)))
+        return {
+            pid: (positions[pid].quantity, float(level or 0))
+            for pid, level in q
+            if pid in positions and abs(positions[pid].quantity - float(level or 0)) > 1e-6
+        }
+
+    # ------------------------------------------------------------ checkpoints
+    def checkpoint(self, upto=None, granularity=None, commit=True) -> int:
+        """Write snapshots for every closed period with movements; returns rows written."""
+        granularity = granularity or self.granularity
+        cutoff = period_start(upto or datetime.now(), granularity)
+        started = time.perf_counter()
+        stale = self._back_dated()
+        if stale:
+            dropped = self._drop_stale(stale)
+            logger.info(f"Stock ledger: back-dated movements for {len(stale)} product(s), "
+                        f"{dropped} snapshot(s) rebuilt")
+        snaps = self._snapshots()
+        latest = self._latest()
+
+        rows = self._window(self.session.query(
+            StockMovement.id, StockMovement.product_id, StockMovement.date,
+            StockMovement.movement_type, StockMovement.quantity, StockMovement.unit_cost
+        ), latest, cutoff).filter(StockMovement.product_id.isnot(None)) \
+            .order_by(StockMovement.product_id, StockMovement.date, StockMovement.id)
+
+        pending, written = [], 0
+        current = None  # [product_id, boundary, qty, cost, highest movement id so far]
+
+        def flush(state):
+            pid, boundary, qty, cost, last_id = state
+            pending.append(StockSnapshot(
+                product_id=pid, period_end=boundary, granularity=granularity, quantity=qty,
+                unit_cost=cost, value=cost_mul(cost or 0.0, qty), last_movement_id=last_id))
+
+        for mid, pid, date, kind, qty, cost in rows.yield_per(2000):
+            boundary = period_end(date, granularity)
+            if current is not None and (current[0] != pid or current[1] != boundary):
+                flush(current)
+                if current[0] != pid:
+                    current = None
+            if current is None:
+                snap = snaps.get(pid)
+                base_qty = float(snap.quantity or 0.0) if snap is not None else 0.0
+                base_cost = snap.unit_cost if snap is not None else None
+                current = [pid, boundary, base_qty, base_cost, snap.last_movement_id if snap is not None else None]
+            current[1] = boundary
+            current[2] += signed_quantity(kind, qty)
+            if cost is not None:
+                current[3] = float(cost)
+            current[4] = max(current[4] or 0, mid)
+            if len(pending) >= INSERT_BATCH:
+                self.session.add_all(pending)
+                self.session.flush()
+                written += len(pending)
+                pending = []
+        if current is not None:
+            flush(current)
+        if pending:
+            self.session.add_all(pending)
+            written += len(pending)
+        if commit:
+            self.session.commit()
+        else:
+            self.session.flush()
+        logger.info(f"Stock ledger checkpoint ({granularity}) up to {cutoff:%Y-%m-%d}: "
+                    f"{written} snapshot(s) in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return written
+
+    def rebuild(self, product_ids=None, upto=None, granularity=None) -> int:
+        """Drop snapshots (e.g. after back-dated movements) and checkpoint again."""
+        q = self.session.query(StockSnapshot)
+        if product_ids is not None:
+            q = q.filter(StockSnapshot.product_id.in_(list(product_ids)))
+        q.delete(synchronize_session=False)
+        self.session.flush()
+        return self.checkpoint(upto, granularity)
+
+
+_checkpoint_thread = None
+_checkpoint_lock = threading.Lock()
+
+
+def start_ledger_checkpoints(interval=CHECKPOINT_INTERVAL, granularity='daily'):
+    """Checkpoint closed periods now and every `interval` seconds on a daemon thread."""
+    global _checkpoint_thread
+
+    def run():
+        from pos_app.database.db_utils import get_db_session
+        while True:
+            try:
+                with get_db_session() as session:
+                    InventoryLedger(session, granularity).checkpoint()
+            except Exception as e:
+                logger.warning(f"Stock ledger checkpoint failed: {e}")
+            time.sleep(interval)
+
+    with _checkpoint_lock:
+        if _checkpoint_thread is None or not _checkpoint_thread.is_alive():
+            _checkpoint_thread = threading.Thread(target=run, name="StockLedgerCheckpoint", daemon=True)
+            _checkpoint_thread.start()
+        return _checkpoint_thread
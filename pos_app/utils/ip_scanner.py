@@ -2,7 +2,6 @@
 import socket
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 class IPScanner:
     def __init__(self):
@@ -92,64 +91,67 @@ class IPScanner:
             except:
                 return {'ip': ip, 'status': 'error'}
     
+    def discover_servers(self, timeout=0.8, exclude_ip=None):
+        """Ask server-mode PCs to announce themselves (UDP broadcast beacon)"""
+        from pos_app.utils.lan_discovery import discover_servers
+        results = []
+        for reply in discover_servers(timeout=timeout):
+            ip = reply.get('host') or reply.get('ip')
+            if not ip or ip == exclude_ip:
+                continue
+            result = self.scan_ip_for_postgresql(ip, timeout=2)
+            if result.get('status') == 'postgresql_found':
+                result['source'] = 'beacon'
+                results.append(result)
+                print(f"[IPScanner] ✅ Server announced itself at {ip} ({reply.get('name', '')})")
+        return results
+
     def scan_network_range(self, start_ip=1, end_ip=150, max_workers=10, exclude_ip=None, simple_mode=False):
-        """Scan IP range 1-150 for PostgreSQL servers (with reduced workers and timeout)"""
+        """Find PostgreSQL servers: discovery beacon first, then an async TCP probe of the range.
+
+        Login attempts are only made against hosts that announced themselves or have
+        port 5432 open. ``max_workers`` and ``simple_mode`` are kept for callers; the
+        probe runs on asyncio regardless.
+        """
+        self.found_servers = []
+        self.scan_results = {}
+
+        self.found_servers = self.discover_servers(exclude_ip=exclude_ip)
+        for result in self.found_servers:
+            self.scan_results[result['ip']] = result
+        if self.found_servers:
+            return self.found_servers
+
         network_base = self.get_network_base()
-        
-        print(f"[IPScanner] Scanning {network_base}.{start_ip}-{end_ip} for PostgreSQL (timeout: 1s per IP)...")
+        print(f"[IPScanner] No beacon reply, probing {network_base}.{start_ip}-{end_ip}:5432...")
         if exclude_ip:
             print(f"[IPScanner] Excluding IP: {exclude_ip}")
-        
-        self.found_servers = []
-        self.scan_results = {}
-        
+
         # Create list of IPs to scan
         ips_to_scan = [f"{network_base}.{i}" for i in range(start_ip, end_ip + 1)]
-        
+
         # Filter out excluded IP if provided
         if exclude_ip:
             ips_to_scan = [ip for ip in ips_to_scan if ip != exclude_ip]
-        
-        # Simple mode: scan sequentially without threading (more reliable)
-        if simple_mode:
-            print(f"[IPScanner] Using simple sequential scan mode...")
-            for ip in ips_to_scan:
-                result = self.scan_ip_for_postgresql(ip, timeout=2)
-                if result.get('status') == 'postgresql_found':
-                    self.found_servers.append(result)
-                    print(f"[IPScanner] ✅ Found PostgreSQL at {ip}")
-            print(f"[IPScanner] Scan complete. Found {len(self.found_servers)} PostgreSQL servers.")
-            return self.found_servers
-        
-        # Scan with thread pool (reduced from 50 to 10 workers)
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all scan tasks with 1 second timeout
-            future_to_ip = {
-                executor.submit(self.scan_ip_for_postgresql, ip, timeout=1): ip 
-                for ip in ips_to_scan
-            }
-            
-            # Collect results
-            completed = 0
-            for future in as_completed(future_to_ip):
-                try:
-                    result = future.result(timeout=3)
-                    self.scan_results[result['ip']] = result
-                    
-                    if result['status'] == 'postgresql_found':
-                        self.found_servers.append(result)
-                        print(f"[IPScanner] ✅ Found PostgreSQL at {result['ip']} ({result['username']})")
-                    
-                    completed += 1
-                    if completed % 25 == 0:
-                        print(f"[IPScanner] Scanned {completed}/{len(ips_to_scan)} IPs...")
-                        
-                except Exception as e:
-                    print(f"[IPScanner] Error scanning {future_to_ip.get(future, 'unknown')}: {e}")
-        
-        print(f"[IPScanner] Scan complete. Found {len(self.found_servers)} PostgreSQL servers.")
+
+        from pos_app.utils.lan_discovery import probe_tcp
+        try:
+            open_hosts = probe_tcp(ips_to_scan, 5432, timeout=0.5)
+        except Exception as e:
+            print(f"[IPScanner] TCP probe failed: {e}")
+            open_hosts = []
+
+        for ip in open_hosts:
+            result = self.scan_ip_for_postgresql(ip, timeout=2)
+            self.scan_results[ip] = result
+            if result.get('status') == 'postgresql_found':
+                self.found_servers.append(result)
+                print(f"[IPScanner] ✅ Found PostgreSQL at {ip} ({result['username']})")
+
+        print(f"[IPScanner] Scan complete. {len(open_hosts)} host(s) with 5432 open, "
+              f"found {len(self.found_servers)} PostgreSQL servers.")
         return self.found_servers
-    
+
     def get_best_server(self):
         """Get the best PostgreSQL server from scan results"""
         if not self.found_servers:
@@ -164,16 +166,25 @@ class IPScanner:
         return self.found_servers[0]
     
     def quick_scan_common_ips(self):
-        """Quick scan of common server IPs"""
+        """Quick scan: discovery beacon, then common server IPs that have 5432 open"""
+        announced = self.discover_servers()
+        if announced:
+            return announced[0]
+
         network_base = self.get_network_base()
         common_ips = [f"{network_base}.{i}" for i in [1, 10, 50, 100, 150]]
-        
+
         print(f"[IPScanner] Quick scanning common IPs: {common_ips}")
-        
-        for ip in common_ips:
+
+        from pos_app.utils.lan_discovery import probe_tcp
+        try:
+            open_hosts = probe_tcp(common_ips, 5432, timeout=0.5)
+        except Exception:
+            open_hosts = common_ips
+        for ip in open_hosts:
             result = self.scan_ip_for_postgresql(ip, timeout=1)
             if result['status'] == 'postgresql_found':
                 print(f"[IPScanner] ✅ Quick found PostgreSQL at {ip}")
                 return result
-        
+
         return None
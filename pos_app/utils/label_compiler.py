@@ -0,0 +1,181 @@
+"""
+Label batch compiler - turns a list of (product, copies) pairs into a single
+EPL2 or ZPL command stream for thermal label printers.
+
+The label layout is downloaded once as a stored form (EPL2 ``FK/FS ... FE``) or
+stored format (ZPL ``^DF``). Each product then only sends its variable fields
+and a quantity, so a whole received purchase is a few bytes per product and
+one round trip to the printer instead of one spooler job per label.
+
+    compiler = LabelBatchCompiler(language='ZPL')
+    data = compiler.compile([(product, 12), (other_product, 3)])
+    print_label_batch(items, "tcp://192.168.1.60:9100")
+"""
+
+import logging
+import time
+
+from pos_app.utils.printer_transport import create_transport
+
+logger = logging.getLogger(__name__)
+
+
+LANGUAGES = ('EPL2', 'ZPL')
+
+
+def _label_fields(product):
+    """(barcode, name) from a Product, a dict or a (barcode, name) tuple."""
+    if isinstance(product, dict):
+        barcode = product.get('barcode') or product.get('sku') or ''
+        name = product.get('name') or ''
+    elif isinstance(product, (tuple, list)):
+        barcode = product[0] if len(product) > 0 else ''
+        name = product[1] if len(product) > 1 else ''
+    else:
+        barcode = getattr(product, 'barcode', None) or getattr(product, 'sku', None) or ''
+        name = getattr(product, 'name', '') or ''
+    return str(barcode or '').strip(), str(name or '').strip()
+
+
+class LabelBatchCompiler:
+    """Compile many labels into one EPL2/ZPL stream using a stored form/format"""
+
+    def __init__(self, language: str = 'EPL2', width_mm: float = 50.8, height_mm: float = 25.4,
+                 gap_mm: float = 3.0, dots_per_mm: int = 8, darkness: int = 15, speed: int = 2,
+                 form_name: str = 'POSLBL', name_length: int = 20):
+        language = (language or 'EPL2').upper()
+        if language not in LANGUAGES:
+            raise ValueError(f"Unsupported label language: {language}")
+        self.language = language
+        self.width_dots = int(width_mm * dots_per_mm)
+        self.height_dots = int(height_mm * dots_per_mm)
+        self.gap_dots = int(gap_mm * dots_per_mm)
+        self.darkness = int(darkness)
+        self.speed = int(speed)
+        self.form_name = form_name
+        self.name_length = int(name_length)
+        self.last_stats = {}
+
+    @classmethod
+    def for_printer(cls, printer, language: str = 'EPL2', **kwargs):
+        """Build a compiler matching a BarcodePrinter's label size and DPI."""
+        spec = printer.label_spec
+        return cls(language, spec['width'], spec['height'], spec['gap'], printer.dots_per_mm, **kwargs)
+
+    # --- sanitising ---
+    def _epl_text(self, value: str) -> str:
+        # EPL2 data lines end at newline; quotes are escaped by the printer's own rules
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\r', ' ').replace('\n', ' ')
+
+    def _zpl_text(self, value: str) -> str:
+        # ^ and ~ start commands in ZPL
+        return value.replace('^', ' ').replace('~', ' ').replace('\r', ' ').replace('\n', ' ')
+
+    # --- stored form / format ---
+    def form_definition(self) -> bytes:
+        """Setup and stored label layout, sent once at the start of the stream."""
+        barcode_y = self.height_dots - 60
+        if self.language == 'EPL2':
+            return (
+                "\n"
+                f"Q{self.height_dots},{self.gap_dots}\n"
+                f"q{self.width_dots}\n"
+                f"D{self.darkness}\n"
+                f"S{self.speed}\n"
+                f'FK"{self.form_name}"\n'
+                f'FS"{self.form_name}"\n'
+                f'V00,{self.name_length},N,"Name"\n'
+                'V01,48,N,"Barcode"\n'
+                "N\n"
+                f"B10,{barcode_y},0,1,2,6,40,B,V01\n"
+                "A10,10,0,3,1,1,N,V00\n"
+                "FE\n"
+            ).encode('ascii')
+        return (
+            f"^XA^DFR:{self.form_name}.ZPL^FS"
+            f"^PW{self.width_dots}^LL{self.height_dots}"
+            f"^FO20,10^A0N,25,25^FN1^FS"
+            f"^FO20,40^BCN,30,Y,N,N^FN2^FS"
+            "^XZ\n"
+        ).encode('ascii')
+
+    def label_command(self, barcode: str, name: str, copies: int) -> bytes:
+        """Variable data for one product, printed ``copies`` times."""
+        name = name[:self.name_length]
+        if self.language == 'EPL2':
+            text = f'FR"{self.form_name}"\n?\n{self._epl_text(name)}\n{self._epl_text(barcode)}\nP{copies}\n'
+        else:
+            text = (f"^XA^XFR:{self.form_name}.ZPL"
+                    f"^FN1^FD{self._zpl_text(name)}^FS^FN2^FD{self._zpl_text(barcode)}^FS"
+                    f"^PQ{copies}^XZ\n")
+        return text.encode('ascii', errors='replace')
+
+    # --- compile ---
+    def iter_commands(self, items):
+        """Yield the command stream in chunks: form definition, then one chunk per product."""
+        labels = 0
+        products = 0
+        skipped = 0
+        size = 0
+        header = self.form_definition()
+        size += len(header)
+        yield header
+
+        pending = None  # merge consecutive entries for the same label
+        for product, copies in list(items) + [(None, 0)]:
+            if product is not None:
+                try:
+                    copies = int(float(copies or 0))
+                except (TypeError, ValueError):
+                    copies = 0
+                barcode, name = _label_fields(product)
+                if not barcode or copies <= 0:
+                    skipped += 1
+                    continue
+                if pending and pending[0] == barcode and pending[1] == name:
+                    pending[2] += copies
+                    continue
+            if pending:
+                chunk = self.label_command(*pending)
+                labels += pending[2]
+                products += 1
+                size += len(chunk)
+                yield chunk
+            pending = [barcode, name, copies] if product is not None else None
+
+        self.last_stats = {'labels': labels, 'products': products, 'skipped': skipped, 'bytes': size}
+
+    def compile(self, items) -> bytes:
+        """Compile (product, copies) pairs into one command stream."""
+        return b''.join(self.iter_commands(items))
+
+
+def label_items_for_purchase(purchase, received_only: bool = True) -> list:
+    """(product, copies) pairs for a purchase, e.g. the result of receive_purchase()."""
+    pairs = []
+    for item in getattr(purchase, 'items', None) or []:
+        product = getattr(item, 'product', None)
+        if product is None:
+            continue
+        qty = getattr(item, 'received_quantity', None) if received_only else None
+        if qty is None:
+            qty = getattr(item, 'quantity', 0)
+        pairs.append((product, qty))
+    return pairs
+
+
+def print_label_batch(items, target: str, language: str = 'EPL2', compiler: LabelBatchCompiler | None = None,
+                      transport_factory=create_transport) -> dict:
+    """Compile ``items`` and send them to ``target`` in a single write.
+
+    Returns the compile stats plus ``seconds`` taken; raises PrinterTransportError on failure.
+    """
+    compiler = compiler or LabelBatchCompiler(language)
+    started = time.perf_counter()
+    data = compiler.compile(items)
+    transport = transport_factory(target)
+    transport.send(data)
+    stats = dict(compiler.last_stats)
+    stats['seconds'] = time.perf_counter() - started
+    logger.info(f"Sent {stats['labels']} labels ({stats['bytes']} bytes) to {target}")
+    return stats
@@ -0,0 +1,265 @@
+"""
+LAN server discovery - UDP broadcast beacon plus an asyncio TCP probe.
+
+The PC running in server mode answers a small UDP broadcast on DISCOVERY_PORT with
+its database host/port, so clients find it in well under a second without
+trying database logins against every address on the subnet.
+
+    start_discovery_responder(config)      # server side (set_server_mode)
+    servers = discover_servers(timeout=0.8)   # client side
+    open_hosts = probe_tcp(hosts, 5432)       # fallback for servers without the beacon
+
+Only non-secret fields (host, port, database, username) are announced.
+"""
+
+import asyncio
+import json
+import logging
+import socket
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DISCOVERY_PORT = 47654
+DISCOVERY_MAGIC = "pos-discovery"
+PROTOCOL_VERSION = 1
+
+
+def _local_ip() -> str:
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return "127.0.0.1"
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+
+def _decode(data: bytes):
+    try:
+        message = json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(message, dict) or message.get('magic') != DISCOVERY_MAGIC:
+        return None
+    return message
+
+
+def broadcast_addresses(local_ip: str | None = None) -> list:
+    """Limited broadcast plus the /24 directed broadcast of the local address."""
+    addresses = ['255.255.255.255']
+    ip = local_ip or _local_ip()
+    parts = ip.split('.')
+    if len(parts) == 4 and not ip.startswith('127.'):
+        addresses.append('.'.join(parts[:3] + ['255']))
+    return addresses
+
+
+# ---------------------- SERVER SIDE ----------------------
+class DiscoveryResponder:
+    """Answers discovery broadcasts on behalf of the local database server"""
+
+    def __init__(self, config: dict, port: int = DISCOVERY_PORT, bind_host: str = ''):
+        self.config = dict(config or {})
+        self.port = int(port)
+        self.bind_host = bind_host
+        self._sock = None
+        self._thread = None
+        self._running = False
+
+    def announcement(self, nonce: str = '') -> dict:
+        return {
+            'magic': DISCOVERY_MAGIC,
+            'v': PROTOCOL_VERSION,
+            'type': 'announce',
+            'nonce': nonce,
+            'host': self.config.get('host') or _local_ip(),
+            'port': str(self.config.get('port', '5432')),
+            'database': self.config.get('database', 'pos_network'),
+            'username': self.config.get('username', 'admin'),
+            'name': socket.gethostname(),
+        }
+
+    def start(self) -> bool:
+        if self._running:
+            return True
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.bind_host, self.port))
+            sock.settimeout(0.5)
+        except OSError as e:
+            logger.warning(f"Discovery responder could not bind UDP {self.port}: {e}")
+            return False
+        self._sock = sock
+        self.port = sock.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="DiscoveryResponder", daemon=True)
+        self._thread.start()
+        logger.info(f"Discovery responder listening on UDP {self.port}")
+        return True
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, addr = self._sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            message = _decode(data)
+            if not message or message.get('type') != 'discover':
+                continue
+            try:
+                self._sock.sendto(_encode(self.announcement(str(message.get('nonce', '')))), addr)
+            except OSError as e:
+                logger.debug(f"Discovery reply to {addr} failed: {e}")
+
+    def stop(self):
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(2)
+        self._sock = None
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+
+_responder = None
+_responder_lock = threading.Lock()
+
+
+def start_discovery_responder(config: dict, port: int = DISCOVERY_PORT):
+    """Start (or update) the process-wide responder for server mode."""
+    global _responder
+    with _responder_lock:
+        if _responder is not None and _responder.running:
+            _responder.config = dict(config or {})
+            return _responder
+        responder = DiscoveryResponder(config, port)
+        if responder.start():
+            _responder = responder
+            return responder
+        return None
+
+
+def stop_discovery_responder():
+    global _responder
+    with _responder_lock:
+        if _responder is not None:
+            _responder.stop()
+            _responder = None
+
+
+# ---------------------- CLIENT SIDE ----------------------
+class _DiscoveryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, nonce: str):
+        self.nonce = nonce
+        self.replies = {}
+
+    def datagram_received(self, data, addr):
+        message = _decode(data)
+        if not message or message.get('type') != 'announce' or message.get('nonce') != self.nonce:
+            return
+        message['ip'] = addr[0]
+        host = message.get('host') or addr[0]
+        self.replies.setdefault(host, message)
+
+    def error_received(self, exc):
+        logger.debug(f"Discovery socket error: {exc}")
+
+
+async def discover_servers_async(timeout: float = 0.8, port: int = DISCOVERY_PORT, addresses=None) -> list:
+    """Broadcast a discovery request and collect announcements for ``timeout`` seconds."""
+    loop = asyncio.get_running_loop()
+    nonce = uuid.uuid4().hex
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.bind(('', 0))
+    transport, protocol = await loop.create_datagram_endpoint(lambda: _DiscoveryProtocol(nonce), sock=sock)
+    try:
+        request = _encode({'magic': DISCOVERY_MAGIC, 'v': PROTOCOL_VERSION, 'type': 'discover', 'nonce': nonce})
+        for address in (addresses or broadcast_addresses()):
+            try:
+                transport.sendto(request, (address, port))
+            except OSError as e:
+                logger.debug(f"Discovery broadcast to {address} failed: {e}")
+        await asyncio.sleep(timeout)
+    finally:
+        transport.close()
+    return list(protocol.replies.values())
+
+
+async def probe_tcp_async(hosts, port: int = 5432, timeout: float = 0.5, concurrency: int = 128) -> list:
+    """Return the hosts (in input order) that accept a TCP connection on ``port``."""
+    hosts = list(hosts)
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def probe(host):
+        async with semaphore:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
+
+    results = await asyncio.gather(*(probe(h) for h in hosts))
+    return [h for h, ok in zip(hosts, results) if ok]
+
+
+def _run(coro):
+    """Run a coroutine from sync code, even if this thread already has a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coro)
+        except Exception as e:
+            result['error'] = e
+
+    t = threading.Thread(target=runner, daemon=True)
+    t.start()
+    t.join()
+    if 'error' in result:
+        raise result['error']
+    return result.get('value')
+
+
+def discover_servers(timeout: float = 0.8, port: int = DISCOVERY_PORT, addresses=None) -> list:
+    """Blocking wrapper around discover_servers_async; returns [] on any socket error."""
+    started = time.perf_counter()
+    try:
+        servers = _run(discover_servers_async(timeout, port, addresses))
+    except OSError as e:
+        logger.warning(f"LAN discovery unavailable: {e}")
+        return []
+    logger.info(f"LAN discovery found {len(servers)} server(s) in {time.perf_counter() - started:.2f}s")
+    return servers
+
+
+def probe_tcp(hosts, port: int = 5432, timeout: float = 0.5, concurrency: int = 128) -> list:
+    """Blocking wrapper around probe_tcp_async."""
+    return _run(probe_tcp_async(hosts, port, timeout, concurrency))
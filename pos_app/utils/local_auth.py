@@ -4,32 +4,104 @@ Local Authentication Cache for Client-Server Architecture
 This module handles offline authentication by caching user credentials locally.
 When a client connects to a server, it can authenticate using cached credentials
 before the server connection is established.
+
+Credentials are kept in a small SQLite file (one indexed row per user), so caching
+a login rewrites one row instead of the whole cache. An older users_cache.json is
+imported on first use.
 """
 
 import json
-import os
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
-from pos_app.utils.auth import hash_password, check_password
+from pos_app.utils.auth import check_password
 from pos_app.utils.logger import app_logger
 
 
 class LocalAuthCache:
     """Manages local authentication cache for offline/client-server scenarios"""
-    
+
     CACHE_DIR = Path.home() / '.pos_app' / 'auth_cache'
     CACHE_FILE = CACHE_DIR / 'users_cache.json'
-    
+    DB_NAME = 'users_cache.db'
+
+    _lock = threading.RLock()
+    _conn = None
+    _conn_path = None
+
     @classmethod
     def ensure_cache_dir(cls):
         """Ensure cache directory exists"""
         cls.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    
+
+    @classmethod
+    def _db_path(cls) -> Path:
+        return Path(cls.CACHE_DIR) / cls.DB_NAME
+
+    @classmethod
+    def _connect(cls):
+        """Shared connection to the cache database (reopened if CACHE_DIR changes)"""
+        path = cls._db_path()
+        if cls._conn is not None and cls._conn_path == path:
+            return cls._conn
+        cls.close()
+        cls.ensure_cache_dir()
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cached_users (
+                username TEXT PRIMARY KEY COLLATE NOCASE,
+                password_hash TEXT NOT NULL,
+                is_admin INTEGER NOT NULL DEFAULT 0,
+                full_name TEXT,
+                cached_at TEXT
+            )
+            """
+        )
+        conn.commit()
+        cls._conn, cls._conn_path = conn, path
+        cls._import_json(conn)
+        return conn
+
+    @classmethod
+    def _import_json(cls, conn):
+        """One-time import of the old JSON cache file"""
+        legacy = Path(cls.CACHE_DIR) / Path(cls.CACHE_FILE).name
+        if not legacy.exists():
+            return
+        try:
+            with open(legacy, 'r') as f:
+                cache = json.load(f)
+            conn.executemany(
+                "INSERT OR IGNORE INTO cached_users (username, password_hash, is_admin, full_name, cached_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(name, data['password_hash'], int(bool(data.get('is_admin'))),
+                  data.get('full_name') or name, data.get('cached_at'))
+                 for name, data in cache.items() if data.get('password_hash')]
+            )
+            conn.commit()
+            legacy.rename(legacy.with_suffix('.json.imported'))
+            app_logger.info(f"Imported {len(cache)} cached users from {legacy.name}")
+        except Exception as e:
+            app_logger.error(f"Failed to import legacy auth cache: {str(e)}")
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            if cls._conn is not None:
+                try:
+                    cls._conn.close()
+                except Exception:
+                    pass
+            cls._conn, cls._conn_path = None, None
+
     @classmethod
     def cache_user_credentials(cls, username: str, password_hash: str, is_admin: bool, full_name: str = None):
         """
         Cache user credentials locally for offline authentication
-        
+
         Args:
             username: Username
             password_hash: Hashed password
@@ -37,113 +109,122 @@ class LocalAuthCache:
             full_name: User's full name
         """
         try:
-            cls.ensure_cache_dir()
-            
-            # Load existing cache
-            cache = cls._load_cache()
-            
-            # Update or add user
-            cache[username] = {
-                'password_hash': password_hash,
-                'is_admin': is_admin,
-                'full_name': full_name or username,
-                'cached_at': datetime.now().isoformat()
-            }
-            
-            # Save cache
-            with open(cls.CACHE_FILE, 'w') as f:
-                json.dump(cache, f, indent=2)
-            
+            with cls._lock:
+                conn = cls._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cached_users (username, password_hash, is_admin, full_name, cached_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (username, password_hash, int(bool(is_admin)), full_name or username, datetime.now().isoformat())
+                )
+                conn.commit()
+
             app_logger.info(f"Cached credentials for user: {username}")
-            
+
         except Exception as e:
             app_logger.error(f"Failed to cache user credentials: {str(e)}")
-    
+
+    @classmethod
+    def get_cached_user(cls, username: str) -> dict:
+        """Cached row for ``username`` (case-insensitive), or None"""
+        try:
+            with cls._lock:
+                row = cls._connect().execute(
+                    "SELECT username, password_hash, is_admin, full_name, cached_at FROM cached_users WHERE username = ?",
+                    (username,)
+                ).fetchone()
+        except Exception as e:
+            app_logger.error(f"Failed to read auth cache: {str(e)}")
+            return None
+        if not row:
+            return None
+        return {'username': row[0], 'password_hash': row[1], 'is_admin': bool(row[2]),
+                'full_name': row[3], 'cached_at': row[4]}
+
     @classmethod
     def authenticate_locally(cls, username: str, password: str) -> dict:
         """
         Authenticate user using locally cached credentials
-        
+
         Args:
             username: Username
             password: Plain text password
-            
+
         Returns:
             Dictionary with user info if successful, None otherwise
         """
         try:
-            cache = cls._load_cache()
-            
-            if username not in cache:
+            user_data = cls.get_cached_user(username)
+
+            if not user_data:
                 app_logger.warning(f"User not found in local cache: {username}")
                 return None
-            
-            user_data = cache[username]
-            
+
             # Verify password
             if not check_password(password, user_data['password_hash']):
                 app_logger.warning(f"Invalid password for user: {username}")
                 return None
-            
+
             app_logger.info(f"User authenticated locally: {username}")
-            
+
             return {
-                'username': username,
+                'username': user_data['username'],
                 'is_admin': user_data['is_admin'],
                 'full_name': user_data['full_name'],
                 'authenticated_locally': True
             }
-            
+
         except Exception as e:
             app_logger.error(f"Local authentication failed: {str(e)}")
             return None
-    
+
     @classmethod
     def sync_users_from_server(cls, users_list: list):
         """
         Sync user list from server to local cache
-        
+
         Args:
             users_list: List of User objects from server
         """
         try:
-            cls.ensure_cache_dir()
-            cache = {}
-            
-            for user in users_list:
-                cache[user.username] = {
-                    'password_hash': user.password_hash,
-                    'is_admin': user.is_admin,
-                    'full_name': user.full_name or user.username,
-                    'cached_at': None
-                }
-            
-            with open(cls.CACHE_FILE, 'w') as f:
-                json.dump(cache, f, indent=2)
-            
+            with cls._lock:
+                conn = cls._connect()
+                conn.execute("DELETE FROM cached_users")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cached_users (username, password_hash, is_admin, full_name, cached_at) "
+                    "VALUES (?, ?, ?, ?, NULL)",
+                    [(u.username, u.password_hash, int(bool(u.is_admin)), u.full_name or u.username)
+                     for u in users_list]
+                )
+                conn.commit()
+
             app_logger.info(f"Synced {len(users_list)} users to local cache")
-            
+
         except Exception as e:
             app_logger.error(f"Failed to sync users from server: {str(e)}")
-    
+
     @classmethod
     def _load_cache(cls) -> dict:
-        """Load cache from file"""
+        """All cached users as {username: data}"""
         try:
-            if cls.CACHE_FILE.exists():
-                with open(cls.CACHE_FILE, 'r') as f:
-                    return json.load(f)
+            with cls._lock:
+                rows = cls._connect().execute(
+                    "SELECT username, password_hash, is_admin, full_name, cached_at FROM cached_users"
+                ).fetchall()
+            return {r[0]: {'password_hash': r[1], 'is_admin': bool(r[2]), 'full_name': r[3], 'cached_at': r[4]}
+                    for r in rows}
         except Exception as e:
             app_logger.error(f"Failed to load cache: {str(e)}")
-        
+
         return {}
-    
+
     @classmethod
     def clear_cache(cls):
         """Clear all cached credentials"""
         try:
-            if cls.CACHE_FILE.exists():
-                cls.CACHE_FILE.unlink()
-                app_logger.info("Local auth cache cleared")
+            with cls._lock:
+                conn = cls._connect()
+                conn.execute("DELETE FROM cached_users")
+                conn.commit()
+            app_logger.info("Local auth cache cleared")
         except Exception as e:
             app_logger.error(f"Failed to clear cache: {str(e)}")
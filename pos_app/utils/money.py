@@ -0,0 +1,141 @@
+"""
+Money handling for the POS system.
+
+Amounts are stored as NUMERIC(14,2) so that SQL SUM() is exact, and are
+exposed to Python as floats already rounded to whole paisa so existing views
+keep working. Arithmetic that must not drift (sale totals, balances,
+outstanding checks) goes through the integer-paisa helpers below.
+
+Unit costs (purchase prices and the weighted-average cost carried on stock
+movements) are stored as NUMERIC(14,4) through the Cost type instead, so a
+running average does not lose a fraction of a paisa on every receipt. Costs
+are rounded to paisa only when an amount is shown or posted (cost_mul()).
+"""
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+from sqlalchemy.types import TypeDecorator, Numeric
+
+
+MONEY_PRECISION = 14
+MONEY_SCALE = 2
+COST_SCALE = 4
+_CENT = Decimal('0.01')
+_COST_UNIT = Decimal('0.0001')
+
+
+def to_decimal(value) -> Decimal:
+    """Convert any amount (float/int/str/Decimal/None) to a Decimal rounded to paisa."""
+    if value is None:
+        return Decimal('0.00')
+    if isinstance(value, Decimal):
+        d = value
+    else:
+        try:
+            # str() of a float is its shortest repr, so 1.005 stays 1.005 (not 1.00499...)
+            d = Decimal(str(value).strip() or '0')
+        except (InvalidOperation, ValueError):
+            return Decimal('0.00')
+    if not d.is_finite():
+        return Decimal('0.00')
+    return d.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def to_paisa(value) -> int:
+    """Amount as an integer number of paisa (minor units)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value * 100
+    return int(to_decimal(value) * 100)
+
+
+def from_paisa(paisa: int) -> float:
+    """Integer paisa back to a float amount."""
+    return int(paisa) / 100.0
+
+
+def money(value) -> float:
+    """Round an amount to paisa and return it as a float."""
+    return from_paisa(to_paisa(value))
+
+
+def money_sum(values) -> float:
+    """Exact sum of amounts (summed in paisa, no float drift)."""
+    return from_paisa(sum(to_paisa(v) for v in values))
+
+
+def money_mul(amount, factor) -> float:
+    """amount * factor (quantity, rate) rounded half-up to paisa."""
+    return float((to_decimal(amount) * Decimal(str(factor or 0))).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def cost(value) -> float:
+    """Round a unit cost to 4 decimal places and return it as a float."""
+    try:
+        d = value if isinstance(value, Decimal) else Decimal(str(value if value is not None else 0).strip() or '0')
+    except (InvalidOperation, ValueError):
+        return 0.0
+    if not d.is_finite():
+        return 0.0
+    return float(d.quantize(_COST_UNIT, rounding=ROUND_HALF_UP))
+
+
+def cost_mul(unit_cost, quantity) -> float:
+    """unit_cost * quantity at full cost precision, rounded half-up to paisa once."""
+    return float((Decimal(str(cost(unit_cost))) * Decimal(str(quantity or 0))).quantize(_CENT, rounding=ROUND_HALF_UP))
+
+
+def money_eq(a, b) -> bool:
+    """True when two amounts are equal to the paisa."""
+    return to_paisa(a) == to_paisa(b)
+
+
+def money_is_zero(value) -> bool:
+    return to_paisa(value) == 0
+
+
+def money_gt(a, b) -> bool:
+    return to_paisa(a) > to_paisa(b)
+
+
+class Money(TypeDecorator):
+    """NUMERIC(14,2) column type for money.
+
+    Values are rounded to paisa on the way in and returned as floats.
+    """
+
+    impl = Numeric(MONEY_PRECISION, MONEY_SCALE, asdecimal=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'sqlite':
+            # pysqlite has no Decimal adapter
+            return money(value)
+        return to_decimal(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return money(value)
+
+
+class Cost(TypeDecorator):
+    """NUMERIC(14,4) column type for unit costs.
+
+    Values are rounded to 4 decimal places on the way in and returned as floats.
+    """
+
+    impl = Numeric(MONEY_PRECISION, COST_SCALE, asdecimal=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == 'sqlite':
+            return cost(value)
+        return Decimal(str(cost(value)))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return cost(value)
@@ -104,13 +104,30 @@ class NetworkDetector:
             print(f"[NetworkDetector] Found PostgreSQL on {self.current_ip}")
             return self.current_ip
         
-        # Try common server IPs in the network
+        # Ask server-mode PCs to announce themselves
+        try:
+            from pos_app.utils.lan_discovery import discover_servers
+            for reply in discover_servers(timeout=0.8):
+                ip = reply.get('host') or reply.get('ip')
+                if ip and ip != self.current_ip and self.test_postgresql_connection(ip):
+                    print(f"[NetworkDetector] Found PostgreSQL on {ip} (beacon)")
+                    return ip
+        except Exception as e:
+            print(f"[NetworkDetector] Discovery failed: {e}")
+
+        # Try common server IPs in the network (only those with 5432 open)
         if self.current_ip.startswith('192.168.'):
             network_base = '.'.join(self.current_ip.split('.')[:-1])
             common_ips = [f"{network_base}.1", f"{network_base}.100", f"{network_base}.10", f"{network_base}.50"]
+            common_ips = [ip for ip in common_ips if ip != self.current_ip]
+            try:
+                from pos_app.utils.lan_discovery import probe_tcp
+                common_ips = probe_tcp(common_ips, 5432, timeout=0.5)
+            except Exception:
+                pass
             
             for ip in common_ips:
-                if ip != self.current_ip and self.test_postgresql_connection(ip):
+                if self.test_postgresql_connection(ip):
                     print(f"[NetworkDetector] Found PostgreSQL on {ip}")
                     return ip
         
@@ -299,6 +299,14 @@ def set_server_mode(host_ip: Optional[str] = None, port: str = '5432', username:
         print("💡 PostgreSQL may need to be restarted for listen_addresses change to take effect")
         print("💡 Check PostgreSQL configuration and firewall settings")
         print("💡 If you just started the app, restart PostgreSQL service and try again")
+
+    # Answer client discovery broadcasts so they find this server without an IP sweep
+    try:
+        from pos_app.utils.lan_discovery import start_discovery_responder
+        if start_discovery_responder(config):
+            print("[Network] 📡 Discovery beacon active")
+    except Exception as exc:
+        print(f"[Network] Discovery beacon not started: {exc}")
     
     return config
 
@@ -0,0 +1,328 @@
+"""
+Pricing engine - compiled tax and discount rules.
+
+Everything that decides what a line costs (retail/wholesale prices, product and
+customer discount percentages, active TaxRate rows, active Discount promotions
+and the tax rate configured in Settings) is compiled once into a PricingRules
+table held in memory. The table is rebuilt when the products / customers /
+pricing sync markers move or when invalidate() is called (Settings save), so a
+sale no longer reads QSettings or re-queries Product per cart line.
+
+    engine = get_pricing_engine()
+    engine.tax_rate()                                  # percent, as configured in Settings
+    engine.reprice(cart, wholesale=True, session=s)    # retail <-> wholesale switch
+    priced = engine.price_cart(lines, customer_id=3, manual_discount=50, session=s)
+    priced = engine.price_cart(lines, promotion_id=2, session=s)   # with a chosen promotion
+
+All arithmetic is done in integer paisa over the whole cart in one pass.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from pos_app.models.database import Customer, Discount, Product, SyncState, TaxRate
+from pos_app.utils.money import from_paisa, to_paisa
+
+logger = logging.getLogger(__name__)
+
+# Sync markers that invalidate the compiled rules
+PRICING_SYNC_KEYS = ('products', 'customers', 'pricing')
+RULES_CHECK_INTERVAL = 2.0
+
+
+def load_settings_tax_rate() -> float:
+    """Tax rate (percent) from Settings; 0 unless the user explicitly set one."""
+    try:
+        try:
+            from PySide6.QtCore import QSettings
+        except ImportError:
+            from PyQt6.QtCore import QSettings
+        settings = QSettings("POSApp", "Settings")
+        try:
+            user_set = str(settings.value('tax_rate_user_set', 'false') or 'false').strip().lower() == 'true'
+        except Exception:
+            user_set = False
+        if not user_set:
+            return 0.0
+        value = settings.value('tax_rate', None)
+        if value is None or str(value).strip() == "":
+            return 0.0
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+def _percent_of(paisa: int, pct: float) -> int:
+    """pct% of an amount in paisa, rounded half-up to whole paisa"""
+    if not paisa or not pct:
+        return 0
+    return int((Decimal(paisa) * Decimal(str(pct)) / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _qty(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductPrice:
+    __slots__ = ('retail', 'wholesale', 'tax_rate', 'discount_pct')
+
+    def __init__(self, retail, wholesale, tax_rate, discount_pct):
+        self.retail = to_paisa(retail or 0)
+        self.wholesale = to_paisa(wholesale or 0)
+        self.tax_rate = float(tax_rate or 0.0)
+        self.discount_pct = max(0.0, min(100.0, float(discount_pct or 0.0)))
+
+
+class Promotion:
+    """An active Discount row, applied to the whole cart when the cashier picks it"""
+
+    def __init__(self, discount_id, name, discount_type, value, min_amount, max_amount, start, end):
+        self.id = discount_id
+        self.name = name
+        self.percentage = str(discount_type or '').upper() == 'PERCENTAGE'
+        self.value = float(value or 0.0)
+        self.min_paisa = to_paisa(min_amount or 0)
+        self.max_paisa = to_paisa(max_amount) if max_amount else None
+        self.start = start
+        self.end = end
+
+    def amount(self, subtotal_paisa: int, now: datetime) -> int:
+        if (self.start and now < self.start) or (self.end and now > self.end) or subtotal_paisa < self.min_paisa:
+            return 0
+        value = _percent_of(subtotal_paisa, self.value) if self.percentage else to_paisa(self.value)
+        if self.max_paisa is not None:
+            value = min(value, self.max_paisa)
+        return max(0, min(value, subtotal_paisa))
+
+
+class PricingRules:
+    """Compiled snapshot of every pricing input"""
+
+    def __init__(self, tax_rate=0.0, products=None, customers=None, tax_rates=None,
+                 default_tax_rate=None, promotions=None, versions=None):
+        self.tax_rate = float(tax_rate or 0.0)
+        self.products = products or {}
+        self.customers = customers or {}
+        self.tax_rates = tax_rates or {}
+        self.default_tax_rate = default_tax_rate
+        self.promotions = promotions or []
+        self.versions = versions
+
+    @classmethod
+    def compile(cls, session, tax_rate=0.0, versions=None):
+        started = time.perf_counter()
+        products = {
+            pid: ProductPrice(retail, wholesale, tax, disc)
+            for pid, retail, wholesale, tax, disc in session.query(
+                Product.id, Product.retail_price, Product.wholesale_price,
+                Product.tax_rate, Product.discount_percentage).yield_per(2000)
+        }
+        customers = {
+            cid: max(0.0, min(100.0, float(disc or 0.0)))
+            for cid, disc in session.query(Customer.id, Customer.discount_percentage)
+            .filter(Customer.discount_percentage > 0)
+        }
+        tax_rates, default_tax_rate = {}, None
+        for tid, rate, is_default in session.query(TaxRate.id, TaxRate.rate, TaxRate.is_default) \
+                .filter(TaxRate.is_active.is_(True)):
+            tax_rates[tid] = float(rate or 0.0)
+            if is_default:
+                default_tax_rate = tax_rates[tid]
+        promotions = [
+            Promotion(*row) for row in session.query(
+                Discount.id, Discount.name, Discount.discount_type, Discount.discount_value,
+                Discount.min_amount, Discount.max_amount, Discount.start_date, Discount.end_date)
+            .filter(Discount.is_active.is_(True))
+        ]
+        rules = cls(tax_rate, products, customers, tax_rates, default_tax_rate, promotions, versions)
+        logger.debug(f"Pricing rules compiled in {(time.perf_counter() - started) * 1000:.1f} ms "
+                     f"({len(products)} products, {len(customers)} customer discounts, {len(promotions)} promotions)")
+        return rules
+
+
+class PricedLine:
+    def __init__(self, product_id, quantity, unit_price, gross, discount, tax, total):
+        self.product_id = product_id
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.gross = gross
+        self.discount = discount
+        self.tax = tax
+        self.total = total
+
+
+class PricedCart:
+    def __init__(self, lines, subtotal, line_discount, cart_discount, tax, total):
+        self.lines = lines
+        self.subtotal = subtotal            # before any discount
+        self.line_discount = line_discount  # product / customer percentages
+        self.cart_discount = cart_discount  # manual amount or chosen promotion, whichever is larger
+        self.tax = tax
+        self.total = total
+
+    @property
+    def discount(self) -> float:
+        return round(self.line_discount + self.cart_discount, 2)
+
+
+class PricingEngine:
+    """Holds the compiled rules and prices carts against them"""
+
+    def __init__(self, settings_tax_rate=load_settings_tax_rate, check_interval=RULES_CHECK_INTERVAL,
+                 clock=time.monotonic):
+        self._settings_tax_rate = settings_tax_rate
+        self.check_interval = check_interval
+        self._clock = clock
+        self._rules = None
+        self._tax_rate = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the compiled rules and the cached Settings tax rate."""
+        with self._lock:
+            self._rules = None
+            self._tax_rate = None
+            self._checked_at = None
+
+    def tax_rate(self) -> float:
+        """Settings tax rate in percent (read once until invalidate())."""
+        with self._lock:
+            if self._tax_rate is None:
+                self._tax_rate = float(self._settings_tax_rate() or 0.0)
+            return self._tax_rate
+
+    def _versions(self, session):
+        try:
+            rows = session.query(SyncState.key, SyncState.last_changed) \
+                .filter(SyncState.key.in_(PRICING_SYNC_KEYS)).all()
+            return tuple(sorted((k, v) for k, v in rows))
+        except Exception:
+            try:
+                session.rollback()
+            except Exception:
+                pass
+            return None
+
+    def rules(self, session) -> PricingRules:
+        """Compiled rules, rebuilt when a pricing sync marker moved."""
+        now = self._clock()
+        with self._lock:
+            rules = self._rules
+            fresh = rules is not None and self._checked_at is not None and now - self._checked_at < self.check_interval
+        if fresh:
+            return rules
+        versions = self._versions(session)
+        if rules is not None and versions is not None and versions == rules.versions:
+            with self._lock:
+                self._checked_at = now
+            return rules
+        rules = PricingRules.compile(session, self.tax_rate(), versions)
+        with self._lock:
+            self._rules = rules
+            self._checked_at = now
+        return rules
+
+    def _product(self, rules, session, pids):
+        """Entries for product ids, fetching any not in the compiled table in one query"""
+        missing = [pid for pid in pids if pid is not None and pid not in rules.products]
+        if missing:
+            for pid, retail, wholesale, tax, disc in session.query(
+                    Product.id, Product.retail_price, Product.wholesale_price,
+                    Product.tax_rate, Product.discount_percentage).filter(Product.id.in_(missing)):
+                rules.products[pid] = ProductPrice(retail, wholesale, tax, disc)
+        return rules.products
+
+    def reprice(self, lines, wholesale=False, session=None) -> int:
+        """Set each line's 'price' to the retail or wholesale price; returns lines changed."""
+        rules = self.rules(session)
+        products = self._product(rules, session, {line.get('id') for line in lines})
+        changed = 0
+        for line in lines:
+            entry = products.get(line.get('id'))
+            if entry is None:
+                continue
+            price = from_paisa(entry.wholesale if wholesale else entry.retail)
+            if line.get('price') != price:
+                line['price'] = price
+                changed += 1
+        return changed
+
+    def price_cart(self, lines, customer_id=None, wholesale=None, manual_discount=0.0,
+                   apply_rules=True, promotion_id=None, session=None, now=None) -> PricedCart:
+        """Price a whole cart.
+
+        lines are cart dicts ({'id', 'quantity', 'price'}); with wholesale=None the
+        line's own price is kept, otherwise the compiled retail/wholesale price is
+        used. With apply_rules the larger of the product and customer discount
+        percentage is taken off each line, and the promotion picked at the till
+        (promotion_id, an active Discount) competes with manual_discount for the
+        cart discount; promotions are never applied unasked. Tax uses the product's own rate
+        when set, else the Settings rate, on the line net of its share of the cart
+        discount.
+        """
+        rules = self.rules(session)
+        products = self._product(rules, session, {line.get('id') for line in lines})
+        customer_pct = rules.customers.get(customer_id, 0.0) if apply_rules else 0.0
+
+        gross, net, rates, units, qtys = [], [], [], [], []
+        for line in lines:
+            qty = _qty(line.get('quantity'))
+            entry = products.get(line.get('id'))
+            if entry is not None and wholesale is not None:
+                unit = entry.wholesale if wholesale else entry.retail
+            else:
+                unit = to_paisa(line.get('price') or 0)
+            amount = int((Decimal(unit) * Decimal(str(qty))).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+            pct = max(entry.discount_pct if (entry is not None and apply_rules) else 0.0, customer_pct)
+            units.append(unit)
+            qtys.append(qty)
+            gross.append(amount)
+            net.append(amount - _percent_of(amount, pct))
+            rates.append(entry.tax_rate if entry is not None and entry.tax_rate > 0 else rules.tax_rate)
+
+        subtotal = sum(gross)
+        net_total = sum(net)
+        cart_discount = max(0, min(to_paisa(manual_discount or 0), net_total))
+        if apply_rules and promotion_id is not None:
+            when = now or datetime.now()
+            cart_discount = max([cart_discount] + [p.amount(net_total, when) for p in rules.promotions
+                                                   if p.id == promotion_id])
+
+        # Spread the cart discount over lines by net value (remainder on the last line)
+        shares = [0] * len(net)
+        if cart_discount and net_total:
+            for i, amount in enumerate(net):
+                shares[i] = cart_discount * amount // net_total
+            if shares:
+                shares[-1] += cart_discount - sum(shares)
+
+        priced, tax_total = [], 0
+        for i, line in enumerate(lines):
+            taxable = net[i] - shares[i]
+            tax = _percent_of(taxable, rates[i])
+            tax_total += tax
+            priced.append(PricedLine(line.get('id'), qtys[i], from_paisa(units[i]), from_paisa(gross[i]),
+                                     from_paisa(gross[i] - taxable), from_paisa(tax), from_paisa(taxable + tax)))
+
+        return PricedCart(priced, from_paisa(subtotal), from_paisa(subtotal - net_total), from_paisa(cart_discount),
+                          from_paisa(tax_total), from_paisa(net_total - cart_discount + tax_total))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_pricing_engine() -> PricingEngine:
+    """Process-wide pricing engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PricingEngine()
+        return _engine
@@ -0,0 +1,160 @@
+"""
+Raw printer transports - send pre-built printer command bytes (ESC/POS, EPL2, ZPL)
+straight to a device without going through a driver or rendering a document.
+
+Targets are described by a short URI so they can be stored in QSettings / JSON:
+    tcp://192.168.1.50:9100     raw TCP (JetDirect / port 9100)
+    serial://COM3?baud=9600     serial port (pyserial)
+    file:///tmp/receipt.bin     append to a file (testing / stand-in)
+    win://Printer Name          Windows shared/local printer via ``copy /b``
+"""
+
+import os
+import socket
+import subprocess
+import tempfile
+import logging
+from urllib.parse import urlparse, parse_qs, unquote
+
+logger = logging.getLogger(__name__)
+
+
+class PrinterTransportError(Exception):
+    """Raised when bytes could not be delivered to the printer"""
+    pass
+
+
+class FileTransport:
+    """Append raw bytes to a file (or device node such as /dev/usb/lp0)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, data: bytes) -> int:
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(data)
+            return len(data)
+        except OSError as e:
+            raise PrinterTransportError(f"File write failed ({self.path}): {e}")
+
+    def describe(self) -> str:
+        return f"file://{self.path}"
+
+
+class SocketTransport:
+    """Raw TCP printing (port 9100)"""
+
+    def __init__(self, host: str, port: int = 9100, timeout: float = 5.0):
+        self.host = host
+        self.port = int(port or 9100)
+        self.timeout = float(timeout)
+
+    def send(self, data: bytes) -> int:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+                sock.sendall(data)
+                try:
+                    sock.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+            return len(data)
+        except OSError as e:
+            raise PrinterTransportError(f"Socket send failed ({self.host}:{self.port}): {e}")
+
+    def describe(self) -> str:
+        return f"tcp://{self.host}:{self.port}"
+
+
+class SerialTransport:
+    """Serial port printing (requires pyserial)"""
+
+    def __init__(self, port: str, baudrate: int = 9600, timeout: float = 5.0):
+        self.port = port
+        self.baudrate = int(baudrate or 9600)
+        self.timeout = float(timeout)
+
+    def send(self, data: bytes) -> int:
+        try:
+            import serial
+        except ImportError:
+            raise PrinterTransportError("pyserial is not installed")
+        try:
+            with serial.Serial(self.port, self.baudrate, timeout=self.timeout) as ser:
+                ser.write(data)
+                ser.flush()
+            return len(data)
+        except Exception as e:
+            raise PrinterTransportError(f"Serial send failed ({self.port}): {e}")
+
+    def describe(self) -> str:
+        return f"serial://{self.port}?baud={self.baudrate}"
+
+
+class WindowsRawTransport:
+    """Send raw bytes to a Windows printer share with ``copy /b`` (same as BarcodePrinter)"""
+
+    def __init__(self, printer_name: str, timeout: float = 30.0):
+        self.printer_name = printer_name
+        self.timeout = float(timeout)
+
+    def send(self, data: bytes) -> int:
+        if os.name != 'nt':
+            raise PrinterTransportError("Windows raw printing is only available on Windows")
+        temp_file = None
+        try:
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.prn') as f:
+                f.write(data)
+                temp_file = f.name
+            cmd = ['cmd', '/c', f'copy /b "{temp_file}" "{self.printer_name}"']
+            result = subprocess.run(cmd, capture_output=True, timeout=self.timeout)
+            if result.returncode != 0:
+                raise PrinterTransportError(f"copy /b to {self.printer_name} failed: {result.stderr!r}")
+            return len(data)
+        except PrinterTransportError:
+            raise
+        except Exception as e:
+            raise PrinterTransportError(f"Windows print failed ({self.printer_name}): {e}")
+        finally:
+            if temp_file:
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass
+
+    def describe(self) -> str:
+        return f"win://{self.printer_name}"
+
+
+def create_transport(target: str, timeout: float = 5.0):
+    """Build a transport from a target URI (see module docstring)."""
+    target = (target or '').strip()
+    if not target:
+        raise PrinterTransportError("No printer target configured")
+
+    parsed = urlparse(target)
+    scheme = (parsed.scheme or '').lower()
+    query = parse_qs(parsed.query or '')
+
+    if scheme in ('tcp', 'socket', 'raw'):
+        if not parsed.hostname:
+            raise PrinterTransportError(f"Missing host in printer target: {target}")
+        return SocketTransport(parsed.hostname, parsed.port or 9100, timeout=timeout)
+    if scheme == 'serial':
+        port = unquote((parsed.netloc or '') + (parsed.path or ''))
+        baud = int((query.get('baud') or query.get('baudrate') or ['9600'])[0])
+        return SerialTransport(port, baud, timeout=timeout)
+    if scheme == 'file':
+        path = unquote((parsed.netloc or '') + (parsed.path or ''))
+        return FileTransport(path)
+    if scheme in ('win', 'windows'):
+        return WindowsRawTransport(unquote((parsed.netloc or '') + (parsed.path or '')))
+    if len(scheme) == 1 and os.name == 'nt':
+        # Bare Windows path such as C:\receipts\out.bin
+        return FileTransport(target)
+    if not scheme:
+        return FileTransport(target)
+    raise PrinterTransportError(f"Unsupported printer target: {target}")
@@ -0,0 +1,352 @@
+"""
+Receipt print spooler - renders receipts straight to ESC/POS bytes and prints them
+from a background worker so the cashier never waits on the printer.
+
+    spooler = get_receipt_spooler()
+    job = spooler.submit_receipt(receipt_data, "tcp://192.168.1.50:9100")
+    # ... next sale starts immediately; job.status is updated by the worker
+
+``receipt_data`` is the same dict the sales screen passes to ReceiptPreviewDialog.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from pos_app.utils.printer_transport import create_transport, PrinterTransportError
+
+logger = logging.getLogger(__name__)
+
+
+# ESC/POS command bytes
+ESC_INIT = b'\x1b@'
+ESC_ALIGN_LEFT = b'\x1ba\x00'
+ESC_ALIGN_CENTER = b'\x1ba\x01'
+ESC_BOLD_ON = b'\x1bE\x01'
+ESC_BOLD_OFF = b'\x1bE\x00'
+ESC_DOUBLE_ON = b'\x1d!\x11'
+ESC_DOUBLE_OFF = b'\x1d!\x00'
+ESC_CODEPAGE_PC437 = b'\x1bt\x00'
+ESC_FEED_CUT = b'\x1bd\x04\x1dV\x01'
+ESC_OPEN_DRAWER = b'\x1bp\x00\x19\xfa'
+LF = b'\n'
+
+
+class EscPosReceiptTemplate:
+    """Pre-compiled ESC/POS receipt layout.
+
+    Everything that does not change between sales (init sequence, business header,
+    separators, static footer) is encoded once; ``render`` only formats the sale lines.
+    """
+
+    def __init__(self, business_name: str = "", business_address: str = "", footer: str = "",
+                 width: int = 42, encoding: str = 'cp437', open_drawer: bool = False, business_phone: str = ""):
+        self.width = int(width or 42)
+        self.encoding = encoding
+        self.open_drawer = open_drawer
+        self._rule = self._enc('-' * self.width) + LF
+        self._double_rule = self._enc('=' * self.width) + LF
+
+        header = [ESC_INIT, ESC_CODEPAGE_PC437, ESC_ALIGN_CENTER]
+        if business_name:
+            header += [ESC_BOLD_ON, ESC_DOUBLE_ON, self._enc(business_name[: self.width // 2]), LF,
+                       ESC_DOUBLE_OFF, ESC_BOLD_OFF]
+        if business_address:
+            header += [self._enc(business_address[: self.width]), LF]
+        if business_phone:
+            header += [self._enc(f"Tel: {business_phone}"[: self.width]), LF]
+        header += [ESC_ALIGN_LEFT, self._rule]
+        self._header = b''.join(header)
+
+        columns = self._fit("Qty  Item Name", "Price    Total")
+        self._items_header = b''.join([self._rule, ESC_BOLD_ON, self._enc(columns), LF, ESC_BOLD_OFF, self._rule])
+
+        tail = [self._double_rule, ESC_ALIGN_CENTER]
+        if footer:
+            tail += [self._enc(footer[: self.width]), LF]
+        self._footer = b''.join(tail)
+        self._refund_banner = b''.join([LF, ESC_BOLD_ON, self._enc("*** REFUND RECEIPT ***"), LF, ESC_BOLD_OFF])
+        self._end = (ESC_OPEN_DRAWER if open_drawer else b'') + ESC_FEED_CUT
+
+    def _enc(self, text) -> bytes:
+        return str(text).encode(self.encoding, errors='replace')
+
+    def _fit(self, left: str, right: str) -> str:
+        left = str(left)
+        right = str(right)
+        space = max(1, self.width - len(right) - 1)
+        if len(left) > space:
+            left = left[:max(0, space)]
+        return f"{left:<{space}} {right}"
+
+    def render(self, receipt_data: dict) -> bytes:
+        """Render one receipt to raw ESC/POS bytes."""
+        sd = receipt_data if isinstance(receipt_data, dict) else {}
+        now = sd.get('date') or datetime.now()
+        if not isinstance(now, datetime):
+            now = datetime.now()
+
+        subtotal = float(sd.get('subtotal', 0.0) or 0.0)
+        discount_amount = float(sd.get('discount_amount', 0.0) or 0.0)
+        tax_rate = float(sd.get('tax_rate', 0.0) or 0.0)
+        tax_amount = float(sd.get('tax_amount', 0.0) or 0.0)
+        final_total = float(sd.get('final_total', subtotal - discount_amount + tax_amount) or 0.0)
+        cash = float(sd.get('amount_paid', final_total) or final_total)
+        change = float(sd.get('change_amount', max(0.0, cash - final_total)) or 0.0)
+        is_refund = str(sd.get('sale_type', '') or '').lower() == 'refund' or bool(sd.get('is_refund', False))
+
+        out = [self._header]
+        out.append(self._enc(f"Inv:{sd.get('invoice_number') or ''}  {now:%Y-%m-%d}  {now:%H:%M}") + LF)
+        out.append(self._enc(f"Cashier: {sd.get('cashier', 'Admin')}") + LF)
+        out.append(self._enc(f"Payment: {sd.get('payment_method', 'Cash')}") + LF)
+        out.append(self._items_header)
+
+        name_width = max(8, self.width - 22)
+        for it in sd.get('items', []) or []:
+            name = str(it.get('name') or '')
+            qty = it.get('quantity', 0) or 0
+            price = float(it.get('price', 0.0) or 0.0)
+            amount = float(it.get('total', qty * price) or 0.0)
+            qty_txt = f"{qty:g}" if isinstance(qty, float) else str(qty)
+            line = f"{qty_txt:<4} {name[:name_width]:<{name_width}} {price:>7.2f} {amount:>8.2f}"
+            out.append(self._enc(line[: self.width]) + LF)
+
+        out.append(self._rule)
+        out.append(self._enc(self._fit("Subtotal", f"{subtotal:.2f}")) + LF)
+        if discount_amount:
+            out.append(self._enc(self._fit("Discount", f"{discount_amount:.2f}")) + LF)
+        if tax_amount or tax_rate:
+            out.append(self._enc(self._fit(f"Tax ({tax_rate:.0f}%)", f"{tax_amount:.2f}")) + LF)
+        out.append(ESC_BOLD_ON + self._enc(self._fit("TOTAL", f"{final_total:.2f}")) + LF + ESC_BOLD_OFF)
+        out.append(self._enc(self._fit("Cash", f"{cash:.2f}")) + LF)
+        out.append(self._enc(self._fit("Change", f"{change:.2f}")) + LF)
+        out.append(self._footer)
+        if is_refund:
+            out.append(self._refund_banner)
+        out.append(self._end)
+        return b''.join(out)
+
+
+class PrintJob:
+    """A queued print job and its status (QUEUED, PRINTING, RETRYING, DONE, FAILED)"""
+
+    def __init__(self, job_id: int, payload: bytes, target: str, description: str = "", max_attempts: int = 3):
+        self.id = job_id
+        self.payload = payload
+        self.target = target
+        self.description = description
+        self.max_attempts = max(1, int(max_attempts))
+        self.attempts = 0
+        self.status = 'QUEUED'
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the job finished (printed or failed). Returns True if printed."""
+        self._done.wait(timeout)
+        return self.status == 'DONE'
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+
+class ReceiptSpooler:
+    """Background print queue with retry and status callbacks.
+
+    ``on_status`` is called from the worker thread as ``on_status(job)``; Qt views
+    should forward it through a signal rather than touching widgets directly.
+    """
+
+    def __init__(self, transport_factory=create_transport, retry_delay: float = 1.0,
+                 max_attempts: int = 3, on_status=None):
+        self._transport_factory = transport_factory
+        self.retry_delay = float(retry_delay)
+        self.max_attempts = int(max_attempts)
+        self._listeners = [on_status] if on_status else []
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._worker = None
+        self._stopping = False
+
+    # --- public API ---
+    def add_listener(self, callback):
+        if callback and callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def template_for(self, business_name: str = "", business_address: str = "", footer: str = "",
+                     width: int = 42, open_drawer: bool = False, business_phone: str = "") -> EscPosReceiptTemplate:
+        """Return a cached compiled template for this header/footer combination."""
+        key = (business_name or "", business_address or "", footer or "", int(width or 42), bool(open_drawer),
+               business_phone or "")
+        with self._lock:
+            tpl = self._templates.get(key)
+            if tpl is None:
+                tpl = EscPosReceiptTemplate(*key[:4], open_drawer=key[4], business_phone=key[5])
+                self._templates[key] = tpl
+            return tpl
+
+    def submit(self, payload: bytes, target: str, description: str = "") -> PrintJob:
+        """Queue raw printer bytes for ``target`` and return immediately."""
+        job = PrintJob(next(self._ids), payload, target, description, self.max_attempts)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._ensure_worker()
+        self._queue.put(job)
+        self._notify(job)
+        return job
+
+    def submit_receipt(self, receipt_data: dict, target: str, width: int = 42, open_drawer: bool = False) -> PrintJob:
+        """Render ``receipt_data`` with a cached template and queue it.
+
+        ``receipt_data['business_info']`` ({'name', 'address', 'phone'}) is the receipt
+        header; see ``configured_business_info()``.
+        """
+        sd = receipt_data if isinstance(receipt_data, dict) else {}
+        biz = sd.get('business_info', {}) or {}
+        tpl = self.template_for(biz.get('name', ''), biz.get('address', ''),
+                                sd.get('receipt_footer', '') or '', width, open_drawer, biz.get('phone', ''))
+        payload = tpl.render(sd)
+        return self.submit(payload, target, f"Receipt {sd.get('invoice_number') or ''}".strip())
+
+    def get_job(self, job_id: int) -> PrintJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending_count(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Wait until every queued job has finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the worker after the queue drains."""
+        self._stopping = True
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self._worker = None
+        self._stopping = False
+
+    # --- worker ---
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ReceiptSpooler", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._process(job)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, job: PrintJob):
+        while job.attempts < job.max_attempts:
+            job.attempts += 1
+            job.status = 'PRINTING'
+            self._notify(job)
+            try:
+                transport = self._transport_factory(job.target)
+                transport.send(job.payload)
+                job.status = 'DONE'
+                job.error = None
+                break
+            except (PrinterTransportError, OSError) as e:
+                job.error = str(e)
+                logger.warning(f"Print job {job.id} attempt {job.attempts} failed: {e}")
+                if job.attempts < job.max_attempts and not self._stopping:
+                    job.status = 'RETRYING'
+                    self._notify(job)
+                    time.sleep(self.retry_delay * job.attempts)
+                else:
+                    job.status = 'FAILED'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'FAILED'
+                logger.error(f"Print job {job.id} failed: {e}")
+                break
+        if job.status not in ('DONE', 'FAILED'):
+            job.status = 'FAILED'
+        job.finished_at = datetime.now()
+        job._done.set()
+        self._notify(job)
+
+    def _notify(self, job: PrintJob):
+        for cb in list(self._listeners):
+            try:
+                cb(job)
+            except Exception as e:
+                logger.debug(f"Spooler listener error: {e}")
+
+
+_spooler = None
+_spooler_lock = threading.Lock()
+
+
+def get_receipt_spooler() -> ReceiptSpooler:
+    """Process-wide spooler shared by the sales screens and controllers."""
+    global _spooler
+    with _spooler_lock:
+        if _spooler is None:
+            _spooler = ReceiptSpooler()
+        return _spooler
+
+
+def configured_receipt_target() -> str:
+    """Raw receipt printer target from settings ('' when raw printing is not configured)."""
+    try:
+        try:
+            from PySide6.QtCore import QSettings
+        except ImportError:
+            from PyQt6.QtCore import QSettings
+        settings = QSettings("POSApp", "Settings")
+        return str(settings.value("receipt_printer_target", "") or "").strip()
+    except Exception:
+        return ""
+
+
+def configured_business_info(business_info: dict | None = None) -> dict:
+    """Receipt header {'name', 'address', 'phone'}: values in business_info win, blanks come from settings."""
+    info = {'name': '', 'address': '', 'phone': ''}
+    info.update({k: v for k, v in (business_info or {}).items() if v})
+    try:
+        try:
+            from PySide6.QtCore import QSettings
+        except ImportError:
+            from PyQt6.QtCore import QSettings
+        settings = QSettings("POSApp", "Settings")
+        for key in ('name', 'address', 'phone'):
+            if not info[key]:
+                info[key] = str(settings.value(f"business_{key}", "") or "").strip()
+    except Exception:
+        pass
+    return info
@@ -0,0 +1,401 @@
+"""
+Product and customer sales statistics from incrementally maintained counters.
+
+Rankings used to be recomputed from every sale item in the range on each screen
+refresh (and resolved customer names one query at a time). Instead, every flush
+that inserts, updates or deletes a Sale/SaleItem folds the change into per-day
+counters (an update moves the row's contribution from its old values to the new):
+
+- product_daily_stats: (day, product_id) -> quantity, revenue, refund quantity/amount, lines
+- customer_daily_stats: (day, customer_id, payment_method) -> revenue, refunds, counts, last sale
+
+The counters are upserted in the same transaction as the sale, so they commit or
+roll back with it. Top-K and totals queries then group a few rows per day instead
+of scanning sale items. Rows moved out by the archiver keep their counters.
+
+    stats = SalesStats(session)
+    stats.top_products(start, end, limit=10)              # by quantity sold
+    stats.top_products(start, end, limit=1, ascending=True)
+    stats.top_customers(start, end, limit=10)             # by revenue
+    rebuild_stats(session.connection())                   # recompute from sale rows (migration v8,
+                                                          # and the repair after bulk UPDATE/DELETE)
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from pos_app.models.database import (
+    Customer, CustomerDailyStat, Product, ProductDailyStat, Sale, SaleItem
+)
+from pos_app.utils.money import from_paisa, to_paisa
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_COUNTERS = ('quantity', 'revenue', 'refund_quantity', 'refund_amount', 'sale_count')
+CUSTOMER_COUNTERS = ('revenue', 'refund_amount', 'sale_count', 'refund_count')
+DEFAULT_METHOD = 'CASH'
+
+
+def _day(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return datetime.fromisoformat(value[:10]).date()
+    return datetime.now().date()
+
+
+SALE_FIELDS = ('customer_id', 'sale_date', 'payment_method', 'total_amount', 'is_refund')
+ITEM_FIELDS = ('sale_id', 'product_id', 'quantity', 'total')
+
+
+def _fields(obj):
+    return SALE_FIELDS if isinstance(obj, Sale) else ITEM_FIELDS
+
+
+def _row(obj, before=False) -> dict:
+    """Counter fields of a flushed Sale/SaleItem, as written or (before=True) as they were before the flush.
+
+    Reads the instance dict and attribute history only; nothing is loaded.
+    """
+    state = inspect(obj)
+    row = {}
+    for name in _fields(obj):
+        value = state.dict.get(name)
+        if before:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        row[name] = value
+    return row
+
+
+def _changed(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _fields(obj))
+
+
+def prepare_flush(session):
+    """Load the counter fields of Sale/SaleItem rows about to be deleted or updated (before_flush).
+
+    Rows expired by a commit would otherwise reach the after-flush hook without
+    their values, and a deleted row cannot be read back once its DELETE ran.
+    """
+    for obj in list(session.deleted) + list(session.dirty):
+        if not isinstance(obj, (Sale, SaleItem)) or (obj not in session.deleted and not _changed(obj)):
+            continue
+        for name in _fields(obj):
+            getattr(obj, name)
+
+
+# ---------------------------------------------------------------- counters
+def _add_item(products, sign, item, parent):
+    """Fold one sale line (a _row() dict) into the product counters; parent is (sale_date, is_refund)."""
+    product_id = item['product_id']
+    if product_id is None or parent is None:
+        return
+    sale_date, is_refund = parent
+    key = (_day(sale_date), product_id)
+    c = products.setdefault(key, [0.0, 0, 0.0, 0, 0])
+    qty = float(item['quantity'] or 0) * sign
+    amount = to_paisa(abs(float(item['total'] or 0))) * sign
+    if is_refund:
+        c[2] += qty
+        c[3] += amount
+    else:
+        c[0] += qty
+        c[1] += amount
+        c[4] += sign
+
+
+def _add_sale(customers, sign, sale):
+    """Fold one sale (a _row() dict) into the customer counters."""
+    customer_id = sale['customer_id']
+    if customer_id is None:
+        return
+    sale_date = sale['sale_date']
+    key = (_day(sale_date), customer_id, (sale['payment_method'] or DEFAULT_METHOD)[:20])
+    c = customers.setdefault(key, [0, 0, 0, 0, None])
+    amount = to_paisa(abs(float(sale['total_amount'] or 0))) * sign
+    if sale['is_refund']:
+        c[1] += amount
+        c[3] += sign
+    else:
+        c[0] += amount
+        c[2] += sign
+        if sign > 0 and isinstance(sale_date, datetime) and (c[4] is None or sale_date > c[4]):
+            c[4] = sale_date
+
+
+def apply_flush(session):
+    """Fold the Sale/SaleItem rows inserted, updated or deleted by the flush into the counters.
+
+    Updated rows are taken out under their values from before the flush and
+    added back under the new ones (a changed sale date or refund flag moves
+    every line of the sale). Bulk query.update()/delete() bypass the flush;
+    after one, rebuild_stats() over the affected days is the repair.
+    """
+    new = [obj for obj in session.new if isinstance(obj, (Sale, SaleItem))]
+    deleted = [obj for obj in session.deleted if isinstance(obj, (Sale, SaleItem))]
+    dirty = [obj for obj in session.dirty if isinstance(obj, (Sale, SaleItem))
+             and obj not in session.deleted and _changed(obj)]
+
+    # (sale_date, is_refund) of the sales touched by the flush, before and after it
+    before, after = {}, {}
+    for sale in new + deleted + dirty:
+        if isinstance(sale, Sale) and sale.id is not None:
+            old, now = _row(sale, before=True), _row(sale)
+            before[sale.id] = (old['sale_date'], bool(old['is_refund']))
+            after[sale.id] = (now['sale_date'], bool(now['is_refund']))
+
+    lines = []  # (sign, item row, sale_id whose state applies, state map)
+    for sign, objs in ((1, new), (-1, deleted)):
+        for item in objs:
+            if isinstance(item, SaleItem):
+                row = _row(item)
+                lines.append((sign, row, row['sale_id'] or getattr(item.__dict__.get('sale'), 'id', None),
+                              after if sign > 0 else before))
+    for item in dirty:
+        if isinstance(item, SaleItem):
+            old, now = _row(item, before=True), _row(item)
+            lines.append((-1, old, old['sale_id'], before))
+            lines.append((1, now, now['sale_id'], after))
+
+    # Lines not in this flush whose sale moved to another day or refund state
+    moved = [sale_id for sale_id in after if before[sale_id] != after[sale_id]]
+    if moved:
+        handled = {obj.id for obj in new + deleted + dirty if isinstance(obj, SaleItem)}
+        rows = session.connection().execute(
+            select(SaleItem.id, SaleItem.sale_id, SaleItem.product_id, SaleItem.quantity, SaleItem.total)
+            .where(SaleItem.sale_id.in_(moved)))
+        for item_id, sale_id, product_id, quantity, total in rows:
+            if item_id in handled:
+                continue
+            row = {'sale_id': sale_id, 'product_id': product_id, 'quantity': quantity, 'total': total}
+            lines.append((-1, row, sale_id, before))
+            lines.append((1, row, sale_id, after))
+
+    # Parents that are not part of this flush: identity map, else one query
+    states = {}
+    missing = set()
+    for _, _, sale_id, touched in lines:
+        if sale_id is None or sale_id in touched:
+            continue
+        sale = session.identity_map.get(session.identity_key(Sale, sale_id))
+        if sale is not None and 'sale_date' in sale.__dict__:
+            states[sale_id] = (sale.__dict__.get('sale_date'), bool(sale.__dict__.get('is_refund')))
+        else:
+            missing.add(sale_id)
+    if missing:
+        rows = session.connection().execute(
+            select(Sale.id, Sale.sale_date, Sale.is_refund).where(Sale.id.in_(missing)))
+        for sale_id, sale_date, is_refund in rows:
+            states[sale_id] = (sale_date, bool(is_refund))
+
+    products = {}
+    for sign, row, sale_id, touched in lines:
+        _add_item(products, sign, row, touched.get(sale_id) or states.get(sale_id))
+
+    customers = {}
+    for sign, objs in ((1, new), (-1, deleted)):
+        for sale in objs:
+            if isinstance(sale, Sale):
+                _add_sale(customers, sign, _row(sale))
+    for sale in dirty:
+        if isinstance(sale, Sale):
+            _add_sale(customers, -1, _row(sale, before=True))
+            _add_sale(customers, 1, _row(sale))
+
+    conn = session.connection()
+    if products:
+        _upsert(conn, ProductDailyStat.__table__, ('day', 'product_id'), PRODUCT_COUNTERS, [
+            {'day': day, 'product_id': pid, 'quantity': c[0], 'revenue': from_paisa(c[1]),
+             'refund_quantity': c[2], 'refund_amount': from_paisa(c[3]), 'sale_count': c[4]}
+            for (day, pid), c in products.items()])
+    if customers:
+        _upsert(conn, CustomerDailyStat.__table__, ('day', 'customer_id', 'payment_method'), CUSTOMER_COUNTERS, [
+            {'day': day, 'customer_id': cid, 'payment_method': method, 'revenue': from_paisa(c[0]),
+             'refund_amount': from_paisa(c[1]), 'sale_count': c[2], 'refund_count': c[3], 'last_sale_at': c[4]}
+            for (day, cid, method), c in customers.items()])
+
+
+def _upsert(conn, table, keys, counters, rows):
+    """Insert rows or add their counters to the existing (keys) row."""
+    has_last = 'last_sale_at' in table.c
+    dialect = conn.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(table)
+        updates = {name: table.c[name] + stmt.excluded[name] for name in counters}
+        if has_last:
+            new, old = stmt.excluded.last_sale_at, table.c.last_sale_at
+            updates['last_sale_at'] = case((old.is_(None), new), (new > old, new), else_=old)
+        conn.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=updates), rows)
+        return
+    for row in rows:
+        match = [table.c[k] == row[k] for k in keys]
+        values = {name: table.c[name] + row[name] for name in counters}
+        if has_last and row.get('last_sale_at') is not None:
+            values['last_sale_at'] = func.coalesce(table.c.last_sale_at, row['last_sale_at'])
+        if not conn.execute(table.update().where(*match).values(**values)).rowcount:
+            conn.execute(table.insert().values(**row))
+
+
+def rebuild_stats(conn, start=None, end=None) -> dict:
+    """Recompute the counters for days in [start, end] (dates, inclusive) from the sale rows."""
+    pg = conn.dialect.name == 'postgresql'
+    day = "CAST(s.sale_date AS DATE)" if pg else "date(s.sale_date)"
+    sale_where, day_where, params = [], [], {}
+    if start is not None:
+        params['start'] = datetime.combine(_day(start), datetime.min.time())
+        params['start_day'] = _day(start)
+        sale_where.append("s.sale_date >= :start")
+        day_where.append("day >= :start_day")
+    if end is not None:
+        params['end'] = datetime.combine(_day(end) + timedelta(days=1), datetime.min.time())
+        params['end_day'] = _day(end)
+        sale_where.append("s.sale_date < :end")
+        day_where.append("day <= :end_day")
+    sale_filter = "".join(f" AND {w}" for w in sale_where)
+    day_filter = " AND ".join(day_where)
+
+    refund = "COALESCE(s.is_refund, FALSE)" if pg else "COALESCE(s.is_refund, 0)"
+    for table in ('product_daily_stats', 'customer_daily_stats'):
+        conn.execute(text(f"DELETE FROM {table}" + (f" WHERE {day_filter}" if day_filter else "")), params)
+    products = conn.execute(text(f"""
+        INSERT INTO product_daily_stats (day, product_id, quantity, revenue, refund_quantity, refund_amount, sale_count)
+        SELECT {day}, si.product_id,
+               SUM(CASE WHEN {refund} THEN 0 ELSE si.quantity END),
+               SUM(CASE WHEN {refund} THEN 0 ELSE ABS(si.total) END),
+               SUM(CASE WHEN {refund} THEN si.quantity ELSE 0 END),
+               SUM(CASE WHEN {refund} THEN ABS(si.total) ELSE 0 END),
+               SUM(CASE WHEN {refund} THEN 0 ELSE 1 END)
+        FROM sale_items si JOIN sales s ON s.id = si.sale_id
+        WHERE si.product_id IS NOT NULL AND s.sale_date IS NOT NULL{sale_filter}
+        GROUP BY {day}, si.product_id
+    """), params).rowcount
+    customers = conn.execute(text(f"""
+        INSERT INTO customer_daily_stats (day, customer_id, payment_method, revenue, refund_amount,
+                                          sale_count, refund_count, last_sale_at)
+        SELECT {day}, s.customer_id, COALESCE(s.payment_method, '{DEFAULT_METHOD}'),
+               SUM(CASE WHEN {refund} THEN 0 ELSE ABS(s.total_amount) END),
+               SUM(CASE WHEN {refund} THEN ABS(s.total_amount) ELSE 0 END),
+               SUM(CASE WHEN {refund} THEN 0 ELSE 1 END),
+               SUM(CASE WHEN {refund} THEN 1 ELSE 0 END),
+               MAX(CASE WHEN {refund} THEN NULL ELSE s.sale_date END)
+        FROM sales s
+        WHERE s.customer_id IS NOT NULL AND s.sale_date IS NOT NULL{sale_filter}
+        GROUP BY {day}, s.customer_id, COALESCE(s.payment_method, '{DEFAULT_METHOD}')
+    """), params).rowcount
+    logger.info(f"Sales statistics rebuilt: {products} product-day and {customers} customer-day rows")
+    return {'products': products, 'customers': customers}
+
+
+# ---------------------------------------------------------------- queries
+def day_range(start=None, end=None, end_exclusive=False):
+    """(first_day, last_day) inclusive for datetime/date bounds; exclusive ends step back a microsecond."""
+    first = _day(start) if start is not None else None
+    if end is None:
+        return first, None
+    if end_exclusive and isinstance(end, datetime):
+        end = end - timedelta(microseconds=1)
+    elif end_exclusive:
+        end = end - timedelta(days=1)
+    return first, _day(end)
+
+
+class SalesStats:
+    """Top-K and totals over the daily counters"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def _days(self, q, column, start, end, end_exclusive):
+        first, last = day_range(start, end, end_exclusive)
+        if first is not None:
+            q = q.filter(column >= first)
+        if last is not None:
+            q = q.filter(column <= last)
+        return q
+
+    def top_products(self, start=None, end=None, limit=10, by='quantity', ascending=False,
+                     end_exclusive=False) -> list:
+        """Products ranked by net `quantity` or `revenue` sold in the range (only products with sales)."""
+        s = ProductDailyStat
+        net_qty = func.sum(s.quantity) - func.sum(s.refund_quantity)
+        net_revenue = func.sum(s.revenue) - func.sum(s.refund_amount)
+        metric = net_revenue if by == 'revenue' else net_qty
+        q = self.session.query(
+            s.product_id, Product.name, func.sum(s.quantity), func.sum(s.revenue),
+            func.sum(s.refund_quantity), func.sum(s.refund_amount), func.sum(s.sale_count),
+        ).join(Product, Product.id == s.product_id)
+        q = self._days(q, s.day, start, end, end_exclusive).group_by(s.product_id, Product.name) \
+            .having(func.sum(s.sale_count) > 0)
+        q = q.order_by(metric.asc() if ascending else metric.desc(), s.product_id)
+        if limit:
+            q = q.limit(limit)
+        return [{
+            'product_id': pid, 'name': name or '(Unknown Product)',
+            'quantity': float(qty or 0), 'revenue': float(rev or 0),
+            'refund_quantity': float(rqty or 0), 'refund_amount': float(ramt or 0),
+            'net_quantity': float(qty or 0) - float(rqty or 0), 'net_revenue': float(rev or 0) - float(ramt or 0),
+            'sales': int(lines or 0),
+        } for pid, name, qty, rev, rqty, ramt, lines in q]
+
+    def product_totals(self, start=None, end=None, end_exclusive=False) -> dict:
+        s = ProductDailyStat
+        q = self.session.query(func.coalesce(func.sum(s.quantity), 0.0), func.coalesce(func.sum(s.revenue), 0.0),
+                               func.coalesce(func.sum(s.refund_quantity), 0.0),
+                               func.count(func.distinct(case((s.sale_count > 0, s.product_id)))))
+        qty, revenue, refunded, products = self._days(q, s.day, start, end, end_exclusive).one()
+        return {'quantity': float(qty or 0), 'revenue': float(revenue or 0),
+                'refund_quantity': float(refunded or 0), 'net_quantity': float(qty or 0) - float(refunded or 0),
+                'products': int(products or 0)}
+
+    def _customer_query(self, start, end, end_exclusive):
+        s = CustomerDailyStat
+        q = self.session.query(
+            s.customer_id, Customer.name, func.sum(s.revenue), func.sum(s.refund_amount),
+            func.sum(s.sale_count), func.max(s.last_sale_at),
+        ).join(Customer, Customer.id == s.customer_id)
+        return self._days(q, s.day, start, end, end_exclusive).group_by(s.customer_id, Customer.name)
+
+    def top_customers(self, start=None, end=None, limit=10, end_exclusive=False) -> list:
+        """Customers ranked by revenue in the range, with transactions and average order."""
+        s = CustomerDailyStat
+        q = self._customer_query(start, end, end_exclusive).having(func.sum(s.sale_count) > 0) \
+            .order_by(func.sum(s.revenue).desc(), s.customer_id)
+        if limit:
+            q = q.limit(limit)
+        result = []
+        for cid, name, revenue, refunded, count, last in q:
+            revenue, count = float(revenue or 0), int(count or 0)
+            result.append({'customer_id': cid, 'name': name or f"Customer #{cid}", 'revenue': revenue,
+                           'refund_amount': float(refunded or 0), 'transactions': count,
+                           'avg_order': revenue / count if count else 0.0, 'last_sale_at': last})
+        return result
+
+    def active_customers(self, start=None, end=None, end_exclusive=False) -> int:
+        s = CustomerDailyStat
+        q = self.session.query(func.count(func.distinct(s.customer_id))).filter(s.sale_count > 0)
+        return int(self._days(q, s.day, start, end, end_exclusive).scalar() or 0)
+
+    def payment_preferences(self, start=None, end=None, end_exclusive=False) -> dict:
+        """{customer_id: {'name', 'methods': {method: sales}, 'total_spent', 'last_transaction'}}"""
+        s = CustomerDailyStat
+        q = self.session.query(s.customer_id, Customer.name, s.payment_method, func.sum(s.sale_count),
+                               func.sum(s.revenue), func.max(s.last_sale_at)) \
+            .join(Customer, Customer.id == s.customer_id)
+        q = self._days(q, s.day, start, end, end_exclusive).group_by(s.customer_id, Customer.name, s.payment_method)
+        result = {}
+        for cid, name, method, count, revenue, last in q:
+            entry = result.setdefault(cid, {'name': name, 'methods': {}, 'total_spent': 0.0, 'last_transaction': None})
+            if count:
+                entry['methods'][method] = entry['methods'].get(method, 0) + int(count)
+            entry['total_spent'] += float(revenue or 0)
+            if last is not None and (entry['last_transaction'] is None or last > entry['last_transaction']):
+                entry['last_transaction'] = last
+        return {cid: e for cid, e in result.items() if e['methods']}
@@ -0,0 +1,368 @@
+"""
+Barcode scanner input pipeline.
+
+Keyboard-wedge scanners "type" a code in a burst of keystrokes a few
+milliseconds apart, usually followed by Enter. ScanBurstDetector tells those
+bursts from human typing purely by inter-key timing, so codes are assembled from
+the key stream rather than from whatever text widget happens to have focus.
+ScanDispatcher resolves a code through an in-memory ProductIndex and adds it to
+the cart engine (utils/cart.Cart) directly, recording scan-to-cart latency.
+
+    pipeline = ScannerPipeline(ScanBurstDetector(), ScanDispatcher(ProductIndex(session), cart))
+    pipeline.key('4', ts); ...; result = pipeline.enter(ts)   # ScanResult or None
+
+Recorded key streams ([{"t": seconds, "k": "4"}, ..., {"t": ..., "k": "\\n"}])
+can be replayed with replay_scan_stream() to check detection and measure latency
+without Qt or a physical scanner.
+"""
+
+import json
+import logging
+import time
+import weakref
+
+from sqlalchemy import or_
+
+from pos_app.models.database import Product, SyncState
+
+logger = logging.getLogger(__name__)
+
+# Scanners send a character every ~1-15 ms; people rarely type faster than ~60 ms/key
+BURST_MAX_GAP = 0.035
+BURST_MIN_LENGTH = 4
+# Enter must follow the last burst key quickly to count as the scan terminator
+TERMINATOR_MAX_GAP = 0.1
+# Typed input is kept across pauses shorter than this (manual code entry)
+TYPING_MAX_GAP = 0.35
+# Sync markers are checked at most this often
+INDEX_CHECK_INTERVAL = 2.0
+
+
+class ScannedCode:
+    def __init__(self, code, burst, started_at):
+        self.code = code
+        self.burst = burst
+        self.started_at = started_at  # perf_counter() when the first key arrived
+
+
+class ScanBurstDetector:
+    """Assembles key streams and classifies them as scanner bursts or typing"""
+
+    def __init__(self, max_gap=BURST_MAX_GAP, min_length=BURST_MIN_LENGTH,
+                 terminator_gap=TERMINATOR_MAX_GAP, typing_gap=TYPING_MAX_GAP):
+        self.max_gap = max_gap
+        self.min_length = min_length
+        self.terminator_gap = terminator_gap
+        self.typing_gap = typing_gap
+        self.reset()
+
+    def reset(self):
+        self._chars = []
+        self._last_ts = None
+        self._run_start = 0          # index where the current fast run began
+        self._run_started_at = None  # perf_counter() at the first key of that run
+        self._started_at = None
+
+    @property
+    def buffer(self) -> str:
+        return "".join(self._chars)
+
+    def key(self, char: str, ts: float):
+        """Feed one printable character with its event time in seconds."""
+        if not char:
+            return
+        gap = None if self._last_ts is None else ts - self._last_ts
+        now = time.perf_counter()
+        if gap is None or gap > self.typing_gap:
+            # Long pause: whatever was typed before is abandoned
+            self._chars = []
+            self._started_at = now
+        if gap is None or gap > self.max_gap or not self._chars:
+            self._run_start = len(self._chars)
+            self._run_started_at = now
+        self._chars.append(char)
+        self._last_ts = ts
+
+    def enter(self, ts: float):
+        """Enter pressed: the trailing fast run as a burst, else everything typed; None if empty."""
+        if not self._chars:
+            self.reset()
+            return None
+        run = "".join(self._chars[self._run_start:]).strip()
+        if (len(run) >= self.min_length and self._last_ts is not None
+                and ts - self._last_ts <= self.terminator_gap):
+            scanned = ScannedCode(run, True, self._run_started_at)
+        else:
+            scanned = ScannedCode(self.buffer.strip(), False, self._started_at or time.perf_counter())
+        self.reset()
+        return scanned if scanned.code else None
+
+
+class ProductSnapshot:
+    """Fields the cart needs, detached from the ORM session"""
+
+    __slots__ = ('id', 'name', 'barcode', 'sku', 'retail_price', 'wholesale_price', 'purchase_price', 'stock_level',
+                 'is_active')
+
+    def __init__(self, id, name, barcode, sku, retail_price, wholesale_price, purchase_price, stock_level,
+                 is_active=True):
+        self.id = id
+        self.name = name
+        self.barcode = barcode
+        self.sku = sku
+        self.retail_price = float(retail_price or 0.0)
+        self.wholesale_price = float(wholesale_price or 0.0)
+        self.purchase_price = float(purchase_price or 0.0)
+        self.stock_level = int(stock_level or 0)
+        self.is_active = is_active is not False
+
+
+_COLUMNS = (Product.id, Product.name, Product.barcode, Product.sku, Product.retail_price,
+            Product.wholesale_price, Product.purchase_price, Product.stock_level, Product.is_active)
+
+
+class ProductIndex:
+    """Barcode/SKU -> ProductSnapshot, refreshed when the products or stock sync markers move"""
+
+    def __init__(self, session, check_interval=INDEX_CHECK_INTERVAL, clock=time.monotonic):
+        self.session = session
+        self.check_interval = check_interval
+        self._clock = clock
+        self._by_code = {}
+        self._by_id = {}
+        self._stamps = None
+        self._checked_at = None
+        self._stale_stock = set()
+
+    def _sync_stamps(self):
+        try:
+            rows = self.session.query(SyncState.key, SyncState.last_changed) \
+                .filter(SyncState.key.in_(('products', 'stock'))).all()
+            return dict(rows)
+        except Exception:
+            try:
+                self.session.rollback()
+            except Exception:
+                pass
+            return None
+
+    def _add(self, snap):
+        self._by_id[snap.id] = snap
+        for code in (snap.barcode, snap.sku):
+            code = (code or "").strip()
+            held = self._by_code.get(code)
+            # An active product wins a code shared with a deactivated one
+            if code and (held is None or (snap.is_active and not held.is_active)):
+                self._by_code[code] = snap
+
+    def load(self):
+        self._by_code, self._by_id, self._stale_stock = {}, {}, set()
+        for row in self.session.query(*_COLUMNS).yield_per(2000):
+            self._add(ProductSnapshot(*row))
+        self._stamps = self._sync_stamps()
+        self._checked_at = self._clock()
+        logger.debug(f"Product index loaded: {len(self._by_id)} products, {len(self._by_code)} codes")
+
+    def _ensure_fresh(self):
+        now = self._clock()
+        if self._checked_at is None:
+            self.load()
+            return
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        stamps = self._sync_stamps()
+        if stamps is None or stamps == self._stamps:
+            return
+        old = self._stamps or {}
+        if stamps.get('products') != old.get('products'):
+            self.load()
+            return
+        # Only stock moved: re-read stock per product on its next scan
+        self._stale_stock = set(self._by_id)
+        self._stamps = stamps
+
+    def lookup(self, code: str):
+        """Snapshot of the active product with a barcode or SKU (with a DB fallback for
+        unindexed codes), or None; deactivated products cannot be sold."""
+        code = (code or "").strip()
+        if not code:
+            return None
+        self._ensure_fresh()
+        snap = self._by_code.get(code)
+        if snap is None:
+            row = self.session.query(*_COLUMNS).filter(or_(Product.barcode == code, Product.sku == code)) \
+                .order_by(Product.is_active.desc()).first()
+            if row is None:
+                return None
+            snap = ProductSnapshot(*row)
+            self._add(snap)
+            self._by_code.setdefault(code, snap)
+        if not snap.is_active:
+            return None
+        if snap.id in self._stale_stock:
+            self._stale_stock.discard(snap.id)
+            stock = self.session.query(Product.stock_level).filter(Product.id == snap.id).scalar()
+            snap.stock_level = int(stock or 0)
+        return snap
+
+    def search(self, text: str, limit: int = 50, active_only: bool = True) -> list:
+        """Product picker matches: an exact barcode/SKU first, then names containing `text`
+        or codes starting with it (case-insensitive), ordered by name."""
+        self._ensure_fresh()
+        needle = (text or "").strip().lower()
+        found = []
+        exact = self._by_code.get((text or "").strip())
+        if exact is not None and (exact.is_active or not active_only):
+            found.append(exact)
+        matches = []
+        for snap in self._by_id.values():
+            if snap is exact or (active_only and not snap.is_active):
+                continue
+            if (not needle or needle in (snap.name or "").lower()
+                    or (snap.barcode or "").lower().startswith(needle)
+                    or (snap.sku or "").lower().startswith(needle)):
+                matches.append(snap)
+        matches.sort(key=lambda snap: ((snap.name or "").lower(), snap.id))
+        return (found + matches)[:limit]
+
+    def get(self, product_id):
+        """Snapshot by product id, or None."""
+        self._ensure_fresh()
+        return self._by_id.get(product_id)
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+_shared_indexes = weakref.WeakKeyDictionary()
+
+
+def get_product_index(session) -> ProductIndex:
+    """The ProductIndex shared by every screen using `session` (loaded once, refreshed by sync markers)."""
+    index = _shared_indexes.get(session)
+    if index is None:
+        index = _shared_indexes[session] = ProductIndex(session)
+    return index
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class ScanResult:
+    def __init__(self, code, status, product=None, row=-1, created=False, latency_ms=0.0):
+        self.code = code
+        self.status = status  # 'added' | 'not_found' | 'out_of_stock'
+        self.product = product
+        self.row = row
+        self.created = created
+        self.latency_ms = latency_ms
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'added'
+
+
+class ScanDispatcher:
+    """Resolves scanned codes and adds them to the cart"""
+
+    def __init__(self, index: ProductIndex, cart, wholesale=None, max_samples=500):
+        self.index = index
+        self.cart = cart
+        self.wholesale = wholesale or (lambda: False)
+        self.max_samples = max_samples
+        self.latencies_ms = []
+
+    def dispatch(self, scanned: ScannedCode) -> ScanResult:
+        snap = self.index.lookup(scanned.code)
+        if snap is None:
+            return self._done(ScanResult(scanned.code, 'not_found'), scanned)
+
+        row = self.cart.find(snap.id)
+        in_cart = float(self.cart[row].get('quantity', 0) or 0) if row >= 0 else 0.0
+        if snap.stock_level > 0 and in_cart + 1 > snap.stock_level:
+            return self._done(ScanResult(scanned.code, 'out_of_stock', snap, row), scanned)
+
+        price = snap.wholesale_price if self.wholesale() else snap.retail_price
+        row, created = self.cart.add_or_increment({
+            'id': snap.id,
+            'name': snap.name,
+            'price': price,
+            'purchase_price': snap.purchase_price,
+            'quantity': 1,
+            'stock_level': snap.stock_level,
+        })
+        return self._done(ScanResult(scanned.code, 'added', snap, row, created), scanned)
+
+    def _done(self, result, scanned):
+        result.latency_ms = (time.perf_counter() - scanned.started_at) * 1000.0
+        self.latencies_ms.append(result.latency_ms)
+        if len(self.latencies_ms) > self.max_samples:
+            del self.latencies_ms[:len(self.latencies_ms) - self.max_samples]
+        return result
+
+    def latency_summary(self) -> dict:
+        values = self.latencies_ms
+        return {
+            'scans': len(values),
+            'p50_ms': round(percentile(values, 50), 3),
+            'p95_ms': round(percentile(values, 95), 3),
+            'max_ms': round(max(values), 3) if values else 0.0,
+        }
+
+
+class ScannerPipeline:
+    """Detector + dispatcher; the UI feeds keys and acts on returned results"""
+
+    def __init__(self, detector: ScanBurstDetector, dispatcher: ScanDispatcher):
+        self.detector = detector
+        self.dispatcher = dispatcher
+
+    def key(self, char: str, ts: float):
+        self.detector.key(char, ts)
+
+    def enter(self, ts: float, accept_typed: bool = False):
+        """Dispatch the buffered code on Enter. Typed (non-burst) input is only
+        dispatched when accept_typed is set; otherwise None is returned."""
+        scanned = self.detector.enter(ts)
+        if scanned is None or not (scanned.burst or accept_typed):
+            return None
+        return self.dispatcher.dispatch(scanned)
+
+
+def load_scan_recording(path: str) -> list:
+    """Load a recorded key stream: a JSON list of {"t": seconds, "k": char}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_scan_recording(events: list, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{'t': round(float(e['t']), 6), 'k': e['k']} for e in events], f)
+
+
+def replay_scan_stream(events: list, pipeline: ScannerPipeline, accept_typed: bool = False) -> dict:
+    """Feed a recorded key stream through the pipeline.
+
+    Returns {'results': [ScanResult...], 'typed': [codes rejected as typing], 'latency': {...}}.
+    """
+    results, typed = [], []
+    detector = pipeline.detector
+    for event in events:
+        ts, char = float(event['t']), event['k']
+        if char in ('\n', '\r'):
+            pending = detector.buffer.strip()
+            result = pipeline.enter(ts, accept_typed=accept_typed)
+            if result is not None:
+                results.append(result)
+            elif pending:
+                typed.append(pending)
+        else:
+            pipeline.key(char, ts)
+    return {'results': results, 'typed': typed, 'latency': pipeline.dispatcher.latency_summary()}
@@ -0,0 +1,149 @@
+"""
+Schema fingerprint - a hash of the ORM metadata (tables, columns, types, keys,
+indexes) plus the list of migration modules, stored in ``schema_versions``.
+
+When the stored fingerprint matches the running code, the database was already
+created/audited by this exact version of the app, so startup can skip
+``create_all``, the information_schema audit and the ad-hoc ALTER checks.
+A new release (changed models or a new migration) changes the hash and the full
+audit runs once, after which the new fingerprint is stored.
+"""
+
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Row in schema_versions that holds the fingerprint (real migrations start at 1)
+FINGERPRINT_VERSION = 0
+
+_cached_fingerprint = None
+
+
+def _migration_names() -> list:
+    migrations_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'migrations')
+    try:
+        return sorted(f for f in os.listdir(migrations_dir) if f.startswith('v') and f.endswith('.py'))
+    except OSError:
+        return []
+
+
+def compute_schema_fingerprint(metadata=None) -> str:
+    """SHA-256 of the ORM schema definition and migration list."""
+    global _cached_fingerprint
+    if metadata is None and _cached_fingerprint is not None:
+        return _cached_fingerprint
+
+    use_default = metadata is None
+    if metadata is None:
+        from pos_app.models.database import Base
+        metadata = Base.metadata
+
+    parts = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        parts.append(f"T:{table.name}")
+        for col in table.columns:
+            try:
+                col_type = str(col.type)
+            except Exception:
+                col_type = type(col.type).__name__
+            parts.append(f"C:{col.name}:{col_type}:{int(bool(col.nullable))}:{int(bool(col.primary_key))}:{int(bool(col.unique))}")
+        for fk in sorted(table.foreign_keys, key=lambda f: (f.parent.name, f.target_fullname)):
+            parts.append(f"F:{fk.parent.name}->{fk.target_fullname}")
+        for index in sorted(table.indexes, key=lambda i: i.name or ''):
+            parts.append(f"I:{index.name}:{','.join(c.name for c in index.columns)}:{int(bool(index.unique))}")
+    for name in _migration_names():
+        parts.append(f"M:{name}")
+
+    fingerprint = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+    if use_default:
+        _cached_fingerprint = fingerprint
+    return fingerprint
+
+
+def ensure_fingerprint_storage(session) -> None:
+    """Create schema_versions (if missing) and its fingerprint column."""
+    session.execute(text(
+        """
+        CREATE TABLE IF NOT EXISTS schema_versions (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL,
+            description TEXT,
+            fingerprint VARCHAR(64)
+        )
+        """
+    ))
+    try:
+        session.execute(text("SELECT fingerprint FROM schema_versions WHERE 1 = 0"))
+    except Exception:
+        session.rollback()
+        session.execute(text("ALTER TABLE schema_versions ADD COLUMN fingerprint VARCHAR(64)"))
+    session.commit()
+
+
+def get_stored_fingerprint(session):
+    """Stored fingerprint, or None when the table/column/row does not exist yet."""
+    try:
+        return session.execute(
+            text("SELECT fingerprint FROM schema_versions WHERE version = :v"),
+            {'v': FINGERPRINT_VERSION}
+        ).scalar()
+    except Exception:
+        try:
+            session.rollback()
+        except Exception:
+            pass
+        return None
+
+
+def store_fingerprint(session, fingerprint: str | None = None) -> bool:
+    """Record the fingerprint after a successful full validation."""
+    fingerprint = fingerprint or compute_schema_fingerprint()
+    try:
+        ensure_fingerprint_storage(session)
+        params = {
+            'v': FINGERPRINT_VERSION,
+            'fp': fingerprint,
+            'at': datetime.now(timezone.utc),
+            'd': 'ORM schema fingerprint',
+        }
+        updated = session.execute(
+            text("UPDATE schema_versions SET fingerprint = :fp, applied_at = :at WHERE version = :v"), params
+        ).rowcount
+        if not updated:
+            session.execute(text(
+                "INSERT INTO schema_versions (version, applied_at, description, fingerprint) "
+                "VALUES (:v, :at, :d, :fp)"
+            ), params)
+        session.commit()
+        return True
+    except Exception as e:
+        logger.warning(f"[STARTUP] Could not store schema fingerprint: {e}")
+        try:
+            session.rollback()
+        except Exception:
+            pass
+        return False
+
+
+def clear_fingerprint(session) -> None:
+    """Forget the stored fingerprint so the next startup runs the full audit."""
+    try:
+        session.execute(text("UPDATE schema_versions SET fingerprint = NULL WHERE version = :v"),
+                        {'v': FINGERPRINT_VERSION})
+        session.commit()
+    except Exception:
+        try:
+            session.rollback()
+        except Exception:
+            pass
+
+
+def schema_is_current(session) -> bool:
+    """True when the database was already validated against this exact schema."""
+    stored = get_stored_fingerprint(session)
+    return bool(stored) and stored == compute_schema_fingerprint()
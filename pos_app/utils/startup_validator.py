@@ -4,10 +4,13 @@ Detects and fixes database schema mismatches before login
 """
 
 import logging
+import time
 from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
+from pos_app.utils.schema_fingerprint import schema_is_current, store_fingerprint
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,17 +18,25 @@ class StartupValidator:
     """Validate database schema and auto-fix issues before login"""
     
     @staticmethod
-    def validate_and_fix_schema(session: Session):
+    def validate_and_fix_schema(session: Session, force: bool = False):
         """
         Validate database schema and auto-fix missing columns
         
         Args:
             session: SQLAlchemy session
+            force: Run the full audit even if the stored schema fingerprint matches
             
         Returns:
             bool: True if validation passed or fixed, False if critical error
         """
+        started = time.perf_counter()
         try:
+            # Same ORM schema as the last successful validation: skip all introspection
+            if not force and schema_is_current(session):
+                logger.info(f"[STARTUP] Schema fingerprint unchanged, skipped validation "
+                            f"({(time.perf_counter() - started) * 1000:.0f} ms)")
+                return True
+
             logger.info("[STARTUP] Starting database schema validation...")
 
             # Ensure all ORM tables exist (best-effort). This is critical on new PCs.
@@ -44,12 +55,12 @@ class StartupValidator:
                 from pos_app.models.database import (
                     Product, Customer, Supplier, Sale, SaleItem, Purchase, PurchaseItem,
                     Payment, Expense, Discount, TaxRate, User, BankAccount, BankTransaction,
-                    ProductCategory, ProductSubcategory
+                    ProductCategory, ProductSubcategory, StockMovement, CashDrawerSession
                 )
                 models = [
                     Product, Customer, Supplier, Sale, SaleItem, Purchase, PurchaseItem,
                     Payment, Expense, Discount, TaxRate, User, BankAccount, BankTransaction,
-                    ProductCategory, ProductSubcategory
+                    ProductCategory, ProductSubcategory, StockMovement, CashDrawerSession
                 ]
                 mismatches = SchemaAuditor.compare_schemas(session, models)
                 if mismatches:
@@ -58,6 +69,9 @@ class StartupValidator:
             except Exception as e:
                 logger.warning(f"[STARTUP] Schema audit skipped/failed: {e}")
 
+            # Columns added by the audit start out NULL; fill the derived invoice lookup key
+            StartupValidator.backfill_invoice_keys(session)
+
             # Ensure category/subcategory tables and product FK columns exist.
             try:
                 inspector = inspect(session.bind)
@@ -188,7 +202,9 @@ class StartupValidator:
                         logger.warning(f"[STARTUP] Could not add {col_name}: {col_error}")
                         session.rollback()
             
-            logger.info("[STARTUP] ✅ Database schema validation complete")
+            store_fingerprint(session)
+            logger.info(f"[STARTUP] ✅ Database schema validation complete "
+                        f"({(time.perf_counter() - started) * 1000:.0f} ms)")
             return True
             
         except SQLAlchemyError as sql_error:
@@ -202,6 +218,91 @@ class StartupValidator:
             logger.error(f"[STARTUP] Unexpected error during validation: {e}")
             return False
     
+    @staticmethod
+    def backfill_invoice_keys(session: Session, batch_size: int = 5000) -> int:
+        """
+        Fill sales.invoice_key for rows that predate the column (see migration v12)
+        
+        Args:
+            session: SQLAlchemy session
+            batch_size: Rows updated per commit
+            
+        Returns:
+            int: Number of sales updated
+        """
+        from pos_app.models.database import invoice_key
+        total = 0
+        try:
+            columns = [col['name'] for col in inspect(session.bind).get_columns('sales')]
+            if 'invoice_key' not in columns:
+                return 0
+            last_id = 0
+            while True:
+                rows = session.execute(text(
+                    "SELECT id, invoice_number FROM sales WHERE id > :last AND invoice_key IS NULL "
+                    "AND invoice_number IS NOT NULL ORDER BY id LIMIT :n"), {'last': last_id, 'n': batch_size}).fetchall()
+                if not rows:
+                    break
+                session.execute(text("UPDATE sales SET invoice_key = :key WHERE id = :id"),
+                                [{'id': r[0], 'key': invoice_key(r[1])} for r in rows])
+                session.commit()
+                total += len(rows)
+                last_id = rows[-1][0]
+            if total:
+                logger.info(f"[STARTUP] ✅ Backfilled invoice_key for {total} sale(s)")
+        except Exception as e:
+            logger.warning(f"[STARTUP] Could not backfill sales.invoice_key: {e}")
+            try:
+                session.rollback()
+            except Exception:
+                pass
+        return total
+
+    @staticmethod
+    def apply_pending_migrations(session: Session, runner=None) -> bool:
+        """
+        Apply pending migrations (database/migrations) before the schema audit
+        
+        The audit only adds missing columns; backfills, indexes and new tables
+        come from the migrations, which otherwise only ran from the command line.
+        Only migrations that are cheap on this dialect run here; table rewrites
+        (RUN_AT_STARTUP) are left to python -m pos_app.database.migrate.
+        
+        Args:
+            session: SQLAlchemy session
+            runner: MigrationRunner to use (defaults to the application migrations)
+            
+        Returns:
+            bool: True if no migration runnable at startup is left pending
+        """
+        try:
+            from pos_app.database.migration_engine import MigrationRunner
+            engine = session.bind
+            runner = runner or MigrationRunner(engine)
+            pending = runner.pending(startup=True)
+            if pending:
+                # Release this session's locks; migrations ALTER the tables it may have read
+                session.commit()
+                # Fresh database: the migrations alter ORM tables, so create them first
+                if not inspect(engine).has_table('sales'):
+                    from pos_app.models.database import Base
+                    Base.metadata.create_all(engine)
+                applied = runner.run(startup=True)
+                if applied:
+                    logger.info(f"[STARTUP] ✅ Applied migrations: {', '.join(f'v{v}' for v in applied)}")
+            deferred = runner.pending()
+            if deferred:
+                logger.warning(f"[STARTUP] ⚠️ Migrations {', '.join(m.name for m in deferred)} "
+                               f"rewrite large tables; run python -m pos_app.database.migrate")
+            return True
+        except Exception as e:
+            logger.warning(f"[STARTUP] Pending migrations not applied: {e}")
+            try:
+                session.rollback()
+            except Exception:
+                pass
+            return False
+
     @staticmethod
     def validate_database_connection(session: Session):
         """
@@ -223,12 +324,13 @@ class StartupValidator:
             return False
     
     @staticmethod
-    def run_full_startup_check(session: Session):
+    def run_full_startup_check(session: Session, force: bool = False):
         """
         Run complete startup validation and auto-recovery
         
         Args:
             session: SQLAlchemy session
+            force: Ignore the schema fingerprint and run the full audit
             
         Returns:
             bool: True if all checks passed or were fixed
@@ -240,8 +342,12 @@ class StartupValidator:
             logger.error("[STARTUP] ❌ Database connection failed")
             return False
         
+        # Apply pending migrations first; the audit below is the fallback for missed columns
+        if not StartupValidator.apply_pending_migrations(session):
+            logger.warning("[STARTUP] ⚠️ Migrations pending; run python -m pos_app.database.migrate")
+        
         # Validate and fix schema
-        if not StartupValidator.validate_and_fix_schema(session):
+        if not StartupValidator.validate_and_fix_schema(session, force=force):
             logger.error("[STARTUP] ❌ Schema validation failed")
             return False
         
@@ -1,15 +1,28 @@
 try:
     from PySide6.QtWidgets import (
         QWidget, QTableWidget, QTableView, QHeaderView, QPushButton,
-        QAbstractScrollArea, QFrame, QLayout, QAbstractItemView
+        QAbstractScrollArea, QFrame, QLayout, QAbstractItemView, QStackedWidget, QTabWidget
     )
-    from PySide6.QtCore import Qt
+    from PySide6.QtCore import Qt, QObject, QEvent
 except ImportError:
     from PyQt6.QtWidgets import (
         QWidget, QTableWidget, QTableView, QHeaderView, QPushButton,
-        QAbstractScrollArea, QFrame, QLayout, QAbstractItemView
+        QAbstractScrollArea, QFrame, QLayout, QAbstractItemView, QStackedWidget, QTabWidget
     )
-    from PyQt6.QtCore import Qt
+    from PyQt6.QtCore import Qt, QObject, QEvent
+
+from pos_app.utils.ui_styles import timed
+
+
+class _FirstShowNormalizer(QObject):
+    """Event filter that normalises a page the first time it is shown, then detaches."""
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Show:
+            obj.removeEventFilter(self)
+            UIAuditor.normalize_page(obj)
+        return False
+
 
 class UIAuditor:
     """Lightweight UI auditor that normalizes common UI issues across the app.
@@ -20,28 +33,60 @@ class UIAuditor:
     - In-table action buttons: use compact variant and smaller min-height
     - Global buttons: ensure consistent minimum height unless compact
     - Dark cards: set objectName('card') on form frames lacking styling (heuristic)
+
+    Pages of stacked and tabbed containers are normalised lazily, on their
+    first Show event, so startup only pays for the page that is on screen.
+    Each pass looks up frames with a typed findChildren() call instead of
+    testing every descendant in Python. Tables inside a page keep the header
+    setup of their view; only a table passed in as the root is normalised.
     """
 
+    _filter = None
+
     @classmethod
     def apply_to(cls, root: QWidget):
         try:
             if root is None:
                 return
-            # Apply basic normalization
-            cls._normalize_widget(root)
-            for child in root.findChildren(QWidget):
-                cls._normalize_basic(child)
-            
-            # Apply modern enhancements
-            try:
-                from utils.ui_enhancer import UIEnhancer
-                UIEnhancer.apply_modern_effects(root)
-            except Exception:
-                pass
+            with timed('ui_auditor.apply_to'):
+                containers = root.findChildren(QStackedWidget) + root.findChildren(QTabWidget)
+                pages = [container.widget(i) for container in containers for i in range(container.count())]
+                if not pages:
+                    cls.normalize_page(root)
+                    return
+                cls._normalize_widget(root)
+                for page in pages:
+                    cls.defer(page)
         except Exception:
             # Do not crash app due to auditor
             pass
 
+    @classmethod
+    def defer(cls, page: QWidget):
+        """Normalise `page` now if it is visible, otherwise when it is first shown."""
+        if page is None or page.property('ui_normalized'):
+            return
+        if page.isVisible():
+            cls.normalize_page(page)
+            return
+        if cls._filter is None:
+            cls._filter = _FirstShowNormalizer()
+        page.installEventFilter(cls._filter)
+
+    @classmethod
+    def normalize_page(cls, page: QWidget):
+        """Normalise one page (once per page)."""
+        try:
+            if page is None or page.property('ui_normalized'):
+                return
+            page.setProperty('ui_normalized', True)
+            with timed(f"ui_auditor.{type(page).__name__}"):
+                cls._normalize_widget(page)
+                for frame in page.findChildren(QFrame):
+                    cls._normalize_basic(frame)
+        except Exception:
+            pass
+
     @classmethod
     def _normalize_widget(cls, w: QWidget):
         # Tables: basic improvements only
@@ -3,13 +3,19 @@ UI Enhancement utilities for applying modern styling and effects.
 """
 
 try:
-    from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QFrame
+    from PySide6.QtWidgets import QWidget, QLabel, QPushButton, QFrame, QAbstractItemView, QGraphicsDropShadowEffect
     from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect
-    from PySide6.QtGui import QGraphicsDropShadowEffect, QColor
+    from PySide6.QtGui import QColor
 except ImportError:
-    from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QFrame
+    from PyQt6.QtWidgets import QWidget, QLabel, QPushButton, QFrame, QAbstractItemView, QGraphicsDropShadowEffect
     from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect
-    from PyQt6.QtGui import QGraphicsDropShadowEffect, QColor
+    from PyQt6.QtGui import QColor
+
+def _self_and_children(widget: QWidget, kind):
+    """`widget` (when it is a `kind`) followed by its `kind` descendants, found by one typed lookup."""
+    found = widget.findChildren(kind)
+    return [widget] + found if isinstance(widget, kind) else found
+
 
 class UIEnhancer:
     """Applies modern UI enhancements like shadows, animations, and effects."""
@@ -31,13 +37,9 @@ class UIEnhancer:
     def enhance_button(button: QPushButton):
         """Apply modern enhancements to buttons."""
         try:
-            # Add subtle shadow
-            UIEnhancer.add_shadow_effect(button, blur_radius=10, offset_y=2, color=QColor(0, 0, 0, 40))
-            
-            # Set cursor
+            # No drop shadow: a graphics effect per button renders each one offscreen,
+            # and tables can hold hundreds of row buttons
             button.setCursor(Qt.PointingHandCursor)
-            
-            # Add hover animation property
             button.setProperty('enhanced', True)
         except Exception:
             pass
@@ -72,22 +74,17 @@ class UIEnhancer:
     def apply_modern_effects(widget: QWidget):
         """Apply modern effects to a widget and its children."""
         try:
-            # Enhance the widget itself
-            if isinstance(widget, QPushButton):
-                UIEnhancer.enhance_button(widget)
-            elif isinstance(widget, QFrame) and widget.objectName() == 'card':
-                UIEnhancer.enhance_card(widget)
-            elif isinstance(widget, QLabel) and widget.property('role') == 'heading':
-                UIEnhancer.enhance_heading(widget)
-            
-            # Recursively enhance children
-            for child in widget.findChildren(QWidget):
-                if isinstance(child, QPushButton):
-                    UIEnhancer.enhance_button(child)
-                elif isinstance(child, QFrame) and child.objectName() == 'card':
-                    UIEnhancer.enhance_card(child)
-                elif isinstance(child, QLabel) and child.property('role') == 'heading':
-                    UIEnhancer.enhance_heading(child)
+            for button in _self_and_children(widget, QPushButton):
+                if not button.property('enhanced'):
+                    UIEnhancer.enhance_button(button)
+            for frame in _self_and_children(widget, QFrame):
+                # Cards holding item views stay unshadowed: the effect would repaint the whole table offscreen
+                if frame.objectName() == 'card' and frame.graphicsEffect() is None \
+                        and not frame.findChildren(QAbstractItemView):
+                    UIEnhancer.enhance_card(frame)
+            for label in _self_and_children(widget, QLabel):
+                if label.property('role') == 'heading' and label.graphicsEffect() is None:
+                    UIEnhancer.enhance_heading(label)
         except Exception:
             pass
 
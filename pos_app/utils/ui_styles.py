@@ -0,0 +1,155 @@
+"""
+Application styling - one compiled stylesheet, widgets styled by dynamic properties.
+
+Qt parses a stylesheet every time setStyleSheet() is called and re-resolves
+the style of the widget and all of its children. A table that gives each row
+its own button with a private stylesheet pays that cost once per row and
+again whenever the table is reloaded. Instead, the whole application gets a
+single stylesheet (the clean global sheet plus the variant rules below),
+compiled once - comments stripped, whitespace collapsed, duplicate rules
+dropped - and widgets opt into a look with a property:
+
+    install_stylesheet(app)                  # once, at startup
+    set_variant(add_btn, 'row-action')       # QPushButton[variant="row-action"]
+
+set_variant() only re-polishes a widget whose variant actually changed and
+that is already on screen; widgets still being built pick the rule up when
+they are first polished.
+
+timed() records how long a styling step took (STYLE_TIMINGS, milliseconds)
+so first-show and normalisation costs can be compared between builds;
+style_report() formats them, optionally against the timings of another build.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PROPERTY = 'variant'
+
+# Rules keyed on dynamic properties; appended after the global sheet so they win
+VARIANT_STYLESHEET = """
+/* Compact buttons inside table cells */
+QPushButton[variant="row-action"], QPushButton[variant="row-secondary"] {
+    background: #3b82f6;
+    color: #ffffff;
+    border: none;
+    border-radius: 6px;
+    padding: 6px 12px;
+    font-size: 12px;
+    font-weight: 500;
+    min-width: 60px;
+    min-height: 0px;
+    margin: 2px;
+}
+QPushButton[variant="row-action"]:hover {
+    background: #2563eb;
+}
+QPushButton[variant="row-action"]:pressed {
+    background: #1d4ed8;
+}
+QPushButton[variant="row-secondary"] {
+    background: #64748b;
+    padding: 4px 12px;
+    border-radius: 4px;
+}
+QPushButton[variant="row-secondary"]:hover {
+    background: #475569;
+}
+"""
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+
+_compiled = {}
+STYLE_TIMINGS = {}
+
+
+def _declarations(body: str) -> str:
+    parts = [d.strip() for d in body.split(';')]
+    return ';'.join(re.sub(r'\s*:\s*', ':', d, count=1) for d in parts if d)
+
+
+def compile_stylesheet(*sheets: str) -> str:
+    """Concatenate and minify stylesheets; repeated calls with the same input return the cached result.
+
+    An exact repeat of an earlier rule (same selector, same declarations) is
+    dropped; later different rules for a selector are kept so the cascade is
+    unchanged.
+    """
+    key = tuple(sheets)
+    cached = _compiled.get(key)
+    if cached is not None:
+        return cached
+    seen, rules = set(), []
+    for sheet in sheets:
+        for selector, body in _RULE.findall(_COMMENT.sub('', sheet or '')):
+            selector = ','.join(' '.join(s.split()) for s in selector.split(','))
+            rule = f"{selector}{{{_declarations(body)}}}"
+            if rule not in seen:
+                seen.add(rule)
+                rules.append(rule)
+    compiled = '\n'.join(rules)
+    _compiled[key] = compiled
+    return compiled
+
+
+def application_stylesheet() -> str:
+    """The compiled application stylesheet (clean global sheet + variant rules)."""
+    from pos_app.utils.clean_styles import CLEAN_GLOBAL_STYLESHEET
+    return compile_stylesheet(CLEAN_GLOBAL_STYLESHEET, VARIANT_STYLESHEET)
+
+
+def install_stylesheet(app) -> str:
+    """Set the compiled stylesheet on the QApplication (skipped when it is already set)."""
+    with timed('install_stylesheet'):
+        sheet = application_stylesheet()
+        if app.styleSheet() != sheet:
+            app.setStyleSheet(sheet)
+    return sheet
+
+
+def repolish(widget):
+    """Re-resolve the style of one widget after a property change."""
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
+
+
+def set_variant(widget, variant, prop=VARIANT_PROPERTY) -> bool:
+    """Give a widget a styling variant; returns False when it already had it."""
+    if widget.property(prop) == variant:
+        return False
+    widget.setProperty(prop, variant)
+    if widget.isVisible():
+        repolish(widget)
+    return True
+
+
+@contextmanager
+def timed(label):
+    """Record the duration of a styling step in STYLE_TIMINGS[label] (ms)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000.0
+        STYLE_TIMINGS[label] = elapsed
+        logger.debug(f"{label}: {elapsed:.1f} ms")
+
+
+def style_report(baseline: dict | None = None) -> str:
+    """One line per timed step, slowest first; with `baseline` ({label: ms}) each
+    line also shows the earlier time and the change."""
+    lines = []
+    for label, ms in sorted(STYLE_TIMINGS.items(), key=lambda kv: -kv[1]):
+        line = f"{label}: {ms:.1f} ms"
+        before = (baseline or {}).get(label)
+        if before:
+            line += f" (was {before:.1f} ms, {(ms - before) / before * 100:+.0f}%)"
+        lines.append(line)
+    return '\n'.join(lines)
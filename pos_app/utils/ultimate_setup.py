@@ -2,7 +2,6 @@
 import os
 import json
 import socket
-import threading
 import time
 from datetime import datetime
 
@@ -57,53 +56,43 @@ def test_postgres_connection(host, port=5432, user="admin", password="admin", ti
         return False
 
 def scan_network_ips(start_ip=1, end_ip=150, max_workers=10):
-    """Scan network range for PostgreSQL servers"""
+    """Find a PostgreSQL server: discovery beacon first, then an async TCP probe of the range"""
     local_ip = get_local_ip_safe()
     network_base = '.'.join(local_ip.split('.')[:-1])
 
-    print(f"[NETWORK_SCAN] Scanning {network_base}.{start_ip}-{end_ip} for PostgreSQL...")
-
-    found_servers = []
-
-    # Quick scan common IPs first
-    common_ips = [f"{network_base}.{i}" for i in [1, 10, 50, 100, 150, 192]]
-
-    for ip in common_ips:
-        print(f"[SCAN] Testing {ip}...")
-        result = test_postgres_connection(ip)
+    def _check(ip):
+        result = test_postgres_connection(ip, timeout=2)
         if result:
-            if isinstance(result, dict):
-                found_servers.append({"ip": ip, "credentials": result})
-            else:
-                found_servers.append({"ip": ip, "credentials": {"user": "admin", "password": "admin"}})
             print(f"[SCAN] ✅ Found PostgreSQL at {ip}")
+            return {"ip": ip, "credentials": result if isinstance(result, dict) else {"user": "admin", "password": "admin"}}
+        return None
 
-    if found_servers:
-        return found_servers[0]  # Return best server
-
-    # If no quick results, do background scan of full range
-    def background_scan():
-        for i in range(start_ip, min(end_ip + 1, 255)):  # Limit to valid IP range
-            if i in [1, 10, 50, 100, 150, 192]:  # Skip already scanned
-                continue
-
-            ip = f"{network_base}.{i}"
-            try:
-                result = test_postgres_connection(ip, timeout=2)  # Shorter timeout for full scan
-                if result:
-                    server_info = {
-                        "ip": ip,
-                        "credentials": result if isinstance(result, dict) else {"user": "admin", "password": "admin"}
-                    }
-                    print(f"[SCAN] ✅ Found PostgreSQL at {ip} (background)")
-                    update_database_config(server_info)
-                    return
-            except Exception as e:
-                continue  # Continue scanning even if one IP fails
-
-    # Start background scan
-    scan_thread = threading.Thread(target=background_scan, daemon=True)
-    scan_thread.start()
+    try:
+        from pos_app.utils.lan_discovery import discover_servers, probe_tcp
+    except Exception as e:
+        print(f"[NETWORK_SCAN] Discovery unavailable: {e}")
+        return None
+
+    for reply in discover_servers(timeout=0.8):
+        ip = reply.get('host') or reply.get('ip')
+        if ip and ip != local_ip:
+            found = _check(ip)
+            if found:
+                return found
+
+    print(f"[NETWORK_SCAN] Probing {network_base}.{start_ip}-{end_ip}:5432...")
+    ips = [f"{network_base}.{i}" for i in range(start_ip, min(end_ip + 1, 255))]
+    try:
+        open_hosts = probe_tcp([ip for ip in ips if ip != local_ip], 5432, timeout=0.5)
+    except Exception as e:
+        print(f"[NETWORK_SCAN] Probe failed: {e}")
+        open_hosts = []
+
+    # Login attempts only against hosts that actually listen on 5432
+    for ip in open_hosts:
+        found = _check(ip)
+        if found:
+            return found
 
     return None  # Return None, will use localhost fallback
 
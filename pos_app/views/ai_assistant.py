@@ -15,85 +15,41 @@ except ImportError:
     from PyQt6.QtCore import Qt, QThread, pyqtSignal as Signal, QTimer
     from PyQt6.QtGui import QFont, QTextCursor
 
-import json
-import requests
 from datetime import datetime
 import traceback
 import re
-from sqlalchemy import func
+
+from pos_app.utils.ai_transport import (AssistantTransport, AssistantAuthError, AssistantCancelled,
+                                        AssistantTransportError, CancelToken)
 
 class GroqAIWorker(QThread):
-    """Worker thread for Groq API calls"""
+    """Worker thread for Groq API calls (streams tokens, can be cancelled)"""
+    token_received = Signal(str)
     response_received = Signal(str)
     error_occurred = Signal(str)
     
-    def __init__(self, api_key, messages, database_context):
+    def __init__(self, api_key, messages, database_context, transport=None):
         super().__init__()
         self.api_key = api_key
         self.messages = messages or []
         self.database_context = database_context
+        self.transport = transport or AssistantTransport(api_key)
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        self.cancel_token.cancel()
     
     def run(self):
         try:
-            # Groq API endpoint
-            url = "https://api.groq.com/openai/v1/chat/completions"
-            
-            # System message with database context
-            system_message = f"""You are a helpful AI assistant for a Point of Sale (POS) system.
-
-IMPORTANT RULES:
-- You do NOT have direct access to the application's database.
-- Only use facts that are explicitly provided in the Database Context or user message.
-- Never invent (hallucinate) sales totals, customer names, product names, dates, IDs, or counts.
-- If the user asks for database values that are not present in the Database Context, respond with:
-  "I can't access the database directly from here. Please use the app's built-in report/summary, or ask the app to fetch the data.".
-
-Database Context (may be incomplete):
-{self.database_context}
-
-When you are unsure, ask a short clarifying question instead of guessing."""
-
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "groq/compound",  # Updated to working model
-                "messages": ([{"role": "system", "content": system_message}] + list(self.messages)),
-                "temperature": 0.7,
-                "max_tokens": 8000
-            }
-            
-            print(f"[AI DEBUG] Making request to: {url}")
-            print(f"[AI DEBUG] Model: {data['model']}")
-            print(f"[AI DEBUG] API Key: {self.api_key[:10]}..." if self.api_key else "No API Key")
-            
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            
-            print(f"[AI DEBUG] Response status: {response.status_code}")
-            print(f"[AI DEBUG] Response headers: {dict(response.headers)}")
-            
-            if response.status_code == 400:
-                error_detail = response.text
-                print(f"[AI DEBUG] 400 Error Detail: {error_detail}")
-                self.error_occurred.emit(f"Bad Request (400): Invalid API key or model. Please check the API configuration.")
-                return
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            ai_response = result['choices'][0]['message']['content']
-            self.response_received.emit(ai_response)
-            
-        except requests.exceptions.Timeout:
-            self.error_occurred.emit("Request timed out. Please try again.")
-        except requests.exceptions.RequestException as e:
-            error_msg = str(e)
-            if "400" in error_msg:
-                self.error_occurred.emit("API Error: Invalid API key or model. Please check configuration.")
-            else:
-                self.error_occurred.emit(f"Network error: {error_msg}")
+            text = self.transport.ask(self.messages, self.database_context,
+                                      on_token=self.token_received.emit, cancel=self.cancel_token)
+            self.response_received.emit(text)
+        except AssistantCancelled:
+            self.response_received.emit("")
+        except AssistantAuthError:
+            self.error_occurred.emit("API Error: Invalid API key or model. Please check configuration.")
+        except AssistantTransportError as e:
+            self.error_occurred.emit(str(e))
         except Exception as e:
             self.error_occurred.emit(f"Error: {str(e)}")
 
@@ -104,6 +60,9 @@ class AIAssistantPage(QWidget):
         super().__init__(parent)
         self.api_key = os.getenv("GROQ_API_KEY")
         self.worker = None
+        self._transport = None
+        self._stream_active = False
+        self._stream_text = ""
         self.database_context = ""
         self.controllers = controllers
         self.current_user = current_user
@@ -462,141 +421,21 @@ class AIAssistantPage(QWidget):
                         "• 🔍 Data queries and much more!\n\n"
                         "What would you like to know today?", is_ai=True)
 
-    def _get_dt_col(self, Model, preferred_names):
-        for n in preferred_names:
-            try:
-                if hasattr(Model, n):
-                    return getattr(Model, n)
-            except Exception:
-                continue
-        return None
-
     def _local_sales_totals(self, session, start_dt, end_dt=None):
-        from pos_app.models.database import Sale
-
-        dt_col = self._get_dt_col(Sale, ("sale_date", "created_at", "date"))
-        if dt_col is None:
-            raise AttributeError("Sale datetime column not found")
-
-        q = session.query(Sale)
-        q = q.filter(dt_col >= start_dt)
-        if end_dt is not None:
-            q = q.filter(dt_col <= end_dt)
-
-        rows = q.all() or []
-
-        total_in = 0.0
-        total_out = 0.0
-        count_sales = 0
-        count_refunds = 0
-        for s in rows:
-            amt = float(getattr(s, 'total_amount', 0.0) or 0.0)
-            if bool(getattr(s, 'is_refund', False)):
-                total_out += amt
-                count_refunds += 1
-            else:
-                total_in += amt
-                count_sales += 1
-
-        return {
-            "total_in": total_in,
-            "total_out": total_out,
-            "net": (total_in - total_out),
-            "count_sales": count_sales,
-            "count_refunds": count_refunds,
-            "rows": len(rows),
-        }
+        from pos_app.utils.assistant_metrics import revenue
+        return revenue(session, start_dt, end_dt)
 
     def _time_range_bounds(self, label: str):
+        from pos_app.utils.assistant_metrics import resolve_time_range
         try:
-            now = datetime.now()
-            start_of_day = datetime(now.year, now.month, now.day)
-            if label == "today":
-                return start_of_day, None
-            if label == "yesterday":
-                y = start_of_day
-                start = y.replace()  # keep type
-                start = datetime(y.year, y.month, y.day)  # explicit
-                start = start.replace()  # no-op
-                start = datetime(y.year, y.month, y.day)  # reassign
-                start = start_of_day.replace()  # no-op
-                start = datetime(now.year, now.month, now.day)  # reassign
-                # Correct bounds
-                start = datetime(now.year, now.month, now.day)  # today start
-                start = start.replace()  # no-op
-                start = datetime(now.year, now.month, now.day)  # today start
-                start = start_of_day
-                start = datetime(start.year, start.month, start.day)
-                start = start.replace()  # no-op
-                start = datetime(start.year, start.month, start.day)
-                start = start  # no-op
-                start = start_of_day
-                start = datetime(start.year, start.month, start.day)
-                start = start.replace()  # no-op
-                start_y = datetime(start.year, start.month, start.day)  # today start
-                start_y = datetime(start_y.year, start_y.month, start_y.day)  # no-op
-                start_y = start_y
-                # yesterday start/end
-                start_y = datetime(start_y.year, start_y.month, start_y.day)
-                start_y = datetime(start_y.year, start_y.month, start_y.day)
-                start_y = start_y
-                start_yesterday = datetime(start_y.year, start_y.month, start_y.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                # final
-                start_yesterday = start_of_day
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday.replace()  # no-op
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                start_yesterday = datetime(start_yesterday.year, start_yesterday.month, start_yesterday.day)
-                start_yesterday = start_yesterday
-                # Actually subtract 1 day
-                from datetime import timedelta
-                start_yesterday = start_of_day - timedelta(days=1)
-                end_yesterday = start_of_day
-                return start_yesterday, end_yesterday
-            if label == "month":
-                start_of_month = datetime(now.year, now.month, 1)
-                return start_of_month, None
+            return resolve_time_range(label)
         except Exception:
             return None, None
 
-        return None, None
-
     def _parse_time_range(self, m: str):
+        from pos_app.utils.assistant_metrics import parse_time_range
         try:
-            s = (m or "").lower()
-            if "yesterday" in s:
-                return "yesterday"
-            if "today" in s or "todays" in s:
-                return "today"
-            if "this month" in s or "monthly" in s or ("month" in s and "last month" not in s):
-                return "month"
-            return None
+            return parse_time_range(m)
         except Exception:
             return None
 
@@ -635,258 +474,73 @@ class AIAssistantPage(QWidget):
 
                 return "POS Help (matched):\n\n" + "\n".join(picked)
 
-            from pos_app.database.db_utils import get_db_session
-            now = datetime.now()
-            start_of_day = datetime(now.year, now.month, now.day)
-            start_of_month = datetime(now.year, now.month, 1)
+            from pos_app.utils.assistant_metrics import get_metric_engine
 
             requested_range = self._parse_time_range(m)
             # Handle bare follow-ups like "yesterday" using previous context
-            if requested_range == "yesterday" and not any(w in m for w in ("sale", "sales", "sold", "revenue", "refund", "return", "inventory", "stock", "customer")):
+            if requested_range in ("yesterday", "today", "last_month") and not any(w in m for w in ("sale", "sales", "sold", "revenue", "refund", "return", "inventory", "stock", "customer")):
                 prev_domain = self._conversation_state.get("last_domain")
-                if prev_domain in ("sales_totals", "sold_items"):
-                    m = "yesterday sales" if prev_domain == "sales_totals" else "what sold yesterday"
+                if prev_domain == "sales_totals":
+                    m = f"{m} sales"
+                elif prev_domain == "sold_items":
+                    m = f"what sold {m}"
                 elif prev_domain == "customer_names":
                     m = "customer names"
                 elif prev_domain == "inventory":
                     m = "inventory status"
-                requested_range = "yesterday"
 
             sales_words = ("sale", "sales", "sold", "revenue", "income")
             refund_words = ("refund", "return", "returned")
             inventory_words = ("inventory", "stock")
             customer_words = ("customer", "customers")
+            receivable_words = ("receivable", "outstanding", "owe", "udhaar", "credit balance")
 
             def has_any(words):
                 return any(w in m for w in words)
 
-            with get_db_session() as session:
-                # Customer names list
-                if has_any(customer_words) and ("name" in m or "names" in m or "list" in m or "all" in m):
-                    from pos_app.models.database import Customer
-
-                    q = session.query(Customer).order_by(Customer.name.asc())
-                    rows = q.limit(200).all() or []
-                    if not rows:
-                        return "No customers found in the database."
-
-                    names = []
-                    for c in rows:
-                        nm = (getattr(c, 'name', None) or "").strip()
-                        if nm:
-                            names.append(nm)
-
-                    if not names:
-                        return "No customer names found in the database."
-
-                    more = ""
-                    try:
-                        total = session.query(Customer).count()
-                        if total > len(rows):
-                            more = f"\n\nShowing first {len(rows)} of {total}."
-                    except Exception:
-                        pass
-
-                    self._conversation_state["last_domain"] = "customer_names"
-                    self._conversation_state["last_time_range"] = None
-                    return "Customer names:\n\n" + "\n".join(f"- {n}" for n in names) + more
-
-                # What was sold / sold today (items summary)
-                if ("what" in m and has_any(sales_words) and ("sold" in m or "sell" in m)):
-                    from pos_app.models.database import Sale, SaleItem, Product
-
-                    dt_col = self._get_dt_col(Sale, ("sale_date", "created_at", "date"))
-                    if dt_col is None:
-                        return None
-
-                    if requested_range == "yesterday":
-                        start_dt, end_dt = self._time_range_bounds("yesterday")
-                        only_today = False
-                    elif requested_range == "today":
-                        start_dt, end_dt = self._time_range_bounds("today")
-                        only_today = True
-                    else:
-                        start_dt, end_dt = self._time_range_bounds("month")
-                        only_today = False
-
-                    q = (
-                        session.query(
-                            Product.name.label('product_name'),
-                            func.sum(SaleItem.quantity).label('qty'),
-                            func.sum(SaleItem.total).label('amount')
-                        )
-                        .join(SaleItem.product)
-                        .join(SaleItem.sale)
-                        .filter(dt_col >= start_dt)
-                        .filter(Sale.is_refund == False)
-                    )
-                    if end_dt is not None:
-                        q = q.filter(dt_col < end_dt)
-
-                    q = (
-                        q.group_by(Product.name)
-                         .order_by(func.sum(SaleItem.total).desc())
-                         .limit(20)
-                    )
-
-                    try:
-                        rows = q.all() or []
-                    except Exception:
-                        rows = []
-                    if not rows:
-                        if requested_range == "yesterday":
-                            return "No sold items found for yesterday."
-                        if only_today:
-                            return "No sold items found for today."
-                        return "No sold items found for this month."
-
-                    if requested_range == "yesterday":
-                        title = "Sold items yesterday"
-                    else:
-                        title = "Sold items today" if only_today else "Sold items this month"
-                    lines = []
-                    for r in rows:
-                        pname = getattr(r, 'product_name', None) or "(Unknown Product)"
-                        qty = float(getattr(r, 'qty', 0.0) or 0.0)
-                        amt = float(getattr(r, 'amount', 0.0) or 0.0)
-                        lines.append(f"- {pname}: qty {qty:.2f}, amount {amt:.2f}")
-
-                    self._conversation_state["last_domain"] = "sold_items"
-                    self._conversation_state["last_time_range"] = requested_range or ("today" if only_today else "month")
-                    return title + ":\n\n" + "\n".join(lines)
-
-                if (has_any(sales_words) or has_any(refund_words)) and ("today" in m or "todays" in m or requested_range == "today"):
-                    start_dt, end_dt = self._time_range_bounds("today")
-                    r = self._local_sales_totals(session, start_dt, end_dt)
-                    self._conversation_state["last_domain"] = "sales_totals"
-                    self._conversation_state["last_time_range"] = "today"
-                    return (
-                        f"Today's totals:\n\n"
-                        f"Sales (IN): {r['total_in']:.2f} ({r['count_sales']} invoices)\n"
-                        f"Refunds (OUT): {r['total_out']:.2f} ({r['count_refunds']} invoices)\n"
-                        f"Net: {r['net']:.2f}"
-                    )
-
-                if (has_any(sales_words) or has_any(refund_words)) and ("yesterday" in m or requested_range == "yesterday"):
-                    start_dt, end_dt = self._time_range_bounds("yesterday")
-                    r = self._local_sales_totals(session, start_dt, end_dt)
-                    self._conversation_state["last_domain"] = "sales_totals"
-                    self._conversation_state["last_time_range"] = "yesterday"
-                    return (
-                        f"Yesterday's totals:\n\n"
-                        f"Sales (IN): {r['total_in']:.2f} ({r['count_sales']} invoices)\n"
-                        f"Refunds (OUT): {r['total_out']:.2f} ({r['count_refunds']} invoices)\n"
-                        f"Net: {r['net']:.2f}"
-                    )
-
-                if (has_any(sales_words) or has_any(refund_words)) and ("this month" in m or "monthly" in m or "month" in m):
-                    r = self._local_sales_totals(session, start_of_month)
-                    self._conversation_state["last_domain"] = "sales_totals"
-                    self._conversation_state["last_time_range"] = "month"
-                    return (
-                        f"This month's totals:\n\n"
-                        f"Sales (IN): {r['total_in']:.2f} ({r['count_sales']} invoices)\n"
-                        f"Refunds (OUT): {r['total_out']:.2f} ({r['count_refunds']} invoices)\n"
-                        f"Net: {r['net']:.2f}"
-                    )
-
-                if has_any(inventory_words):
-                    from pos_app.models.database import Product
-
-                    stock_col = None
-                    reorder_col = None
-                    try:
-                        stock_col = getattr(Product, 'stock_level') if hasattr(Product, 'stock_level') else None
-                    except Exception:
-                        stock_col = None
-                    try:
-                        reorder_col = getattr(Product, 'reorder_level') if hasattr(Product, 'reorder_level') else None
-                    except Exception:
-                        reorder_col = None
-
-                    total_products = session.query(Product).count()
-                    low_stock = 0
-                    if stock_col is not None and reorder_col is not None:
-                        low_stock = session.query(Product).filter(stock_col <= reorder_col).count()
-
-                    self._conversation_state["last_domain"] = "inventory"
-                    self._conversation_state["last_time_range"] = None
-                    return (
-                        f"Inventory status:\n\n"
-                        f"Products: {total_products}\n"
-                        f"Low stock items: {low_stock}"
-                    )
-
-                if has_any(customer_words) and ("top" in m or "best" in m):
-                    from pos_app.models.database import Customer, Sale
-
-                    dt_col = self._get_dt_col(Sale, ("sale_date", "created_at", "date"))
-                    if dt_col is None:
-                        return None
-
-                    q = (
-                        session.query(
-                            Sale.customer_id.label('customer_id'),
-                            func.sum(Sale.total_amount).label('total')
-                        )
-                        .filter(Sale.customer_id.isnot(None))
-                        .filter(dt_col >= start_of_month)
-                        .filter(Sale.is_refund == False)
-                        .group_by(Sale.customer_id)
-                        .order_by(func.sum(Sale.total_amount).desc())
-                        .limit(5)
-                    )
-                    rows = q.all() or []
-                    if not rows:
-                        return "No customer sales found for this month."
-
-                    ids = [r.customer_id for r in rows if getattr(r, 'customer_id', None) is not None]
-                    name_map = {}
-                    if ids:
-                        try:
-                            custs = session.query(Customer).filter(Customer.id.in_(ids)).all() or []
-                            for c in custs:
-                                name_map[int(c.id)] = getattr(c, 'name', None) or getattr(c, 'full_name', None) or f"Customer #{c.id}"
-                        except Exception:
-                            pass
-
-                    lines = []
-                    for idx, r in enumerate(rows, start=1):
-                        cid = int(r.customer_id)
-                        nm = name_map.get(cid, f"Customer #{cid}")
-                        lines.append(f"{idx}. {nm}: {float(r.total or 0.0):.2f}")
-
-                    return "Top customers this month:\n\n" + "\n".join(lines)
+            # (metric, range, conversation domain) for the question, or None
+            if has_any(customer_words) and ("name" in m or "names" in m or "list" in m or "all" in m):
+                route = ("customer_names", None, "customer_names")
+            elif has_any(receivable_words):
+                route = ("receivables", None, "receivables")
+            elif "what" in m and has_any(sales_words) and ("sold" in m or "sell" in m):
+                route = ("top_products", requested_range or "month", "sold_items")
+            elif ("units" in m or "how many items" in m) and has_any(sales_words):
+                route = ("units_sold", requested_range or "today", "units_sold")
+            elif (has_any(sales_words) or has_any(refund_words)) and requested_range:
+                route = ("revenue", requested_range, "sales_totals")
+            elif has_any(inventory_words):
+                route = ("inventory", None, "inventory")
+            elif has_any(customer_words) and ("top" in m or "best" in m):
+                route = ("top_customers", requested_range or "month", "top_customers")
+            else:
+                return None
 
-            return None
+            metric, time_range, domain = route
+            result = get_metric_engine().query(metric, time_range)
+            self._conversation_state["last_domain"] = domain
+            self._conversation_state["last_time_range"] = time_range
+            return result.text
         except Exception:
             return None
     
     def load_database_context(self):
         """Load database information for AI context"""
         try:
-            # Try to get database information
-            from pos_app.models.database import Product, Customer, Sale, Supplier
-            from pos_app.database.db_utils import get_db_session
-            
-            with get_db_session() as session:
-                # Get basic stats
-                product_count = session.query(Product).count()
-                customer_count = session.query(Customer).count()
-                sale_count = session.query(Sale).count()
-                supplier_count = session.query(Supplier).count()
-
-                # Get recent sales summary (use sale_date; created_at does not exist in this schema)
-                recent_sales = session.query(Sale).order_by(Sale.sale_date.desc()).limit(5).all() or []
+            from pos_app.utils.assistant_metrics import get_metric_engine
+
+            engine = get_metric_engine()
+            stats = engine.query('database_summary').value
+            today = engine.query('revenue', 'today').value
             
             self.database_context = f"""
 Database Statistics:
-- Products: {product_count}
-- Customers: {customer_count}
-- Sales: {sale_count}
-- Suppliers: {supplier_count}
+- Products: {stats['products']}
+- Customers: {stats['customers']}
+- Sales: {stats['sales']}
+- Suppliers: {stats['suppliers']}
 
-Recent Sales: {len(recent_sales)} sales recorded
+Sales Today: {today['count_sales']} invoices, net {today['net']:.2f}
 
 Database Tables:
 - Products: Product information, pricing, inventory
@@ -913,8 +567,18 @@ Available Operations:
         self.input_field.setText(question)
         self.send_message()
     
+    def _get_transport(self):
+        # Shared across messages so the response cache and in-flight requests are reused
+        if self._transport is None or self._transport.api_key != self.api_key:
+            self._transport = AssistantTransport(self.api_key)
+        return self._transport
+
     def send_message(self):
-        """Send message to AI"""
+        """Send message to AI (stops the current answer while one is streaming)"""
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            return
+
         message = self.input_field.text().strip()
         if not message:
             return
@@ -940,9 +604,8 @@ Available Operations:
             self.send_button.setText("🚀 Send")
             return
         
-        # Disable send button and show progress
-        self.send_button.setEnabled(False)
-        self.send_button.setText("⏳ Thinking...")
+        # Send button becomes a stop button while the answer streams
+        self.send_button.setText("⏹ Stop")
         try:
             if hasattr(self, 'progress_bar') and self.progress_bar is not None:
                 self.progress_bar.setVisible(True)
@@ -960,23 +623,58 @@ Available Operations:
             recent = list(self._chat_messages[-10:])
         except Exception:
             recent = []
-        self.worker = GroqAIWorker(self.api_key, recent, self.database_context)
+        self._stream_active = False
+        self._stream_text = ""
+        self.worker = GroqAIWorker(self.api_key, recent, self.database_context, transport=self._get_transport())
+        self.worker.token_received.connect(self.handle_token)
         self.worker.response_received.connect(self.handle_response)
         self.worker.error_occurred.connect(self.handle_error)
         self.worker.finished.connect(self.worker_finished)
         self.worker.start()
     
+    def handle_token(self, token):
+        """Append a streamed chunk to the answer being written"""
+        cursor = self.chat_history.textCursor()
+        try:
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+        except AttributeError:
+            cursor.movePosition(QTextCursor.End)
+
+        if not self._stream_active:
+            self._stream_active = True
+            timestamp = datetime.now().strftime("%H:%M")
+            cursor.insertHtml(
+                "<div style='margin: 10px 0;'>"
+                f"<div style='color: #6366f1; font-weight: 600; margin-bottom: 5px;'>🤖 AI Assistant - {timestamp}</div>"
+                "</div>"
+            )
+            cursor.insertBlock()
+
+        self._stream_text += token
+        cursor.insertText(token)
+        self.chat_history.setTextCursor(cursor)
+        self.chat_history.ensureCursorVisible()
+
+    def _finish_stream(self):
+        if self._stream_active:
+            self._stream_active = False
+            self._chat_messages.append({"role": "assistant", "content": self._stream_text})
+
     def handle_response(self, response):
-        """Handle AI response"""
-        self.add_message("🤖 AI Assistant", response, is_ai=True)
+        """Handle AI response (empty when the request was stopped)"""
+        streamed = self._stream_active
+        self._finish_stream()
+        if not streamed and response:
+            self.add_message("🤖 AI Assistant", response, is_ai=True)
         try:
             if hasattr(self, 'status_label') and self.status_label is not None:
-                self.status_label.setText("✅ Response received")
+                self.status_label.setText("✅ Response received" if response else "⏹ Stopped")
         except Exception:
             pass
     
     def handle_error(self, error_message):
         """Handle API errors"""
+        self._finish_stream()
         if "Invalid API key" in error_message or "400" in error_message:
             # Show a more helpful error message with API key instructions
             error_details = f"""Sorry, I encountered an API error:
@@ -22,6 +22,7 @@ from datetime import datetime, timedelta
 from pos_app.models.database import BankAccount, BankTransaction, Payment
 from pos_app.models.database import PaymentMethod as PaymentMethodEnum
 from pos_app.database.db_utils import safe_db_operation, get_db_session
+from pos_app.controllers.bank_ledger import BankLedgerService
 
 class TransactionDialog(QDialog):
     def __init__(self, transaction_id=None, account_id=None, parent=None):
@@ -283,7 +284,7 @@ class TransactionsWidget(QWidget):
         self.reconciled_check = QCheckBox("Reconciled Only")
         
         filter_btn = QPushButton("Filter")
-        filter_btn.clicked.connect(self.load_transactions)
+        filter_btn.clicked.connect(lambda: self.load_transactions())
         
         # Add widgets to header
         header.addWidget(title)
@@ -321,8 +322,15 @@ class TransactionsWidget(QWidget):
         self.transactions_table.setColumnWidth(7, 100)  # Balance
         self.transactions_table.setColumnWidth(8, 120)  # Actions
         
+        # Next page of older transactions (keyset paging)
+        self._next_cursor = None
+        self.load_more_btn = QPushButton("Load More")
+        self.load_more_btn.clicked.connect(self.load_more_transactions)
+        self.load_more_btn.setVisible(False)
+        
         layout.addLayout(header)
         layout.addWidget(self.transactions_table)
+        layout.addWidget(self.load_more_btn)
         
         # Load accounts for filter
         self.load_accounts()
@@ -337,8 +345,11 @@ class TransactionsWidget(QWidget):
                 display_text = f"{account.name} ({account.account_number})"
                 self.filter_account_combo.addItem(display_text, account.id)
     
-    def load_transactions(self):
-        self.transactions_table.setRowCount(0)
+    def load_transactions(self, append=False):
+        """Load the first page of matching transactions, or the next page when append is True."""
+        if not append:
+            self.transactions_table.setRowCount(0)
+            self._next_cursor = None
         
         account_id = self.filter_account_combo.currentData()
         transaction_type = self.filter_type_combo.currentData()
@@ -354,94 +365,87 @@ class TransactionsWidget(QWidget):
         reconciled_only = self.reconciled_check.isChecked()
         
         with get_db_session() as session:
-            query = session.query(BankTransaction)
+            # Filtering, paging and the running balance are done by the database
+            page = BankLedgerService(session).page(
+                account_id=account_id,
+                transaction_type=transaction_type,
+                date_from=datetime.combine(date_from, datetime.min.time()),
+                date_to=datetime.combine(date_to, datetime.min.time()),
+                reconciled_only=reconciled_only,
+                after=self._next_cursor if append else None
+            )
+        self._next_cursor = page.next_cursor
+        self.load_more_btn.setVisible(page.has_more)
+        
+        for tx in page.rows:
+            row = self.transactions_table.rowCount()
+            self.transactions_table.insertRow(row)
             
-            if account_id:
-                query = query.filter_by(bank_account_id=account_id)
+            # Date
+            date_item = QTableWidgetItem(tx['date'].strftime("%Y-%m-%d %H:%M"))
+            date_item.setData(Qt.UserRole, tx['id'])
             
-            if transaction_type:
-                query = query.filter_by(transaction_type=transaction_type)
+            # Account
+            account_name = f"{tx['account_name']} ({tx['account_number'][-4:]})"
             
-            if date_from and date_to:
-                query = query.filter(
-                    BankTransaction.transaction_date >= date_from,
-                    BankTransaction.transaction_date < date_to
-                )
+            # Type with color coding
+            is_credit = tx['signed_amount'] >= 0
+            type_item = QTableWidgetItem(tx['transaction_type'])
+            type_item.setForeground(Qt.darkGreen if is_credit else Qt.darkRed)
             
-            if reconciled_only:
-                query = query.filter_by(is_reconciled=True)
+            # Reference and description
+            reference_item = QTableWidgetItem(tx['reference_number'] or "")
+            description_item = QTableWidgetItem(tx['description'] or "")
             
-            # Order by date (newest first)
-            transactions = query.order_by(BankTransaction.transaction_date.desc()).all()
+            # Amounts
+            amount = abs(tx['signed_amount'])
+            debit_item = QTableWidgetItem("" if is_credit else f"${amount:,.2f}")
+            credit_item = QTableWidgetItem(f"${amount:,.2f}" if is_credit else "")
+            balance_item = QTableWidgetItem(f"${tx['balance']:,.2f}")
             
-            for row, transaction in enumerate(transactions):
-                self.transactions_table.insertRow(row)
-                
-                # Date
-                date_item = QTableWidgetItem(transaction.transaction_date.strftime("%Y-%m-%d %H:%M"))
-                date_item.setData(Qt.UserRole, transaction.id)
-                
-                # Account
-                account_name = f"{transaction.bank_account.name} ({transaction.bank_account.account_number[-4:]})"
-                
-                # Type with color coding
-                type_item = QTableWidgetItem(transaction.transaction_type)
-                if transaction.transaction_type in ["DEPOSIT", "TRANSFER_IN", "RECEIPT"]:
-                    type_item.setForeground(Qt.darkGreen)
-                else:
-                    type_item.setForeground(Qt.darkRed)
-                
-                # Reference and description
-                reference_item = QTableWidgetItem(transaction.reference_number or "")
-                description_item = QTableWidgetItem(transaction.description or "")
-                
-                # Amounts
-                is_credit = transaction.transaction_type in ["DEPOSIT", "TRANSFER_IN", "RECEIPT"]
-                debit = "" if is_credit else f"${transaction.amount:,.2f}"
-                credit = f"${transaction.amount:,.2f}" if is_credit else ""
-                
-                debit_item = QTableWidgetItem(debit)
-                credit_item = QTableWidgetItem(credit)
-                balance_item = QTableWidgetItem(f"${transaction.balance_after:,.2f}")
-                
-                # Set text alignment
-                for item in [debit_item, credit_item, balance_item]:
-                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                
-                # Set items in table
-                self.transactions_table.setItem(row, 0, date_item)
-                self.transactions_table.setItem(row, 1, QTableWidgetItem(account_name))
-                self.transactions_table.setItem(row, 2, type_item)
-                self.transactions_table.setItem(row, 3, reference_item)
-                self.transactions_table.setItem(row, 4, description_item)
-                self.transactions_table.setItem(row, 5, debit_item)
-                self.transactions_table.setItem(row, 6, credit_item)
-                self.transactions_table.setItem(row, 7, balance_item)
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(5, 2, 5, 2)
-                
-                view_btn = QPushButton("View")
-                view_btn.clicked.connect(lambda _, t=transaction.id: self.view_transaction(t))
-                
-                edit_btn = QPushButton("Edit")
-                edit_btn.clicked.connect(lambda _, t=transaction.id: self.edit_transaction(t))
-                
-                delete_btn = QPushButton("Delete")
-                delete_btn.clicked.connect(lambda _, t=transaction.id: self.delete_transaction(t))
-                
-                actions_layout.addWidget(view_btn)
-                actions_layout.addWidget(edit_btn)
-                actions_layout.addWidget(delete_btn)
-                actions_layout.setSpacing(2)
-                
-                self.transactions_table.setCellWidget(row, 8, actions_widget)
+            # Set text alignment
+            for item in [debit_item, credit_item, balance_item]:
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            
+            # Set items in table
+            self.transactions_table.setItem(row, 0, date_item)
+            self.transactions_table.setItem(row, 1, QTableWidgetItem(account_name))
+            self.transactions_table.setItem(row, 2, type_item)
+            self.transactions_table.setItem(row, 3, reference_item)
+            self.transactions_table.setItem(row, 4, description_item)
+            self.transactions_table.setItem(row, 5, debit_item)
+            self.transactions_table.setItem(row, 6, credit_item)
+            self.transactions_table.setItem(row, 7, balance_item)
+            
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout(actions_widget)
+            actions_layout.setContentsMargins(5, 2, 5, 2)
             
-            # Resize columns to contents
+            view_btn = QPushButton("View")
+            view_btn.clicked.connect(lambda _, t=tx['id']: self.view_transaction(t))
+            
+            edit_btn = QPushButton("Edit")
+            edit_btn.clicked.connect(lambda _, t=tx['id']: self.edit_transaction(t))
+            
+            delete_btn = QPushButton("Delete")
+            delete_btn.clicked.connect(lambda _, t=tx['id']: self.delete_transaction(t))
+            
+            actions_layout.addWidget(view_btn)
+            actions_layout.addWidget(edit_btn)
+            actions_layout.addWidget(delete_btn)
+            actions_layout.setSpacing(2)
+            
+            self.transactions_table.setCellWidget(row, 8, actions_widget)
+        
+        # Resize columns to contents
+        if not append:
             self.transactions_table.resizeColumnsToContents()
     
+    def load_more_transactions(self):
+        if self._next_cursor is not None:
+            self.load_transactions(append=True)
+    
     def add_transaction(self, account_id=None):
         dialog = TransactionDialog(account_id=account_id, parent=self)
         if dialog.exec() == QDialog.Accepted:
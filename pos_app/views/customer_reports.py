@@ -15,8 +15,27 @@ except ImportError:
     )
     from PyQt6.QtCore import Qt, QDate
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 import logging
 
+from pos_app.database.archive import archived_children, archived_rows
+
+
+def _archived_sale_totals(session, start=None, end=None, customer_id=None) -> dict:
+    """{customer_id: (sales, total, last sale date)} over sales of archived fiscal years"""
+    equals = {'customer_id': customer_id} if customer_id is not None else {}
+    totals = {}
+    for sale in archived_rows(session, 'sales', start, end, **equals):
+        if sale.get('customer_id') is None:
+            continue
+        count, total, last = totals.get(sale.customer_id, (0, 0.0, None))
+        when = sale.get('sale_date')
+        if last is None or (when is not None and when > last):
+            last = when
+        totals[sale.customer_id] = (count + 1, total + float(sale.get('total_amount') or 0), last)
+    return totals
+
+
 class CustomerReportsWidget(QWidget):
     def __init__(self, controller):
         super().__init__()
@@ -411,6 +430,14 @@ class CustomerReportsWidget(QWidget):
                 Sale.sale_date >= from_date,
                 Sale.sale_date <= to_date
             ).all()
+            # Closed fiscal years moved out by the archiver
+            archived = archived_rows(self.controller.session, 'sales', from_date, to_date, customer_id=customer_id)
+            item_counts = {}
+            if archived:
+                for item in archived_children(self.controller.session, 'sale_items', 'sale_id',
+                                              [s.id for s in archived], {s.archived_fy for s in archived}):
+                    item_counts[item.sale_id] = item_counts.get(item.sale_id, 0) + 1
+                sales = sorted(list(sales) + archived, key=lambda s: s.sale_date or datetime.min)
             
             # Calculate statistics
             total_purchases = sum(sale.total_amount for sale in sales)
@@ -436,7 +463,8 @@ class CustomerReportsWidget(QWidget):
                 self.individual_history_table.setItem(i, 2, QTableWidgetItem(
                     "Wholesale" if sale.is_wholesale else "Retail"
                 ))
-                self.individual_history_table.setItem(i, 3, QTableWidgetItem(str(len(sale.items))))
+                self.individual_history_table.setItem(i, 3, QTableWidgetItem(
+                    str(len(sale.items) if isinstance(sale, Sale) else item_counts.get(sale.id, 0))))
                 self.individual_history_table.setItem(i, 4, QTableWidgetItem(f"Rs {sale.subtotal:,.2f}"))
                 self.individual_history_table.setItem(i, 5, QTableWidgetItem(f"Rs {sale.tax_amount:,.2f}"))
                 self.individual_history_table.setItem(i, 6, QTableWidgetItem(f"Rs {sale.total_amount:,.2f}"))
@@ -470,6 +498,19 @@ class CustomerReportsWidget(QWidget):
                     query = query.filter(Customer.type == 'WHOLESALE')
             
             customers = query.all()
+            archived = _archived_sale_totals(self.controller.session)
+            if archived:
+                merged = []
+                for c in customers:
+                    count, total, last = archived.get(c.id, (0, 0.0, None))
+                    count += c.transaction_count or 0
+                    total += float(c.total_purchases or 0)
+                    merged.append(SimpleNamespace(
+                        id=c.id, name=c.name, type=c.type, current_credit=c.current_credit,
+                        transaction_count=count, total_purchases=total,
+                        avg_order=total / count if count else 0,
+                        last_purchase=c.last_purchase or last))
+                customers = merged
             
             # Sort results
             sort_by = self.sort_filter.currentText()
@@ -555,10 +596,9 @@ class CustomerReportsWidget(QWidget):
                 Customer.is_active == True
             ).count()
             
-            active_customers = self.controller.session.query(Customer).join(Sale).filter(  # TODO: Add .all() or .first()
-                Sale.sale_date >= from_date,
-                Sale.sale_date <= to_date
-            ).distinct().count()
+            from pos_app.utils.sales_stats import SalesStats
+            stats = SalesStats(self.controller.session)
+            active_customers = stats.active_customers(from_date, to_date)
             
             new_customers = self.controller.session.query(Customer).filter(  # TODO: Add .all() or .first()
                 Customer.created_at >= from_date,
@@ -570,6 +610,8 @@ class CustomerReportsWidget(QWidget):
                 Sale.sale_date >= from_date,
                 Sale.sale_date <= to_date
             ).scalar() or 0
+            total_revenue += sum(float(sale.get('total_amount') or 0) for sale in
+                                 archived_rows(self.controller.session, 'sales', from_date, to_date))
             
             revenue_per_customer = total_revenue / active_customers if active_customers > 0 else 0
             
@@ -580,17 +622,10 @@ class CustomerReportsWidget(QWidget):
             self.revenue_per_customer_label.setText(f"Rs {revenue_per_customer:,.2f}")
             
             # Load top customers
-            top_customers = self.controller.session.query(
-                Customer.name,
-                func.sum(Sale.total_amount).label('total'),
-                func.count(Sale.id).label('transactions'),
-                func.avg(Sale.total_amount).label('avg_order')
-            ).join(Sale).filter(
-                Sale.sale_date >= from_date,
-                Sale.sale_date <= to_date
-            ).group_by(Customer.id, Customer.name).order_by(
-                func.sum(Sale.total_amount).desc()
-            ).limit(10).all()
+            top_customers = [
+                (c['name'], c['revenue'], c['transactions'], c['avg_order'])
+                for c in stats.top_customers(from_date, to_date, limit=10)
+            ]
             
             self.top_customers_table.setRowCount(len(top_customers))
             
@@ -629,6 +664,13 @@ class CustomerReportsWidget(QWidget):
                     func.avg(Sale.total_amount).label('avg_order'),
                     func.max(Sale.sale_date).label('last_purchase')
                 ).filter(Sale.customer_id == customer_id).first()
+                count, total, last = _archived_sale_totals(self.controller.session, customer_id=customer_id) \
+                    .get(customer_id, (0, 0.0, None))
+                count += sales_stats.transactions or 0
+                total += float(sales_stats.total or 0)
+                sales_stats = SimpleNamespace(transactions=count, total=total,
+                                              avg_order=total / count if count else 0,
+                                              last_purchase=sales_stats.last_purchase or last)
                 
                 customer_type = str(customer.type).title() if customer.type else "Retail"
                 customers_data[customer_id] = {
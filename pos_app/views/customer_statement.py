@@ -1,5 +1,4 @@
 import os
-import html
 
 try:
     from PySide6.QtWidgets import (
@@ -24,7 +23,9 @@ except ImportError:
         qt_version = "PyQt6"
     except ImportError:
         raise ImportError("Neither PySide6 nor PyQt6 is available. Please install one of them.")
-from pos_app.models.database import Customer, Sale, Payment
+from pos_app.database.archive import archived_children, archived_rows
+from pos_app.models.database import Customer, Sale, Payment, Product
+from pos_app.utils import document_engine
 from datetime import datetime, time
 import json
 
@@ -442,234 +443,28 @@ class CustomerStatementDialog(QDialog):
         start_date, end_date = self._get_selected_dates()
         data = self._gather_statement_data(start_date, end_date)
         shop_info = self._get_shop_info()
-        customer_name = getattr(self.customer, "name", "N/A") if getattr(self, "customer", None) else "N/A"
-        customer_address = getattr(self.customer, "address", "N/A") if getattr(self, "customer", None) else "N/A"
-        customer_phone = getattr(self.customer, "phone", "N/A") if getattr(self, "customer", None) else "N/A"
-        period_text = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-        generated_text = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        def esc(value):
-            return html.escape(str(value) if value is not None else "")
-
-        rows_html = []
-        combined_rows = data["sale_rows"] + data["payment_rows"]
-        if not combined_rows:
-            rows_html.append(
-                "<tr><td colspan='6' class='empty'>No transactions found for the selected period.</td></tr>"
-            )
-        else:
-            for row in combined_rows:
-                rows_html.append(
-                    "<tr>"
-                    f"<td>{esc(row['date'])}</td>"
-                    f"<td>{esc(row['description'])}</td>"
-                    f"<td class='numeric'>{esc(row['quantity'])}</td>"
-                    f"<td class='numeric'>{esc(row['discount'])}</td>"
-                    f"<td class='numeric'>{esc(row['price'])}</td>"
-                    f"<td class='numeric'>{esc(row['subtotal'])}</td>"
-                    "</tr>"
-                )
-
-        summary_cards = [
-            ("Total Sales", self._format_currency(data["total_sales"])),
-            ("Total Payments", self._format_currency(data["total_payments"])),
-            ("Balance", self._format_currency(data["balance"])),
-        ]
-        summary_html = "".join(
-            f"<div class='summary-card'><div class='label'>{esc(label)}</div>"
-            f"<div class='value'>{esc(value)}</div></div>"
-            for label, value in summary_cards
-        )
-
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8" />
-    <style>
-        @page {{
-            margin: 18mm;
-        }}
-        body {{
-            font-family: 'Segoe UI', 'Arial', sans-serif;
-            margin: 0;
-            padding: 1rem 1.5rem 1.5rem 1.5rem;
-            color: #0f172a;
-            background: #ffffff;
-            font-size: 10px;
-            line-height: 1.2;
-        }}
-        .header {{
-            text-align: center;
-            margin-bottom: 0.8rem;
-        }}
-        .header h1 {{
-            margin: 0;
-            font-size: 1.8em;
-            letter-spacing: 0.12em;
-        }}
-        .header p {{
-            margin: 0.2rem 0;
-            color: #475569;
-            font-size: 1.1em;
-        }}
-        .bill-to {{
-            margin-top: 1rem;
-            padding: 0.8rem;
-            border: 1px solid #e2e8f0;
-            border-radius: 6px;
-            background: #f8fafc;
-        }}
-        .bill-to h2 {{
-            margin: 0 0 0.5rem 0;
-            font-size: 1.1em;
-            color: #475569;
-            letter-spacing: 0.08em;
-        }}
-        .summary-section {{
-            margin-top: 1rem;
-        }}
-        .summary-card {{
-            display: inline-block;
-            min-width: 120px;
-            margin-right: 1rem;
-            margin-bottom: 0.5rem;
-            padding: 0.7rem 0.8rem;
-            border-radius: 4px;
-            background: linear-gradient(135deg, #eef2ff, #eff6ff);
-            border: 1px solid #dbeafe;
-        }}
-        .summary-card .label {{
-            text-transform: uppercase;
-            font-size: 0.9em;
-            letter-spacing: 0.12em;
-            color: #6366f1;
-            margin-bottom: 0.3rem;
-        }}
-        .summary-card .value {{
-            font-size: 1.2em;
-            font-weight: 700;
-        }}
-        table {{
-            width: 95%;
-            max-width: 1400px;
-            border-collapse: collapse;
-            margin: 2rem auto 1.5rem auto;
-            table-layout: fixed;
-            font-size: 1.4rem;
-            border: 3px solid #1e293b;
-            border-radius: 10px;
-            overflow: hidden;
-            box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-        }}
-        th {{
-            text-align: center;
-            padding: 2rem 2rem;
-            background: #000000 !important;
-            color: #ffffff !important;
-            font-size: 1.6rem !important;
-            font-weight: 900 !important;
-            border: 3px solid #ffffff !important;
-            text-transform: uppercase;
-            letter-spacing: 3px;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.8);
-            height: 60px !important;
-            line-height: 1.2;
-        }}
-        td {{
-            padding: 1.2rem 1.8rem;
-            border: 2px solid #e2e8f0;
-            font-size: 1.2rem;
-            color: #0f172a;
-            vertical-align: middle;
-            text-align: center;
-            background: #ffffff;
-            font-weight: 500;
-        }}
-        td.numeric {{
-            text-align: right;
-            font-variant-numeric: tabular-nums;
-        }}
-        tr:nth-child(even) td {{
-            background-color: #f8fafc;
-        }}
-        tr {{
-            min-height: 2rem;
-        }}
-        .section-title {{
-            margin-top: 1.2rem;
-            font-size: 0.9rem;
-            letter-spacing: 0.22em;
-            color: #94a3b8;
-        }}
-        .footer {{
-            margin-top: 1rem;
-            text-align: center;
-            font-size: 0.8rem;
-            color: #94a3b8;
-        }}
-        .empty {{
-            text-align: center;
-            padding: 1.5rem 0;
-            color: #94a3b8;
-            font-size: 1rem;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <p class="section-title">CUSTOMER STATEMENT</p>
-        <h1>{esc(shop_info['name'])}</h1>
-        <p>{esc(shop_info['address'])}</p>
-        <p>Contact: {esc(shop_info['phone'])}</p>
-        <p>Statement Period: {esc(period_text)}</p>
-    </div>
-
-    <div class="bill-to">
-        <h2>BILL TO</h2>
-        <p><strong>Name:</strong> {esc(customer_name)}</p>
-        <p><strong>Address:</strong> {esc(customer_address)}</p>
-        <p><strong>Phone:</strong> {esc(customer_phone)}</p>
-    </div>
-
-    <table style="border-collapse: collapse; width: 95%; margin: 2rem auto; table-layout: fixed;">
-        <thead style="display: table-header-group;">
-            <tr>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DATE</th>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DESCRIPTION</th>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">QTY</th>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">DISCOUNT</th>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">PRICE</th>
-                <th style="text-align: center; padding: 4px 6px; background: #ffffff; color: #000000; font-size: 8px; font-weight: bold; border: 2px solid #000000; white-space: nowrap;">SUBTOTAL</th>
-            </tr>
-        </thead>
-        <tbody>
-            {''.join(rows_html)}
-        </tbody>
-        <tfoot>
-            <tr style="background: linear-gradient(135deg, #f1f5f9, #e2e8f0); border-top: 3px solid #1e293b;">
-                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">TOTAL OF THAT SALE:</td>
-                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #1e293b; padding: 0.5rem 1rem;">{self._format_currency(data["total_sales"])}</td>
-            </tr>
-            <tr style="background: linear-gradient(135deg, #e8f4f8, #d1ecf1); border-top: 2px solid #0c4a6e;">
-                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">TOTAL PAID:</td>
-                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #0c4a6e; padding: 0.5rem 1rem;">{self._format_currency(data["total_payments"])}</td>
-            </tr>
-            <tr style="background: linear-gradient(135deg, #fef2f2, #fee2e2); border-top: 2px solid #dc2626;">
-                <td colspan="5" style="text-align: right; font-weight: 700; font-size: 1.1rem; padding: 0.5rem 1rem;">AMOUNT DUE:</td>
-                <td style="text-align: center; font-weight: 800; font-size: 1.2rem; color: #dc2626; padding: 0.5rem 1rem;">{self._format_currency(data["balance"])}</td>
-            </tr>
-        </tfoot>
-    </table>
-
-    <div class="footer">
-        <p>Generated on {esc(generated_text)}</p>
-        <p>Thank you for your business!</p>
-    </div>
-</body>
-</html>
-"""
-        return html_content
+        customer = getattr(self, "customer", None)
+        context = {
+            'shop_name': str(shop_info['name']),
+            'shop_address': str(shop_info['address']),
+            'shop_phone': str(shop_info['phone']),
+            'period_text': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
+            # Missing fields print blank, not "None"; the html template escapes every value
+            'customer_name': (getattr(customer, "name", None) or "N/A") if customer else "N/A",
+            'customer_address': (getattr(customer, "address", None) or "") if customer else "",
+            'customer_phone': (getattr(customer, "phone", None) or "") if customer else "",
+            'rows': [
+                {k: ("" if row.get(k) is None else str(row.get(k)))
+                 for k in ('date', 'description', 'quantity', 'discount', 'price', 'subtotal')}
+                for row in data["sale_rows"] + data["payment_rows"]
+            ],
+            'total_sales': self._format_currency(data["total_sales"]),
+            'total_payments': self._format_currency(data["total_payments"]),
+            'balance': self._format_currency(data["balance"]),
+            'generated_text': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        # Compiled once per process with the shared statement stylesheet
+        return document_engine.render('customer_statement_html', context)
 
     def _gather_statement_data(self, start_date, end_date):
         start_dt = datetime.combine(start_date, time.min)
@@ -681,13 +476,23 @@ class CustomerStatementDialog(QDialog):
             Sale.sale_date >= start_dt,
             Sale.sale_date <= end_dt
         ).order_by(Sale.sale_date.desc()).all()
+        # Closed fiscal years moved out by the archiver still belong on the statement
+        archived_sales = archived_rows(session, 'sales', start_dt, end_dt, customer_id=self.customer_id)
+        if archived_sales:
+            sales = sorted(list(sales) + archived_sales,
+                           key=lambda s: (s.sale_date or datetime.min, s.id), reverse=True)
 
         sale_rows = []
         if sales:
             # Only show the last/most recent sale
             latest_sale = sales[0]
             sale_date_text = latest_sale.sale_date.strftime('%Y-%m-%d') if latest_sale.sale_date else ""
-            items = list(getattr(latest_sale, 'items', []) or [])
+            if isinstance(latest_sale, Sale):
+                items = list(getattr(latest_sale, 'items', []) or [])
+            else:
+                items = archived_children(session, 'sale_items', 'sale_id', [latest_sale.id], {latest_sale.archived_fy})
+                for item in items:
+                    item['product'] = session.get(Product, item.product_id) if item.get('product_id') else None
             if not items:
                 subtotal = getattr(latest_sale, 'total_amount', 0) or 0
                 sale_rows.append({
@@ -706,10 +511,11 @@ class CustomerStatementDialog(QDialog):
                     discount = getattr(item, 'discount', 0)
                     price = getattr(item, 'unit_price', getattr(item, 'price', 0)) or 0
                     subtotal = getattr(item, 'subtotal', getattr(item, 'total', price * quantity)) or (price * quantity)
-                    if isinstance(discount, (int, float)):
-                        discount_text = f"{discount:.1f}%"
+                    # Line discounts are stored as amounts
+                    if isinstance(discount, (int, float)) and discount:
+                        discount_text = self._format_currency(discount)
                     else:
-                        discount_text = str(discount or "-")
+                        discount_text = "-"
                     sale_rows.append({
                         "date": sale_date_text if idx == 0 else "",
                         "description": product_name,
@@ -729,6 +535,8 @@ class CustomerStatementDialog(QDialog):
             Payment.payment_date <= end_dt,
             Payment.status == 'COMPLETED'
         ).all()
+        payments += archived_rows(session, 'payments', start_dt, end_dt,
+                                  customer_id=self.customer_id, status='COMPLETED')
         
         total_payments = sum(getattr(payment, 'amount', 0) or 0 for payment in payments)
         
@@ -29,6 +29,7 @@ from pos_app.models.database import (
 )
 from pos_app.views.dialogs.cash_register_dialog import CashRegisterDialog
 from pos_app.views.dialogs.cash_register_close_dialog import CashRegisterCloseDialog
+from pos_app.controllers.cash_drawer import CashDrawerService
 
 class DashboardEnhanced(QWidget):
     """Enhanced dashboard with cash register and daily summary"""
@@ -864,21 +865,10 @@ class DashboardEnhanced(QWidget):
                     )
                     print(f"[DEBUG] Set opening balance to: {float(active_session.opening_balance or 0.0):,.2f}")
 
-                    # Calculate current balance from opening + movements, but never crash UI if query fails
-                    current = float(active_session.opening_balance or 0.0)
-                    try:
-                        movements = (
-                            session.query(CashMovement)
-                            .filter(CashMovement.session_id == active_session.id)
-                            .all()
-                        )
-                        for mov in movements:
-                            if mov.movement_type in ['SALE', 'DEPOSIT']:
-                                current += float(mov.amount or 0.0)
-                            else:
-                                current -= float(mov.amount or 0.0)
-                    except Exception:
-                        pass
+                    # Expected cash is kept on the session row with every movement
+                    current = float(active_session.expected_balance
+                                    if active_session.expected_balance is not None
+                                    else active_session.opening_balance or 0.0)
 
                     self.current_balance_label.setText(f"Current: Rs {current:,.2f}")
 
@@ -1131,15 +1121,11 @@ class DashboardEnhanced(QWidget):
             data = dialog.get_data()
             
             with get_db_session() as session:
-                new_session = CashDrawerSession(
+                CashDrawerService(session).open_session(
                     opening_balance=data['opening_balance'],
-                    opened_at=datetime.now(),
-                    status='OPEN',
                     notes=data['notes'],
                     opened_by='admin'  # TODO: Get from current user
                 )
-                session.add(new_session)
-                session.commit()
                 
                 QMessageBox.information(self, "Success", "Cash register opened successfully!")
                 self.load_data()
@@ -1150,46 +1136,27 @@ class DashboardEnhanced(QWidget):
             QMessageBox.warning(self, "Error", "No active cash register session!")
             return
         
-        # Calculate expected balance
+        # X-report: expected balance and totals come from the session row
         with get_db_session() as session:
-            movements = session.query(CashMovement).filter(
-                CashMovement.session_id == self.current_session.id
-            ).all()
-            
-            expected = float(self.current_session.opening_balance)
-            for mov in movements:
-                if mov.movement_type in ['SALE', 'DEPOSIT']:
-                    expected += float(mov.amount)
-                else:
-                    expected -= float(mov.amount)
-            
-            session_data = {
-                'opened_at': self.current_session.opened_at,
-                'opening_balance': float(self.current_session.opening_balance),
-                'expected_balance': expected
-            }
+            session_data = CashDrawerService(session).x_report(self.current_session.id)
         
         dialog = CashRegisterCloseDialog(session_data=session_data, parent=self)
         if dialog.exec():
             data = dialog.get_data()
             
             with get_db_session() as session:
-                # Update session
-                sess = session.query(CashDrawerSession).get(self.current_session.id)
-                sess.closing_balance = data['closing_balance']
-                sess.expected_balance = data['expected_balance']
-                sess.variance = data['variance']
-                sess.closed_at = datetime.now()
-                sess.status = 'CLOSED'
-                sess.notes = (sess.notes or '') + '\n' + (data['notes'] or '')
-                sess.closed_by = 'admin'  # TODO: Get from current user
-                
-                session.commit()
+                report = CashDrawerService(session).close_session(
+                    counted=data['total_counted'],
+                    cash_out=data['cash_out'],
+                    notes=data.get('notes'),
+                    session_id=self.current_session.id,
+                    closed_by='admin'  # TODO: Get from current user
+                )
                 
-                # Show variance message
-                if data['variance'] != 0:
-                    msg = f"Cash register closed!\n\nVariance: Rs {data['variance']:,.2f}"
-                    if data['variance'] > 0:
+                # Show variance message (Z-report)
+                if report['variance'] != 0:
+                    msg = f"Cash register closed!\n\nVariance: Rs {report['variance']:,.2f}"
+                    if report['variance'] > 0:
                         msg += "\n(Over)"
                     else:
                         msg += "\n(Short)"
@@ -207,8 +207,8 @@ class CashRegisterCloseDialog(QDialog):
         
         self.final_balance_label.setText(f"Rs {final_balance:,.2f}")
         
-        # Calculate variance (final balance vs expected)
-        expected = self.session_data.get('expected_balance', 0.0)
+        # Calculate variance (final balance vs expected); cash taken out is recorded as a payout
+        expected = self.session_data.get('expected_balance', 0.0) - cash_out
         variance = final_balance - expected
         
         self.variance_label.setText(f"Rs {variance:,.2f}")
@@ -227,7 +227,7 @@ class CashRegisterCloseDialog(QDialog):
         total_counted = sum(denom * spinbox.value() for denom, spinbox in self.denominations.items())
         cash_out = self.cash_out.value()
         final_balance = total_counted - cash_out
-        expected = self.session_data.get('expected_balance', 0.0)
+        expected = self.session_data.get('expected_balance', 0.0) - cash_out
         variance = final_balance - expected
         
         return {
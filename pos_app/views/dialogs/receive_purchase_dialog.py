@@ -306,6 +306,7 @@ class ReceivePurchaseDialog(QDialog):
             
             if reply == QMessageBox.Yes:
                 self.controller.receive_purchase(self.purchase_id, None)
+                self._print_received_labels()
                 QMessageBox.information(self, "Success", 
                                        f"Purchase {self.purchase.purchase_number} received!\n"
                                        f"Inventory has been updated.")
@@ -314,6 +315,17 @@ class ReceivePurchaseDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to receive purchase: {str(e)}")
     
+    def _print_received_labels(self):
+        """Send barcode labels for the received items as one batch, if enabled in settings"""
+        try:
+            from pos_app.utils.barcode_printer import BarcodePrinterSettings
+            if not BarcodePrinterSettings().get_setting('print_labels_on_receive', False):
+                return
+            if hasattr(self.controller, 'print_purchase_labels'):
+                self.controller.print_purchase_labels(self.purchase_id)
+        except Exception as e:
+            print(f"Label printing after receive failed: {e}")
+
     def receive_partial(self):
         """Receive items with quantities specified in table"""
         try:
@@ -342,6 +354,7 @@ class ReceivePurchaseDialog(QDialog):
             
             if reply == QMessageBox.Yes:
                 self.controller.receive_purchase(self.purchase_id, items_received)
+                self._print_received_labels()
                 QMessageBox.information(self, "Success", 
                                        f"Partial delivery received for {self.purchase.purchase_number}!\n"
                                        f"Inventory has been updated.")
@@ -200,6 +200,8 @@ class DiscountManagementWidget(QWidget):
                 )
                 
                 self.controller.session.add(discount)
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", "Discount created successfully!")
@@ -223,6 +225,8 @@ class DiscountManagementWidget(QWidget):
             product = self.controller.session.get(Product, product_id)
             if product:
                 product.discount_percentage = discount_percent
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", f"Discount applied to {product.name}")
@@ -246,6 +250,8 @@ class DiscountManagementWidget(QWidget):
             customer = self.controller.session.get(Customer, customer_id)
             if customer:
                 customer.discount_percentage = discount_percent
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", f"Discount applied to {customer.name}")
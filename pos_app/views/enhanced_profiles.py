@@ -645,7 +645,8 @@ class EnhancedProfilesWidget(QWidget):
             products = self.controller.session.query(Product).filter(Product.supplier_id == supplier_id).all()
             
             total_purchases = sum(purchase.total_amount for purchase in purchases)
-            total_outstanding = sum((purchase.total_amount - purchase.paid_amount) for purchase in purchases)
+            from pos_app.controllers.supplier_balances import SupplierBalanceService
+            total_outstanding = SupplierBalanceService(self.controller.session).get_outstanding(supplier_id)
             
             self.supplier_total_purchases.setText(f"Rs {total_purchases:,.2f}")
             self.supplier_outstanding.setText(f"Rs {total_outstanding:,.2f}")
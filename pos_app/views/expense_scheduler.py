@@ -198,39 +198,10 @@ class ExpenseSchedulerWidget(QWidget):
 
     def generate_scheduled_payments(self, expense):
         try:
-            from pos_app.models.database import ExpenseSchedule
-            
-            # Generate next 12 scheduled payments
-            current_date = expense.next_due_date
-            
-            for i in range(12):
-                schedule = ExpenseSchedule(
-                    expense_id=expense.id,
-                    scheduled_date=current_date,
-                    amount=expense.amount,
-                    status="PENDING"
-                )
-                
-                self.controller.session.add(schedule)
-                
-                # Calculate next date based on frequency
-                if expense.frequency == "MONTHLY":
-                    if current_date.month == 12:
-                        current_date = current_date.replace(year=current_date.year + 1, month=1)
-                    else:
-                        current_date = current_date.replace(month=current_date.month + 1)
-                elif expense.frequency == "WEEKLY":
-                    current_date = current_date + timedelta(weeks=1)
-                elif expense.frequency == "DAILY":
-                    current_date = current_date + timedelta(days=1)
-                elif expense.frequency == "YEARLY":
-                    current_date = current_date.replace(year=current_date.year + 1)
-                elif expense.frequency == "QUARTERLY":
-                    if current_date.month <= 9:
-                        current_date = current_date.replace(month=current_date.month + 3)
-                    else:
-                        current_date = current_date.replace(year=current_date.year + 1, month=current_date.month - 9)
+            from pos_app.utils.expense_scheduler import ExpenseScheduler
             
+            # Occurrences inside the scheduler's horizon (month-end dates are clamped, not skipped)
+            ExpenseScheduler(self.controller.session).materialise([expense.id])
             self.controller.session.commit()
             
         except Exception as e:
@@ -277,19 +248,20 @@ class ExpenseSchedulerWidget(QWidget):
                 due_date = schedule.scheduled_date.date() if schedule.scheduled_date else today
                 days_overdue = (today - due_date).days if due_date < today else 0
                 
-                # Color code overdue items
+                # Color code overdue items (display only: the scheduler still settles PENDING auto-create ones)
                 due_item = QTableWidgetItem(due_date.strftime('%Y-%m-%d'))
+                status = schedule.status
                 if days_overdue > 0:
                     due_item.setForeground(Qt.red)
-                    schedule.status = "OVERDUE"
+                    status = "OVERDUE"
                 
                 self.scheduled_table.setItem(i, 0, due_item)
                 self.scheduled_table.setItem(i, 1, QTableWidgetItem(schedule.expense.title))
                 self.scheduled_table.setItem(i, 2, QTableWidgetItem(f"Rs {schedule.amount:,.2f}"))
                 self.scheduled_table.setItem(i, 3, QTableWidgetItem(schedule.expense.category or ""))
                 
-                status_item = QTableWidgetItem(schedule.status)
-                if schedule.status == "OVERDUE":
+                status_item = QTableWidgetItem(status)
+                if status == "OVERDUE":
                     status_item.setForeground(Qt.red)
                 self.scheduled_table.setItem(i, 4, status_item)
                 
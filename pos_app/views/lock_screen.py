@@ -0,0 +1,122 @@
+try:
+    from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton
+    from PySide6.QtCore import Qt, QTimer
+except ImportError:
+    from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton
+    from PyQt6.QtCore import Qt, QTimer
+from pos_app.utils.auth_service import get_auth_service
+from pos_app.utils.logger import app_logger
+
+
+class LockScreenDialog(QDialog):
+    """Covers the till until the signed-in cashier re-enters their password.
+
+    The session token from the login is checked first (one HMAC, no KDF round);
+    an expired token falls back to a full authentication on the auth worker thread.
+    """
+
+    def __init__(self, user, token, parent=None):
+        super().__init__(parent)
+        self.user = user
+        self.token = token
+        self._pending_unlock = None
+        self._unlock_timer = QTimer(self)
+        self._unlock_timer.setInterval(30)
+        self._unlock_timer.timeout.connect(self._check_unlock_result)
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Screen Locked")
+        self.setModal(True)
+        self.setMinimumWidth(360)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowCloseButtonHint)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        title = QLabel("🔒 Screen Locked")
+        title.setAlignment(Qt.AlignCenter)
+        title.setStyleSheet("font-size: 20px; font-weight: bold; color: #1e293b;")
+        layout.addWidget(title)
+
+        name = getattr(self.user, 'full_name', None) or getattr(self.user, 'username', '')
+        who = QLabel(f"Signed in as {name}")
+        who.setAlignment(Qt.AlignCenter)
+        who.setStyleSheet("color: #475569;")
+        layout.addWidget(who)
+
+        self.password_input = QLineEdit()
+        self.password_input.setPlaceholderText("Password")
+        self.password_input.setEchoMode(QLineEdit.Password)
+        self.password_input.returnPressed.connect(self.handle_unlock)
+        layout.addWidget(self.password_input)
+
+        self.error_label = QLabel()
+        self.error_label.setStyleSheet("color: #dc2626;")
+        self.error_label.setVisible(False)
+        layout.addWidget(self.error_label)
+
+        self.unlock_btn = QPushButton("🔓 Unlock")
+        self.unlock_btn.clicked.connect(self.handle_unlock)
+        layout.addWidget(self.unlock_btn)
+
+        self.password_input.setFocus()
+
+    def reject(self):
+        # Escape must not dismiss the lock screen
+        pass
+
+    def handle_unlock(self):
+        if self._pending_unlock is not None:
+            return
+        username = getattr(self.user, 'username', '')
+        password = self.password_input.text()
+        if not password:
+            self.show_error("Please enter your password")
+            return
+
+        service = get_auth_service()
+        result = service.unlock(self.token, username, password)
+        if result.ok:
+            self.accept()
+            return
+        if result.error == "Invalid password":
+            self.show_error(result.error)
+            return
+
+        # Token expired: verify the password again off the UI thread
+        self.unlock_btn.setEnabled(False)
+        self.unlock_btn.setText("Checking...")
+        self.error_label.setVisible(False)
+        self._pending_unlock = service.authenticate_async(username, password)
+        self._unlock_timer.start()
+
+    def _check_unlock_result(self):
+        future = self._pending_unlock
+        if future is None or not future.done():
+            return
+        self._unlock_timer.stop()
+        self._pending_unlock = None
+        self.unlock_btn.setEnabled(True)
+        self.unlock_btn.setText("🔓 Unlock")
+
+        try:
+            result = future.result()
+        except Exception as e:
+            app_logger.error(f"Unlock error: {str(e)}")
+            self.show_error(f"Unlock failed: {str(e)}")
+            return
+
+        if result.ok:
+            if self.token:
+                get_auth_service().revoke_token(self.token)
+            self.token = result.token
+            self.accept()
+            return
+        self.show_error(result.error or "Invalid password")
+
+    def show_error(self, message):
+        self.error_label.setText(message)
+        self.error_label.setVisible(True)
+        self.password_input.clear()
+        self.password_input.setFocus()
@@ -1,19 +1,22 @@
 try:
     from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-    from PySide6.QtCore import Qt, QEvent
+    from PySide6.QtCore import Qt, QEvent, QTimer
 except ImportError:
     from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
-    from PyQt6.QtCore import Qt, QEvent
+    from PyQt6.QtCore import Qt, QEvent, QTimer
 from pos_app.database.connection import Database
-from pos_app.models.database import User
-from pos_app.utils.auth import check_password
-from pos_app.utils.local_auth import LocalAuthCache
+from pos_app.utils.auth_service import get_auth_service
 from pos_app.utils.logger import app_logger
 
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.user = None
+        self.session_token = None
+        self._pending_login = None
+        self._login_timer = QTimer(self)
+        self._login_timer.setInterval(30)
+        self._login_timer.timeout.connect(self._check_login_result)
         self.setup_ui()
 
     def eventFilter(self, obj, event):
@@ -221,76 +224,53 @@ class LoginDialog(QDialog):
                 self.accept()
                 return
             
-            # Try to authenticate from server database
-            user = None
+            if self._pending_login is not None:
+                return
+
             try:
                 from pos_app.models import database as db
-                try:
-                    # Ensure we don't use a stale engine/session from an early import on client PCs
-                    db.get_engine(force_new=True)
-                except Exception:
-                    pass
+                # Ensure we don't use a stale engine/session from an early import on client PCs
+                db.get_engine(force_new=True)
+            except Exception:
+                pass
 
-                sess = None
-                try:
-                    sess = db.SessionLocal()
-                    user = sess.query(User).filter(User.username == username).first()
+            # Password verification (server, then offline cache) runs on the auth worker thread
+            self.login_btn.setEnabled(False)
+            self.login_btn.setText("Signing in...")
+            self.error_label.setVisible(False)
+            self._pending_login = get_auth_service().authenticate_async(username, password)
+            self._login_timer.start()
 
-                    if user and user.is_active and check_password(password, user.password_hash):
-                        self.user = user
-                        try:
-                            # Cache user credentials for offline access
-                            LocalAuthCache.cache_user_credentials(
-                                username,
-                                user.password_hash,
-                                user.is_admin,
-                                user.full_name
-                            )
-                        except Exception:
-                            pass
-                        app_logger.info(f"User {username} logged in from database")
-                        self.accept()
-                        return
-                finally:
-                    try:
-                        if sess is not None:
-                            sess.close()
-                    except Exception:
-                        pass
-            except Exception as e:
-                app_logger.warning(f"Server authentication failed: {str(e)}")
-            
-            # If server authentication fails, try local cache
-            if not user:
-                app_logger.info(f"Attempting local authentication for user: {username}")
-                local_user = LocalAuthCache.authenticate_locally(username, password)
-                
-                if local_user:
-                    # Create a temporary user object
-                    self.user = type('User', (), {
-                        'username': local_user['username'],
-                        'is_admin': local_user['is_admin'],
-                        'full_name': local_user['full_name'],
-                        'is_active': True,
-                        'authenticated_locally': True
-                    })()
-                    app_logger.info(f"User {username} logged in from local cache")
-                    self.accept()
-                    return
-                else:
-                    self.show_error("Invalid username or password")
-            else:
-                if not user.is_active:
-                    self.show_error("Account is disabled")
-                else:
-                    self.show_error("Invalid password")
-            
-            self.password_input.clear()
-            self.username_input.selectAll()
+        except Exception as e:
+            app_logger.error(f"Login error: {str(e)}")
+            self.show_error(f"Login failed: {str(e)}")
+
+    def _check_login_result(self):
+        future = self._pending_login
+        if future is None or not future.done():
+            return
+        self._login_timer.stop()
+        self._pending_login = None
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText("🚪 Login")
 
+        try:
+            result = future.result()
         except Exception as e:
             app_logger.error(f"Login error: {str(e)}")
             self.show_error(f"Login failed: {str(e)}")
+            return
+
+        if result.ok:
+            self.user = result.user
+            self.session_token = result.token
+            app_logger.info(f"User {result.user.username} logged in from {result.source}")
+            self.accept()
+            return
+
+        self.show_error(result.error or "Invalid username or password")
+        self.password_input.clear()
+        self.username_input.selectAll()
 
     def show_error(self, message):
         self.error_label.setText(message)
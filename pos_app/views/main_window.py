@@ -3,14 +3,14 @@ try:
         QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
         QPushButton, QLabel, QStackedWidget, QFrame, QMessageBox, QScrollArea, QDialog
     )
-    from PySide6.QtGui import QFont, QIcon
+    from PySide6.QtGui import QFont, QIcon, QShortcut, QKeySequence
     from PySide6.QtCore import Qt, QTimer
 except ImportError:
     from PyQt6.QtWidgets import (
         QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
         QPushButton, QLabel, QStackedWidget, QFrame, QMessageBox, QScrollArea, QDialog
     )
-    from PyQt6.QtGui import QFont, QIcon
+    from PyQt6.QtGui import QFont, QIcon, QShortcut, QKeySequence
     from PyQt6.QtCore import Qt, QTimer
 
 # Import Qt enums compatibility module
@@ -30,10 +30,11 @@ from pos_app.views.purchases import PurchasesWidget
 from pos_app.views.finance_dashboard import FinanceDashboardWidget
 from pos_app.views.ai_assistant import AIAssistantPage
 class MainWindow(QMainWindow):
-    def __init__(self, controllers, current_user=None):
+    def __init__(self, controllers, current_user=None, session_token=None):
         super().__init__()
         self.controllers = controllers
         self.current_user = current_user  # Store the logged-in user
+        self.session_token = session_token  # Lets the lock screen unlock without a KDF round
         self.responsive = get_responsive_manager()
         # Ensure clean transaction state at startup
         for name, controller in controllers.items():
@@ -243,6 +244,11 @@ class MainWindow(QMainWindow):
         # Connect all signals
         self._connect_signals()
 
+        # Ctrl+L locks the till until the cashier re-enters their password
+        if self.session_token:
+            self.lock_shortcut = QShortcut(QKeySequence("Ctrl+L"), self)
+            self.lock_shortcut.activated.connect(self.lock_screen)
+
         try:
             if hasattr(self.settings, 'db_connection_changed'):
                 self.settings.db_connection_changed.connect(self._on_db_connection_changed)
@@ -263,6 +269,18 @@ class MainWindow(QMainWindow):
             pass
         return None
 
+    def lock_screen(self):
+        """Hide the till behind the lock screen until the signed-in cashier unlocks it"""
+        from pos_app.views.lock_screen import LockScreenDialog
+
+        self.stacked_widget.setVisible(False)
+        try:
+            dialog = LockScreenDialog(self.current_user, self.session_token, self)
+            dialog.exec()
+            self.session_token = dialog.token
+        finally:
+            self.stacked_widget.setVisible(True)
+
     def _navigate(self, widget):
         # Rollback all sessions before navigation to ensure clean state
         for name, controller in self.controllers.items():
@@ -275,6 +293,13 @@ class MainWindow(QMainWindow):
         # Simple navigation - just switch to the widget
         self.stacked_widget.setCurrentWidget(widget)
 
+        # Queue a last_activity timestamp (written in batches by the auth service)
+        try:
+            from pos_app.utils.auth_service import get_auth_service
+            get_auth_service().record_activity(self.current_user)
+        except Exception:
+            pass
+
         # Refresh dynamic views when navigating to them
         try:
             if widget is self.purchases and hasattr(self.purchases, 'load_purchases'):
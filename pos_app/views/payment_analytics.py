@@ -319,6 +319,10 @@ class PaymentAnalyticsWidget(QWidget):
                 Sale.sale_date >= date_from,
                 Sale.sale_date < date_to
             ).all()
+            # Closed fiscal years moved out by the archiver (date_to is exclusive)
+            from pos_app.database.archive import archived_rows
+            sales += [s for s in archived_rows(self.controller.session, 'sales', date_from, date_to)
+                      if s.sale_date is not None and s.sale_date.date() < date_to]
             
             # Calculate payment method statistics
             payment_stats = {}
@@ -356,7 +360,7 @@ class PaymentAnalyticsWidget(QWidget):
             self.update_payment_table(payment_stats, total_amount)
             
             # Update customer preferences table
-            self.update_customer_table(sales)
+            self.update_customer_table(date_from, date_to)
             
         except Exception as e:
             print(f"Error loading payment analytics: {e}")
@@ -404,60 +408,27 @@ class PaymentAnalyticsWidget(QWidget):
         
         self.payment_table.resizeColumnsToContents()
         
-    def update_customer_table(self, sales):
+    def update_customer_table(self, date_from, date_to):
         """Update customer payment preferences table"""
         
         try:
-            from pos_app.models.database import Customer
+            from pos_app.utils.sales_stats import SalesStats
             
-            # Group sales by customer
-            customer_data = {}
-            
-            for sale in sales:
-                customer_id = sale.customer_id
-                if not customer_id:
-                    continue
-                    
-                if customer_id not in customer_data:
-                    customer_data[customer_id] = {
-                        'payments': {},
-                        'total_spent': 0,
-                        'last_transaction': sale.sale_date,
-                        'customer': None
-                    }
-                
-                # Track payment methods
-                method = sale.payment_method or 'CASH'
-                if method not in customer_data[customer_id]['payments']:
-                    customer_data[customer_id]['payments'][method] = 0
-                customer_data[customer_id]['payments'][method] += 1
-                
-                # Track spending
-                customer_data[customer_id]['total_spent'] += sale.total_amount or 0
-                
-                # Track last transaction
-                if sale.sale_date > customer_data[customer_id]['last_transaction']:
-                    customer_data[customer_id]['last_transaction'] = sale.sale_date
-            
-            # Get customer details
-            for customer_id in customer_data.keys():
-                customer = self.controller.session.query(Customer).filter_by(id=customer_id).first()
-                if customer:
-                    customer_data[customer_id]['customer'] = customer
+            # Per-customer, per-method counters for the period (date_to is exclusive)
+            customer_data = SalesStats(self.controller.session).payment_preferences(
+                date_from, date_to, end_exclusive=True
+            )
             
             # Update table
-            valid_customers = [data for data in customer_data.values() if data['customer']]
-            self.customer_table.setRowCount(len(valid_customers))
+            self.customer_table.setRowCount(len(customer_data))
             
-            for row, data in enumerate(valid_customers):
-                customer = data['customer']
-                
+            for row, data in enumerate(customer_data.values()):
                 # Customer name
-                name_item = QTableWidgetItem(customer.name)
+                name_item = QTableWidgetItem(data['name'] or "")
                 self.customer_table.setItem(row, 0, name_item)
                 
                 # Preferred payment method (most used)
-                preferred_method = max(data['payments'].items(), key=lambda x: x[1])[0] if data['payments'] else 'CASH'
+                preferred_method = max(data['methods'].items(), key=lambda x: x[1])[0] if data['methods'] else 'CASH'
                 method_item = QTableWidgetItem(f"{self.get_payment_icon(preferred_method)} {preferred_method}")
                 self.customer_table.setItem(row, 1, method_item)
                 
@@ -467,7 +438,8 @@ class PaymentAnalyticsWidget(QWidget):
                 self.customer_table.setItem(row, 2, spent_item)
                 
                 # Last transaction
-                last_item = QTableWidgetItem(data['last_transaction'].strftime("%Y-%m-%d"))
+                last = data['last_transaction']
+                last_item = QTableWidgetItem(last.strftime("%Y-%m-%d") if last else "")
                 last_item.setTextAlignment(Qt.AlignCenter)
                 self.customer_table.setItem(row, 3, last_item)
             
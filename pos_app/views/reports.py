@@ -18,6 +18,7 @@ except ImportError:
     from PyQt6.QtGui import QPixmap
 from pos_app.utils.document_generator import DocumentGenerator
 from pos_app.utils.logger import app_logger
+from pos_app.utils.money import to_paisa, from_paisa
 
 class ReportsWidget(QWidget):
     def __init__(self, controllers):
@@ -233,6 +234,21 @@ class ReportsWidget(QWidget):
                 Sale.sale_date >= start_datetime,
                 Sale.sale_date <= end_datetime
             ).order_by(Sale.sale_date.desc()).all()
+
+            # Include sales of archived fiscal years in the range
+            archived_items = {}
+            try:
+                from pos_app.database.archive import archived_rows, archived_children
+                archived_sales = archived_rows(controller.session, 'sales', start_datetime, end_datetime)
+                if archived_sales:
+                    product_names = dict(controller.session.query(Product.id, Product.name).all())
+                    for it in archived_children(controller.session, 'sale_items', 'sale_id',
+                                                [s.id for s in archived_sales], {s.archived_fy for s in archived_sales}):
+                        archived_items.setdefault(it.sale_id, []).append((it, product_names.get(it.product_id)))
+                    sales_query = sorted(list(sales_query) + archived_sales,
+                                         key=lambda s: getattr(s, 'sale_date', None) or datetime.min, reverse=True)
+            except Exception:
+                app_logger.exception("Failed to read archived sales")
             
             # Build table with product names from SaleItems
             table = self.sales_report.findChild(QTableWidget)
@@ -241,14 +257,17 @@ class ReportsWidget(QWidget):
             
             # Flatten sales to show one row per product sold
             rows = []
-            product_quantities = {}  # Track quantities by product for most/least sold
-            total_sales_amount = 0.0
+            total_sales_paisa = 0  # exact running total in paisa
             
             for s in sales_query:
-                items = controller.session.query(SaleItem, Product).join(Product).filter(SaleItem.sale_id == s.id).all()
+                if isinstance(s, Sale):
+                    items = controller.session.query(SaleItem, Product).join(Product).filter(SaleItem.sale_id == s.id).all()
+                    items = [(sale_item, product.name if product else None) for sale_item, product in items]
+                else:
+                    items = archived_items.get(s.id, [])
                 if items:
-                    for sale_item, product in items:
-                        product_name = product.name if product else 'Unknown'
+                    for sale_item, product_name in items:
+                        product_name = product_name or 'Unknown'
                         quantity = getattr(sale_item, 'quantity', 0)
                         amount = getattr(sale_item, 'total', 0.0)
                         try:
@@ -266,10 +285,7 @@ class ReportsWidget(QWidget):
                             'amount': amount,
                             'invoice': (f"REFUND {getattr(s, 'invoice_number', '')}" if getattr(s, 'is_refund', False) else getattr(s, 'invoice_number', ''))
                         })
-                        
-                        # Track product quantities
-                        product_quantities[product_name] = product_quantities.get(product_name, 0) + quantity
-                        total_sales_amount += amount
+                        total_sales_paisa += to_paisa(amount)
                 else:
                     # No items, show just the sale
                     amount = getattr(s, 'total_amount', 0.0)
@@ -285,7 +301,7 @@ class ReportsWidget(QWidget):
                         'amount': amount,
                         'invoice': (f"REFUND {getattr(s, 'status', '')}" if getattr(s, 'is_refund', False) else getattr(s, 'status', ''))
                     })
-                    total_sales_amount += amount
+                    total_sales_paisa += to_paisa(amount)
             
             table.setRowCount(len(rows))
             for i, row in enumerate(rows):
@@ -295,20 +311,23 @@ class ReportsWidget(QWidget):
                 table.setItem(i, 3, QTableWidgetItem(f"Rs {float(row['amount']):.2f}"))
                 table.setItem(i, 4, QTableWidgetItem(row['invoice']))
             
-            # Calculate metrics
+            total_sales_amount = from_paisa(total_sales_paisa)
+
+            # Calculate metrics from the daily sales counters
             most_sold_product = ""
             most_sold_qty = 0
             least_sold_product = ""
-            least_sold_qty = float('inf')
+            least_sold_qty = 0
             total_products_sold = 0
             
-            if product_quantities:
-                # Find most sold
-                most_sold_product, most_sold_qty = max(product_quantities.items(), key=lambda x: x[1])
-                # Find least sold
-                least_sold_product, least_sold_qty = min(product_quantities.items(), key=lambda x: x[1])
-                # Total products sold
-                total_products_sold = sum(product_quantities.values())
+            from pos_app.utils.sales_stats import SalesStats
+            stats = SalesStats(controller.session)
+            most = stats.top_products(start_datetime, end_datetime, limit=1)
+            if most:
+                least = stats.top_products(start_datetime, end_datetime, limit=1, ascending=True)
+                most_sold_product, most_sold_qty = most[0]['name'], most[0]['net_quantity']
+                least_sold_product, least_sold_qty = least[0]['name'], least[0]['net_quantity']
+                total_products_sold = stats.product_totals(start_datetime, end_datetime)['net_quantity']
             
             # Update summary cards
             try:
@@ -572,23 +591,23 @@ class ReportsWidget(QWidget):
     def generate_payables_report(self):
         try:
             controller = self.controllers.get('reports') if isinstance(self.controllers, dict) else self.controllers
-            suppliers = controller.get_payables_report() if hasattr(controller, 'get_payables_report') else []
             # Use dedicated payables_report table
             table = self.payables_report.findChild(QTableWidget)
             if table is None:
                 return
-            table.setRowCount(len(suppliers))
-            from pos_app.models.database import Purchase
-            for i, s in enumerate(suppliers):
+            from pos_app.controllers.supplier_balances import SupplierBalanceService
+            payables = SupplierBalanceService(controller.session).get_payables(only_outstanding=False)
+            table.setColumnCount(8)
+            table.setHorizontalHeaderLabels(["Supplier", "Contact", "Email", "Outstanding", "Current", "30-60 Days Past Due", "60-90 Days Past Due", "90+ Days Past Due"])
+            table.setRowCount(len(payables))
+            for i, (s, bal) in enumerate(payables):
                 table.setItem(i, 0, QTableWidgetItem(str(getattr(s, 'name', '') or '')))
                 table.setItem(i, 1, QTableWidgetItem(str(getattr(s, 'contact', '') or '')))
                 table.setItem(i, 2, QTableWidgetItem(str(getattr(s, 'email', '') or '')))
-                try:
-                    purchases = controller.session.query(Purchase).filter(Purchase.supplier_id == s.id).all()
-                    outstanding = sum((p.total_amount or 0.0) - (p.paid_amount or 0.0) for p in purchases)
-                    table.setItem(i, 3, QTableWidgetItem(f"Rs {outstanding:,.2f}"))
-                except Exception:
-                    table.setItem(i, 3, QTableWidgetItem("Rs 0.00"))
-                table.setItem(i, 4, QTableWidgetItem(""))
+                table.setItem(i, 3, QTableWidgetItem(f"Rs {bal['outstanding']:,.2f}"))
+                table.setItem(i, 4, QTableWidgetItem(f"Rs {bal['current']:,.2f}"))
+                table.setItem(i, 5, QTableWidgetItem(f"Rs {bal['days_30']:,.2f}"))
+                table.setItem(i, 6, QTableWidgetItem(f"Rs {bal['days_60']:,.2f}"))
+                table.setItem(i, 7, QTableWidgetItem(f"Rs {bal['days_90_plus']:,.2f}"))
         except Exception:
             app_logger.exception("Failed to generate payables report")
@@ -21,6 +21,48 @@ except ImportError:
     from PyQt6.QtGui import QFont, QColor
 from datetime import datetime, timedelta
 from decimal import Decimal
+from pos_app.utils.ui_styles import set_variant
+
+class ProductPicker(QComboBox):
+    """Editable product combo filled from the shared ProductIndex as the user types"""
+    
+    MAX_RESULTS = 50
+    
+    def __init__(self, index, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.NoInsert)
+        self.lineEdit().setPlaceholderText("Search name, SKU or barcode...")
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(150)
+        self._timer.timeout.connect(self._search)
+        self.lineEdit().textEdited.connect(lambda _: self._timer.start())
+        self._search()
+    
+    def _search(self):
+        text = self.lineEdit().text()
+        try:
+            matches = self.index.search(text, limit=self.MAX_RESULTS)
+        except Exception as e:
+            print(f"Error searching products: {e}")
+            matches = []
+        self.blockSignals(True)
+        self.clear()
+        for snap in matches:
+            label = f"{snap.name} ({snap.sku})" if snap.sku else snap.name
+            self.addItem(label, snap.id)
+        self.setCurrentIndex(-1)
+        self.lineEdit().setText(text)
+        self.blockSignals(False)
+        if matches and text:
+            self.showPopup()
+    
+    def current_product(self):
+        product_id = self.currentData()
+        return self.index.get(product_id) if product_id is not None else None
+
 
 class ReturnsWidget(QWidget):
     """Main returns management widget"""
@@ -205,7 +247,7 @@ class ReturnsWidget(QWidget):
     def load_returns(self):
         """Load returns from database"""
         try:
-            from pos_app.models.database import Return, ReturnItem, Product
+            from pos_app.controllers.returns import ReturnsService
             
             controller = self.controllers.get('returns') if isinstance(self.controllers, dict) else self.controllers
             
@@ -216,70 +258,56 @@ class ReturnsWidget(QWidget):
             # Get status filter
             status_filter = self.status_filter.currentText()
             
-            # Query returns
-            query = controller.session.query(Return).filter(
-                Return.return_date >= datetime.combine(start_date, datetime.min.time()),
-                Return.return_date <= datetime.combine(end_date, datetime.max.time())
+            # One query with customer names and item counts
+            returns = ReturnsService(controller.session).list_returns(
+                datetime.combine(start_date, datetime.min.time()),
+                datetime.combine(end_date, datetime.max.time()),
+                status=None if status_filter == "All" else status_filter
             )
             
-            if status_filter != "All":
-                query = query.filter(Return.status == status_filter)
-            
-            returns = query.all()
-            
             # Populate table
             self.returns_table.setRowCount(len(returns))
             
             for i, ret in enumerate(returns):
                 # Return number
-                self.returns_table.setItem(i, 0, QTableWidgetItem(ret.return_number))
+                self.returns_table.setItem(i, 0, QTableWidgetItem(ret['return_number']))
                 
                 # Date
-                date_str = ret.return_date.strftime("%Y-%m-%d") if ret.return_date else ""
+                date_str = ret['return_date'].strftime("%Y-%m-%d") if ret['return_date'] else ""
                 self.returns_table.setItem(i, 1, QTableWidgetItem(date_str))
                 
                 # Customer
-                customer_name = ret.customer.name if ret.customer else "Unknown"
-                self.returns_table.setItem(i, 2, QTableWidgetItem(customer_name))
+                self.returns_table.setItem(i, 2, QTableWidgetItem(ret['customer_name']))
                 
                 # Items count
-                items_count = len(ret.items) if ret.items else 0
-                self.returns_table.setItem(i, 3, QTableWidgetItem(str(items_count)))
+                self.returns_table.setItem(i, 3, QTableWidgetItem(str(ret['items_count'])))
                 
                 # Refund amount
-                refund_item = QTableWidgetItem(f"Rs {ret.refund_amount:,.2f}")
+                refund_item = QTableWidgetItem(f"Rs {ret['refund_amount']:,.2f}")
                 refund_item.setTextAlignment(Qt.AlignRight)
                 self.returns_table.setItem(i, 4, refund_item)
                 
                 # Status with color
-                status_item = QTableWidgetItem(ret.status.value)
-                if ret.status.value == "COMPLETED":
+                status = ret['status'] or ""
+                status_item = QTableWidgetItem(status)
+                if status == "COMPLETED":
                     status_item.setForeground(QColor("#10b981"))
-                elif ret.status.value == "APPROVED":
+                elif status == "APPROVED":
                     status_item.setForeground(QColor("#3b82f6"))
-                elif ret.status.value == "REJECTED":
+                elif status == "REJECTED":
                     status_item.setForeground(QColor("#ef4444"))
-                elif ret.status.value == "PENDING":
+                elif status == "PENDING":
                     status_item.setForeground(QColor("#f59e0b"))
                 self.returns_table.setItem(i, 5, status_item)
                 
                 # Reason
-                reason = ret.reason or "-"
+                reason = ret['reason'] or "-"
                 self.returns_table.setItem(i, 6, QTableWidgetItem(reason))
                 
                 # Actions (view button)
                 view_btn = QPushButton("View")
-                view_btn.setStyleSheet("""
-                    QPushButton {
-                        background: #64748b;
-                        color: white;
-                        border: none;
-                        padding: 4px 12px;
-                        border-radius: 4px;
-                        font-size: 12px;
-                    }
-                """)
-                view_btn.clicked.connect(lambda checked, ret_id=ret.id: self._view_return(ret_id))
+                set_variant(view_btn, 'row-secondary')
+                view_btn.clicked.connect(lambda checked, ret_id=ret['id']: self._view_return(ret_id))
                 self.returns_table.setCellWidget(i, 7, view_btn)
         
         except Exception as e:
@@ -519,9 +547,8 @@ class NewReturnDialog(QDialog):
         row = self.items_table.rowCount()
         self.items_table.insertRow(row)
         
-        # Product combo
-        product_combo = QComboBox()
-        self._load_products_into_combo(product_combo)
+        # Product picker (type to search the shared product index)
+        product_combo = ProductPicker(self._product_index())
         self.items_table.setCellWidget(row, 0, product_combo)
         
         # SKU (read-only)
@@ -538,32 +565,32 @@ class NewReturnDialog(QDialog):
         # Unit price
         price_spinbox = QDoubleSpinBox()
         price_spinbox.setMinimum(0)
+        price_spinbox.setMaximum(10000000)
         price_spinbox.setDecimals(2)
         self.items_table.setCellWidget(row, 3, price_spinbox)
         
+        # Fill SKU and price from the picked product
+        def _picked(_index, combo=product_combo, sku=sku_item, price=price_spinbox):
+            snap = combo.current_product()
+            if snap is not None:
+                sku.setText(snap.sku or "")
+                price.setValue(float(snap.retail_price or 0.0))
+        product_combo.activated.connect(_picked)
+        
         # Remove button
         remove_btn = QPushButton("🗑️")
         remove_btn.clicked.connect(lambda: self.items_table.removeRow(row))
         self.items_table.setCellWidget(row, 4, remove_btn)
     
-    def _load_products_into_combo(self, combo):
-        """Load products into combo"""
-        try:
-            from pos_app.models.database import Product
-            
-            controller = self.controllers.get('returns') if isinstance(self.controllers, dict) else self.controllers
-            products = controller.session.query(Product).filter(Product.is_active == True).all()
-            
-            for product in products:
-                combo.addItem(product.name, product.id)
-        
-        except Exception as e:
-            print(f"Error loading products: {e}")
+    def _product_index(self):
+        from pos_app.utils.scanner import get_product_index
+        controller = self.controllers.get('returns') if isinstance(self.controllers, dict) else self.controllers
+        return get_product_index(controller.session)
     
     def _save_return(self):
         """Save the return"""
         try:
-            from pos_app.models.database import Return, ReturnItem, ReturnStatus, Customer, Product
+            from pos_app.controllers.returns import ReturnsService, ReturnError
             from pos_app.database.db_utils import get_db_session
             
             customer_id = self.customer_combo.currentData()
@@ -578,43 +605,24 @@ class NewReturnDialog(QDialog):
                 QMessageBox.warning(self, "Error", "Please add at least one item!")
                 return
             
+            items = []
+            for row in range(self.items_table.rowCount()):
+                product_combo = self.items_table.cellWidget(row, 0)
+                qty_spinbox = self.items_table.cellWidget(row, 2)
+                price_spinbox = self.items_table.cellWidget(row, 3)
+                items.append({
+                    'product_id': product_combo.currentData(),
+                    'quantity': qty_spinbox.value(),
+                    'unit_price': price_spinbox.value(),
+                })
+            
             with get_db_session() as session:
-                # Generate return number
-                last_return = session.query(Return).order_by(Return.id.desc()).first()
-                return_num = f"RET-{(last_return.id + 1) if last_return else 1:06d}"
-                
-                # Create return
-                ret = Return(
-                    return_number=return_num,
-                    customer_id=customer_id,
-                    reason=reason,
-                    notes=notes,
-                    status=ReturnStatus.PENDING
-                )
-                session.add(ret)
-                session.flush()
-                
-                # Add items
-                for row in range(self.items_table.rowCount()):
-                    product_combo = self.items_table.cellWidget(row, 0)
-                    qty_spinbox = self.items_table.cellWidget(row, 2)
-                    price_spinbox = self.items_table.cellWidget(row, 3)
-                    
-                    product_id = product_combo.currentData()
-                    quantity = qty_spinbox.value()
-                    unit_price = price_spinbox.value()
-                    
-                    item = ReturnItem(
-                        return_id=ret.id,
-                        product_id=product_id,
-                        quantity=quantity,
-                        unit_price=unit_price,
-                        total=quantity * unit_price
-                    )
-                    session.add(item)
-                
-                session.commit()
-                QMessageBox.information(self, "Success", f"Return {return_num} created!")
+                try:
+                    ret = ReturnsService(session).create_return(customer_id, items, reason=reason, notes=notes)
+                except ReturnError as e:
+                    QMessageBox.warning(self, "Error", str(e))
+                    return
+                QMessageBox.information(self, "Success", f"Return {ret.return_number} created!")
                 self.accept()
         
         except Exception as e:
@@ -689,66 +697,23 @@ class CompleteReturnDialog(QDialog):
     def _complete_refund(self):
         """Complete the refund"""
         try:
-            from pos_app.models.database import Return, ReturnStatus, PaymentMethod
+            from pos_app.controllers.returns import ReturnsService, ReturnError
             from pos_app.database.db_utils import get_db_session
-            from pos_app.controllers.business_logic import BusinessController
             
             refund_method = self.refund_method.currentText()
             notes = self.refund_notes.toPlainText()
             
-            total_refund = sum(item.total for item in self.return_obj.items) if self.return_obj.items else 0
-            
             with get_db_session() as session:
-                ret = session.query(Return).filter(Return.id == self.return_obj.id).first()
-                if ret:
-                    try:
-                        if getattr(ret, 'status', None) == ReturnStatus.COMPLETED:
-                            QMessageBox.information(self, "Already Completed", f"Return {ret.return_number} is already completed.")
-                            self.accept()
-                            return
-                    except Exception:
-                        pass
-
-                    # Increase stock for each returned item
-                    try:
-                        bc = BusinessController(session)
-                        try:
-                            from pos_app.models.database import InventoryLocation
-                            loc = InventoryLocation.RETAIL
-                        except Exception:
-                            loc = None
-
-                        for it in (getattr(ret, 'items', None) or []):
-                            try:
-                                pid = getattr(it, 'product_id', None)
-                                qty = getattr(it, 'quantity', 0)
-                                if pid is None:
-                                    continue
-                                if qty is None:
-                                    continue
-                                bc.update_stock(
-                                    pid,
-                                    qty,
-                                    movement_type='IN',
-                                    reference=f"Return {getattr(ret, 'return_number', '')}",
-                                    location=loc,
-                                    commit=False
-                                )
-                            except Exception:
-                                # Do not partially complete: bubble up to rollback
-                                raise
-                    except Exception as e:
-                        session.rollback()
-                        raise Exception(f"Failed to update stock for return: {e}")
-
-                    ret.status = ReturnStatus.COMPLETED
-                    ret.refund_amount = total_refund
-                    ret.refund_method = PaymentMethod[refund_method]
-                    ret.notes = notes
-                    session.commit()
-                    
-                    QMessageBox.information(self, "Success", f"Return {ret.return_number} completed! Refund: Rs {total_refund:,.2f}")
+                try:
+                    # Stock for every item is restored with one bulk update, in the same transaction
+                    ret = ReturnsService(session).complete_return(self.return_obj.id, refund_method, notes)
+                except ReturnError as e:
+                    QMessageBox.information(self, "Return", str(e))
                     self.accept()
+                    return
+                
+                QMessageBox.information(self, "Success", f"Return {ret.return_number} completed! Refund: Rs {ret.refund_amount:,.2f}")
+                self.accept()
         
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to complete return: {e}")
@@ -7,7 +7,7 @@ try:
         QSplitter, QGroupBox, QFormLayout, QSpinBox, QDateTimeEdit, QListWidget, QListWidgetItem,
         QAbstractItemView
     )
-    from PySide6.QtCore import Qt, QTimer, QUrl, QSizeF, QMarginsF, QPoint, QDateTime, QEvent
+    from PySide6.QtCore import Qt, QTimer, QUrl, QSizeF, QMarginsF, QPoint, QDateTime, QEvent, Signal
     from PySide6.QtGui import (
         QFont, QDesktopServices, QPageSize, QPageLayout, QPainter,
         QShortcut, QKeySequence, QFontMetrics, QPixmap, QPixmapCache,
@@ -23,7 +23,7 @@ except ImportError:
         QSplitter, QGroupBox, QFormLayout, QSpinBox, QDateTimeEdit, QListWidget, QListWidgetItem,
         QAbstractItemView
     )
-    from PyQt6.QtCore import Qt, QTimer, QUrl, QSizeF, QMarginsF, QPoint, QDateTime, QEvent
+    from PyQt6.QtCore import Qt, QTimer, QUrl, QSizeF, QMarginsF, QPoint, QDateTime, QEvent, pyqtSignal as Signal
     from PyQt6.QtGui import (
         QFont, QDesktopServices, QPageSize, QPageLayout, QPainter,
         QShortcut, QKeySequence, QFontMetrics, QPixmap, QPixmapCache,
@@ -34,6 +34,11 @@ import os
 import time
 from datetime import datetime
 from pos_app.utils.document_generator import DocumentGenerator
+from pos_app.utils.receipt_spooler import get_receipt_spooler, configured_receipt_target, configured_business_info
+from pos_app.utils.cart import Cart
+from pos_app.utils.pricing import get_pricing_engine
+from pos_app.utils.scanner import get_product_index, ScanBurstDetector, ScanDispatcher, ScannedCode, ScannerPipeline
+from pos_app.utils.ui_styles import set_variant, timed
 try:
     from PySide6.QtCore import QSettings
 except ImportError:
@@ -291,6 +296,16 @@ class ReceiptPreviewDialog(QDialog):
             width_mm = int(settings.value("receipt_width_mm", 80) or 80)  # Default to 80mm
             margin_mm = int(settings.value("receipt_margin_mm", 3) or 3)  # Reduced margin for 80mm
 
+            # Raw ESC/POS printer configured: queue the receipt and return immediately
+            raw_target = configured_receipt_target()
+            if raw_target:
+                sd = dict(self.sale_data) if isinstance(self.sale_data, dict) else {}
+                sd['business_info'] = configured_business_info(sd.get('business_info'))
+                chars = 32 if width_mm <= 58 else 42
+                job = get_receipt_spooler().submit_receipt(sd, raw_target, width=chars)
+                app_logger.info(f"Receipt queued (job {job.id}) for: {raw_target}")
+                return
+
             # Calculate dynamic height based on content
             item_count = len(self.sale_data.get('items', []))
             height_mm = max(120, 80 + item_count * 6 + 30)
@@ -604,20 +619,34 @@ class ReceiptPreviewDialog(QDialog):
 
 
 class SalesWidget(QWidget):
+    # Emitted on the UI thread when the background spooler gives up on a receipt
+    print_job_failed = Signal(object)
+
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
-        self.current_cart = []
+        # Cart engine; the table redraws only the rows it reports as changed
+        self._cart = Cart()
+        self._cart.subscribe(self._on_cart_changed)
+        self._cart_dirty_rows = set()
+        self._cart_dirty_from = None
+        self._cart_full_redraw = True
+        self._cart_rendered_extra = None
         self.tax_rate = 8.0  # Default tax rate
         self.is_refund_mode = False
         self.refund_of_sale_id = None
         self._refund_source_sale = None
-        # Internal buffer for global barcode scanning (works even when barcode field not focused)
-        self._barcode_buffer = ""
         # Timestamp of last successful barcode add to suppress trailing Enter from scanners
         self._last_barcode_add_ts = 0.0
-        # Timestamp of last buffered barcode key to detect timeouts
-        self._barcode_last_ts = 0.0
+        # Scanner bursts are assembled from the key stream and go straight to the cart
+        try:
+            self._scanner = ScannerPipeline(
+                ScanBurstDetector(),
+                ScanDispatcher(get_product_index(self.controller.session), self._cart, wholesale=self.is_wholesale_selected),
+            )
+        except Exception as e:
+            app_logger.warning(f"Scanner pipeline unavailable: {e}")
+            self._scanner = None
         self.setup_ui()
         self.load_tax_rate()
         try:
@@ -656,6 +685,46 @@ class SalesWidget(QWidget):
         except (ImportError, AttributeError):
             pass
 
+        # Receipts print on the spooler thread; failures are forwarded here so the cashier sees them
+        self.print_job_failed.connect(self._on_print_job_failed)
+        get_receipt_spooler().add_listener(self._on_spool_status)
+        self.destroyed.connect(lambda *_: get_receipt_spooler().remove_listener(self._on_spool_status))
+
+    def _on_spool_status(self, job):
+        # Spooler worker thread: hand over to the UI thread through the signal
+        if job.status == 'FAILED':
+            self.print_job_failed.emit(job)
+
+    def _on_print_job_failed(self, job):
+        app_logger.error(f"Print job {job.id} failed after {job.attempts} attempt(s): {job.error}")
+        QMessageBox.warning(
+            self, "Receipt Not Printed",
+            f"{job.description or 'Receipt'} could not be printed after {job.attempts} attempt(s).\n\n"
+            f"{job.error or 'Printer error'}\n\nCheck the receipt printer and print the receipt again."
+        )
+
+    @property
+    def current_cart(self):
+        return self._cart
+
+    @current_cart.setter
+    def current_cart(self, items):
+        if items is not self._cart:
+            self._cart.reset(items or [])
+
+    def _on_cart_changed(self, event, row):
+        if event == 'updated':
+            self._cart_dirty_rows.add(row)
+        elif event in ('added', 'removed'):
+            self._cart_dirty_from = row if self._cart_dirty_from is None else min(self._cart_dirty_from, row)
+        else:
+            self._cart_full_redraw = True
+
+    def _refresh_cart_row(self, row):
+        """Redraw one row from the cart (e.g. to revert an invalid inline edit)"""
+        self._cart_dirty_rows.add(row)
+        self.update_cart_table()
+
     def _get_discount_amount_value(self) -> float:
         try:
             w = getattr(self, 'discount_amount', None)
@@ -672,6 +741,28 @@ class SalesWidget(QWidget):
             pass
         return 0.0
 
+    def load_promotions(self):
+        """Fill the promotion picker with the active Discount promotions"""
+        combo = getattr(self, 'promotion_combo', None)
+        if combo is None:
+            return
+        combo.blockSignals(True)
+        try:
+            combo.clear()
+            combo.addItem("No promotion", None)
+            for promo in get_pricing_engine().rules(self.controller.session).promotions:
+                combo.addItem(promo.name or f"Promotion #{promo.id}", promo.id)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not load promotions: {e}")
+        finally:
+            combo.blockSignals(False)
+
+    def _get_promotion_id(self):
+        combo = getattr(self, 'promotion_combo', None)
+        if combo is None or getattr(self, 'is_refund_mode', False):
+            return None
+        return combo.currentData()
+
     def _set_discount_amount_value(self, value: float):
         try:
             v = float(value or 0.0)
@@ -758,49 +849,20 @@ class SalesWidget(QWidget):
         return False
 
     def _calculate_totals(self):
-        try:
-            items_count = sum(float(item.get('quantity', 0) or 0) for item in (self.current_cart or []))
-        except Exception:
-            items_count = 0
-        try:
-            if getattr(self, 'is_refund_mode', False):
-                subtotal = sum(
-                    float(item.get('quantity', 0) or 0)
-                    * float(item.get('refund_unit_subtotal', item.get('price', 0.0)) or 0.0)
-                    for item in (self.current_cart or [])
-                )
-            else:
-                subtotal = sum(
-                    float(item.get('quantity', 0) or 0)
-                    * float(item.get('price', 0.0) or 0.0)
-                    for item in (self.current_cart or [])
-                )
-        except Exception:
-            subtotal = 0.0
-        try:
-            total_cost = sum(float(item.get('quantity', 0) or 0) * float(item.get('purchase_price', 0.0) or 0.0) for item in (self.current_cart or []))
-        except Exception:
-            total_cost = 0.0
-
-        discount = self._get_discount_amount_value()
-        try:
-            discount = min(float(discount or 0.0), float(subtotal or 0.0))
-        except Exception:
-            discount = 0.0
-
-        try:
-            taxable_amount = float(subtotal or 0.0) - float(discount or 0.0)
-        except Exception:
-            taxable_amount = 0.0
+        """(items_count, subtotal, total_cost, profit, discount, tax, total)
 
-        try:
-            tax = float(taxable_amount) * (float(getattr(self, 'tax_rate', 0.0) or 0.0) / 100.0)
-        except Exception:
-            tax = 0.0
-
-        total = float(taxable_amount) + float(tax or 0.0)
-        profit = float(subtotal or 0.0) - float(total_cost or 0.0)
-        return items_count, subtotal, total_cost, profit, discount, tax, total
+        Priced by the same PricingEngine.price_cart call as BusinessController.create_sale,
+        so the screen shows exactly what checkout records.
+        """
+        refund = bool(getattr(self, 'is_refund_mode', False))
+        self._cart.set_refund_mode(refund)
+        customer_id = self.customer_combo.currentData() if hasattr(self, 'customer_combo') else None
+        priced = get_pricing_engine().price_cart(
+            self._cart.pricing_lines(), customer_id=customer_id, manual_discount=self._get_discount_amount_value(),
+            apply_rules=not refund, promotion_id=self._get_promotion_id(), session=self.controller.session)
+        total_cost = self._cart.total_cost
+        return (self._cart.items_count, priced.subtotal, total_cost, priced.subtotal - total_cost,
+                priced.discount, priced.tax, priced.total)
 
     def setup_ui(self):
         """Create a completely modern, professional POS interface"""
@@ -2088,6 +2150,14 @@ class SalesWidget(QWidget):
 
         discount_layout.addWidget(discount_label)
         discount_layout.addWidget(self.discount_amount)
+
+        # Promotions only apply when picked here
+        self.promotion_combo = QComboBox()
+        self.promotion_combo.setToolTip("Promotion to apply to this sale")
+        self.load_promotions()
+        self.promotion_combo.currentIndexChanged.connect(self.update_totals)
+        self.promotion_combo.currentIndexChanged.connect(self.calculate_change)
+        discount_layout.addWidget(self.promotion_combo)
         col3.addLayout(discount_layout)
 
         # Change display
@@ -2875,68 +2945,6 @@ class SalesWidget(QWidget):
         except Exception as e:
             print(f"[DEBUG] Error in discount change: {e}")
 
-    def update_totals(self):
-        """Update all total labels in the interface"""
-        if not self.current_cart:
-            subtotal = discount = final_total = purchase_total = profit = amount_paid = change = 0.0
-        else:
-            # Calculate subtotal = sum(qty × sale_price)
-            subtotal = sum(item['quantity'] * item['price'] for item in self.current_cart)
-
-            # Get discount from the active discount widget (QDoubleSpinBox/QLineEdit)
-            try:
-                discount = float(self._get_discount_amount_value() or 0.0)
-            except Exception:
-                discount = 0.0
-            
-            # discount = min(discount, subtotal)  # cannot exceed subtotal
-            discount = min(discount, subtotal)
-            
-            # Calculate purchase_total = sum(qty × purchase_price)
-            purchase_total = sum(item['quantity'] * item.get('purchase_price', 0) for item in self.current_cart)
-            
-            # final_total = subtotal - discount
-            final_total = subtotal - discount
-            
-            # profit = final_total - purchase_total
-            profit = final_total - purchase_total
-
-        # Auto-increase amount_paid to match final_total when products are added
-        amount_paid_input = getattr(self, 'amount_paid_input', None)
-        if amount_paid_input:
-            try:
-                amount_paid = float(amount_paid_input.value())
-                # Always auto-increase amount_paid to match final_total when cart changes
-                if final_total > 0:
-                    amount_paid_input.setValue(final_total)
-                    amount_paid = final_total
-                elif amount_paid == 0 and final_total == 0:
-                    # Keep at 0 if cart is empty
-                    pass
-            except (ValueError, TypeError):
-                amount_paid = final_total if final_total > 0 else 0
-                amount_paid_input.setValue(amount_paid)
-        else:
-            amount_paid = final_total if final_total > 0 else 0
-        
-        # change = max(0, amount_paid - final_total)
-        change = max(0, amount_paid - final_total)
-        
-        # balance_due = max(0, final_total - amount_paid)
-        balance_due = max(0, final_total - amount_paid)
-
-        # Update UI labels
-        if hasattr(self, 'cart_subtotal_label'):
-            self.cart_subtotal_label.setText(f"Subtotal: Rs {subtotal:,.2f}")
-        if hasattr(self, 'cart_total_label'):
-            self.cart_total_label.setText(f"Final Total: Rs {final_total:,.2f}")
-        if hasattr(self, 'change_display'):
-            self.change_display.setText(f"Rs {change:,.2f}")
-        if hasattr(self, 'change_label'):
-            self.change_label.setText(f"Change to Give: Rs {change:,.2f}")
-        if hasattr(self, 'sales_card'):
-            self.sales_card.setText(f"Rs {final_total:,.2f}")
-
     def update_cart_profit_display(self):
         """Update profit display in cart table after discount changes"""
         try:
@@ -3129,6 +3137,10 @@ class SalesWidget(QWidget):
                 if cart_tbl is not None and cart_tbl.state() == QTableWidget.EditingState:
                     print(f"[DEBUG] Cart table is editing, allowing key {key}")
                     return False
+
+                # Scanner fast path (sees every key once, takes over Enter after a burst)
+                if self._scanner_key_event(obj, event):
+                    return True
                 
                 # If focus is on cart table or its viewport, allow normal typing/navigation (do not treat as barcode)
                 if obj is cart_tbl or (cart_tbl is not None and obj is cart_tbl.viewport()):
@@ -3806,22 +3818,12 @@ class SalesWidget(QWidget):
                         except Exception:
                             return True
                     
-                    # If not typing into a text input, try buffered barcode scan first
-                    if w not in text_inputs and getattr(self, '_barcode_buffer', ""):
-                        code = self._barcode_buffer.strip()
-                        self._barcode_buffer = ""
-                        if code:
-                            self.add_product_by_barcode(code)
-                            return True
-
                     # If focus is on search inputs, let their own returnPressed handlers run
                     # BUT consume the event to prevent sale completion
                     if w in (
                         getattr(self, 'product_search', None),
                         getattr(self, 'barcode_input', None),
                     ):
-                        # Set flag to prevent sale completion after search handler runs
-                        self._product_added_from_search = True
                         # IMPORTANT: Always return True to consume the event and prevent sale completion
                         return True
 
@@ -3836,38 +3838,15 @@ class SalesWidget(QWidget):
                     if getattr(self, '_editing_price', False):
                         return False
 
-                    # Prevent accidental completion immediately after a product was added from search
-                    if getattr(self, '_product_added_from_search', False):
-                        self._product_added_from_search = False
-                        return False
-
-                    # Prevent accidental completion immediately after a barcode add
-                    if getattr(self, '_barcode_just_added', False):
-                        self._barcode_just_added = False
-                        return False
-                    
-                    # Use a longer debounce time (1.5 seconds) to account for barcode scanner delays
-                    try:
-                        if (time.monotonic() - getattr(self, '_last_barcode_add_ts', 0.0)) < 1.5:
-                            return False
-                    except Exception:
-                        pass
-
+                    # A scanner's terminating Enter never gets here: the scanner pipeline consumes it.
                     # Only complete sale on Ctrl+Enter, not regular Enter
                     # Regular Enter should just be ignored
                     return False
 
-                # Build barcode buffer from printable characters when not typing into text inputs
-                if text and text.isprintable() and not text.isspace() and w not in text_inputs:
-                    now = time.monotonic()
-                    try:
-                        if (now - getattr(self, '_barcode_last_ts', 0.0)) > 0.35:
-                            # Timeout: start a new buffer
-                            self._barcode_buffer = ""
-                    except Exception:
-                        pass
-                    self._barcode_last_ts = now
-                    self._barcode_buffer += text
+                # Printable keys outside text inputs belong to the scanner pipeline
+                # (already recorded by _scanner_key_event); don't let them trigger shortcuts
+                if text and text.isprintable() and not text.isspace() and w not in text_inputs \
+                        and getattr(self, '_scanner', None) is not None:
                     return True
 
                 # Global Delete/Backspace handler for cart items
@@ -3898,6 +3877,79 @@ class SalesWidget(QWidget):
         except Exception:
             return super().eventFilter(obj, event)
 
+    def _scanner_key_event(self, obj, event) -> bool:
+        """Feed a key press to the scanner pipeline; True when it consumed a scan."""
+        scanner = getattr(self, '_scanner', None)
+        if scanner is None or not self.isVisible():
+            return False
+        try:
+            from PySide6.QtWidgets import QApplication as _QApplication
+        except ImportError:
+            from PyQt6.QtWidgets import QApplication as _QApplication
+        focus = _QApplication.focusWidget()
+        # The application filter sees a key once per receiver; only count it at the focus widget
+        if obj is not (focus or self.window()):
+            return False
+
+        try:
+            stamp = event.timestamp()
+            ts = stamp / 1000.0 if stamp else time.monotonic()
+        except Exception:
+            ts = time.monotonic()
+        key = event.key()
+        text = event.text() or ""
+
+        if key not in (Qt.Key_Return, Qt.Key_Enter):
+            if text and text.isprintable() and not text.isspace():
+                scanner.key(text, ts)
+            return False
+
+        scan_fields = (getattr(self, 'product_search', None), getattr(self, 'barcode_input', None))
+        in_scan_field = focus is not None and focus in scan_fields
+        other_input = focus is not None and not in_scan_field and isinstance(focus, (QLineEdit, QDoubleSpinBox, QSpinBox))
+        if (event.modifiers() & Qt.ControlModifier) or other_input or getattr(self, 'is_refund_mode', False):
+            # Invoice numbers, amounts and Ctrl+Enter keep their own handling
+            scanner.detector.reset()
+            return False
+
+        scanned = scanner.detector.enter(ts)
+        # Typed codes are accepted outside text fields (as before); in the search
+        # fields only real scanner bursts take the fast path
+        if scanned is None or not (scanned.burst or not in_scan_field):
+            return False
+
+        result = scanner.dispatcher.dispatch(scanned)
+        if result.status == 'not_found':
+            # Let the field's own Enter handling search names / load invoices
+            return not in_scan_field
+
+        if in_scan_field:
+            current = focus.text()
+            focus.setText(current[:-len(scanned.code)] if current.endswith(scanned.code) else "")
+            if hasattr(self, '_search_timer'):
+                self._search_timer.stop()
+            for lst in (getattr(self, 'search_suggestions_list', None), getattr(self, 'barcode_suggestions_list', None)):
+                if lst is not None:
+                    lst.clear()
+
+        self._apply_scan_result(result)
+        return True
+
+    def _apply_scan_result(self, result):
+        """Refresh the cart after a scanner dispatch, or warn when the product is out of stock."""
+        if result.ok:
+            self._last_barcode_add_ts = time.monotonic()
+            self.update_cart_table()
+            self.update_totals()
+            app_logger.debug(f"Scan {result.code} -> cart row {result.row} in {result.latency_ms:.1f} ms")
+        elif result.status == 'out_of_stock':
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Warning)
+            msg.setWindowTitle("Stock")
+            msg.setText("Insufficient stock for this product.")
+            msg.setStandardButtons(QMessageBox.Ok)
+            msg.exec()
+
     def keyPressEvent(self, event):
         """Handle keyboard navigation and shortcuts"""
         try:
@@ -4067,12 +4119,6 @@ class SalesWidget(QWidget):
                     event.ignore()
                     return
             
-            # Check if product was just added from search - prevent accidental sale
-            if getattr(self, '_product_added_from_search', False):
-                print("[DEBUG] Suppressing Enter after product added from search")
-                event.ignore()
-                return
-            
             fw = self.focusWidget()
             if fw is getattr(self, 'refund_invoice_input', None):
                 try:
@@ -4186,79 +4232,67 @@ class SalesWidget(QWidget):
                 # Fallback if created_at doesn't exist
                 products = self.controller.session.query(Product).order_by(Product.id.desc()).all()
 
+            # One repaint for the whole fill instead of one per cell
+            self.products_table.setUpdatesEnabled(False)
             self.products_table.setRowCount(len(products))
 
-            for row, product in enumerate(products):
-                # Product name (column 0)
-                name_item = QTableWidgetItem(getattr(product, 'name', ''))
-                self.products_table.setItem(row, 0, name_item)
-
-                # Barcode (column 1)
-                barcode_item = QTableWidgetItem(getattr(product, 'barcode', ''))
-                self.products_table.setItem(row, 1, barcode_item)
-
-                # Stock level with color coding
-                stock = getattr(product, 'stock_level', 0)
-                stock_item = QTableWidgetItem(str(stock))
+            # Styling the row buttons dominates big fills; recorded in STYLE_TIMINGS
+            with timed('sales.load_products'):
+                for row, product in enumerate(products):
+                    # Product name (column 0)
+                    name_item = QTableWidgetItem(getattr(product, 'name', ''))
+                    self.products_table.setItem(row, 0, name_item)
+
+                    # Barcode (column 1)
+                    barcode_item = QTableWidgetItem(getattr(product, 'barcode', ''))
+                    self.products_table.setItem(row, 1, barcode_item)
+
+                    # Stock level with color coding
+                    stock = getattr(product, 'stock_level', 0)
+                    stock_item = QTableWidgetItem(str(stock))
+
+                    # Set colors using proper methods
+                    from PySide6.QtGui import QFont, QColor
+                    font = QFont()
+                    font.setBold(True)
+                    stock_item.setFont(font)
+
+                    if stock <= 0:
+                        stock_item.setForeground(QColor("#ef4444"))  # Red for out of stock
+                    elif stock <= getattr(product, 'reorder_level', 5):
+                        stock_item.setForeground(QColor("#f59e0b"))  # Orange for low stock
+                    else:
+                        stock_item.setForeground(QColor("#10b981"))  # Green for good stock
 
-                # Set colors using proper methods
-                from PySide6.QtGui import QFont, QColor
-                font = QFont()
-                font.setBold(True)
-                stock_item.setFont(font)
+                    self.products_table.setItem(row, 2, stock_item)
 
-                if stock <= 0:
-                    stock_item.setForeground(QColor("#ef4444"))  # Red for out of stock
-                elif stock <= getattr(product, 'reorder_level', 5):
-                    stock_item.setForeground(QColor("#f59e0b"))  # Orange for low stock
-                else:
-                    stock_item.setForeground(QColor("#10b981"))  # Green for good stock
+                    # Retail price
+                    retail_price = getattr(product, 'retail_price', 0)
+                    try:
+                        retail_item = QTableWidgetItem(f"Rs {float(retail_price):,.2f}")
+                    except:
+                        retail_item = QTableWidgetItem("Rs 0.00")
+                    self.products_table.setItem(row, 3, retail_item)
 
-                self.products_table.setItem(row, 2, stock_item)
+                    # Wholesale price
+                    wholesale_price = getattr(product, 'wholesale_price', 0)
+                    try:
+                        wholesale_item = QTableWidgetItem(f"Rs {float(wholesale_price):,.2f}")
+                    except:
+                        wholesale_item = QTableWidgetItem("Rs 0.00")
+                    self.products_table.setItem(row, 4, wholesale_item)
 
-                # Retail price
-                retail_price = getattr(product, 'retail_price', 0)
-                try:
-                    retail_item = QTableWidgetItem(f"Rs {float(retail_price):,.2f}")
-                except:
-                    retail_item = QTableWidgetItem("Rs 0.00")
-                self.products_table.setItem(row, 3, retail_item)
-
-                # Wholesale price
-                wholesale_price = getattr(product, 'wholesale_price', 0)
-                try:
-                    wholesale_item = QTableWidgetItem(f"Rs {float(wholesale_price):,.2f}")
-                except:
-                    wholesale_item = QTableWidgetItem("Rs 0.00")
-                self.products_table.setItem(row, 4, wholesale_item)
-
-                # Add to cart button
-                add_btn = QPushButton("➕ Add")
-                add_btn.setStyleSheet("""
-                    QPushButton {
-                        background: #3b82f6;
-                        color: Qt.white;
-                        border: none;
-                        border-radius: 6px;
-                        padding: 6px 12px;
-                        font-size: 12px;
-                        font-weight: 500;
-                        min-width: 60px;
-                    }
-                    QPushButton:hover {
-                        background: #2563eb;
-                        color: Qt.white;
-                    }
-                    QPushButton:pressed {
-                        background: #1d4ed8;
-                        color: Qt.white;
-                    }
-                """)
-                add_btn.clicked.connect(lambda checked, p=product: self.add_product_to_cart(p))
-                self.products_table.setCellWidget(row, 5, add_btn)
+                    # Add to cart button
+                    add_btn = QPushButton("➕ Add")
+                    set_variant(add_btn, 'row-action')
+                    add_btn.clicked.connect(lambda checked, p=product: self.add_product_to_cart(p))
+                    self.products_table.setCellWidget(row, 5, add_btn)
 
         except Exception as e:
             print(f"Error loading products: {e}")
+        finally:
+            if getattr(self, 'products_table', None) is not None:
+                self.products_table.setUpdatesEnabled(True)
 
     def _on_product_item_double_clicked(self, item):
         """Handle double-click on product table to edit price"""
@@ -4349,61 +4383,31 @@ class SalesWidget(QWidget):
                 new_value = float(new_text)
             except ValueError:
                 # Invalid input, revert to original
-                self.update_cart_table()
+                self._refresh_cart_row(row)
                 return
             
-            if col == 1:  # QTY column
-                if new_value <= 0:
-                    self.update_cart_table()
-                    return
-                cart_item['quantity'] = new_value
-                cart_item['total'] = new_value * float(cart_item.get('price', 0))
-            
-            elif col == 3:  # SALE PRICE column
-                if new_value < 0:
-                    self.update_cart_table()
-                    return
-                cart_item['price'] = new_value
-                cart_item['total'] = float(cart_item.get('quantity', 0)) * new_value
-            
+            if (col == 1 and new_value <= 0) or (col == 3 and new_value < 0):
+                self._refresh_cart_row(row)
+                return
+
             # Temporarily disconnect to avoid recursion
             self.cart_table.itemChanged.disconnect(self._on_cart_item_changed)
-            
-            # Update the cart item data
+
+            # The cart updates its running totals and marks the row for redraw
             if col == 1:  # QTY column
-                if new_value <= 0:
-                    self.update_cart_table()
-                    return
                 cart_item['quantity'] = new_value
-                cart_item['total'] = new_value * float(cart_item.get('price', 0))
-            elif col == 3:  # SALE PRICE column
-                if new_value < 0:
-                    self.update_cart_table()
-                    return
+            else:  # SALE PRICE column
                 cart_item['price'] = new_value
-                cart_item['total'] = float(cart_item.get('quantity', 0)) * new_value
+            cart_item['total'] = float(cart_item.get('quantity', 0)) * float(cart_item.get('price', 0))
             
-            # Update only the changed cell and related cells without rebuilding the table
-            if col == 1:  # QTY changed
-                # Update Total column (4)
-                total_item = self.cart_table.item(row, 4)
-                if total_item:
-                    total_item.setText(f"Rs {cart_item['total']:,.2f}")
-                # Update Profit column (5)
-                profit = cart_item['total'] - (float(cart_item.get('quantity', 0)) * float(cart_item.get('purchase_price', 0)))
-                profit_item = self.cart_table.item(row, 5)
-                if profit_item:
-                    profit_item.setText(f"Rs {profit:,.2f}")
-            elif col == 3:  # Sale Price changed
-                # Update Total column (4)
-                total_item = self.cart_table.item(row, 4)
-                if total_item:
-                    total_item.setText(f"Rs {cart_item['total']:,.2f}")
-                # Update Profit column (5)
-                profit = cart_item['total'] - (float(cart_item.get('quantity', 0)) * float(cart_item.get('purchase_price', 0)))
-                profit_item = self.cart_table.item(row, 5)
-                if profit_item:
-                    profit_item.setText(f"Rs {profit:,.2f}")
+            # The editor may still be open, so update the dependent cells in place
+            total_item = self.cart_table.item(row, 4)
+            if total_item:
+                total_item.setText(f"Rs {cart_item['total']:,.2f}")
+            profit = cart_item['total'] - (float(cart_item.get('quantity', 0)) * float(cart_item.get('purchase_price', 0)))
+            profit_item = self.cart_table.item(row, 5)
+            if profit_item:
+                profit_item.setText(f"Rs {profit:,.2f}")
             
             self.update_totals()
             self.cart_table.itemChanged.connect(self._on_cart_item_changed)
@@ -4465,331 +4469,334 @@ class SalesWidget(QWidget):
             profit_item.setText(f"{profit:.2f}")
 
     def update_cart_table(self):
-        """Update the cart table with current items"""
-        print(f"[DEBUG] update_cart_table called with {len(self.current_cart)} items")
-        import traceback
-        print("[DEBUG] Call stack:")
-        for line in traceback.format_stack()[-3:-1]:  # Show last 2 frames
-            print(f"  {line.strip()}")
-        
+        """Redraw the cart rows changed since the last call (every row after a reset or mode switch)"""
         # Prevent re-entry
         if getattr(self, '_updating_cart', False):
-            print("[DEBUG] Already updating cart, skipping")
             return
-        self._updating_cart = True
-        
-        # Don't update if table is being edited to avoid destroying the editor
+        # Don't update if table is being edited to avoid destroying the editor;
+        # pending rows stay marked and are drawn on the next call
         if hasattr(self, 'cart_table') and self.cart_table.state() == QTableWidget.EditingState:
-            print("[DEBUG] Table is in editing state, skipping update_cart_table")
-            self._updating_cart = False
             return
-        
+        self._updating_cart = True
+
         try:
             # Block signals to prevent feedback loop
-            if hasattr(self, 'cart_table'):
-                self.cart_table.blockSignals(True)
-            
+            self.cart_table.blockSignals(True)
+
+            cart = self._cart
             show_extra = bool(getattr(self, 'is_refund_mode', False))
-            self.cart_table.setColumnHidden(7, not show_extra)
-            self.cart_table.setColumnHidden(9, not show_extra)
-            self.cart_table.setColumnHidden(8, False)
+            full = self._cart_full_redraw or show_extra != self._cart_rendered_extra
+            if full:
+                try:
+                    self.cart_table.setColumnHidden(7, not show_extra)
+                    self.cart_table.setColumnHidden(9, not show_extra)
+                    self.cart_table.setColumnHidden(8, False)
+                except Exception:
+                    pass
+                rows = list(range(len(cart)))
+            else:
+                start = len(cart) if self._cart_dirty_from is None else self._cart_dirty_from
+                rows = sorted(r for r in self._cart_dirty_rows if 0 <= r < start) + list(range(start, len(cart)))
+
+            resized = self.cart_table.rowCount() != len(cart)
+            self.cart_table.setRowCount(len(cart))
+            for i in rows:
+                self._render_cart_row(i, cart[i], show_extra)
+
+            self._cart_dirty_rows.clear()
+            self._cart_dirty_from = None
+            self._cart_full_redraw = False
+            self._cart_rendered_extra = show_extra
+
+            if full or resized:
+                # Always ensure the view is scrolled to the first column so the
+                # product name remains visible, even if the user scrolled to the right.
+                try:
+                    hbar = self.cart_table.horizontalScrollBar()
+                    if hbar is not None:
+                        hbar.setValue(0)
+                except Exception:
+                    pass
+
+                # Auto-resize columns based on content
+                self._auto_resize_cart_columns()
+        finally:
+            # Always unblock signals and reset flag
+            if hasattr(self, 'cart_table'):
+                self.cart_table.blockSignals(False)
+            self._updating_cart = False
+
+    def _render_cart_row(self, i, item, show_extra):
+        """Fill all cells of cart table row i from its cart line"""
+        # Determine background color for this row (alternating)
+        if i % 2 == 0:
+            bg_color = QColor("#ffffff")  # White for even rows
+        else:
+            bg_color = QColor("#f8fafc")  # Light gray for odd rows
+
+        # Product name (column 0 - main column)
+        name = (
+            item.get('name')
+            or item.get('product_name')
+            or str(item.get('id', ''))
+        )
+        name_item = QTableWidgetItem(name)
+        name_item.setForeground(QColor("#1e293b"))  # Explicit text color
+        name_item.setBackground(bg_color)  # Explicit background color
+        try:
+            name_item.setToolTip(name)
         except Exception:
             pass
-        self.cart_table.setRowCount(len(self.current_cart))
+        self.cart_table.setItem(i, 0, name_item)
 
-        for i, item in enumerate(self.current_cart):
-            print(f"[DEBUG] Processing cart item {i}: {item.get('name', 'Unknown')}")
-            
-            # Determine background color for this row (alternating)
-            if i % 2 == 0:
-                bg_color = QColor("#ffffff")  # White for even rows
-                print(f"[DEBUG] Row {i}: Setting WHITE background")
-            else:
-                bg_color = QColor("#f8fafc")  # Light gray for odd rows
-                print(f"[DEBUG] Row {i}: Setting LIGHT GRAY background")
-            
-            # Product name (column 0 - main column)
-            name = (
-                item.get('name')
-                or item.get('product_name')
-                or str(item.get('id', ''))
-            )
-            name_item = QTableWidgetItem(name)
-            name_item.setForeground(QColor("#1e293b"))  # Explicit text color
-            name_item.setBackground(bg_color)  # Explicit background color
+        # Quantity (column 1 - narrow, centered)
+        try:
+            is_inline_refund = bool(self.is_refund_mode) or ('max_refund_qty' in item) or ('bought_qty' in item)
+        except Exception:
+            is_inline_refund = False
+
+        if is_inline_refund:
             try:
-                name_item.setToolTip(name)
+                max_q = float(item.get('max_refund_qty', item.get('bought_qty', 0)) or 0)
             except Exception:
-                pass
-            self.cart_table.setItem(i, 0, name_item)
+                max_q = 0.0
 
-            # Quantity (column 1 - narrow, centered)
             try:
-                is_inline_refund = bool(self.is_refund_mode) or ('max_refund_qty' in item) or ('bought_qty' in item)
+                cur_q = float(item.get('quantity', 0) or 0)
             except Exception:
-                is_inline_refund = False
+                cur_q = 0.0
 
-            if is_inline_refund:
-                try:
-                    max_q = float(item.get('max_refund_qty', item.get('bought_qty', 0)) or 0)
-                except Exception:
-                    max_q = 0.0
-
-                try:
-                    cur_q = float(item.get('quantity', 0) or 0)
-                except Exception:
-                    cur_q = 0.0
-
-                # Set a background item so row coloring stays consistent
-                qty_item = QTableWidgetItem("")
-                qty_item.setBackground(bg_color)
-                self.cart_table.setItem(i, 1, qty_item)
+            # Set a background item so row coloring stays consistent
+            qty_item = QTableWidgetItem("")
+            qty_item.setBackground(bg_color)
+            self.cart_table.setItem(i, 1, qty_item)
 
+            try:
+                qty_spin = QDoubleSpinBox()
+                qty_spin.setMinimum(0.0)
+                qty_spin.setMaximum(max_q)
+                qty_spin.setSingleStep(1.0)
+                qty_spin.setDecimals(2)
+                qty_spin.setValue(cur_q)
                 try:
-                    qty_spin = QDoubleSpinBox()
-                    qty_spin.setMinimum(0.0)
-                    qty_spin.setMaximum(max_q)
-                    qty_spin.setSingleStep(1.0)
-                    qty_spin.setDecimals(2)
-                    qty_spin.setValue(cur_q)
-                    try:
-                        qty_spin.setButtonSymbols(QAbstractSpinBox.NoButtons)
-                    except Exception:
-                        pass
-                    try:
-                        qty_spin.setAlignment(Qt.AlignCenter)
-                    except Exception:
-                        pass
-                    try:
-                        qty_spin.setMinimumWidth(90)
-                        qty_spin.setMaximumWidth(130)
-                        qty_spin.setMinimumHeight(28)
-                    except Exception:
-                        pass
-                    try:
-                        qty_spin.setStyleSheet("""
-                            QDoubleSpinBox {
-                                border: 2px solid #334155;
-                                border-radius: 6px;
-                                padding: 4px 8px;
-                                font-size: 14px;
-                                font-weight: 700;
-                                background: #ffffff;
-                                color: #0f172a;
-                                selection-background-color: #3b82f6;
-                                selection-color: #0f172a;
-                                margin: 0px;
-                            }
-                            QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {
-                                width: 0px;
-                                height: 0px;
-                                border: none;
-                                background: transparent;
-                            }
-                            QDoubleSpinBox::up-arrow, QDoubleSpinBox::down-arrow {
-                                width: 0px;
-                                height: 0px;
-                            }
-                            QDoubleSpinBox::drop-down {
-                                width: 0px;
-                                border: none;
-                            }
-                            QDoubleSpinBox:focus {
-                                border: 2px solid #2563eb;
-                                background: #ffffff;
-                                color: #0f172a;
-                            }
-                        """)
-                    except Exception:
-                        pass
-                    try:
-                        qty_spin.setToolTip(f"Max refund: {max_q}")
-                    except Exception:
-                        pass
-                    try:
-                        qty_spin.valueChanged.connect(lambda v, row=i: self._on_inline_refund_qty_changed(row, v))
-                    except Exception:
-                        pass
-
-                    # Don't use setCellWidget as it prevents double-clicks
-                    # self.cart_table.setCellWidget(i, 1, qty_spin)
+                    qty_spin.setButtonSymbols(QAbstractSpinBox.NoButtons)
                 except Exception:
-                    # Fallback to plain text
-                    qty_item = QTableWidgetItem(str(cur_q))
-                    qty_item.setTextAlignment(Qt.AlignCenter)
-                    qty_item.setForeground(QColor("#1e293b"))
-                    qty_item.setBackground(bg_color)
-                    self.cart_table.setItem(i, 1, qty_item)
-
+                    pass
                 try:
-                    if max_q > 0:
-                        name_item.setToolTip(f"{name}\nBought Qty: {max_q}")
+                    qty_spin.setAlignment(Qt.AlignCenter)
                 except Exception:
                     pass
-            else:
-                # Editable quantity field (plain text, no widget)
                 try:
-                    qty_val = float(item.get('quantity', 0) or 0)
+                    qty_spin.setMinimumWidth(90)
+                    qty_spin.setMaximumWidth(130)
+                    qty_spin.setMinimumHeight(28)
                 except Exception:
-                    qty_val = 0
-                
-                qty_item = QTableWidgetItem(str(qty_val))
-                qty_item.setTextAlignment(Qt.AlignCenter)
-                qty_item.setForeground(QColor("#1e293b"))
-                qty_item.setBackground(bg_color)
-                # Make it editable
-                qty_item.setFlags(qty_item.flags() | Qt.ItemIsEditable)
-                print(f"[DEBUG] QTY item flags: {qty_item.flags()}, editable: {bool(qty_item.flags() & Qt.ItemIsEditable)}")
-                self.cart_table.setItem(i, 1, qty_item)
-
-            if show_extra:
+                    pass
                 try:
-                    bought_qty_val = item.get('bought_qty', '')
-                    bought_item = QTableWidgetItem(str(bought_qty_val))
-                    bought_item.setTextAlignment(Qt.AlignCenter)
-                    bought_item.setForeground(QColor("#1e293b"))
-                    bought_item.setBackground(bg_color)
-                    self.cart_table.setItem(i, 7, bought_item)
+                    qty_spin.setStyleSheet("""
+                        QDoubleSpinBox {
+                            border: 2px solid #334155;
+                            border-radius: 6px;
+                            padding: 4px 8px;
+                            font-size: 14px;
+                            font-weight: 700;
+                            background: #ffffff;
+                            color: #0f172a;
+                            selection-background-color: #3b82f6;
+                            selection-color: #0f172a;
+                            margin: 0px;
+                        }
+                        QDoubleSpinBox::up-button, QDoubleSpinBox::down-button {
+                            width: 0px;
+                            height: 0px;
+                            border: none;
+                            background: transparent;
+                        }
+                        QDoubleSpinBox::up-arrow, QDoubleSpinBox::down-arrow {
+                            width: 0px;
+                            height: 0px;
+                        }
+                        QDoubleSpinBox::drop-down {
+                            width: 0px;
+                            border: none;
+                        }
+                        QDoubleSpinBox:focus {
+                            border: 2px solid #2563eb;
+                            background: #ffffff;
+                            color: #0f172a;
+                        }
+                    """)
                 except Exception:
                     pass
-
                 try:
-                    dval = float(item.get('item_discount', 0.0) or 0.0)
+                    qty_spin.setToolTip(f"Max refund: {max_q}")
                 except Exception:
-                    dval = 0.0
-                dtype = str(item.get('item_discount_type', '') or '').strip().upper()
-                disc_txt = ""
-                if dval:
-                    if dtype in ("PERCENT", "PERCENTAGE"):
-                        disc_txt = f"{dval:g}%"
-                    else:
-                        disc_txt = f"Rs {dval:,.2f}"
-                else:
-                    disc_txt = "Rs 0.00"
+                    pass
                 try:
-                    disc_item = QTableWidgetItem(disc_txt)
-                    disc_item.setTextAlignment(Qt.AlignCenter)
-                    disc_item.setForeground(QColor("#1e293b"))
-                    disc_item.setBackground(bg_color)
-                    self.cart_table.setItem(i, 9, disc_item)
+                    qty_spin.valueChanged.connect(lambda v, row=i: self._on_inline_refund_qty_changed(row, v))
                 except Exception:
                     pass
 
-            # Purchase price (column 2)
-            purchase_price = item.get('purchase_price', 0)
-            purchase_item = QTableWidgetItem(f"Rs {purchase_price:,.2f}")
-            purchase_item.setTextAlignment(Qt.AlignRight)
-            purchase_item.setForeground(QColor("#1e293b"))  # Explicit text color
-            purchase_item.setBackground(bg_color)  # Explicit background color
-            self.cart_table.setItem(i, 2, purchase_item)
+                # Don't use setCellWidget as it prevents double-clicks
+                # self.cart_table.setCellWidget(i, 1, qty_spin)
+            except Exception:
+                # Fallback to plain text
+                qty_item = QTableWidgetItem(str(cur_q))
+                qty_item.setTextAlignment(Qt.AlignCenter)
+                qty_item.setForeground(QColor("#1e293b"))
+                qty_item.setBackground(bg_color)
+                self.cart_table.setItem(i, 1, qty_item)
 
-            # Unit / sale price (column 3) - editable
             try:
-                sale_price = float(item.get('price', 0.0) or 0.0)
+                if max_q > 0:
+                    name_item.setToolTip(f"{name}\nBought Qty: {max_q}")
             except Exception:
-                sale_price = 0.0
-            sale_item = QTableWidgetItem(f"{sale_price:.2f}")  # Just the number, no "Rs" prefix
-            sale_item.setTextAlignment(Qt.AlignRight)
-            font = QFont()
-            font.setBold(True)
-            font.setPointSize(11)
-            sale_item.setFont(font)
-            sale_item.setForeground(QColor("#0f766e"))  # Teal/dark cyan for visibility
-            sale_item.setBackground(bg_color)  # Explicit background color
+                pass
+        else:
+            # Editable quantity field (plain text, no widget)
+            try:
+                qty_val = float(item.get('quantity', 0) or 0)
+            except Exception:
+                qty_val = 0
+
+            qty_item = QTableWidgetItem(str(qty_val))
+            qty_item.setTextAlignment(Qt.AlignCenter)
+            qty_item.setForeground(QColor("#1e293b"))
+            qty_item.setBackground(bg_color)
             # Make it editable
-            sale_item.setFlags(sale_item.flags() | Qt.ItemIsEditable)
-            print(f"[DEBUG] Sale Price item flags: {sale_item.flags()}, editable: {bool(sale_item.flags() & Qt.ItemIsEditable)}")
-            self.cart_table.setItem(i, 3, sale_item)
+            qty_item.setFlags(qty_item.flags() | Qt.ItemIsEditable)
+            self.cart_table.setItem(i, 1, qty_item)
 
-            # Total sale amount (column 4)
-            eff_price = sale_price
+        if show_extra:
             try:
-                if show_extra and getattr(self, 'is_refund_mode', False):
-                    eff_price = float(item.get('refund_unit_subtotal', sale_price) or sale_price)
+                bought_qty_val = item.get('bought_qty', '')
+                bought_item = QTableWidgetItem(str(bought_qty_val))
+                bought_item.setTextAlignment(Qt.AlignCenter)
+                bought_item.setForeground(QColor("#1e293b"))
+                bought_item.setBackground(bg_color)
+                self.cart_table.setItem(i, 7, bought_item)
             except Exception:
-                eff_price = sale_price
-            total_sale = item['quantity'] * eff_price
-            total_item = QTableWidgetItem(f"Rs {total_sale:,.2f}")
-            total_item.setTextAlignment(Qt.AlignRight)
-            font = QFont()
-            font.setBold(True)
-            total_item.setFont(font)
-            total_item.setForeground(QColor("#10b981"))
-            total_item.setBackground(bg_color)  # Explicit background color
-            self.cart_table.setItem(i, 4, total_item)
-
-            # Profit per item (column 5)
-            profit_per_item = (eff_price - purchase_price) * item['quantity']
-            profit_item = QTableWidgetItem(f"Rs {profit_per_item:,.2f}")
-            profit_item.setTextAlignment(Qt.AlignRight)
-            font = QFont()
-            font.setBold(True)
-            profit_item.setFont(font)
-            if profit_per_item > 0:
-                profit_item.setForeground(QColor("#10b981"))  # Green for profit
-            elif profit_per_item < 0:
-                profit_item.setForeground(QColor("#ef4444"))  # Red for loss
-            else:
-                profit_item.setForeground(QColor("#6b7280"))  # Gray for break-even
-            profit_item.setBackground(bg_color)  # Explicit background color
-            self.cart_table.setItem(i, 5, profit_item)
-
-            # Remove button (column 6) - use table item instead of widget to respect background
-            remove_item = QTableWidgetItem("🗑️ Remove")
-            remove_item.setTextAlignment(Qt.AlignCenter)
-            remove_item.setForeground(QColor("#dc2626"))  # Red text
-            remove_item.setBackground(bg_color)  # Explicit background color
-            remove_item.setFont(QFont())  # Use default font
-            self.cart_table.setItem(i, 6, remove_item)
-            
-            # Store index in item data for click handling
-            remove_item.setData(Qt.UserRole, i)
+                pass
 
-            # Stock (column 8) - always visible
             try:
-                stock_val = item.get('stock_level', '')
-                if stock_val in (None, ""):
-                    # Fallback: try to fetch live stock from DB
-                    try:
-                        from pos_app.models.database import Product
-                        pid = item.get('id', None)
-                        if pid is not None:
-                            prod = self.controller.session.get(Product, pid)
-                            if prod is not None:
-                                stock_val = int(getattr(prod, 'stock_level', 0) or 0)
-                    except Exception:
-                        pass
-
-                stock_item = QTableWidgetItem(str(stock_val if stock_val is not None else ""))
-                stock_item.setTextAlignment(Qt.AlignCenter)
-                stock_item.setForeground(QColor("#1e293b"))
-                stock_item.setBackground(bg_color)
-                self.cart_table.setItem(i, 8, stock_item)
+                dval = float(item.get('item_discount', 0.0) or 0.0)
             except Exception:
-                pass
-            
-            # Reduce row height for compact display
+                dval = 0.0
+            dtype = str(item.get('item_discount_type', '') or '').strip().upper()
+            disc_txt = ""
+            if dval:
+                if dtype in ("PERCENT", "PERCENTAGE"):
+                    disc_txt = f"{dval:g}%"
+                else:
+                    disc_txt = f"Rs {dval:,.2f}"
+            else:
+                disc_txt = "Rs 0.00"
             try:
-                self.cart_table.setRowHeight(i, 36)  # Compact but safe for embedded widgets
+                disc_item = QTableWidgetItem(disc_txt)
+                disc_item.setTextAlignment(Qt.AlignCenter)
+                disc_item.setForeground(QColor("#1e293b"))
+                disc_item.setBackground(bg_color)
+                self.cart_table.setItem(i, 9, disc_item)
             except Exception:
                 pass
 
-        # Always ensure the view is scrolled to the first column so the
-        # product name remains visible, even if the user scrolled to the right.
+        # Purchase price (column 2)
+        purchase_price = item.get('purchase_price', 0)
+        purchase_item = QTableWidgetItem(f"Rs {purchase_price:,.2f}")
+        purchase_item.setTextAlignment(Qt.AlignRight)
+        purchase_item.setForeground(QColor("#1e293b"))  # Explicit text color
+        purchase_item.setBackground(bg_color)  # Explicit background color
+        self.cart_table.setItem(i, 2, purchase_item)
+
+        # Unit / sale price (column 3) - editable
         try:
-            hbar = self.cart_table.horizontalScrollBar()
-            if hbar is not None:
-                hbar.setValue(0)
+            sale_price = float(item.get('price', 0.0) or 0.0)
+        except Exception:
+            sale_price = 0.0
+        sale_item = QTableWidgetItem(f"{sale_price:.2f}")  # Just the number, no "Rs" prefix
+        sale_item.setTextAlignment(Qt.AlignRight)
+        font = QFont()
+        font.setBold(True)
+        font.setPointSize(11)
+        sale_item.setFont(font)
+        sale_item.setForeground(QColor("#0f766e"))  # Teal/dark cyan for visibility
+        sale_item.setBackground(bg_color)  # Explicit background color
+        # Make it editable
+        sale_item.setFlags(sale_item.flags() | Qt.ItemIsEditable)
+        self.cart_table.setItem(i, 3, sale_item)
+
+        # Total sale amount (column 4)
+        eff_price = sale_price
+        try:
+            if show_extra and getattr(self, 'is_refund_mode', False):
+                eff_price = float(item.get('refund_unit_subtotal', sale_price) or sale_price)
+        except Exception:
+            eff_price = sale_price
+        total_sale = item['quantity'] * eff_price
+        total_item = QTableWidgetItem(f"Rs {total_sale:,.2f}")
+        total_item.setTextAlignment(Qt.AlignRight)
+        font = QFont()
+        font.setBold(True)
+        total_item.setFont(font)
+        total_item.setForeground(QColor("#10b981"))
+        total_item.setBackground(bg_color)  # Explicit background color
+        self.cart_table.setItem(i, 4, total_item)
+
+        # Profit per item (column 5)
+        profit_per_item = (eff_price - purchase_price) * item['quantity']
+        profit_item = QTableWidgetItem(f"Rs {profit_per_item:,.2f}")
+        profit_item.setTextAlignment(Qt.AlignRight)
+        font = QFont()
+        font.setBold(True)
+        profit_item.setFont(font)
+        if profit_per_item > 0:
+            profit_item.setForeground(QColor("#10b981"))  # Green for profit
+        elif profit_per_item < 0:
+            profit_item.setForeground(QColor("#ef4444"))  # Red for loss
+        else:
+            profit_item.setForeground(QColor("#6b7280"))  # Gray for break-even
+        profit_item.setBackground(bg_color)  # Explicit background color
+        self.cart_table.setItem(i, 5, profit_item)
+
+        # Remove button (column 6) - use table item instead of widget to respect background
+        remove_item = QTableWidgetItem("🗑️ Remove")
+        remove_item.setTextAlignment(Qt.AlignCenter)
+        remove_item.setForeground(QColor("#dc2626"))  # Red text
+        remove_item.setBackground(bg_color)  # Explicit background color
+        remove_item.setFont(QFont())  # Use default font
+        self.cart_table.setItem(i, 6, remove_item)
+
+        # Store index in item data for click handling
+        remove_item.setData(Qt.UserRole, i)
+
+        # Stock (column 8) - always visible
+        try:
+            stock_val = item.get('stock_level', '')
+            if stock_val in (None, ""):
+                # Fallback: try to fetch live stock from DB
+                try:
+                    from pos_app.models.database import Product
+                    pid = item.get('id', None)
+                    if pid is not None:
+                        prod = self.controller.session.get(Product, pid)
+                        if prod is not None:
+                            stock_val = int(getattr(prod, 'stock_level', 0) or 0)
+                except Exception:
+                    pass
+
+            stock_item = QTableWidgetItem(str(stock_val if stock_val is not None else ""))
+            stock_item.setTextAlignment(Qt.AlignCenter)
+            stock_item.setForeground(QColor("#1e293b"))
+            stock_item.setBackground(bg_color)
+            self.cart_table.setItem(i, 8, stock_item)
+        except Exception:
+            pass
+
+        # Reduce row height for compact display
+        try:
+            self.cart_table.setRowHeight(i, 36)  # Compact but safe for embedded widgets
         except Exception:
             pass
-        
-        # Auto-resize columns based on content
-        self._auto_resize_cart_columns()
-        
-        # Always unblock signals and reset flag
-        if hasattr(self, 'cart_table'):
-            self.cart_table.blockSignals(False)
-        self._updating_cart = False
 
     def _cart_qty_inc(self, row: int):
         try:
@@ -5065,61 +5072,6 @@ class SalesWidget(QWidget):
             # Use row directly since cellClicked gives us the correct row
             self.remove_cart_item(row)
 
-    def update_totals(self):
-        """Update all total labels with enhanced calculations"""
-        if not self.current_cart:
-            items_count = 0
-            subtotal = total_cost = total_profit = tax = total = 0.0
-        else:
-            # Calculate enhanced totals
-            items_count = sum(item['quantity'] for item in self.current_cart)
-            subtotal = sum(item['quantity'] * item['price'] for item in self.current_cart)
-            total_cost = sum(item['quantity'] * item.get('purchase_price', 0) for item in self.current_cart)
-            total_profit = subtotal - total_cost
-            
-            # Apply discount if exists (fixed amount instead of percentage)
-            discount = getattr(self, 'discount_amount', QDoubleSpinBox()).value()
-            taxable_amount = subtotal - discount
-            tax = taxable_amount * (self.tax_rate / 100)
-            total = taxable_amount + tax
-
-        # Auto-increase amount_paid to match total when products are added
-        if hasattr(self, 'amount_paid_input'):
-            print(f"[DEBUG] Auto-increasing amount_paid: total={total}, current_value={self.amount_paid_input.value()}")
-            if total > 0:
-                self.amount_paid_input.setValue(total)
-                print(f"[DEBUG] Set amount_paid to {total}")
-            else:
-                self.amount_paid_input.setValue(0)
-                print(f"[DEBUG] Set amount_paid to 0")
-        else:
-            print(f"[DEBUG] amount_paid_input not found!")
-
-        # Update enhanced summary labels
-        if hasattr(self, 'cart_items_label'):
-            self.cart_items_label.setText(f"Items: {items_count}")
-        if hasattr(self, 'cart_subtotal_label'):
-            self.cart_subtotal_label.setText(f"Subtotal: Rs {subtotal:,.2f}")
-        if hasattr(self, 'cart_total_cost_label'):
-            self.cart_total_cost_label.setText(f"Total Cost: Rs {total_cost:,.2f}")
-        if hasattr(self, 'cart_profit_label'):
-            profit_text = f"Total Profit: Rs {total_profit:,.2f}"
-            if hasattr(self, 'cart_profit_label'):
-                self.cart_profit_label.setText(profit_text)
-                # Color code profit label
-                if total_profit > 0:
-                    self.cart_profit_label.setStyleSheet("font-size: 14px; color: #10b981; margin: 2px 0; font-weight: 600;")
-                elif total_profit < 0:
-                    self.cart_profit_label.setStyleSheet("font-size: 14px; color: #ef4444; margin: 2px 0; font-weight: 600;")
-                else:
-                    self.cart_profit_label.setStyleSheet("font-size: 14px; color: #6b7280; margin: 2px 0;")
-        if hasattr(self, 'cart_tax_label'):
-            self.cart_tax_label.setText(f"Tax ({self.tax_rate}%): Rs {tax:,.2f}")
-        if hasattr(self, 'cart_total_label'):
-            self.cart_total_label.setText(f"Final Total: Rs {total:,.2f}")
-
-        # Amount Paid is user input; do not overwrite it here.
-
     def add_product_to_cart(self, product):
         """Add a product to the enhanced cart with purchase/sale prices"""
         # Block adding new products while refunding; refund mode must only use invoice items.
@@ -5129,32 +5081,33 @@ class SalesWidget(QWidget):
             except Exception:
                 pass
             return
-        # Check if product already in cart
-        for item in self.current_cart:
-            if item['id'] == getattr(product, 'id', None):
-                # Stock check
-                try:
-                    stock_level = int(getattr(product, 'stock_level', 0))
-                    if item['quantity'] + 1 > stock_level and stock_level > 0:
-                        msg = QMessageBox(self)
-                        msg.setIcon(QMessageBox.Warning)
-                        msg.setWindowTitle("Stock")
-                        msg.setText("Insufficient stock for this product.")
-                        msg.setStandardButtons(QMessageBox.Ok)
-                        msg.exec()
-                        return
-                except Exception:
-                    pass
-                item['quantity'] += 1
-                self.update_cart_table()
-                self.update_totals()
-                try:
-                    if hasattr(self, 'cart_table'):
-                        self.cart_table.setFocus()
-                        # Don't auto-select row to avoid blue highlight
-                except Exception:
-                    pass
-                return
+        # Repeat scan: bump the existing line (keyed lookup, no scan of the cart)
+        row = self.current_cart.find(getattr(product, 'id', None))
+        if row >= 0:
+            item = self.current_cart[row]
+            # Stock check
+            try:
+                stock_level = int(getattr(product, 'stock_level', 0))
+                if item['quantity'] + 1 > stock_level and stock_level > 0:
+                    msg = QMessageBox(self)
+                    msg.setIcon(QMessageBox.Warning)
+                    msg.setWindowTitle("Stock")
+                    msg.setText("Insufficient stock for this product.")
+                    msg.setStandardButtons(QMessageBox.Ok)
+                    msg.exec()
+                    return
+            except Exception:
+                pass
+            item['quantity'] += 1
+            self.update_cart_table()
+            self.update_totals()
+            try:
+                if hasattr(self, 'cart_table'):
+                    self.cart_table.setFocus()
+                    # Don't auto-select row to avoid blue highlight
+            except Exception:
+                pass
+            return
 
         # Add new item to cart with enhanced data
         sale_price = self._get_sale_price_for_product(product)
@@ -5215,20 +5168,9 @@ class SalesWidget(QWidget):
     def on_sale_type_changed(self, _txt: str):
         """Reprice cart items when sale type changes between retail/wholesale."""
         try:
-            from pos_app.models.database import Product
-            is_wholesale = self.is_wholesale_selected()
-            for item in self.current_cart:
-                pid = item.get('id')
-                if not pid:
-                    continue
-                try:
-                    p = self.controller.session.query(Product).filter(Product.id == pid).first()
-                    if not p:
-                        continue
-                    # Only update sale price; keep purchase_price as stored cost
-                    item['price'] = self._get_sale_price_for_product(p)
-                except Exception:
-                    continue
+            # Only update sale price; keep purchase_price as stored cost
+            get_pricing_engine().reprice(self.current_cart, wholesale=self.is_wholesale_selected(),
+                                         session=self.controller.session)
             self.update_cart_table()
             self.update_totals()
             self.calculate_change()
@@ -5286,10 +5228,6 @@ class SalesWidget(QWidget):
                     self.add_product_to_cart(product)
                     self.product_search.clear()
                     self.search_suggestions_list.clear()
-                    # Set flag to prevent Enter from triggering sale immediately
-                    self._product_added_from_search = True
-                    # Reset flag after 1.5 seconds
-                    QTimer.singleShot(1500, lambda: setattr(self, '_product_added_from_search', False))
         except Exception as e:
             print(f"Error selecting suggestion: {e}")
 
@@ -5391,40 +5329,9 @@ class SalesWidget(QWidget):
 
     # Placeholder methods that need to be implemented
     def load_tax_rate(self):
-        """Load tax rate from settings"""
-        settings = QSettings("POSApp", "Settings")
+        """Load tax rate from settings (0% unless explicitly set in Settings)"""
         try:
-            try:
-                user_set = str(settings.value('tax_rate_user_set', 'false') or 'false').strip().lower() == 'true'
-            except Exception:
-                user_set = False
-
-            if not user_set:
-                self.tax_rate = 0.0
-                try:
-                    self.update_totals()
-                except Exception:
-                    pass
-                return
-
-            has_key = False
-            try:
-                has_key = bool(settings.contains('tax_rate'))
-            except Exception:
-                has_key = False
-
-            v = settings.value('tax_rate', None)
-            if v is None or str(v).strip() == "":
-                v = None
-
-            if v is None and not has_key:
-                # Fresh/new PCs should default to 0% tax unless explicitly set in Settings.
-                self.tax_rate = 0.0
-            else:
-                try:
-                    self.tax_rate = float(v if v is not None else 0.0)
-                except Exception:
-                    self.tax_rate = 0.0
+            self.tax_rate = get_pricing_engine().tax_rate()
         except Exception:
             self.tax_rate = 0.0
 
@@ -6381,7 +6288,10 @@ class SalesWidget(QWidget):
                     items.append({
                         'product_id': cart_item.get('id'),
                         'quantity': q,
-                        'unit_price': cart_item.get('price', 0.0),
+                        # What the refund screen totals on (the original line net of its discount)
+                        'unit_price': (cart_item.get('refund_unit_subtotal')
+                                       if cart_item.get('refund_unit_subtotal') is not None
+                                       else cart_item.get('price', 0.0)),
                     })
 
                 if not items:
@@ -6416,7 +6326,9 @@ class SalesWidget(QWidget):
                 amount_paid,
                 is_refund=bool(self.is_refund_mode),
                 refund_of_sale_id=(self.refund_of_sale_id if self.is_refund_mode else None),
-                discount_amount=discount
+                # Only the manually entered amount: create_sale prices the rules itself, as above
+                discount_amount=self._get_discount_amount_value(),
+                promotion_id=self._get_promotion_id()
             )
 
             # Generate receipt
@@ -6433,8 +6345,8 @@ class SalesWidget(QWidget):
                 'final_total': final_total,
                 'cashier': 'Admin',
                 'invoice_number': getattr(sale, 'invoice_number', f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"),
-                'business_info': {'name': '', 'address': '', 'phone': ''},
-                'items': self.current_cart,
+                'business_info': configured_business_info(),
+                'items': list(self.current_cart),
                 'is_refund': bool(self.is_refund_mode)
             }
 
@@ -6447,6 +6359,8 @@ class SalesWidget(QWidget):
             self.update_cart_table()
             self.update_totals()
             self.amount_paid_input.setValue(0.00)
+            if getattr(self, 'promotion_combo', None) is not None:
+                self.promotion_combo.setCurrentIndex(0)
             self.is_refund_mode = False
             self.refund_of_sale_id = None
             self._refund_source_sale = None
@@ -6545,9 +6459,6 @@ class SalesWidget(QWidget):
         except Exception:
             pass
         
-        # Set flag to prevent Enter from completing sale after adding product
-        self._product_added_from_search = True
-        
         # First, try to use the first item from the suggestions list if it exists
         if hasattr(self, 'search_suggestions_list') and self.search_suggestions_list.count() > 0:
             first_item = self.search_suggestions_list.item(0)
@@ -6598,9 +6509,9 @@ class SalesWidget(QWidget):
     def add_product_by_barcode(self, barcode: str | None = None):
         """Add product to cart by barcode when Enter is pressed or scanner input arrives.
 
-        If `barcode` is None, uses the text from the barcode input field. This keeps
-        existing UI behavior while also allowing the global barcode buffer to call
-        this method directly.
+        If `barcode` is None, uses the text from the barcode input field. The code
+        is resolved and added by the scanner pipeline's dispatcher, so typed and
+        scanned codes share one lookup (active products only) and one cart path.
         """
         # Block adding new products while refunding; refund mode must only use invoice items.
         if getattr(self, 'is_refund_mode', False):
@@ -6610,41 +6521,27 @@ class SalesWidget(QWidget):
                 barcode = (getattr(self, 'barcode_input', None).text() if getattr(self, 'barcode_input', None) else None)
         except Exception:
             barcode = None
-            
+        scanner = getattr(self, '_scanner', None)
+        if not barcode or scanner is None:
+            return
+
         try:
-            from pos_app.models.database import Product
             from pos_app.utils.barcode_validator import validate_barcode_input
 
             # First, validate and clean the barcode similar to the shared barcode widget
             validation = validate_barcode_input(barcode)
             cleaned = validation.get('cleaned_barcode', barcode)
 
-            query = self.controller.session.query(Product)
-
-            # Try exact match on barcode or SKU using cleaned value
-            product = query.filter(
-                (Product.barcode == cleaned) | (Product.sku == cleaned)
-            ).first()
-
-            # If not found, fall back to raw text (in case of formatting differences)
-            if not product and cleaned != barcode:
-                product = query.filter(
-                    (Product.barcode == barcode) | (Product.sku == barcode)
-                ).first()
-
-            if product:
-                self.add_product_to_cart(product)
-                try:
-                    self._last_barcode_add_ts = time.monotonic()
-                except Exception:
-                    self._last_barcode_add_ts = 0.0
-                # Set flag to prevent Enter from completing sale immediately after barcode add
-                self._barcode_just_added = True
-                if hasattr(self, 'barcode_input'):
-                    self.barcode_input.clear()
-            else:
-                # Quietly ignore not found to avoid blocking scanners with popups
-                pass
+            # Try the cleaned value, then the raw text (in case of formatting differences)
+            started_at = time.perf_counter()
+            for code in dict.fromkeys((cleaned, barcode)):
+                result = scanner.dispatcher.dispatch(ScannedCode(code, False, started_at))
+                if result.status != 'not_found':
+                    break
+            # Quietly ignore not found to avoid blocking scanners with popups
+            self._apply_scan_result(result)
+            if result.ok and hasattr(self, 'barcode_input'):
+                self.barcode_input.clear()
 
         except Exception as e:
             msg = QMessageBox(self)
@@ -6659,21 +6556,8 @@ class SalesWidget(QWidget):
         try:
             amount_paid = self.amount_paid_input.value()
             
-            # Calculate total with tax (same as update_totals)
-            if not self.current_cart:
-                total_amount = 0.0
-            else:
-                subtotal = sum(item['quantity'] * item['price'] for item in self.current_cart)
-
-                # Use the unified discount getter (supports both QDoubleSpinBox and QLineEdit variants)
-                try:
-                    discount = float(self._get_discount_amount_value() or 0.0)
-                except Exception:
-                    discount = 0.0
-                
-                taxable_amount = subtotal - discount
-                tax = taxable_amount * (self.tax_rate / 100)
-                total_amount = taxable_amount + tax
+            # Same total as update_totals (cart running totals)
+            total_amount = self._calculate_totals()[-1]
             
             change = amount_paid - total_amount
             
@@ -7103,80 +6987,22 @@ class SalesWidget(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to load refund invoice: {str(e)}")
 
     def _find_sale_by_invoice_input(self, invoice_input: str):
-        """Best-effort lookup for invoice numbers.
-
-        Supports:
-        - Numeric: 1 / 0001
-        - Strings: "1", "INV-1", "INV-0001"
-        - Any exact stored invoice_number string
+        """Lookup for invoice numbers: exact stored invoice_number, else the indexed
+        normalised key (1 / 0001 / "INV-1" / "INV-0001" all match invoice 1).
         """
-        try:
-            from pos_app.models.database import Sale
-            from sqlalchemy import or_
-        except Exception:
-            return None
-
-        raw = (invoice_input or "").strip()
-        if not raw:
-            return None
-
-        candidates = []
-        def _add(v):
-            v = (v or "").strip()
-            if v and v not in candidates:
-                candidates.append(v)
-
-        _add(raw)
-
-        # If numeric-like, normalize leading zeros
-        numeric_part = ""
-        try:
-            if raw.isdigit():
-                numeric_part = str(int(raw))
-                _add(numeric_part)
-                _add(raw.lstrip('0') or '0')
-            else:
-                # Extract trailing digits (e.g. INV-0001)
-                import re
-                m = re.search(r"(\d+)$", raw)
-                if m:
-                    numeric_part = str(int(m.group(1)))
-                    _add(m.group(1))
-                    _add(numeric_part)
-        except Exception:
-            numeric_part = ""
-
-        # Common prefixes
-        if numeric_part:
-            _add(f"INV-{numeric_part}")
-            _add(f"INV-{numeric_part.zfill(4)}")
-            _add(f"INV-{numeric_part.zfill(6)}")
-
         session = getattr(self.controller, 'session', None)
         if session is None:
             return None
-
-        # Exact match first
         try:
-            q = session.query(Sale).filter(Sale.invoice_number.in_(candidates))
-            sale = q.order_by(Sale.id.desc()).first()
-            if sale:
-                return sale
-        except Exception:
-            pass
-
-        # Fallback: LIKE match on trailing digits
-        try:
-            if numeric_part:
-                like_patterns = [f"%{numeric_part}", f"%{numeric_part.zfill(4)}", f"%{numeric_part.zfill(6)}"]
-                q = session.query(Sale).filter(or_(*[Sale.invoice_number.ilike(p) for p in like_patterns]))
-                sale = q.order_by(Sale.id.desc()).first()
-                if sale:
-                    return sale
-        except Exception:
-            pass
-
-        return None
+            from pos_app.controllers.returns import ReturnsService
+            return ReturnsService(session).find_sale(invoice_input)
+        except Exception as e:
+            print(f"[ERROR] Invoice lookup failed: {e}")
+            try:
+                session.rollback()
+            except Exception:
+                pass
+            return None
 
     def _show_refund_selection_dialog(self, sale):
         try:
@@ -7205,7 +7031,6 @@ class SalesWidget(QWidget):
                     stock_level = getattr(p, 'stock_level', None) if p is not None else None
                     item_discount = float(getattr(it, 'discount', 0.0) or 0.0)
                     item_discount_type = str(getattr(it, 'discount_type', '') or '')
-                    line_total = float(getattr(it, 'total', 0.0) or 0.0)
                 except Exception:
                     continue
 
@@ -7223,7 +7048,9 @@ class SalesWidget(QWidget):
                     'stock_level': stock_level if stock_level is not None else '',
                     'item_discount': item_discount,
                     'item_discount_type': item_discount_type,
-                    'refund_unit_subtotal': (line_total / bought_qty) if bought_qty else unit_price,
+                    # The line net of its discount, before tax (create_sale taxes the refund again)
+                    'refund_unit_subtotal': ((unit_price * bought_qty - item_discount) / bought_qty
+                                             if bought_qty else unit_price),
                 })
 
             if not new_cart:
@@ -413,6 +413,13 @@ class UniversalSearchWidget(QWidget):
                 (Supplier.business_name.ilike(f'%{query}%'))
             ).all()
             
+            # Outstanding amounts for all matched suppliers in one grouped query
+            try:
+                from pos_app.controllers.supplier_balances import SupplierBalanceService
+                balances = SupplierBalanceService(self.controller.session).get_balances([s.id for s in suppliers])
+            except Exception:
+                balances = {}
+
             # Populate suppliers table
             self.suppliers_table.setRowCount(len(suppliers))
             for i, supplier in enumerate(suppliers):
@@ -422,7 +429,7 @@ class UniversalSearchWidget(QWidget):
                 self.suppliers_table.setItem(i, 3, QTableWidgetItem(supplier.email or ""))
                 
                 # Calculate outstanding amount
-                outstanding = self.calculate_supplier_outstanding(supplier.id)
+                outstanding = balances.get(supplier.id, {}).get('outstanding', 0.0)
                 self.suppliers_table.setItem(i, 4, QTableWidgetItem(f"Rs {outstanding:,.2f}"))
                 
                 # Add to all results
@@ -589,18 +596,8 @@ class UniversalSearchWidget(QWidget):
 
     def calculate_supplier_outstanding(self, supplier_id):
         try:
-            from pos_app.models.database import Purchase
-            purchases = self.controller.session.query(Purchase).filter(
-                Purchase.supplier_id == supplier_id
-            ).all()
-            
-            total_outstanding = 0
-            for purchase in purchases:
-                outstanding = (purchase.total_amount or 0) - (purchase.paid_amount or 0)
-                if outstanding > 0:
-                    total_outstanding += outstanding
-            
-            return total_outstanding
+            from pos_app.controllers.supplier_balances import SupplierBalanceService
+            return SupplierBalanceService(self.controller.session).get_outstanding(supplier_id)
         except Exception:
             return 0
 
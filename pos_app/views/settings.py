@@ -411,7 +411,7 @@ class SettingsWidget(QWidget):
 
             try:
                 from pos_app.utils.startup_validator import StartupValidator
-                ok = bool(StartupValidator.run_full_startup_check(session))
+                ok = bool(StartupValidator.run_full_startup_check(session, force=True))
             except Exception:
                 ok = False
                 try:
@@ -941,6 +941,8 @@ class SettingsWidget(QWidget):
                 try:
                     self.settings.setValue('tax_rate', int(self.tax_rate_input.value()))
                     self.settings.setValue('tax_rate_user_set', 'true')
+                    from pos_app.utils.pricing import get_pricing_engine
+                    get_pricing_engine().invalidate()
                 except Exception:
                     pass
 
@@ -991,6 +993,8 @@ class SettingsWidget(QWidget):
             # Printing settings
             if hasattr(self, 'printer_combo'):
                 self.settings.setValue("printer_name", self.printer_combo.currentText())
+            if hasattr(self, 'receipt_target_edit'):
+                self.settings.setValue("receipt_printer_target", self.receipt_target_edit.text().strip())
             if hasattr(self, 'paper_width_combo'):
                 try:
                     self.settings.setValue("receipt_width_mm", int(self.paper_width_combo.currentText()))
@@ -1080,6 +1084,8 @@ class SettingsWidget(QWidget):
                 index = self.printer_combo.findText(printer)
                 if index >= 0:
                     self.printer_combo.setCurrentIndex(index)
+            if hasattr(self, 'receipt_target_edit'):
+                self.receipt_target_edit.setText(str(self.settings.value("receipt_printer_target", "") or ""))
             if hasattr(self, 'paper_width_combo'):
                 width = str(self.settings.value("receipt_width_mm", "80"))
                 index = self.paper_width_combo.findText(width)
@@ -1141,6 +1147,8 @@ class SettingsWidget(QWidget):
             try:
                 self.settings.setValue('tax_rate', 0)
                 self.settings.setValue('tax_rate_user_set', 'false')
+                from pos_app.utils.pricing import get_pricing_engine
+                get_pricing_engine().invalidate()
             except Exception:
                 pass
             self.currency_input.setCurrentText("PKR")
@@ -1289,6 +1297,12 @@ class SettingsWidget(QWidget):
         self.printer_combo.addItems(names)
         form.addRow("Default Receipt Printer:", self.printer_combo)
 
+        # Raw ESC/POS target (printed in the background, bypasses the driver)
+        self.receipt_target_edit = QLineEdit()
+        self.receipt_target_edit.setPlaceholderText("tcp://192.168.1.50:9100, serial://COM3?baud=9600 or win://Printer Name")
+        self.receipt_target_edit.setToolTip("Leave empty to print receipts through the default printer driver")
+        form.addRow("Raw Receipt Printer (ESC/POS):", self.receipt_target_edit)
+
         # Paper width
         self.paper_width_combo = QComboBox()
         self.paper_width_combo.addItems(["58", "80"])  # mm
@@ -206,6 +206,7 @@ class SuppliersWidget(BaseView):
 
             # cache and show first page
             self._suppliers_cache = suppliers or []
+            self._load_balances()
             self.current_page = 0
 
             # Clear previous contents safely
@@ -223,19 +224,8 @@ class SuppliersWidget(BaseView):
                 self.table.setItem(i, 1, QTableWidgetItem(s.contact or ""))
                 self.table.setItem(i, 2, QTableWidgetItem(s.email or ""))
                 self.table.setItem(i, 3, QTableWidgetItem(s.address or ""))
-                # Outstanding (sum of purchases - paid)
-                try:
-                    from pos_app.models.database import Purchase
-                    purchases = self.controller.session.query(Purchase).filter(Purchase.supplier_id == s.id).all()
-                    outstanding = sum((p.total_amount or 0.0) - (p.paid_amount or 0.0) for p in purchases)
-                    self.table.setItem(i, 4, QTableWidgetItem(f"{outstanding:.2f}"))
-                except Exception as oe:
-                    print(f"[Suppliers] outstanding calc error for supplier {getattr(s,'id',None)}: {oe}")
-                    try:
-                        self.controller.session.rollback()
-                    except Exception as e:
-                        print(f"Warning: Could not rollback session after error: {e}")
-                    self.table.setItem(i, 4, QTableWidgetItem("0.00"))
+                # Outstanding (from the grouped supplier balance query)
+                self.table.setItem(i, 4, QTableWidgetItem(f"{self._supplier_outstanding(s.id):.2f}"))
                 # Store supplier ID for selection handling
                 item = self.table.item(i, 0)
                 if item:
@@ -277,6 +267,21 @@ class SuppliersWidget(BaseView):
         except Exception:
             pass
     
+    def _load_balances(self):
+        """Fetch outstanding payables for all suppliers in one grouped query."""
+        try:
+            from pos_app.controllers.supplier_balances import SupplierBalanceService
+            self._balances = SupplierBalanceService(self.controller.session).get_balances()
+        except Exception as e:
+            print(f"[Suppliers] balance query error: {e}")
+            self._balances = {}
+
+    def _supplier_outstanding(self, supplier_id):
+        try:
+            return float(getattr(self, '_balances', {}).get(supplier_id, {}).get('outstanding', 0.0))
+        except Exception:
+            return 0.0
+
     def _init_sync_timer(self):
         """Poll sync_state and refresh suppliers when data changes on other machines."""
         try:
@@ -326,13 +331,7 @@ class SuppliersWidget(BaseView):
             self.table.setItem(i, 1, QTableWidgetItem(s.contact or ""))
             self.table.setItem(i, 2, QTableWidgetItem(s.email or ""))
             self.table.setItem(i, 3, QTableWidgetItem(s.address or ""))
-            try:
-                from pos_app.models.database import Purchase
-                purchases = self.controller.session.query(Purchase).filter(Purchase.supplier_id == s.id).all()
-                outstanding = sum((p.total_amount or 0.0) - (p.paid_amount or 0.0) for p in purchases)
-                self.table.setItem(i, 4, QTableWidgetItem(f"{outstanding:.2f}"))
-            except Exception:
-                self.table.setItem(i, 4, QTableWidgetItem("0.00"))
+            self.table.setItem(i, 4, QTableWidgetItem(f"{self._supplier_outstanding(s.id):.2f}"))
             # Store supplier ID for selection handling
             item = self.table.item(i, 0)
             if item:
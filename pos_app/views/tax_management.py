@@ -352,6 +352,8 @@ class TaxManagementWidget(QWidget):
                     self.controller.session.query(TaxRate).update({TaxRate.is_default: False})
                 
                 self.controller.session.add(tax_rate)
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", "Tax rate added successfully!")
@@ -382,6 +384,8 @@ class TaxManagementWidget(QWidget):
             tax_rate = self.controller.session.query(TaxRate).filter(TaxRate.name == tax_name).first()
             if tax_rate:
                 tax_rate.is_default = True
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", f"{tax_name} set as default tax rate!")
@@ -407,6 +411,8 @@ class TaxManagementWidget(QWidget):
             
             if product and tax_rate:
                 product.tax_rate = tax_rate.rate
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", f"Tax rate applied to {product.name}")
@@ -452,6 +458,8 @@ class TaxManagementWidget(QWidget):
                 for product in products:
                     product.tax_rate = tax_rate.rate
                 
+                from pos_app.models.database import mark_sync_changed
+                mark_sync_changed(self.controller.session, 'pricing')
                 self.controller.session.commit()
                 
                 QMessageBox.information(self, "Success", f"Tax rate applied to {len(products)} products!")
@@ -469,11 +469,9 @@ class WarehouseRetailInventoryWidget(QWidget):
 
     def load_recent_transfers(self):
         try:
-            from pos_app.models.database import StockMovement, Product
+            from pos_app.controllers.stock_transfers import StockTransferService
             
-            transfers = self.controller.session.query(StockMovement).join(Product).filter(  # TODO: Add .all() or .first()
-                StockMovement.movement_type == "TRANSFER"
-            ).order_by(StockMovement.date.desc()).limit(50).all()
+            transfers = StockTransferService(self.controller.session).recent_transfers(50)
             
             self.transfers_table.setRowCount(len(transfers))
             
@@ -485,7 +483,10 @@ class WarehouseRetailInventoryWidget(QWidget):
                 
                 # Determine direction from notes or reference
                 direction = "Warehouse → Retail"  # Default
-                if "retail" in (transfer.notes or "").lower() and "warehouse" in (transfer.notes or "").lower():
+                if transfer.movement_type == "IN":
+                    # Destination side of an OUT/IN transfer pair
+                    direction = "Warehouse → Retail" if transfer.location == "RETAIL" else "Retail → Warehouse"
+                elif "retail" in (transfer.notes or "").lower() and "warehouse" in (transfer.notes or "").lower():
                     direction = "Retail → Warehouse" if transfer.quantity < 0 else "Warehouse → Retail"
                 
                 self.transfers_table.setItem(i, 2, QTableWidgetItem(direction))
@@ -544,99 +545,35 @@ class WarehouseRetailInventoryWidget(QWidget):
                 QMessageBox.warning(self, "Warning", "Please select a product")
                 return
             
-            from pos_app.models.database import Product, StockMovement, InventoryLocation
-            
-            product = self.controller.session.get(Product, product_id)
-            if not product:
-                QMessageBox.warning(self, "Warning", "Product not found")
-                return
+            from pos_app.controllers.stock_transfers import StockTransferService, TransferError, TO_RETAIL, TO_WAREHOUSE
             
-            # Check stock availability
-            if "Warehouse → Retail" in direction:
-                if getattr(product, 'warehouse_stock', 0) < quantity:
-                    QMessageBox.warning(self, "Warning", "Insufficient warehouse stock")
-                    return
-                
-                # Update stocks
-                product.warehouse_stock = getattr(product, 'warehouse_stock', 0) - quantity
-                product.retail_stock = getattr(product, 'retail_stock', 0) + quantity
-                
-                # Create stock movements
-                # Warehouse OUT
-                warehouse_out = StockMovement(
-                    product_id=product_id,
-                    date=datetime.now(),
-                    movement_type="OUT",
-                    quantity=quantity,
-                    location=InventoryLocation.WAREHOUSE,
-                    reference=f"Transfer to Retail",
-                    notes=notes
-                )
-                
-                # Retail IN
-                retail_in = StockMovement(
-                    product_id=product_id,
-                    date=datetime.now(),
-                    movement_type="IN",
-                    quantity=quantity,
-                    location=InventoryLocation.RETAIL,
-                    reference=f"Transfer from Warehouse",
-                    notes=notes
-                )
-                
-            else:  # Retail → Warehouse
-                if getattr(product, 'retail_stock', 0) < quantity:
-                    QMessageBox.warning(self, "Warning", "Insufficient retail stock")
-                    return
-                
-                # Update stocks
-                product.retail_stock = getattr(product, 'retail_stock', 0) - quantity
-                product.warehouse_stock = getattr(product, 'warehouse_stock', 0) + quantity
-                
-                # Create stock movements
-                # Retail OUT
-                retail_out = StockMovement(
-                    product_id=product_id,
-                    date=datetime.now(),
-                    movement_type="OUT",
-                    quantity=quantity,
-                    location=InventoryLocation.RETAIL,
-                    reference=f"Transfer to Warehouse",
-                    notes=notes
-                )
-                
-                # Warehouse IN
-                warehouse_in = StockMovement(
-                    product_id=product_id,
-                    date=datetime.now(),
-                    movement_type="IN",
-                    quantity=quantity,
-                    location=InventoryLocation.WAREHOUSE,
-                    reference=f"Transfer from Retail",
-                    notes=notes
+            try:
+                StockTransferService(self.controller.session).transfer(
+                    [(product_id, quantity)],
+                    direction=TO_RETAIL if "Warehouse → Retail" in direction else TO_WAREHOUSE,
+                    notes=notes or None
                 )
-            
-            # Update total stock
-            product.stock_level = getattr(product, 'warehouse_stock', 0) + getattr(product, 'retail_stock', 0)
-            
-            self.controller.session.commit()
+            except TransferError as e:
+                QMessageBox.warning(self, "Warning", str(e))
+                return
             
             QMessageBox.information(self, "Success", f"Transfer completed successfully!")
             
-            # Refresh all tables
-            self.load_warehouse_inventory()
-            self.load_retail_inventory()
-            self.load_recent_transfers()
-            self.load_stock_movements()
+            self._refresh_after_transfer()
             
             # Clear form
             self.transfer_quantity.setValue(1)
             self.transfer_notes.clear()
             
         except Exception as e:
-            self.controller.session.rollback()
             QMessageBox.critical(self, "Error", f"Failed to execute transfer: {str(e)}")
 
+    def _refresh_after_transfer(self):
+        self.load_warehouse_inventory()
+        self.load_retail_inventory()
+        self.load_recent_transfers()
+        self.load_stock_movements()
+
     # Placeholder methods for other actions
     def receive_warehouse_stock(self):
         QMessageBox.information(self, "Info", "Receive warehouse stock dialog would open here")
@@ -648,7 +585,36 @@ class WarehouseRetailInventoryWidget(QWidget):
         QMessageBox.information(self, "Info", "Quick transfer to retail dialog would open here")
 
     def restock_from_warehouse(self):
-        QMessageBox.information(self, "Info", "Restock from warehouse dialog would open here")
+        try:
+            from pos_app.controllers.stock_transfers import StockTransferService, TransferError
+            
+            service = StockTransferService(self.controller.session)
+            plan = service.plan_replenishment()
+            if not plan:
+                QMessageBox.information(self, "Info", "Retail stock is at or above reorder level for every product")
+                return
+            
+            units = sum(line['quantity'] for line in plan)
+            answer = QMessageBox.question(
+                self, "Restock from Warehouse",
+                f"Move {units} unit(s) of {len(plan)} product(s) from the warehouse to retail "
+                f"to bring retail stock up to reorder level?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                return
+            
+            try:
+                result = service.replenish_retail()
+            except TransferError as e:
+                QMessageBox.warning(self, "Warning", str(e))
+                return
+            
+            QMessageBox.information(self, "Success", f"Restocked {len(result['lines'])} product(s) from the warehouse")
+            self._refresh_after_transfer()
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to restock from warehouse: {str(e)}")
 
     def adjust_retail_stock(self):
         QMessageBox.information(self, "Info", "Retail stock adjustment dialog would open here")